@@ -0,0 +1,463 @@
+"""
+Offline load test for The Fallen Bot.
+
+Builds a simulated guild (fake Guild/Member/Message objects) and drives the
+real handlers from main.py without connecting to Discord:
+
+    python loadtest.py                         # all scenarios, 2000 members
+    python loadtest.py --members 5000 --scenario on_message --ops 1000
+    python loadtest.py --api-latency 0.05      # pretend each API call takes 50ms
+
+HTTP is stubbed (every send/add_roles/kick just counts the call) and the
+handlers' own asyncio.sleep() rate-limit delays are skipped and totalled as
+"virtual sleep", so the numbers show the bot's own cost. Each scenario runs in
+a fresh temp directory and reports throughput, p50/p99 latency, bytes written
+to the JSON stores and peak Python memory (tracemalloc adds overhead - pass
+--no-memory for cleaner latency numbers).
+"""
+
+import argparse
+import asyncio
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import discord  # noqa: E402
+import main  # noqa: E402
+
+_real_asyncio = asyncio
+_real_sleep = asyncio.sleep
+
+# ==========================================
+# STUBBED HTTP + VIRTUAL SLEEP
+# ==========================================
+
+api_stats = {"calls": {}, "virtual_sleep": 0.0, "latency": 0.0}
+
+async def fake_api_call(endpoint):
+    """Stand-in for a Discord REST call"""
+    api_stats["calls"][endpoint] = api_stats["calls"].get(endpoint, 0) + 1
+    if api_stats["latency"]:
+        await _real_sleep(api_stats["latency"])
+    else:
+        await _real_sleep(0)
+
+async def virtual_sleep(delay, result=None):
+    """Count the handler's own rate-limit delay but don't actually wait"""
+    api_stats["virtual_sleep"] += max(0, delay or 0)
+    await _real_sleep(0)
+    return result
+
+class VirtualAsyncio(types.ModuleType):
+    """asyncio proxy for main.py with sleep() replaced"""
+    def __init__(self):
+        super().__init__("asyncio")
+        self.sleep = virtual_sleep
+
+    def __getattr__(self, name):
+        return getattr(_real_asyncio, name)
+
+# ==========================================
+# SIMULATED GUILD
+# ==========================================
+
+_next_id = [10_000_000_000_000_000]
+
+def new_id():
+    _next_id[0] += 1
+    return _next_id[0]
+
+class FakeAsset:
+    url = "https://cdn.discordapp.com/embed/avatars/0.png"
+
+class FakePermissions:
+    administrator = False
+
+class FakeRole:
+    def __init__(self, name, position):
+        self.id = new_id()
+        self.name = name
+        self.position = position
+        self.mention = f"<@&{self.id}>"
+
+    def __eq__(self, other):
+        return isinstance(other, FakeRole) and other.id == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+class FakeMessage:
+    def __init__(self, author=None, guild=None, channel=None, content="", embed=None):
+        self.id = new_id()
+        self.author = author
+        self.guild = guild
+        self.channel = channel
+        self.content = content
+        self.embeds = [embed] if embed else []
+
+    async def edit(self, **kwargs):
+        await fake_api_call("message.edit")
+
+class FakeChannel:
+    def __init__(self, name, guild):
+        self.id = new_id()
+        self.name = name
+        self.guild = guild
+        self.mention = f"<#{self.id}>"
+
+    async def send(self, content=None, **kwargs):
+        await fake_api_call("channel.send")
+        return FakeMessage(guild=self.guild, channel=self, content=content, embed=kwargs.get("embed"))
+
+class FakeVoiceChannel:
+    def __init__(self, name, guild):
+        self.id = new_id()
+        self.name = name
+        self.guild = guild
+        self.members = []
+
+class FakeVoiceState:
+    def __init__(self, self_deaf=False):
+        self.self_deaf = self_deaf
+
+class FakeMember:
+    def __init__(self, guild, name, roles, bot=False, status=None, voice=None, premium_since=None):
+        self.id = new_id()
+        self.guild = guild
+        self.name = name
+        self.display_name = name
+        self.mention = f"<@{self.id}>"
+        self.roles = roles
+        self.bot = bot
+        self.status = status or discord.Status.online
+        self.voice = voice
+        self.premium_since = premium_since
+        now = datetime.datetime.now(datetime.timezone.utc)
+        self.created_at = now - datetime.timedelta(days=random.randint(1, 2000))
+        self.joined_at = now - datetime.timedelta(days=random.randint(1, 700))
+        self.display_avatar = FakeAsset()
+        self.avatar = FakeAsset()
+        self.guild_permissions = FakePermissions()
+
+    @property
+    def top_role(self):
+        return max(self.roles, key=lambda r: r.position)
+
+    def __str__(self):
+        return self.name
+
+    async def add_roles(self, *roles, reason=None):
+        await fake_api_call("member.add_roles")
+        for role in roles:
+            if role not in self.roles:
+                self.roles.append(role)
+
+    async def remove_roles(self, *roles, reason=None):
+        await fake_api_call("member.remove_roles")
+        self.roles = [r for r in self.roles if r not in roles]
+
+    async def edit(self, **kwargs):
+        await fake_api_call("member.edit")
+        if "roles" in kwargs:
+            self.roles = list(kwargs["roles"])
+
+    async def kick(self, reason=None):
+        await fake_api_call("member.kick")
+
+    async def send(self, content=None, **kwargs):
+        await fake_api_call("dm.send")
+
+class FakeGuild:
+    def __init__(self, name="Simulated Fallen"):
+        self.id = new_id()
+        self.name = name
+        self.roles = []
+        self.text_channels = []
+        self.voice_channels = []
+        self.stage_channels = []
+        self.categories = []
+        self.members = []
+        self._members = {}
+        self.premium_subscription_count = 0
+        self.premium_tier = 0
+        self.created_at = datetime.datetime.now(datetime.timezone.utc)
+        self.me = None
+        self.chunked = True
+
+    @property
+    def member_count(self):
+        return len(self.members)
+
+    def get_member(self, user_id):
+        return self._members.get(int(user_id))
+
+    def get_role(self, role_id):
+        return next((r for r in self.roles if r.id == role_id), None)
+
+    def get_channel(self, channel_id):
+        return next((c for c in self.text_channels if c.id == channel_id), None)
+
+    def add_member(self, member):
+        self.members.append(member)
+        self._members[member.id] = member
+
+class FakeResponse:
+    async def send_message(self, *args, **kwargs):
+        await fake_api_call("interaction.respond")
+
+    async def defer(self, *args, **kwargs):
+        await fake_api_call("interaction.defer")
+
+class FakeInteraction:
+    def __init__(self, guild, channel, user):
+        self.id = new_id()
+        self.guild = guild
+        self.channel = channel
+        self.user = user
+        self.response = FakeResponse()
+
+    async def edit_original_response(self, **kwargs):
+        await fake_api_call("interaction.edit")
+
+def build_guild(args):
+    """Create a guild with the configured role mix"""
+    guild = FakeGuild()
+    role_names = (
+        ["@everyone", main.INACTIVITY_REQUIRED_ROLE, main.INACTIVITY_IMMUNITY_ROLE, main.BOOSTER_ROLE_NAME,
+         main.STAFF_ROLE_NAME, main.UNVERIFIED_ROLE_NAME, main.MEMBER_ROLE_NAME, main.FALLEN_VERIFIED_ROLE]
+        + main.RANK_DEMOTION_ORDER
+        + [cfg["role"] for cfg in main.LEVEL_CONFIG.values()]
+        + list(main.ATTENDANCE_ROLE_REWARDS.values())
+        + list(main.STREAK_ROLE_REWARDS.values())
+    )
+    for pos, name in enumerate(role_names):
+        guild.roles.append(FakeRole(name, pos))
+    roles = {r.name: r for r in guild.roles}
+
+    for name in (main.LOG_CHANNEL_NAME, main.LEVEL_UP_CHANNEL_NAME, main.WELCOME_CHANNEL_NAME, "general"):
+        guild.text_channels.append(FakeChannel(name, guild))
+    lounge = FakeVoiceChannel("lounge", guild)
+    guild.voice_channels.append(lounge)
+
+    statuses = [discord.Status.online, discord.Status.idle, discord.Status.dnd, discord.Status.offline]
+    for i in range(args.members):
+        member_roles = [roles["@everyone"]]
+        if random.random() < args.mainer_frac:
+            member_roles.append(roles[main.INACTIVITY_REQUIRED_ROLE])
+            if random.random() < args.ranked_frac:
+                member_roles.append(roles[random.choice(main.RANK_DEMOTION_ORDER)])
+        if random.random() < args.immunity_frac:
+            member_roles.append(roles[main.INACTIVITY_IMMUNITY_ROLE])
+        booster = random.random() < args.booster_frac
+        if booster:
+            member_roles.append(roles[main.BOOSTER_ROLE_NAME])
+        voice = FakeVoiceState(self_deaf=random.random() < 0.1) if random.random() < args.voice_frac else None
+        member = FakeMember(
+            guild, f"member{i}", member_roles,
+            bot=random.random() < args.bot_frac,
+            status=random.choice(statuses),
+            voice=voice,
+            premium_since=guild.created_at if booster else None,
+        )
+        guild.add_member(member)
+        if voice:
+            lounge.members.append(member)
+    return guild
+
+def seed_user_data(guild, args):
+    """Write a leaderboard with realistic stats, some members long inactive"""
+    now = datetime.datetime.now(datetime.timezone.utc)
+    data = {"roster": [None] * 10, "theme": main.DEFAULT_THEME, "users": {}}
+    for member in guild.members:
+        if member.bot:
+            continue
+        uid = str(member.id)
+        main.ensure_user_structure(data, uid)
+        xp = random.randint(0, 60000)
+        user = data["users"][uid]
+        user["xp"] = xp
+        user["level"] = main.get_level_from_xp(xp)[0]
+        user["coins"] = random.randint(0, 20000)
+        user["messages"] = random.randint(0, 5000)
+        days_ago = random.randint(4, 60) if random.random() < args.inactive_frac else random.randint(0, 2)
+        user["last_active"] = (now - datetime.timedelta(days=days_ago)).isoformat()
+    main.save_data(data)
+
+# ==========================================
+# SCENARIOS
+# ==========================================
+
+async def scenario_on_message(guild, args):
+    humans = [m for m in guild.members if not m.bot]
+    channel = guild.text_channels[-1]
+    for _ in range(args.ops):
+        author = random.choice(humans)
+        message = FakeMessage(author=author, guild=guild, channel=channel, content="hello there")
+        yield main.on_message(message)
+
+async def scenario_voice_tick(guild, args):
+    for _ in range(max(1, args.ops // 100)):
+        yield main.award_voice_xp([guild])
+
+async def scenario_attendance(guild, args):
+    humans = [m for m in guild.members if not m.bot]
+    channel = guild.text_channels[-1]
+    host = humans[0]
+    for _ in range(max(1, args.ops // 25)):
+        attendees = random.sample(humans, min(25, len(humans)))
+        interaction = FakeInteraction(guild, channel, host)
+        yield main.process_attendance_batch(interaction, attendees, "training", host)
+
+async def scenario_inactivity(guild, args):
+    yield main.run_inactivity_check(guild)
+
+SCENARIOS = {
+    "on_message": scenario_on_message,
+    "voice_tick": scenario_voice_tick,
+    "attendance": scenario_attendance,
+    "inactivity": scenario_inactivity,
+}
+
+# ==========================================
+# RUNNER
+# ==========================================
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+def store_bytes_written():
+    return sum(entry["save_bytes"] for entry in main.perf_metrics["stores"].values())
+
+def reset_state():
+    """Clear main.py's in-memory caches between scenarios"""
+    main._guild_shards.clear()
+    main._guild_dirs.clear()
+    main._activity_rollups_dirty.clear()
+    main._presence_counts.clear()
+    main._approx_presence.clear()
+    main._giveaway_state["data"] = None
+    main._live_edits.clear()
+    main._spar_queue["entries"] = None
+    main._spar_role_cache.clear()
+    main._alt_flags = None
+    main._join_tracker.clear()
+    main._level_up_events.clear()
+    main._roblox["users"].clear()
+    main._roblox["profiles"].clear()
+    main._view_index.clear()
+    main._activity_checks = None
+    main._poll_state["data"] = None
+    main._poll_state["tallies"].clear()
+    main._applications["data"] = None
+    main.xp_cooldowns["message"].clear()
+    main.xp_cooldowns["reaction"].clear()
+    main.api_call_tracker.update({"last_call": 0, "calls_this_minute": 0, "minute_start": 0})
+    main.perf_metrics["stores"].clear()
+    api_stats["calls"].clear()
+    api_stats["virtual_sleep"] = 0.0
+
+async def run_scenario(name, args):
+    workdir = tempfile.mkdtemp(prefix=f"fallen_loadtest_{name}_")
+    os.chdir(workdir)
+    reset_state()
+    random.seed(args.seed)
+
+    guild = build_guild(args)
+    seed_user_data(guild, args)
+    bytes_before = store_bytes_written()
+
+    latencies = []
+    if args.memory:
+        tracemalloc.start()
+    wall_start = time.perf_counter()
+    async for coro in SCENARIOS[name](guild, args):
+        start = time.perf_counter()
+        await coro
+        latencies.append((time.perf_counter() - start) * 1000)
+    wall = time.perf_counter() - wall_start
+    peak = 0
+    if args.memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {
+        "scenario": name,
+        "ops": len(latencies),
+        "wall_s": wall,
+        "throughput": len(latencies) / wall if wall else 0.0,
+        "p50_ms": percentile(latencies, 50),
+        "p99_ms": percentile(latencies, 99),
+        "bytes_written": store_bytes_written() - bytes_before,
+        "peak_mem_mb": peak / (1024 * 1024),
+        "api_calls": sum(api_stats["calls"].values()),
+        "virtual_sleep_s": api_stats["virtual_sleep"],
+        "workdir": workdir,
+    }
+
+def print_report(results, args):
+    print("=" * 96)
+    print(f"Simulated guild: {args.members} members | API latency {args.api_latency * 1000:.0f}ms | seed {args.seed}")
+    print("=" * 96)
+    header = f"{'scenario':<12}{'ops':>7}{'ops/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'written':>12}{'peak MB':>9}{'API':>7}{'v.sleep':>10}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(
+            f"{r['scenario']:<12}{r['ops']:>7}{r['throughput']:>10.1f}{r['p50_ms']:>10.1f}{r['p99_ms']:>10.1f}"
+            f"{main.format_number(r['bytes_written']) + 'B':>12}{r['peak_mem_mb']:>9.1f}{r['api_calls']:>7}{r['virtual_sleep_s']:>9.0f}s"
+        )
+    print("-" * len(header))
+    print("written = bytes saved to JSON stores, v.sleep = handler delays skipped (real time they would add)")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline load test for The Fallen Bot")
+    parser.add_argument("--scenario", choices=list(SCENARIOS) + ["all"], default="all")
+    parser.add_argument("--members", type=int, default=2000)
+    parser.add_argument("--ops", type=int, default=500, help="Messages / attendees driven per scenario")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="Seconds each stubbed API call takes")
+    parser.add_argument("--mainer-frac", type=float, default=0.6)
+    parser.add_argument("--ranked-frac", type=float, default=0.7, help="Fraction of Mainers with a stage role")
+    parser.add_argument("--immunity-frac", type=float, default=0.02)
+    parser.add_argument("--booster-frac", type=float, default=0.05)
+    parser.add_argument("--voice-frac", type=float, default=0.1)
+    parser.add_argument("--bot-frac", type=float, default=0.01)
+    parser.add_argument("--inactive-frac", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--no-memory", dest="memory", action="store_false",
+                        help="Skip tracemalloc (it slows every allocation, so latencies read higher)")
+    return parser.parse_args(argv)
+
+async def run(args):
+    main.asyncio = VirtualAsyncio()
+    main.db_pool = None
+    api_stats["latency"] = args.api_latency
+
+    async def no_commands(message):
+        return None
+    main.bot.process_commands = no_commands
+
+    names = list(SCENARIOS) if args.scenario == "all" else [args.scenario]
+    results = []
+    for name in names:
+        print(f"⏳ Running {name}...")
+        results.append(await run_scenario(name, args))
+    print_report(results, args)
+    return results
+
+if __name__ == "__main__":
+    cwd = os.getcwd()
+    try:
+        asyncio.run(run(parse_args()))
+    finally:
+        os.chdir(cwd)
@@ -1,12 +1,19 @@
 import discord
 from discord import app_commands
-from discord.ext import commands, tasks
+from discord.ext import commands
 import json
 import os
 import asyncio
 import datetime
 import random
 import re
+import time
+import functools
+import contextlib
+import contextvars
+import heapq
+import bisect
+from collections import Counter, OrderedDict, deque
 from io import BytesIO
 import aiohttp
 
@@ -36,6 +43,22 @@ TOKEN = os.getenv("DISCORD_TOKEN")
 # PostgreSQL Database URL (set in Render dashboard)
 DATABASE_URL = os.getenv("DATABASE_URL") 
 
+# Guild id whose data lives in the top-level files. Any other guild the bot
+# joins gets its own partition (see GUILD PARTITIONS). Unset = single server,
+# every guild shares the top-level files.
+HOME_GUILD_ID = os.getenv("HOME_GUILD_ID")
+
+# Sharding: SHARD_COUNT unset = one gateway connection, "auto" or a number =
+# AutoShardedBot. Every shard runs in this process - giveaways, polls,
+# tournaments, activity checks and applications are single files rewritten
+# whole, so splitting shards across processes would lose writes.
+SHARD_COUNT = os.getenv("SHARD_COUNT")
+
+# Member cache: "all" caches every member and chunks guilds at startup. A comma
+# list of discord.MemberCacheFlags names ("voice,joined") caches only those
+# members and skips startup chunking; full member lists are fetched on demand.
+MEMBER_CACHE = os.getenv("MEMBER_CACHE", "all")
+
 # --- ROLE SETTINGS ---
 REQUIRED_ROLE_NAME = "Mainer"         # Legacy - keeping for backwards compatibility         
 STAFF_ROLE_NAME = "Staff"             
@@ -72,9 +95,14 @@ WELCOME_CHANNEL_NAME = "╰・welcome"  # Welcome channel for new members
 RECURRING_EVENTS_FILE = "recurring_events.json"
 TRANSCRIPTS_FILE = "ticket_transcripts.json"
 PRACTICE_FILE = "practice_sessions.json"
+SPAR_QUEUE_FILE = "spar_queue.json"
+ALT_FLAGS_FILE = "alt_flags.json"
+COIN_LEDGER_FILE = "coin_ledger.log"  # Append-only coin/XP ledger (see COIN LEDGER)
 LEGACY_FILE = "legacy_data.json"
 EMBEDS_FILE = "custom_embeds.json"
 POLLS_FILE = "polls_data.json"      
+GUILD_DATA_DIR = "guilds"  # Partitions for guilds other than HOME_GUILD_ID
+GUILD_SHARD_LIMIT = int(os.getenv("GUILD_SHARD_LIMIT", "8"))  # Guild partitions kept in memory
 
 # --- LEVEL CARD SETTINGS ---
 # LOCAL FILE ONLY - use your template with black pills
@@ -311,6 +339,7 @@ async def rate_limited_action(coro, delay=API_CALL_DELAY):
     global api_call_tracker
     
     now = datetime.datetime.now().timestamp()
+    wait_start = time.perf_counter()
     
     # Reset counter every minute
     if now - api_call_tracker["minute_start"] > 60:
@@ -331,6 +360,7 @@ async def rate_limited_action(coro, delay=API_CALL_DELAY):
         await asyncio.sleep(delay - time_since_last)
     
     # Execute the action
+    perf_observe("ratelimit", "queue_wait", (time.perf_counter() - wait_start) * 1000)
     api_call_tracker["last_call"] = datetime.datetime.now().timestamp()
     api_call_tracker["calls_this_minute"] += 1
     
@@ -343,6 +373,7 @@ async def safe_add_role(member, role):
         return True
     except discord.HTTPException as e:
         if e.status == 429:  # Rate limited
+            perf_record_rate_limit()
             retry_after = e.retry_after if hasattr(e, 'retry_after') else 5
             print(f"Rate limited! Waiting {retry_after}s...")
             await asyncio.sleep(retry_after)
@@ -362,6 +393,7 @@ async def safe_remove_role(member, role):
         return True
     except discord.HTTPException as e:
         if e.status == 429:
+            perf_record_rate_limit()
             retry_after = e.retry_after if hasattr(e, 'retry_after') else 5
             print(f"Rate limited! Waiting {retry_after}s...")
             await asyncio.sleep(retry_after)
@@ -374,6 +406,39 @@ async def safe_remove_role(member, role):
     except:
         return False
 
+async def reconcile_member_roles(member, add=(), remove=(), reason=None):
+    """
+    Apply role changes as one member.edit(roles=...) call instead of an
+    add/remove per role. None entries are ignored and `add` wins over `remove`.
+    Returns (added, removed) - only the roles that actually changed.
+    """
+    add = [r for r in add if r]
+    add_ids = {r.id for r in add}
+    remove_ids = {r.id for r in remove if r} - add_ids
+    current = [r for r in member.roles if r.id != member.guild.id]  # Skip @everyone
+    current_ids = {r.id for r in current}
+    
+    added = []
+    for role in add:
+        if role.id not in current_ids and role not in added:
+            added.append(role)
+    removed = [r for r in current if r.id in remove_ids]
+    if not added and not removed:
+        return [], []
+    
+    target = [r for r in current if r.id not in remove_ids] + added
+    try:
+        await rate_limited_action(member.edit(roles=target, reason=reason))
+    except discord.HTTPException as e:
+        if e.status != 429:
+            raise
+        perf_record_rate_limit()
+        retry_after = e.retry_after if hasattr(e, 'retry_after') else 5
+        print(f"Rate limited! Waiting {retry_after}s...")
+        await asyncio.sleep(retry_after)
+        await member.edit(roles=target, reason=reason)
+    return added, removed
+
 async def safe_send_message(channel, content=None, embed=None, view=None):
     """Safely send a message with rate limit protection"""
     try:
@@ -383,6 +448,7 @@ async def safe_send_message(channel, content=None, embed=None, view=None):
         )
     except discord.HTTPException as e:
         if e.status == 429:
+            perf_record_rate_limit()
             retry_after = e.retry_after if hasattr(e, 'retry_after') else 5
             await asyncio.sleep(retry_after)
             try:
@@ -400,6 +466,7 @@ async def safe_kick(member, reason=None):
         return True
     except discord.HTTPException as e:
         if e.status == 429:
+            perf_record_rate_limit()
             retry_after = e.retry_after if hasattr(e, 'retry_after') else 5
             await asyncio.sleep(retry_after)
             try:
@@ -420,6 +487,7 @@ async def safe_create_channel(guild, name, category=None, overwrites=None):
         )
     except discord.HTTPException as e:
         if e.status == 429:
+            perf_record_rate_limit()
             retry_after = e.retry_after if hasattr(e, 'retry_after') else 5
             await asyncio.sleep(retry_after)
             try:
@@ -438,6 +506,302 @@ async def safe_delete_channel(channel):
     except:
         return False
 
+# --- LIVE MESSAGE EDITS ---
+# Counters on public messages (check-ins, giveaway entries, registrations)
+# go through queue_live_edit instead of editing on every click. Each message
+# gets at most one edit per interval, and only the newest queued state is
+# sent - anything still waiting when a newer update arrives is dropped.
+
+LIVE_EDIT_INTERVAL = 5.0
+LIVE_EDIT_MAX_TRACKED = 500
+
+_live_edits = {}  # message_id -> {"message", "state", "interval", "last_edit", "task", "sending"}
+
+def queue_live_edit(message, state, interval=LIVE_EDIT_INTERVAL):
+    """
+    Queue the latest state for a message. `state` is either the kwargs for
+    message.edit() or a callable returning them (sync or async) that runs at
+    send time; returning None skips the edit.
+    """
+    entry = _live_edits.get(message.id)
+    if entry is None:
+        if len(_live_edits) >= LIVE_EDIT_MAX_TRACKED:
+            for message_id in [mid for mid, e in _live_edits.items() if e["task"] is None]:
+                del _live_edits[message_id]
+        entry = _live_edits[message.id] = {"message": message, "state": None, "interval": interval, "last_edit": 0.0, "task": None, "sending": False}
+    elif entry["state"] is not None:
+        perf_metrics["live_edits_superseded"] += 1
+    
+    entry["message"] = message
+    entry["state"] = state
+    entry["interval"] = interval
+    if entry["task"] is None:
+        entry["task"] = asyncio.create_task(flush_live_edit(message.id))
+
+async def cancel_live_edit(message_id):
+    """
+    Drop a pending edit before a final edit made directly. A flush that is
+    only waiting is cancelled; one already sending is awaited so it can't
+    land after the final edit.
+    """
+    entry = _live_edits.get(int(message_id))
+    if not entry:
+        return
+    entry["state"] = None
+    task = entry["task"]
+    if task is None or task is asyncio.current_task():
+        return
+    if entry["sending"]:
+        await asyncio.wait([task])
+    else:
+        task.cancel()
+
+async def flush_live_edit(message_id):
+    entry = _live_edits[message_id]
+    try:
+        while entry["state"] is not None:
+            wait = entry["last_edit"] + entry["interval"] - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            
+            state, entry["state"] = entry["state"], None
+            if state is None:
+                break
+            entry["sending"] = True
+            if callable(state):
+                state = state()
+                if asyncio.iscoroutine(state):
+                    state = await state
+            if not state:
+                entry["sending"] = False
+                continue
+            
+            try:
+                await entry["message"].edit(**state)
+                perf_metrics["live_edits_sent"] += 1
+            except discord.HTTPException as e:
+                if e.status == 429:
+                    perf_record_rate_limit()
+                print(f"Live message edit failed: {e}")
+            entry["sending"] = False
+            entry["last_edit"] = time.monotonic()
+    except Exception as e:
+        print(f"Live message edit error: {e}")
+    finally:
+        entry["sending"] = False
+        entry["task"] = None
+
+# --- PERSISTENT VIEW REGISTRY ---
+# Persistent views are registered once per class with fixed custom_ids, and
+# per-item buttons (polls) are DynamicItems matched by custom_id template, so
+# startup cost doesn't grow with the number of live polls or tournaments.
+# A clicked view finds its state from the message (or thread) it lives on
+# through _view_index. Each kind's index is built by its VIEW_INDEX_BUILDERS
+# entry the first time it's needed and dropped whenever that store is saved.
+
+_view_index = {}          # kind -> {message/channel id: state key}
+VIEW_INDEX_BUILDERS = {}  # kind -> function returning {message/channel id: state key}
+
+def invalidate_view_index(kind):
+    _view_index.pop(kind, None)
+
+def resolve_view_state(kind, *ids):
+    """State key for the first of `ids` (message/channel ids) found in the index"""
+    index = _view_index.get(kind)
+    if index is None:
+        index = _view_index[kind] = VIEW_INDEX_BUILDERS[kind]()
+    for object_id in ids:
+        if object_id and str(object_id) in index:
+            return index[str(object_id)]
+    return None
+
+# --- STATIC PAGES ---
+# Help categories and server info pages never change while the bot runs, so
+# each one is built once by its STATIC_PAGE_BUILDERS entry and the same Embed
+# is sent on every click. compile_static_pages() rebuilds them all at startup
+# (after a config edit). Served embeds are shared - copy() before changing one.
+
+_static_pages = {}          # page key -> discord.Embed
+STATIC_PAGE_BUILDERS = {}   # page key -> function returning a discord.Embed
+
+def static_page(key):
+    page = _static_pages.get(key)
+    if page is None:
+        page = _static_pages[key] = STATIC_PAGE_BUILDERS[key]()
+    return page
+
+async def compile_static_pages():
+    _static_pages.clear()
+    for key, builder in STATIC_PAGE_BUILDERS.items():
+        _static_pages[key] = builder()
+    return len(_static_pages)
+
+# ==========================================
+# PERFORMANCE INSTRUMENTATION
+# ==========================================
+# Lightweight latency histograms and counters for the hot paths.
+# Shown by the staff !perf command and, when METRICS_PORT is set,
+# served as Prometheus text on METRICS_HOST:METRICS_PORT/metrics.
+
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = os.getenv("METRICS_PORT")  # Unset = no HTTP endpoint
+LOOP_LAG_INTERVAL = 0.5  # Seconds between event-loop lag probes
+PERF_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+perf_metrics = {
+    "started_at": time.time(),
+    "histograms": {},  # (kind, name) -> histogram
+    "stores": {},  # store -> {"load": n, "save": n, "load_bytes": n, "save_bytes": n}
+    "rate_limit_hits": 0,
+    "live_edits_sent": 0,
+    "live_edits_superseded": 0,
+    "loop_lag_ms": 0.0,
+    "loop_lag_max_ms": 0.0,
+}
+
+def _new_histogram():
+    return {"buckets": [0] * (len(PERF_BUCKETS_MS) + 1), "count": 0, "sum": 0.0, "max": 0.0}
+
+def perf_observe(kind, name, ms):
+    """Record one latency sample (milliseconds)"""
+    key = (kind, name)
+    hist = perf_metrics["histograms"].get(key)
+    if hist is None:
+        hist = perf_metrics["histograms"][key] = _new_histogram()
+    idx = len(PERF_BUCKETS_MS)
+    for i, bound in enumerate(PERF_BUCKETS_MS):
+        if ms <= bound:
+            idx = i
+            break
+    hist["buckets"][idx] += 1
+    hist["count"] += 1
+    hist["sum"] += ms
+    if ms > hist["max"]:
+        hist["max"] = ms
+
+def perf_percentile(hist, pct):
+    """Approximate a percentile from histogram buckets (upper bucket bound)"""
+    if not hist["count"]:
+        return 0.0
+    target = hist["count"] * pct / 100
+    running = 0
+    for i, n in enumerate(hist["buckets"]):
+        running += n
+        if running >= target:
+            return float(PERF_BUCKETS_MS[i]) if i < len(PERF_BUCKETS_MS) else hist["max"]
+    return hist["max"]
+
+@contextlib.contextmanager
+def perf_timer(kind, name):
+    """Time a block: `with perf_timer("render", "level_card"): ...`"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        perf_observe(kind, name, (time.perf_counter() - start) * 1000)
+
+def perf_event(func):
+    """Decorator that records an event handler's latency"""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        with perf_timer("event", func.__name__):
+            return await func(*args, **kwargs)
+    return wrapper
+
+def perf_render(func):
+    """Decorator that records an image generator's render time"""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        with perf_timer("render", func.__name__):
+            return await func(*args, **kwargs)
+    return wrapper
+
+def perf_record_store(store, op, nbytes=0):
+    """Count a JSON store load/save and the bytes moved"""
+    entry = perf_metrics["stores"].get(store)
+    if entry is None:
+        entry = perf_metrics["stores"][store] = {"load": 0, "save": 0, "load_bytes": 0, "save_bytes": 0}
+    entry[op] += 1
+    entry[f"{op}_bytes"] += nbytes
+
+def perf_record_rate_limit():
+    """Count a 429 on both the metrics and the bot's own counter"""
+    perf_metrics["rate_limit_hits"] += 1
+    try:
+        bot.rate_limit_hits += 1
+        bot.last_rate_limit = datetime.datetime.now(datetime.timezone.utc)
+    except NameError:
+        pass
+
+@contextlib.asynccontextmanager
+async def perf_db_acquire():
+    """db_pool.acquire() that records how long we waited for a connection"""
+    start = time.perf_counter()
+    async with db_pool.acquire() as conn:
+        perf_observe("db", "acquire", (time.perf_counter() - start) * 1000)
+        yield conn
+
+async def loop_lag_monitor():
+    """Measure how late the event loop wakes us up - high values mean something is blocking"""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(LOOP_LAG_INTERVAL)
+        lag_ms = max(0.0, (loop.time() - start - LOOP_LAG_INTERVAL) * 1000)
+        perf_metrics["loop_lag_ms"] = lag_ms
+        if lag_ms > perf_metrics["loop_lag_max_ms"]:
+            perf_metrics["loop_lag_max_ms"] = lag_ms
+        perf_observe("loop", "lag", lag_ms)
+
+def render_prometheus_metrics():
+    """Format all metrics in the Prometheus text exposition format"""
+    lines = [
+        "# TYPE fallen_uptime_seconds gauge",
+        f"fallen_uptime_seconds {time.time() - perf_metrics['started_at']:.0f}",
+        "# TYPE fallen_loop_lag_ms gauge",
+        f"fallen_loop_lag_ms {perf_metrics['loop_lag_ms']:.3f}",
+        "# TYPE fallen_rate_limit_hits_total counter",
+        f"fallen_rate_limit_hits_total {perf_metrics['rate_limit_hits']}",
+        "# TYPE fallen_live_edits_total counter",
+        f'fallen_live_edits_total{{result="sent"}} {perf_metrics["live_edits_sent"]}',
+        f'fallen_live_edits_total{{result="superseded"}} {perf_metrics["live_edits_superseded"]}',
+        "# TYPE fallen_latency_ms histogram",
+    ]
+    for (kind, name), hist in sorted(perf_metrics["histograms"].items()):
+        labels = f'kind="{kind}",name="{name}"'
+        running = 0
+        for bound, n in zip(PERF_BUCKETS_MS, hist["buckets"]):
+            running += n
+            lines.append(f'fallen_latency_ms_bucket{{{labels},le="{bound}"}} {running}')
+        lines.append(f'fallen_latency_ms_bucket{{{labels},le="+Inf"}} {hist["count"]}')
+        lines.append(f"fallen_latency_ms_sum{{{labels}}} {hist['sum']:.3f}")
+        lines.append(f"fallen_latency_ms_count{{{labels}}} {hist['count']}")
+    lines.append("# TYPE fallen_store_ops_total counter")
+    lines.append("# TYPE fallen_store_bytes_total counter")
+    for store, entry in sorted(perf_metrics["stores"].items()):
+        for op in ("load", "save"):
+            lines.append(f'fallen_store_ops_total{{store="{store}",op="{op}"}} {entry[op]}')
+            lines.append(f'fallen_store_bytes_total{{store="{store}",op="{op}"}} {entry[op + "_bytes"]}')
+    return "\n".join(lines) + "\n"
+
+async def start_metrics_server():
+    """Serve /metrics on the local metrics port (only when METRICS_PORT is set)"""
+    if not METRICS_PORT:
+        return None
+    from aiohttp import web
+    
+    async def handle_metrics(request):
+        return web.Response(text=render_prometheus_metrics(), content_type="text/plain")
+    
+    app = web.Application()
+    app.router.add_get("/metrics", handle_metrics)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, METRICS_HOST, int(METRICS_PORT))
+    await site.start()
+    print(f"✅ Metrics endpoint on http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+    return runner
+
 # Store cooldowns in memory (user_id: last_xp_time)
 xp_cooldowns = {
     "message": {},
@@ -546,166 +910,136 @@ DEFAULT_THEME = {
     "color": 0x2b2d31 
 }
 
+# --- GUILD PARTITIONS ---
+# User data (with the coin ledger), duels, events, warnings, inactivity and
+# command permissions are kept per guild. The home guild uses the top-level
+# files and guild_id 0 in PostgreSQL; any other guild gets its own files under
+# GUILD_DATA_DIR/<guild id>/ and its own guild_id rows. The guild being served
+# is a context variable set for every gateway event (PersistentBot.setup_hook)
+# and by guild_scope() in background loops, so store helpers pick the right
+# partition without a guild argument. Each partition's in-memory state is one
+# shard; shards past GUILD_SHARD_LIMIT are dropped least recently used first
+# (stores write through, so a dropped shard just reloads from its files).
+
+_current_guild = contextvars.ContextVar("current_guild", default=None)
+_guild_shards = OrderedDict()  # partition -> {state name: state}
+_guild_dirs = set()
+
+def guild_partition(guild_id=None):
+    """'home' or the guild id string - defaults to the guild being served"""
+    if guild_id is None:
+        guild_id = _current_guild.get()
+    if guild_id is None or not HOME_GUILD_ID or str(guild_id) == HOME_GUILD_ID:
+        return "home"
+    return str(guild_id)
+
+def guild_db_id(partition=None):
+    """guild_id column value for a partition (home is 0)"""
+    partition = partition or guild_partition()
+    return 0 if partition == "home" else int(partition)
+
+def db_partition(guild_id):
+    """Partition for a guild_id column value"""
+    return "home" if not guild_id else guild_partition(guild_id)
+
+@contextlib.contextmanager
+def guild_scope(guild_id):
+    """Serve the block from `guild_id`'s partition"""
+    token = _current_guild.set(guild_id)
+    try:
+        yield
+    finally:
+        _current_guild.reset(token)
+
+def guild_path(filename, partition=None):
+    """Where `filename` lives for a partition"""
+    partition = partition or guild_partition()
+    if partition == "home":
+        return filename
+    folder = os.path.join(GUILD_DATA_DIR, partition)
+    if folder not in _guild_dirs:
+        os.makedirs(folder, exist_ok=True)
+        _guild_dirs.add(folder)
+    return os.path.join(folder, filename)
+
+def guild_state(name, factory):
+    """The serving partition's `name` state, created by `factory` on first use"""
+    partition = guild_partition()
+    shard = _guild_shards.get(partition)
+    if shard is None:
+        shard = _guild_shards[partition] = {}
+        for old in list(_guild_shards):
+            if len(_guild_shards) <= GUILD_SHARD_LIMIT:
+                break
+            if old not in ("home", partition):
+                del _guild_shards[old]
+    else:
+        _guild_shards.move_to_end(partition)
+    state = shard.get(name)
+    if state is None:
+        state = shard[name] = factory()
+    return state
+
+def guilds_by_partition():
+    """{partition: [guilds]} for the guilds the bot is in"""
+    partitions = {}
+    for guild in bot.guilds:
+        partitions.setdefault(guild_partition(guild.id), []).append(guild)
+    return partitions
+
+def wrap_gateway_parsers(connection):
+    """Run every gateway event that carries a guild_id inside that guild's scope.
+    Handlers, commands and view callbacks are all scheduled as tasks from here,
+    and tasks copy the context they were created in."""
+    def scoped(parser):
+        def parse(data):
+            guild_id = data.get("guild_id") if isinstance(data, dict) else None
+            if guild_id is None:
+                return parser(data)
+            with guild_scope(int(guild_id)):
+                return parser(data)
+        return parse
+    for event, parser in list(connection.parsers.items()):
+        connection.parsers[event] = scoped(parser)
+
 # --- DATABASE MANAGEMENT ---
 
+# Bump when migrate_schema() changes so existing databases re-run it once
+SCHEMA_VERSION = 3
+
 async def init_database():
-    """Initialize PostgreSQL database connection and tables"""
+    """Open the PostgreSQL pool and migrate the schema if its version changed"""
     global db_pool
     
     if not POSTGRES_AVAILABLE or not DATABASE_URL:
         print("📁 Using JSON file storage (PostgreSQL not configured)")
         return False
     
+    if db_pool:
+        return True  # Pool is opened once per process
+    
     try:
         db_pool = await asyncpg.create_pool(DATABASE_URL, min_size=1, max_size=10)
         
-        # Create tables if they don't exist
-        async with db_pool.acquire() as conn:
-            # Main users table with ALL fields
-            await conn.execute('''
-                CREATE TABLE IF NOT EXISTS users (
-                    user_id BIGINT PRIMARY KEY,
-                    xp INTEGER DEFAULT 0,
-                    level INTEGER DEFAULT 0,
-                    coins INTEGER DEFAULT 0,
-                    wins INTEGER DEFAULT 0,
-                    losses INTEGER DEFAULT 0,
-                    raid_wins INTEGER DEFAULT 0,
-                    raid_losses INTEGER DEFAULT 0,
-                    raid_participation INTEGER DEFAULT 0,
-                    training_attendance INTEGER DEFAULT 0,
-                    tryout_attendance INTEGER DEFAULT 0,
-                    tryout_passes INTEGER DEFAULT 0,
-                    tryout_fails INTEGER DEFAULT 0,
-                    events_hosted INTEGER DEFAULT 0,
-                    daily_streak INTEGER DEFAULT 0,
-                    last_daily TIMESTAMP,
-                    weekly_xp INTEGER DEFAULT 0,
-                    monthly_xp INTEGER DEFAULT 0,
-                    voice_time INTEGER DEFAULT 0,
-                    messages INTEGER DEFAULT 0,
-                    verified BOOLEAN DEFAULT FALSE,
-                    roblox_username TEXT,
-                    roblox_id BIGINT,
-                    last_active TIMESTAMP DEFAULT NOW(),
-                    elo_shield_active BOOLEAN DEFAULT FALSE,
-                    streak_saver_active BOOLEAN DEFAULT FALSE,
-                    training_reserved BOOLEAN DEFAULT FALSE,
-                    custom_level_bg TEXT,
-                    inventory TEXT[] DEFAULT ARRAY[]::TEXT[],
-                    warnings JSONB DEFAULT '[]'::JSONB,
-                    achievements TEXT[] DEFAULT ARRAY[]::TEXT[],
-                    activity_log JSONB DEFAULT '[]'::JSONB,
-                    created_at TIMESTAMP DEFAULT NOW()
-                )
-            ''')
-            
-            # Add new columns if they don't exist (for existing databases)
-            new_columns = [
-                ("training_attendance", "INTEGER DEFAULT 0"),
-                ("tryout_attendance", "INTEGER DEFAULT 0"),
-                ("tryout_passes", "INTEGER DEFAULT 0"),
-                ("tryout_fails", "INTEGER DEFAULT 0"),
-                ("events_hosted", "INTEGER DEFAULT 0"),
-                ("voice_time", "INTEGER DEFAULT 0"),
-                ("last_active", "TIMESTAMP DEFAULT NOW()"),
-                ("elo_shield_active", "BOOLEAN DEFAULT FALSE"),
-                ("streak_saver_active", "BOOLEAN DEFAULT FALSE"),
-                ("training_reserved", "BOOLEAN DEFAULT FALSE"),
-                ("custom_level_bg", "TEXT"),
-                ("inventory", "TEXT[] DEFAULT ARRAY[]::TEXT[]"),
-            ]
-            
-            for col_name, col_type in new_columns:
-                try:
-                    await conn.execute(f'ALTER TABLE users ADD COLUMN IF NOT EXISTS {col_name} {col_type}')
-                except:
-                    pass
-            
-            await conn.execute('''
-                CREATE TABLE IF NOT EXISTS raids (
-                    id SERIAL PRIMARY KEY,
-                    target TEXT NOT NULL,
-                    result TEXT NOT NULL,
-                    participants BIGINT[] DEFAULT ARRAY[]::BIGINT[],
-                    xp_gained INTEGER DEFAULT 0,
-                    created_at TIMESTAMP DEFAULT NOW()
-                )
-            ''')
-            
-            await conn.execute('''
-                CREATE TABLE IF NOT EXISTS wars (
-                    id SERIAL PRIMARY KEY,
-                    clan_name TEXT NOT NULL,
-                    wins INTEGER DEFAULT 0,
-                    losses INTEGER DEFAULT 0,
-                    status TEXT DEFAULT 'active',
-                    created_at TIMESTAMP DEFAULT NOW()
-                )
-            ''')
-            
-            await conn.execute('''
-                CREATE TABLE IF NOT EXISTS tournaments (
-                    id SERIAL PRIMARY KEY,
-                    name TEXT NOT NULL,
-                    status TEXT DEFAULT 'signup',
-                    participants BIGINT[] DEFAULT ARRAY[]::BIGINT[],
-                    bracket JSONB DEFAULT '[]'::JSONB,
-                    winner_id BIGINT,
-                    created_at TIMESTAMP DEFAULT NOW()
-                )
-            ''')
-            
-            await conn.execute('''
-                CREATE TABLE IF NOT EXISTS roster (
-                    position INTEGER PRIMARY KEY,
-                    user_id BIGINT,
-                    roblox_name TEXT
-                )
-            ''')
-            
+        async with perf_db_acquire() as conn:
             await conn.execute('''
                 CREATE TABLE IF NOT EXISTS settings (
                     key TEXT PRIMARY KEY,
                     value JSONB
                 )
             ''')
-            
-            # JSON data backup table (stores entire JSON blobs)
-            await conn.execute('''
-                CREATE TABLE IF NOT EXISTS json_data (
-                    key TEXT PRIMARY KEY,
-                    data JSONB NOT NULL,
-                    updated_at TIMESTAMP DEFAULT NOW()
-                )
-            ''')
-            
-            # ELO/Duels table
-            await conn.execute('''
-                CREATE TABLE IF NOT EXISTS duels (
-                    key TEXT PRIMARY KEY,
-                    data JSONB NOT NULL,
-                    updated_at TIMESTAMP DEFAULT NOW()
-                )
-            ''')
-            
-            # Events table
-            await conn.execute('''
-                CREATE TABLE IF NOT EXISTS events (
-                    key TEXT PRIMARY KEY,
-                    data JSONB NOT NULL,
-                    updated_at TIMESTAMP DEFAULT NOW()
-                )
-            ''')
-            
-            # Inactivity table
-            await conn.execute('''
-                CREATE TABLE IF NOT EXISTS inactivity (
-                    key TEXT PRIMARY KEY,
-                    data JSONB NOT NULL,
-                    updated_at TIMESTAMP DEFAULT NOW()
-                )
-            ''')
+            stored = await conn.fetchval("SELECT value FROM settings WHERE key = 'schema_version'")
+            stored_version = json.loads(stored) if stored else None
+            
+            if stored_version != SCHEMA_VERSION:
+                print(f"Migrating database schema v{stored_version} -> v{SCHEMA_VERSION}...")
+                await migrate_schema(conn)
+                await conn.execute('''
+                    INSERT INTO settings (key, value) VALUES ('schema_version', $1)
+                    ON CONFLICT (key) DO UPDATE SET value = $1
+                ''', json.dumps(SCHEMA_VERSION))
+            else:
+                print(f"✅ Database schema up to date (v{SCHEMA_VERSION})")
         
         print("✅ PostgreSQL database connected and initialized!")
         return True
@@ -716,11 +1050,192 @@ async def init_database():
         db_pool = None
         return False
 
+async def migrate_schema(conn):
+    """Create tables and add missing columns (only runs when SCHEMA_VERSION changes)"""
+    # Main users table with ALL fields
+    await conn.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            user_id BIGINT PRIMARY KEY,
+            xp INTEGER DEFAULT 0,
+            level INTEGER DEFAULT 0,
+            coins INTEGER DEFAULT 0,
+            wins INTEGER DEFAULT 0,
+            losses INTEGER DEFAULT 0,
+            raid_wins INTEGER DEFAULT 0,
+            raid_losses INTEGER DEFAULT 0,
+            raid_participation INTEGER DEFAULT 0,
+            training_attendance INTEGER DEFAULT 0,
+            tryout_attendance INTEGER DEFAULT 0,
+            tryout_passes INTEGER DEFAULT 0,
+            tryout_fails INTEGER DEFAULT 0,
+            events_hosted INTEGER DEFAULT 0,
+            daily_streak INTEGER DEFAULT 0,
+            last_daily TIMESTAMP,
+            weekly_xp INTEGER DEFAULT 0,
+            monthly_xp INTEGER DEFAULT 0,
+            voice_time INTEGER DEFAULT 0,
+            messages INTEGER DEFAULT 0,
+            verified BOOLEAN DEFAULT FALSE,
+            roblox_username TEXT,
+            roblox_id BIGINT,
+            last_active TIMESTAMP DEFAULT NOW(),
+            elo_shield_active BOOLEAN DEFAULT FALSE,
+            streak_saver_active BOOLEAN DEFAULT FALSE,
+            training_reserved BOOLEAN DEFAULT FALSE,
+            custom_level_bg TEXT,
+            inventory TEXT[] DEFAULT ARRAY[]::TEXT[],
+            warnings JSONB DEFAULT '[]'::JSONB,
+            achievements TEXT[] DEFAULT ARRAY[]::TEXT[],
+            activity_log JSONB DEFAULT '[]'::JSONB,
+            created_at TIMESTAMP DEFAULT NOW()
+        )
+    ''')
+    
+    # Add new columns if they don't exist (for existing databases)
+    new_columns = [
+        ("training_attendance", "INTEGER DEFAULT 0"),
+        ("tryout_attendance", "INTEGER DEFAULT 0"),
+        ("tryout_passes", "INTEGER DEFAULT 0"),
+        ("tryout_fails", "INTEGER DEFAULT 0"),
+        ("events_hosted", "INTEGER DEFAULT 0"),
+        ("voice_time", "INTEGER DEFAULT 0"),
+        ("last_active", "TIMESTAMP DEFAULT NOW()"),
+        ("elo_shield_active", "BOOLEAN DEFAULT FALSE"),
+        ("streak_saver_active", "BOOLEAN DEFAULT FALSE"),
+        ("training_reserved", "BOOLEAN DEFAULT FALSE"),
+        ("custom_level_bg", "TEXT"),
+        ("inventory", "TEXT[] DEFAULT ARRAY[]::TEXT[]"),
+    ]
+    
+    for col_name, col_type in new_columns:
+        try:
+            await conn.execute(f'ALTER TABLE users ADD COLUMN IF NOT EXISTS {col_name} {col_type}')
+        except:
+            pass
+    
+    await conn.execute('''
+        CREATE TABLE IF NOT EXISTS raids (
+            id SERIAL PRIMARY KEY,
+            target TEXT NOT NULL,
+            result TEXT NOT NULL,
+            participants BIGINT[] DEFAULT ARRAY[]::BIGINT[],
+            xp_gained INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT NOW()
+        )
+    ''')
+    
+    await conn.execute('''
+        CREATE TABLE IF NOT EXISTS wars (
+            id SERIAL PRIMARY KEY,
+            clan_name TEXT NOT NULL,
+            wins INTEGER DEFAULT 0,
+            losses INTEGER DEFAULT 0,
+            status TEXT DEFAULT 'active',
+            created_at TIMESTAMP DEFAULT NOW()
+        )
+    ''')
+    
+    await conn.execute('''
+        CREATE TABLE IF NOT EXISTS tournaments (
+            id SERIAL PRIMARY KEY,
+            name TEXT NOT NULL,
+            status TEXT DEFAULT 'signup',
+            participants BIGINT[] DEFAULT ARRAY[]::BIGINT[],
+            bracket JSONB DEFAULT '[]'::JSONB,
+            winner_id BIGINT,
+            created_at TIMESTAMP DEFAULT NOW()
+        )
+    ''')
+    
+    await conn.execute('''
+        CREATE TABLE IF NOT EXISTS roster (
+            position INTEGER PRIMARY KEY,
+            user_id BIGINT,
+            roblox_name TEXT
+        )
+    ''')
+    
+    await conn.execute('''
+        CREATE TABLE IF NOT EXISTS settings (
+            key TEXT PRIMARY KEY,
+            value JSONB
+        )
+    ''')
+    
+    # JSON data backup table (stores entire JSON blobs)
+    await conn.execute('''
+        CREATE TABLE IF NOT EXISTS json_data (
+            key TEXT PRIMARY KEY,
+            data JSONB NOT NULL,
+            updated_at TIMESTAMP DEFAULT NOW()
+        )
+    ''')
+    
+    # ELO/Duels table
+    await conn.execute('''
+        CREATE TABLE IF NOT EXISTS duels (
+            key TEXT PRIMARY KEY,
+            data JSONB NOT NULL,
+            updated_at TIMESTAMP DEFAULT NOW()
+        )
+    ''')
+    
+    # Events table
+    await conn.execute('''
+        CREATE TABLE IF NOT EXISTS events (
+            key TEXT PRIMARY KEY,
+            data JSONB NOT NULL,
+            updated_at TIMESTAMP DEFAULT NOW()
+        )
+    ''')
+    
+    # Inactivity table
+    await conn.execute('''
+        CREATE TABLE IF NOT EXISTS inactivity (
+            key TEXT PRIMARY KEY,
+            data JSONB NOT NULL,
+            updated_at TIMESTAMP DEFAULT NOW()
+        )
+    ''')
+    
+    # Coin/XP ledger (append-only, mirrored from COIN_LEDGER_FILE)
+    await conn.execute('''
+        CREATE TABLE IF NOT EXISTS coin_ledger (
+            id BIGSERIAL PRIMARY KEY,
+            guild_id BIGINT NOT NULL DEFAULT 0,
+            user_id BIGINT NOT NULL,
+            coins INTEGER DEFAULT 0,
+            xp INTEGER DEFAULT 0,
+            balance INTEGER NOT NULL,
+            reason TEXT NOT NULL,
+            idempotency_key TEXT,
+            created_at TIMESTAMP DEFAULT NOW()
+        )
+    ''')
+    
+    # Guild partitions: rows are keyed by guild (0 = home guild), so the same
+    # user id or store key can exist once per guild
+    for table, key in (("users", "user_id"), ("json_data", "key"), ("duels", "key"),
+                       ("events", "key"), ("inactivity", "key")):
+        await conn.execute(f'ALTER TABLE {table} ADD COLUMN IF NOT EXISTS guild_id BIGINT NOT NULL DEFAULT 0')
+        await conn.execute(f'ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {table}_pkey')
+        await conn.execute(f'ALTER TABLE {table} ADD PRIMARY KEY (guild_id, {key})')
+    
+    await conn.execute('ALTER TABLE coin_ledger ADD COLUMN IF NOT EXISTS guild_id BIGINT NOT NULL DEFAULT 0')
+    await conn.execute('ALTER TABLE coin_ledger DROP CONSTRAINT IF EXISTS coin_ledger_idempotency_key_key')
+    await conn.execute('DROP INDEX IF EXISTS coin_ledger_user_idx')
+    await conn.execute(
+        'CREATE UNIQUE INDEX IF NOT EXISTS coin_ledger_guild_key_idx ON coin_ledger (guild_id, idempotency_key)'
+    )
+    await conn.execute(
+        'CREATE INDEX IF NOT EXISTS coin_ledger_guild_user_idx ON coin_ledger (guild_id, user_id, created_at DESC)'
+    )
+
 async def db_get_user(user_id: int):
     """Get user data from database"""
     if db_pool:
-        async with db_pool.acquire() as conn:
-            row = await conn.fetchrow('SELECT * FROM users WHERE user_id = $1', user_id)
+        async with perf_db_acquire() as conn:
+            row = await conn.fetchrow('SELECT * FROM users WHERE guild_id = $1 AND user_id = $2', guild_db_id(), user_id)
             if row:
                 return dict(row)
     return None
@@ -728,13 +1243,13 @@ async def db_get_user(user_id: int):
 async def db_save_user(user_id: int, data: dict):
     """Save user data to database"""
     if db_pool:
-        async with db_pool.acquire() as conn:
+        async with perf_db_acquire() as conn:
             await conn.execute('''
                 INSERT INTO users (user_id, xp, level, coins, wins, losses, raid_wins, raid_losses, 
                     raid_participation, daily_streak, weekly_xp, monthly_xp, messages, warnings,
-                    verified, roblox_username, roblox_id, achievements)
-                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15, $16, $17, $18)
-                ON CONFLICT (user_id) DO UPDATE SET
+                    verified, roblox_username, roblox_id, achievements, guild_id)
+                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15, $16, $17, $18, $19)
+                ON CONFLICT (guild_id, user_id) DO UPDATE SET
                     xp = $2, level = $3, coins = $4, wins = $5, losses = $6, raid_wins = $7,
                     raid_losses = $8, raid_participation = $9, daily_streak = $10, weekly_xp = $11,
                     monthly_xp = $12, messages = $13, warnings = $14, verified = $15,
@@ -746,21 +1261,21 @@ async def db_save_user(user_id: int, data: dict):
                 data.get('daily_streak', 0), data.get('weekly_xp', 0), data.get('monthly_xp', 0),
                 data.get('messages', 0), data.get('warnings', 0), data.get('verified', False),
                 data.get('roblox_username'), data.get('roblox_id'),
-                data.get('achievements', [])
+                data.get('achievements', []), guild_db_id()
             )
 
 async def db_get_all_users():
     """Get all users from database"""
     if db_pool:
-        async with db_pool.acquire() as conn:
-            rows = await conn.fetch('SELECT * FROM users ORDER BY xp DESC')
+        async with perf_db_acquire() as conn:
+            rows = await conn.fetch('SELECT * FROM users WHERE guild_id = $1 ORDER BY xp DESC', guild_db_id())
             return {str(row['user_id']): dict(row) for row in rows}
     return {}
 
 async def db_log_raid(target: str, result: str, participants: list, xp_gained: int):
     """Log raid to database"""
     if db_pool:
-        async with db_pool.acquire() as conn:
+        async with perf_db_acquire() as conn:
             await conn.execute('''
                 INSERT INTO raids (target, result, participants, xp_gained)
                 VALUES ($1, $2, $3, $4)
@@ -769,7 +1284,7 @@ async def db_log_raid(target: str, result: str, participants: list, xp_gained: i
 async def db_get_raid_history(limit: int = 10):
     """Get raid history from database"""
     if db_pool:
-        async with db_pool.acquire() as conn:
+        async with perf_db_acquire() as conn:
             rows = await conn.fetch('''
                 SELECT * FROM raids ORDER BY created_at DESC LIMIT $1
             ''', limit)
@@ -778,26 +1293,29 @@ async def db_get_raid_history(limit: int = 10):
 
 # --- JSON DATA MANAGEMENT (with PostgreSQL backup) ---
 
-# In-memory cache to reduce database calls
-_data_cache = None
-_cache_time = None
+# In-memory cache to reduce database calls (one per guild partition)
 CACHE_DURATION = 5  # seconds
 
+def _data_cache():
+    return guild_state("main", lambda: {"data": None, "time": None})
+
 def load_data():
     """Load data from PostgreSQL if available, otherwise JSON file"""
-    global _data_cache, _cache_time
+    cache = _data_cache()
     
     # Check cache first
-    if _data_cache and _cache_time and (datetime.datetime.now() - _cache_time).seconds < CACHE_DURATION:
-        return _data_cache
+    if cache["data"] and cache["time"] and (datetime.datetime.now() - cache["time"]).seconds < CACHE_DURATION:
+        return cache["data"]
     
     # Try to load from JSON file (local copy)
-    if not os.path.exists(LEADERBOARD_FILE):
+    path = guild_path(LEADERBOARD_FILE)
+    if not os.path.exists(path):
         data = {"roster": [None]*10, "theme": DEFAULT_THEME, "users": {}}
     else:
-        with open(LEADERBOARD_FILE, "r") as f:
+        with open(path, "r") as f:
             try:
                 data = json.load(f)
+                perf_record_store(LEADERBOARD_FILE, "load", f.tell())
                 if "users" not in data: data["users"] = {}
                 if "roster" not in data: data["roster"] = [None]*10
                 if "theme" not in data: data["theme"] = DEFAULT_THEME
@@ -805,70 +1323,83 @@ def load_data():
                 print(f"Error loading data: {e}")
                 data = {"roster": [None]*10, "theme": DEFAULT_THEME, "users": {}}
     
-    _data_cache = data
-    _cache_time = datetime.datetime.now()
+    if replay_coin_ledger(data):
+        save_data(data)
+    
+    cache["data"] = data
+    cache["time"] = datetime.datetime.now()
     return data
 
-def save_data(data):
-    """Save data to JSON file and PostgreSQL if available"""
-    global _data_cache, _cache_time
-    
+def save_data(data, touched=None):
+    """Save data to JSON file and PostgreSQL if available.
+    Pass the changed user ids as `touched` to keep server aggregates incremental."""
     # Always save to local JSON file
-    with open(LEADERBOARD_FILE, "w") as f:
+    with open(guild_path(LEADERBOARD_FILE), "w") as f:
         json.dump(data, f, indent=4)
+        perf_record_store(LEADERBOARD_FILE, "save", f.tell())
     
     # Update cache
-    _data_cache = data
-    _cache_time = datetime.datetime.now()
+    cache = _data_cache()
+    cache["data"] = data
+    cache["time"] = datetime.datetime.now()
+    
+    # Keep server aggregates in step
+    if touched is None:
+        mark_server_aggregates_stale()
+    else:
+        for uid in touched:
+            sync_user_aggregates(uid, data["users"].get(uid))
     
     # Also save to PostgreSQL in background if available
     if db_pool:
-        asyncio.create_task(save_data_to_postgres(data))
+        asyncio.create_task(save_data_to_postgres(data, guild_db_id()))
 
-async def save_data_to_postgres(data):
+async def save_data_to_postgres(data, guild_id=0):
     """Save main data to PostgreSQL json_data table"""
     if not db_pool:
         return
     
     try:
-        async with db_pool.acquire() as conn:
+        async with perf_db_acquire() as conn:
             await conn.execute('''
-                INSERT INTO json_data (key, data, updated_at)
-                VALUES ('main_data', $1, NOW())
-                ON CONFLICT (key) DO UPDATE SET data = $1, updated_at = NOW()
-            ''', json.dumps(data))
+                INSERT INTO json_data (guild_id, key, data, updated_at)
+                VALUES ($2, 'main_data', $1, NOW())
+                ON CONFLICT (guild_id, key) DO UPDATE SET data = $1, updated_at = NOW()
+            ''', json.dumps(data), guild_id)
     except Exception as e:
         print(f"PostgreSQL save error: {e}")
 
 async def load_data_from_postgres():
-    """Load main data from PostgreSQL - use on startup to restore data"""
+    """Load main data for every guild from PostgreSQL - {guild_id: data}, used on startup"""
     if not db_pool:
         return None
     
     try:
-        async with db_pool.acquire() as conn:
-            row = await conn.fetchrow("SELECT data FROM json_data WHERE key = 'main_data'")
-            if row:
-                return json.loads(row['data'])
+        async with perf_db_acquire() as conn:
+            rows = await conn.fetch("SELECT guild_id, data FROM json_data WHERE key = 'main_data'")
+            return {row['guild_id']: json.loads(row['data']) for row in rows}
     except Exception as e:
         print(f"PostgreSQL load error: {e}")
     return None
 
+def write_json_file(path, data):
+    """Compact JSON write - used for startup restores, safe to run in a thread"""
+    with open(path, "w") as f:
+        json.dump(data, f, separators=(",", ":"))
+        perf_record_store(path, "save", f.tell())
+
 async def sync_data_from_postgres():
     """Sync local JSON with PostgreSQL data on startup"""
-    global _data_cache, _cache_time
-    
     if not db_pool:
         return False
     
     pg_data = await load_data_from_postgres()
     if pg_data:
-        # PostgreSQL has data - use it
-        with open(LEADERBOARD_FILE, "w") as f:
-            json.dump(pg_data, f, indent=4)
-        _data_cache = pg_data
-        _cache_time = datetime.datetime.now()
-        print("✅ Data synced from PostgreSQL!")
+        # PostgreSQL has data - use it, one file per guild partition
+        for guild_id, guild_data in pg_data.items():
+            await asyncio.to_thread(write_json_file, guild_path(LEADERBOARD_FILE, db_partition(guild_id)), guild_data)
+        _guild_shards.clear()
+        print(f"✅ Data synced from PostgreSQL! ({len(pg_data)} guild partitions)")
         return True
     else:
         # No data in PostgreSQL - upload current JSON
@@ -913,12 +1444,107 @@ def ensure_user_structure(data, uid):
                 data["users"][uid][k] = v
     return data
 
+# --- SERVER AGGREGATES ---
+# Running totals for the stats dashboard, updated per touched user on save.
+# Saves that don't say which users changed mark the aggregates stale and
+# the next read rebuilds them once.
+
+AGGREGATE_FIELDS = {
+    "total_xp": "xp",
+    "total_coins": "coins",
+    "total_wins": "wins",
+    "total_losses": "losses",
+    "total_raids": "raid_participation",
+    "total_trainings": "training_attendance",
+    "total_voice": "voice_time",
+}
+
+def _server_aggregates():
+    return guild_state("aggregates", lambda: {"agg": None, "stale": True})
+
+def mark_server_aggregates_stale():
+    _server_aggregates()["stale"] = True
+
+def _aggregate_row(udata, previous=None):
+    """Snapshot of one user's contribution to the aggregates"""
+    row = {key: udata.get(field, 0) or 0 for key, field in AGGREGATE_FIELDS.items()}
+    row["verified"] = 1 if udata.get("verified") else 0
+    row["level"] = udata.get("level", 0) or 0
+    
+    # Only re-parse last_active when it actually changed
+    last_active = udata.get("last_active")
+    row["last_active"] = last_active
+    if previous is not None and previous["last_active"] == last_active:
+        row["active_day"] = previous["active_day"]
+    else:
+        row["active_day"] = None
+        if last_active:
+            try:
+                last_dt = datetime.datetime.fromisoformat(last_active.replace('Z', '+00:00'))
+                if last_dt.tzinfo is None:
+                    last_dt = last_dt.replace(tzinfo=datetime.timezone.utc)
+                row["active_day"] = last_dt.astimezone(datetime.timezone.utc).date().toordinal()
+            except:
+                pass
+    return row
+
+def _apply_aggregate_row(agg, row, sign):
+    for key in AGGREGATE_FIELDS:
+        agg["totals"][key] += sign * row[key]
+    agg["totals"]["verified_count"] += sign * row["verified"]
+    agg["user_count"] += sign
+    agg["level_sum"] += sign * row["level"]
+    agg["levels"][row["level"]] = agg["levels"].get(row["level"], 0) + sign
+    if row["active_day"] is not None:
+        agg["active_days"][row["active_day"]] = agg["active_days"].get(row["active_day"], 0) + sign
+
+def rebuild_server_aggregates():
+    """Full scan of user data - only runs when the aggregates are stale"""
+    agg = {
+        "totals": {key: 0 for key in AGGREGATE_FIELDS},
+        "user_count": 0,
+        "level_sum": 0,
+        "levels": {},
+        "active_days": {},
+        "rows": {},
+    }
+    agg["totals"]["verified_count"] = 0
+    
+    for uid, udata in load_data().get("users", {}).items():
+        row = _aggregate_row(udata)
+        agg["rows"][uid] = row
+        _apply_aggregate_row(agg, row, 1)
+    
+    state = _server_aggregates()
+    state["agg"], state["stale"] = agg, False
+    return agg
+
+def get_server_aggregates():
+    state = _server_aggregates()
+    if state["agg"] is None or state["stale"]:
+        return rebuild_server_aggregates()
+    return state["agg"]
+
+def sync_user_aggregates(uid, udata):
+    """Swap one user's old contribution for the new one"""
+    state = _server_aggregates()
+    if state["agg"] is None or state["stale"]:
+        return
+    agg = state["agg"]
+    old = agg["rows"].pop(uid, None)
+    if old is not None:
+        _apply_aggregate_row(agg, old, -1)
+    if udata is not None:
+        row = _aggregate_row(udata, old)
+        agg["rows"][uid] = row
+        _apply_aggregate_row(agg, row, 1)
+
 # --- USER DATA HELPERS ---
 def get_user_data(user_id):
     data = load_data()
     uid = str(user_id)
     data = ensure_user_structure(data, uid)
-    save_data(data)
+    save_data(data, touched=(uid,))
     return data["users"][uid]
 
 def update_user_data(user_id, key, value):
@@ -926,7 +1552,7 @@ def update_user_data(user_id, key, value):
     uid = str(user_id)
     data = ensure_user_structure(data, uid)
     data["users"][uid][key] = value
-    save_data(data)
+    save_data(data, touched=(uid,))
 
 def add_user_stat(user_id, key, amount):
     data = load_data()
@@ -938,7 +1564,7 @@ def add_user_stat(user_id, key, amount):
         if new_val > MAX_COINS: new_val = MAX_COINS
         if new_val < 0: new_val = 0
     data["users"][uid][key] = new_val
-    save_data(data)
+    save_data(data, touched=(uid,))
     return new_val
 
 def add_xp_to_user(user_id, amount):
@@ -948,17 +1574,173 @@ def add_xp_to_user(user_id, amount):
     data["users"][uid]["xp"] += amount
     data["users"][uid]["weekly_xp"] += amount
     data["users"][uid]["monthly_xp"] += amount
-    save_data(data)
+    save_data(data, touched=(uid,))
+    if amount > 0:
+        record_activity(user_id, xp=amount)
     return data["users"][uid]["xp"]
 
-def add_coins(user_id, amount):
-    """Add coins to a user"""
+def add_coins(user_id, amount, reason="adjust", key=None):
+    """Add coins to a user (recorded in the coin ledger)"""
+    _, user = ledger_apply(user_id, reason, coins=amount, key=key)
+    return user["coins"]
+
+# --- COIN LEDGER ---
+# Coin/XP grants and purchases are written as one line each to
+# COIN_LEDGER_FILE before the user record is touched, and the balances in
+# leaderboard.json are just the ledger folded up to data["ledger"]["offset"].
+# A crash between the append and the save is replayed by load_data(). Each
+# write can carry an idempotency key (interaction id, "daily:<uid>:<date>"...)
+# so a retried interaction or double-click is applied once. The balance check
+# and debit happen without an await in between, so two purchases can't both
+# spend the same coins.
+
+LEDGER_KEY_MEMORY = 20000  # Recent idempotency keys kept in memory
+
+def _coin_ledger():
+    """This guild's ledger key memory - each guild has its own ledger file"""
+    return guild_state("ledger", lambda: {
+        "keys": None,          # set of recent idempotency keys (None = not loaded yet)
+        "order": deque(),      # same keys, oldest first, for trimming
+    })
+
+def _ledger_keys():
+    ledger = _coin_ledger()
+    if ledger["keys"] is None:
+        keys, order = set(), deque()
+        try:
+            with open(guild_path(COIN_LEDGER_FILE), "r") as f:
+                for line in f:
+                    try:
+                        key = json.loads(line).get("key")
+                    except ValueError:
+                        continue
+                    if key:
+                        keys.add(key)
+                        order.append(key)
+                perf_record_store(COIN_LEDGER_FILE, "load", f.tell())
+        except FileNotFoundError:
+            pass
+        while len(order) > LEDGER_KEY_MEMORY:
+            keys.discard(order.popleft())
+        ledger["keys"], ledger["order"] = keys, order
+    return ledger["keys"]
+
+def ledger_seen(key):
+    """True if a ledger entry with this idempotency key was already applied"""
+    return key in _ledger_keys()
+
+def _remember_ledger_key(key):
+    keys = _ledger_keys()
+    order = _coin_ledger()["order"]
+    keys.add(key)
+    order.append(key)
+    if len(order) > LEDGER_KEY_MEMORY:
+        keys.discard(order.popleft())
+
+def _apply_ledger_entry(user, entry):
+    """Fold one ledger entry into a user record"""
+    user["coins"] = entry["balance"]
+    if entry.get("xp"):
+        user["xp"] = user.get("xp", 0) + entry["xp"]
+        user["weekly_xp"] = user.get("weekly_xp", 0) + entry["xp"]
+        user["monthly_xp"] = user.get("monthly_xp", 0) + entry["xp"]
+    for key, amount in entry.get("incr", {}).items():
+        user[key] = user.get(key, 0) + amount
+    user.update(entry.get("set", {}))
+
+def replay_coin_ledger(data):
+    """Apply ledger lines written after the last saved watermark (crash recovery)"""
+    mark = data.setdefault("ledger", {"seq": 0, "offset": 0})
+    path = guild_path(COIN_LEDGER_FILE)
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        return 0
+    if size < mark["offset"]:
+        mark["offset"] = 0  # Log was replaced; seq numbers still say what's new
+    elif size == mark["offset"]:
+        return 0
+    
+    replayed, torn = 0, False
+    with open(path, "r") as f:
+        f.seek(mark["offset"])
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                torn = True  # Partial final line from a crash mid-append
+                break
+            if entry["seq"] > mark["seq"]:
+                ensure_user_structure(data, entry["user"])
+                _apply_ledger_entry(data["users"][entry["user"]], entry)
+                mark["seq"] = entry["seq"]
+                replayed += 1
+            mark["offset"] += len(line.encode())
+    if torn:
+        os.truncate(path, mark["offset"])
+    if replayed:
+        print(f"💰 Replayed {replayed} coin ledger entries")
+    return replayed
+
+def ledger_apply(user_id, reason, coins=0, xp=0, key=None, require_funds=False, incr=None, fields=None):
+    """Record a coin/XP change (plus counter increments and field updates) as a
+    single ledger entry and apply it. Returns (status, user) where status is
+    "ok", "duplicate" (key already applied) or "insufficient" (would go negative)."""
     data = load_data()
     uid = str(user_id)
     data = ensure_user_structure(data, uid)
-    data["users"][uid]["coins"] = data["users"][uid].get("coins", 0) + amount
-    save_data(data)
-    return data["users"][uid]["coins"]
+    user = data["users"][uid]
+    
+    if key and ledger_seen(key):
+        return "duplicate", user
+    
+    balance = user.get("coins", 0) + coins
+    if require_funds and balance < 0:
+        return "insufficient", user
+    balance = max(0, min(MAX_COINS, balance))
+    
+    mark = data.setdefault("ledger", {"seq": 0, "offset": 0})
+    entry = {
+        "seq": mark["seq"] + 1,
+        "ts": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "user": uid, "coins": coins, "xp": xp, "balance": balance,
+        "reason": reason, "key": key,
+    }
+    if incr:
+        entry["incr"] = incr
+    if fields:
+        entry["set"] = fields
+    
+    line = json.dumps(entry, separators=(",", ":")) + "\n"
+    with open(guild_path(COIN_LEDGER_FILE), "a") as f:
+        f.write(line)
+        mark["offset"] = f.tell()
+    perf_record_store(COIN_LEDGER_FILE, "save", len(line))
+    
+    if key:
+        _remember_ledger_key(key)
+    _apply_ledger_entry(user, entry)
+    mark["seq"] = entry["seq"]
+    save_data(data, touched=(uid,))
+    
+    if xp > 0:
+        record_activity(user_id, xp=xp)
+    if db_pool:
+        asyncio.create_task(db_append_ledger(entry, guild_db_id()))
+    return "ok", user
+
+async def db_append_ledger(entry, guild_id=0):
+    """Mirror a ledger entry to the coin_ledger table"""
+    try:
+        async with perf_db_acquire() as conn:
+            await conn.execute('''
+                INSERT INTO coin_ledger (guild_id, user_id, coins, xp, balance, reason, idempotency_key)
+                VALUES ($1, $2, $3, $4, $5, $6, $7)
+                ON CONFLICT (guild_id, idempotency_key) DO NOTHING
+            ''', guild_id, int(entry["user"]), entry["coins"], entry["xp"], entry["balance"],
+                entry["reason"], entry["key"])
+    except Exception as e:
+        print(f"Coin ledger DB error: {e}")
 
 def calculate_next_level_xp(level):
     """Calculate XP needed for the next level (continuous leveling like Arcane)"""
@@ -1209,6 +1991,7 @@ LEADERBOARD_NAME_POSITIONS = {
 }
 
 
+@perf_render
 async def create_top10_leaderboard_image(guild):
     """
     Create the visual Top 10 leaderboard image with player avatars
@@ -1532,6 +2315,7 @@ def create_arcane_level_embed(member, user_data, rank):
     
     return embed
 
+@perf_render
 async def create_level_card_image(member, user_data, rank, is_booster_user=False):
     """Create a level card by overlaying content on The Fallen template"""
     if not PIL_AVAILABLE:
@@ -1698,6 +2482,7 @@ async def create_level_card_image(member, user_data, rank, is_booster_user=False
     return output
 
 
+@perf_render
 async def create_animated_level_card(member, user_data, rank, is_booster_user=False):
     """Create an animated GIF level card overlaying content on The Fallen template"""
     if not PIL_AVAILABLE:
@@ -1834,6 +2619,7 @@ async def create_animated_level_card(member, user_data, rank, is_booster_user=Fa
     return output
 
 
+@perf_render
 async def create_server_stats_image(guild):
     """Create a visual server stats dashboard"""
     if not PIL_AVAILABLE:
@@ -1857,14 +2643,13 @@ async def create_server_stats_image(guild):
     draw.line([(50, 85), (width - 50, 85)], fill=(80, 80, 100), width=2)
     
     total = guild.member_count
-    online = sum(1 for m in guild.members if m.status != discord.Status.offline)
-    bots = sum(1 for m in guild.members if m.bot)
+    presence = await get_presence_counts(guild)
+    online = total - presence["offline"]
+    bots = presence["bots"]
     humans = total - bots
     boosters = guild.premium_subscription_count or 0
     
-    data = load_data()
-    users = data.get("users", {})
-    total_xp = sum(u.get("xp", 0) for u in users.values())
+    total_xp = get_server_aggregates()["totals"]["total_xp"]
     
     stats = [
         [("MEMBERS", str(total), (114, 137, 218)), ("ONLINE", str(online), (67, 181, 129)), ("HUMANS", str(humans), (255, 255, 255)), ("BOTS", str(bots), (153, 170, 181))],
@@ -1941,6 +2726,7 @@ def create_arcane_leaderboard_embed(guild, users_data, sort_key="xp", title_suff
     
     return embed
 
+@perf_render
 async def create_activity_results_image(guild, check, responses):
     """Create activity check results using custom Fallen background"""
     if not PIL_AVAILABLE:
@@ -2075,6 +2861,7 @@ async def create_activity_results_image(guild, check, responses):
     return buffer
 
 
+@perf_render
 async def create_leaderboard_image(guild, users_data, sort_key="xp", title_suffix="Overall XP"):
     """Create a stylish image-based leaderboard with Fallen theme and avatars"""
     if not PIL_AVAILABLE:
@@ -2333,97 +3120,108 @@ def create_themed_background(width, height, theme="welcome"):
 # WELCOME CARD IMAGE GENERATOR
 # ==========================================
 
-async def create_welcome_card(member):
-    """Create a beautiful welcome card image for new members"""
-    if not PIL_AVAILABLE:
-        return None
-    
-    width, height = 900, 350
-    
-    # Try to load custom welcome background first
-    background = None
-    for path in WELCOME_CARD_PATHS:
-        if os.path.exists(path):
-            try:
-                background = Image.open(path).convert("RGBA")
-                background = background.resize((width, height), Image.Resampling.LANCZOS)
-                break
-            except:
-                pass
-    
-    # If no custom background, create themed one
-    if background is None:
-        background = create_themed_background(width, height, theme="welcome")
-    
-    card = background.copy()
-    
-    # Subtle dark overlay for text readability
-    overlay = Image.new("RGBA", (width, height), (0, 0, 0, 100))
-    card = Image.alpha_composite(card, overlay)
-    
+WELCOME_CARD_SIZE = (900, 350)
+WELCOME_AVATAR_SIZE = 120
+
+# Background, overlay, banner text and fonts never change between joins, so
+# they're rendered once and each card only adds the avatar, name and count
+_welcome_card_assets = {"base": None, "fonts": None, "mask": None}
+
+def get_welcome_card_assets():
+    if _welcome_card_assets["base"] is None:
+        width, height = WELCOME_CARD_SIZE
+        
+        # Try to load custom welcome background first
+        background = None
+        for path in WELCOME_CARD_PATHS:
+            if os.path.exists(path):
+                try:
+                    background = Image.open(path).convert("RGBA")
+                    background = background.resize((width, height), Image.Resampling.LANCZOS)
+                    break
+                except:
+                    pass
+        
+        # If no custom background, create themed one
+        if background is None:
+            background = create_themed_background(width, height, theme="welcome")
+        
+        # Subtle dark overlay for text readability
+        overlay = Image.new("RGBA", (width, height), (0, 0, 0, 100))
+        card = Image.alpha_composite(background, overlay)
+        draw = ImageDraw.Draw(card)
+        
+        # Load fonts
+        try:
+            font_title = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 42)
+            font_name = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 32)
+            font_text = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 20)
+        except:
+            font_title = font_name = font_text = ImageFont.load_default()
+        
+        # Top decorative line with glow effect
+        draw.rectangle([(0, 0), (width, 5)], fill=(139, 0, 0))
+        draw.rectangle([(0, 5), (width, 8)], fill=(80, 0, 0))
+        
+        # Welcome text
+        welcome_text = "WELCOME TO"
+        w_bbox = draw.textbbox((0, 0), welcome_text, font=font_text)
+        w_width = w_bbox[2] - w_bbox[0]
+        draw.text(((width - w_width) // 2, 40), welcome_text, font=font_text, fill=(180, 180, 180))
+        
+        # Server name with shadow
+        server_text = "THE FALLEN"
+        s_bbox = draw.textbbox((0, 0), server_text, font=font_title)
+        s_width = s_bbox[2] - s_bbox[0]
+        draw.text(((width - s_width) // 2 + 2, 72), server_text, font=font_title, fill=(50, 0, 0))
+        draw.text(((width - s_width) // 2, 70), server_text, font=font_title, fill=(255, 255, 255))
+        
+        # Bottom decorative line
+        draw.rectangle([(0, height - 8), (width, height - 5)], fill=(80, 0, 0))
+        draw.rectangle([(0, height - 5), (width, height)], fill=(139, 0, 0))
+        
+        # Circular avatar mask
+        mask = Image.new("L", (WELCOME_AVATAR_SIZE, WELCOME_AVATAR_SIZE), 0)
+        ImageDraw.Draw(mask).ellipse((0, 0, WELCOME_AVATAR_SIZE, WELCOME_AVATAR_SIZE), fill=255)
+        
+        _welcome_card_assets["fonts"] = (font_name, font_text)
+        _welcome_card_assets["mask"] = mask
+        _welcome_card_assets["base"] = card
+    return _welcome_card_assets
+
+def render_welcome_card_sync(avatar_data, display_name, member_count):
+    assets = get_welcome_card_assets()
+    font_name, font_text = assets["fonts"]
+    card = assets["base"].copy()
     draw = ImageDraw.Draw(card)
-    
-    # Load fonts
-    try:
-        font_title = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 42)
-        font_name = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 32)
-        font_text = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 20)
-        font_small = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 16)
-    except:
-        font_title = font_name = font_text = font_small = ImageFont.load_default()
-    
-    # Top decorative line with glow effect
-    draw.rectangle([(0, 0), (width, 5)], fill=(139, 0, 0))
-    draw.rectangle([(0, 5), (width, 8)], fill=(80, 0, 0))
-    
-    # Welcome text
-    welcome_text = "WELCOME TO"
-    w_bbox = draw.textbbox((0, 0), welcome_text, font=font_text)
-    w_width = w_bbox[2] - w_bbox[0]
-    draw.text(((width - w_width) // 2, 40), welcome_text, font=font_text, fill=(180, 180, 180))
-    
-    # Server name with shadow
-    server_text = "THE FALLEN"
-    s_bbox = draw.textbbox((0, 0), server_text, font=font_title)
-    s_width = s_bbox[2] - s_bbox[0]
-    # Shadow
-    draw.text(((width - s_width) // 2 + 2, 72), server_text, font=font_title, fill=(50, 0, 0))
-    # Main text
-    draw.text(((width - s_width) // 2, 70), server_text, font=font_title, fill=(255, 255, 255))
+    width = WELCOME_CARD_SIZE[0]
     
     # Avatar
-    avatar_size = 120
+    avatar_size = WELCOME_AVATAR_SIZE
     avatar_x = (width - avatar_size) // 2
     avatar_y = 130
     
-    # Download avatar
-    try:
-        async with aiohttp.ClientSession() as session:
-            avatar_url = member.display_avatar.with_format('png').with_size(256).url
-            async with session.get(avatar_url) as resp:
-                if resp.status == 200:
-                    avatar_data = await resp.read()
-                    avatar_img = Image.open(BytesIO(avatar_data)).convert("RGBA")
-                    avatar_img = avatar_img.resize((avatar_size, avatar_size), Image.Resampling.LANCZOS)
-                    
-                    # Create circular mask
-                    mask = Image.new("L", (avatar_size, avatar_size), 0)
-                    mask_draw = ImageDraw.Draw(mask)
-                    mask_draw.ellipse((0, 0, avatar_size, avatar_size), fill=255)
-                    
-                    # Red border with glow effect
-                    draw.ellipse(
-                        [avatar_x - 8, avatar_y - 8, avatar_x + avatar_size + 8, avatar_y + avatar_size + 8],
-                        fill=(60, 0, 0)
-                    )
-                    draw.ellipse(
-                        [avatar_x - 5, avatar_y - 5, avatar_x + avatar_size + 5, avatar_y + avatar_size + 5],
-                        fill=(139, 0, 0)
-                    )
-                    
-                    card.paste(avatar_img, (avatar_x, avatar_y), mask)
-                    draw = ImageDraw.Draw(card)
-    except:
+    avatar_img = None
+    if avatar_data:
+        try:
+            avatar_img = Image.open(BytesIO(avatar_data)).convert("RGBA")
+            avatar_img = avatar_img.resize((avatar_size, avatar_size), Image.Resampling.LANCZOS)
+        except:
+            avatar_img = None
+    
+    if avatar_img:
+        # Red border with glow effect
+        draw.ellipse(
+            [avatar_x - 8, avatar_y - 8, avatar_x + avatar_size + 8, avatar_y + avatar_size + 8],
+            fill=(60, 0, 0)
+        )
+        draw.ellipse(
+            [avatar_x - 5, avatar_y - 5, avatar_x + avatar_size + 5, avatar_y + avatar_size + 5],
+            fill=(139, 0, 0)
+        )
+        card.paste(avatar_img, (avatar_x, avatar_y), assets["mask"])
+        draw = ImageDraw.Draw(card)
+    else:
         # Draw placeholder avatar
         draw.ellipse(
             [avatar_x - 5, avatar_y - 5, avatar_x + avatar_size + 5, avatar_y + avatar_size + 5],
@@ -2435,42 +3233,57 @@ async def create_welcome_card(member):
         )
     
     # Username with shadow
-    name_text = member.display_name[:20]  # Truncate long names
+    name_text = display_name[:20]  # Truncate long names
     n_bbox = draw.textbbox((0, 0), name_text, font=font_name)
     n_width = n_bbox[2] - n_bbox[0]
-    # Shadow
     draw.text(((width - n_width) // 2 + 2, 267), name_text, font=font_name, fill=(30, 0, 0))
     draw.text(((width - n_width) // 2, 265), name_text, font=font_name, fill=(255, 255, 255))
     
     # Member count
-    member_num = f"Member #{member.guild.member_count}"
+    member_num = f"Member #{member_count}"
     m_bbox = draw.textbbox((0, 0), member_num, font=font_text)
     m_width = m_bbox[2] - m_bbox[0]
     draw.text(((width - m_width) // 2, 305), member_num, font=font_text, fill=(139, 0, 0))
     
-    # Bottom decorative line
-    draw.rectangle([(0, height - 8), (width, height - 5)], fill=(80, 0, 0))
-    draw.rectangle([(0, height - 5), (width, height)], fill=(139, 0, 0))
-    
     # Save
     output = BytesIO()
-    card.save(output, format="PNG")
+    card.save(output, format="PNG", compress_level=3)
     output.seek(0)
     return output
 
-# ==========================================
-# PROFILE CARD IMAGE GENERATOR
-# ==========================================
-
-async def create_profile_card(member, user_data, rank, achievements, is_booster_user=False):
-    """Create a detailed profile card image"""
+@perf_render
+async def create_welcome_card(member):
+    """Create a beautiful welcome card image for new members"""
     if not PIL_AVAILABLE:
         return None
     
-    width, height = 900, 500
-    
-    # Try to load custom profile background first
-    background = None
+    # Download avatar
+    avatar_data = None
+    try:
+        async with aiohttp.ClientSession() as session:
+            avatar_url = member.display_avatar.with_format('png').with_size(256).url
+            async with session.get(avatar_url) as resp:
+                if resp.status == 200:
+                    avatar_data = await resp.read()
+    except:
+        pass
+    
+    return await asyncio.to_thread(render_welcome_card_sync, avatar_data, member.display_name, member.guild.member_count)
+
+# ==========================================
+# PROFILE CARD IMAGE GENERATOR
+# ==========================================
+
+@perf_render
+async def create_profile_card(member, user_data, rank, achievements, is_booster_user=False):
+    """Create a detailed profile card image"""
+    if not PIL_AVAILABLE:
+        return None
+    
+    width, height = 900, 500
+    
+    # Try to load custom profile background first
+    background = None
     for path in PROFILE_CARD_PATHS:
         if os.path.exists(path):
             try:
@@ -2665,6 +3478,7 @@ async def create_profile_card(member, user_data, rank, achievements, is_booster_
     return output
 
 
+@perf_render
 async def create_animated_profile_card(member, user_data, rank, achievements, is_booster_user=False):
     """Create an animated profile card for boosters"""
     if not PIL_AVAILABLE:
@@ -2861,10 +3675,203 @@ async def check_new_achievements(user_id, guild):
     
     return new_unlocks
 
+# ==========================================
+# ACTIVITY ROLLUPS (Daily per-user + hourly per-guild)
+# ==========================================
+# Compact time-series kept in memory and flushed periodically.
+# Users get a ring buffer of the last ACTIVITY_ROLLUP_DAYS days (slot = day % N),
+# guilds get the same ring of 24-hour histograms plus running hour totals,
+# so graphs and "most active hours" never need to scan all users.
+
+ACTIVITY_ROLLUP_FILE = "activity_rollups.json"
+ACTIVITY_ROLLUP_DAYS = 30  # Days kept per user / guild
+ACTIVITY_FLUSH_INTERVAL = 60  # Seconds between disk flushes
+ACTIVITY_METRICS = ("xp", "messages", "voice")
+
+_activity_rollups_dirty = {}  # partition -> rollups changed since the last flush
+
+def _rollup_state():
+    """This guild's rollups - each guild has its own rollup file"""
+    return guild_state("rollups", lambda: {"data": None})
+
+def load_activity_rollups():
+    """Load this guild's activity rollups (in-memory after first load)"""
+    state = _rollup_state()
+    if state["data"] is not None:
+        return state["data"]
+    partition = guild_partition()
+    data = _activity_rollups_dirty.get(partition)  # Shard was dropped before its flush
+    if data is None:
+        try:
+            with open(guild_path(ACTIVITY_ROLLUP_FILE), "r") as f:
+                data = json.load(f)
+                perf_record_store(ACTIVITY_ROLLUP_FILE, "load", f.tell())
+        except:
+            data = {}
+        data.setdefault("users", {})
+        data.setdefault("guilds", {})
+    state["data"] = data
+    return data
+
+def save_activity_rollups():
+    """Write every guild's dirty activity rollups to disk and PostgreSQL"""
+    while _activity_rollups_dirty:
+        partition, data = _activity_rollups_dirty.popitem()
+        with open(guild_path(ACTIVITY_ROLLUP_FILE, partition), "w") as f:
+            json.dump(data, f, separators=(",", ":"))
+            perf_record_store(ACTIVITY_ROLLUP_FILE, "save", f.tell())
+        
+        if db_pool:
+            asyncio.create_task(save_activity_rollups_to_postgres(data, guild_db_id(partition)))
+
+async def save_activity_rollups_to_postgres(data, guild_id=0):
+    """Save activity rollups to PostgreSQL json_data table"""
+    if not db_pool:
+        return
+    try:
+        async with perf_db_acquire() as conn:
+            await conn.execute('''
+                INSERT INTO json_data (guild_id, key, data, updated_at)
+                VALUES ($2, 'activity_rollups', $1, NOW())
+                ON CONFLICT (guild_id, key) DO UPDATE SET data = $1, updated_at = NOW()
+            ''', json.dumps(data, separators=(",", ":")), guild_id)
+    except Exception as e:
+        print(f"PostgreSQL activity rollups save error: {e}")
+
+async def load_activity_rollups_from_postgres():
+    """Load activity rollups for every guild from PostgreSQL - {guild_id: data}"""
+    if not db_pool:
+        return None
+    try:
+        async with perf_db_acquire() as conn:
+            rows = await conn.fetch("SELECT guild_id, data FROM json_data WHERE key = 'activity_rollups'")
+            return {row['guild_id']: json.loads(row['data']) for row in rows}
+    except Exception as e:
+        print(f"PostgreSQL activity rollups load error: {e}")
+    return None
+
+def _new_user_rollup():
+    series = {"days": [-1] * ACTIVITY_ROLLUP_DAYS}
+    for metric in ACTIVITY_METRICS:
+        series[metric] = [0] * ACTIVITY_ROLLUP_DAYS
+    return series
+
+def _new_guild_rollup():
+    return {
+        "days": [-1] * ACTIVITY_ROLLUP_DAYS,
+        "hours": [0] * (ACTIVITY_ROLLUP_DAYS * 24),
+        "totals": [0] * 24,
+    }
+
+def _user_rollup_slot(series, day):
+    """Get the ring slot for a day, clearing it if it holds an older day"""
+    slot = day % ACTIVITY_ROLLUP_DAYS
+    if series["days"][slot] != day:
+        series["days"][slot] = day
+        for metric in ACTIVITY_METRICS:
+            series[metric][slot] = 0
+    return slot
+
+def _expire_guild_slot(series, slot):
+    """Remove a day's hourly histogram from the running totals"""
+    base = slot * 24
+    hours = series["hours"]
+    totals = series["totals"]
+    for h in range(24):
+        totals[h] -= hours[base + h]
+        hours[base + h] = 0
+
+def _guild_rollup_slot(series, day):
+    slot = day % ACTIVITY_ROLLUP_DAYS
+    if series["days"][slot] != day:
+        _expire_guild_slot(series, slot)
+        series["days"][slot] = day
+    return slot
+
+def _expire_guild_rollup(series, today):
+    """Drop days that fell out of the window without being overwritten"""
+    oldest = today - ACTIVITY_ROLLUP_DAYS
+    for slot, day in enumerate(series["days"]):
+        if day != -1 and day <= oldest:
+            _expire_guild_slot(series, slot)
+            series["days"][slot] = -1
+
+def record_activity(user_id, xp=0, messages=0, voice=0, guild_id=None, when=None):
+    """Add activity to the user's daily rollup and the guild's hourly histogram"""
+    now = when or datetime.datetime.now(datetime.timezone.utc)
+    day = now.date().toordinal()
+    data = load_activity_rollups()
+    
+    uid = str(user_id)
+    series = data["users"].get(uid)
+    if series is None:
+        series = data["users"][uid] = _new_user_rollup()
+    slot = _user_rollup_slot(series, day)
+    series["xp"][slot] += xp
+    series["messages"][slot] += messages
+    series["voice"][slot] += voice
+    
+    if guild_id is not None:
+        gid = str(guild_id)
+        gseries = data["guilds"].get(gid)
+        if gseries is None:
+            gseries = data["guilds"][gid] = _new_guild_rollup()
+        gslot = _guild_rollup_slot(gseries, day)
+        weight = max(1, messages + voice)
+        gseries["hours"][gslot * 24 + now.hour] += weight
+        gseries["totals"][now.hour] += weight
+    
+    _activity_rollups_dirty[guild_partition()] = data
+
+def get_activity_series(user_id, days=ACTIVITY_ROLLUP_DAYS):
+    """Get a user's daily activity, oldest first. Empty list if never tracked."""
+    series = load_activity_rollups()["users"].get(str(user_id))
+    if series is None:
+        return []
+    
+    days = min(days, ACTIVITY_ROLLUP_DAYS)
+    today = datetime.datetime.now(datetime.timezone.utc).date().toordinal()
+    result = []
+    for day in range(today - days + 1, today + 1):
+        slot = day % ACTIVITY_ROLLUP_DAYS
+        entry = {"date": datetime.date.fromordinal(day).isoformat()}
+        for metric in ACTIVITY_METRICS:
+            entry[metric] = series[metric][slot] if series["days"][slot] == day else 0
+        result.append(entry)
+    return result
+
+def get_guild_hourly_activity(guild_id):
+    """Get the guild's activity per UTC hour over the rollup window"""
+    series = load_activity_rollups()["guilds"].get(str(guild_id))
+    if series is None:
+        return [0] * 24
+    today = datetime.datetime.now(datetime.timezone.utc).date().toordinal()
+    _expire_guild_rollup(series, today)
+    return list(series["totals"])
+
+def get_peak_hours(guild_id, top=3):
+    """Get the most active UTC hours as (hour, count), busiest first"""
+    totals = get_guild_hourly_activity(guild_id)
+    ranked = sorted(range(24), key=lambda h: totals[h], reverse=True)
+    return [(h, totals[h]) for h in ranked[:top] if totals[h] > 0]
+
+async def activity_rollup_flush_loop():
+    """Background loop that flushes dirty activity rollups to disk"""
+    await bot.wait_until_ready()
+    
+    while not bot.is_closed():
+        await asyncio.sleep(ACTIVITY_FLUSH_INTERVAL)
+        try:
+            if _activity_rollups_dirty:
+                save_activity_rollups()
+        except Exception as e:
+            print(f"Activity rollup flush error: {e}")
+
 # ==========================================
 # ACTIVITY GRAPH GENERATOR
 # ==========================================
 
+@perf_render
 async def create_activity_graph(member, user_data):
     """Create an activity graph showing XP over time"""
     if not PIL_AVAILABLE:
@@ -2893,11 +3900,12 @@ async def create_activity_graph(member, user_data):
     # Draw grid
     draw.rectangle([(graph_x, graph_y), (graph_x + graph_width, graph_y + graph_height)], outline=(50, 50, 60))
     
-    # Get activity data (simulated - would need to track daily XP)
-    activity_log = user_data.get('activity_log', [])
+    # Get daily activity from the rollup store
+    activity_log = get_activity_series(member.id) or user_data.get('activity_log', [])
+    active_days = sum(1 for d in activity_log if any(d.get(m, 0) for m in ACTIVITY_METRICS))
     
     # If no data, show message
-    if len(activity_log) < 2:
+    if active_days < 2:
         draw.text((graph_x + 200, graph_y + 120), "Not enough data yet", font=font_title, fill=(100, 100, 100))
         draw.text((graph_x + 180, graph_y + 160), "Activity tracking starts now!", font=font_label, fill=(80, 80, 80))
     else:
@@ -2945,13 +3953,16 @@ RAID_HISTORY_FILE = "raid_history.json"
 def load_raid_history():
     try:
         with open(RAID_HISTORY_FILE, "r") as f:
-            return json.load(f)
+            data = json.load(f)
+            perf_record_store(RAID_HISTORY_FILE, "load", f.tell())
+            return data
     except:
         return {"raids": []}
 
 def save_raid_history(data):
     with open(RAID_HISTORY_FILE, "w") as f:
         json.dump(data, f, indent=2)
+        perf_record_store(RAID_HISTORY_FILE, "save", f.tell())
 
 def log_raid(target, result, participants, xp_gained):
     """Log a raid to history"""
@@ -2976,13 +3987,16 @@ TOURNAMENT_FILE = "tournaments.json"
 def load_tournaments():
     try:
         with open(TOURNAMENT_FILE, "r") as f:
-            return json.load(f)
+            data = json.load(f)
+            perf_record_store(TOURNAMENT_FILE, "load", f.tell())
+            return data
     except:
         return {"active": None, "history": []}
 
 def save_tournaments(data):
     with open(TOURNAMENT_FILE, "w") as f:
         json.dump(data, f, indent=2)
+        perf_record_store(TOURNAMENT_FILE, "save", f.tell())
 
 def create_bracket(participants):
     """Create a tournament bracket from participants"""
@@ -3033,6 +4047,7 @@ def create_bracket(participants):
     
     return bracket
 
+@perf_render
 async def create_bracket_image(tournament_name, bracket):
     """Generate a visual tournament bracket image"""
     if not PIL_AVAILABLE:
@@ -3253,6 +4268,7 @@ def draw_rank_border(draw, card, x, y, size, border_style):
 # SERVER STATS IMAGE GENERATOR
 # ==========================================
 
+@perf_render
 async def create_server_stats_image(guild):
     """Create a beautiful server statistics image"""
     if not PIL_AVAILABLE:
@@ -3297,16 +4313,15 @@ async def create_server_stats_image(guild):
     t_width = t_bbox[2] - t_bbox[0]
     draw.text(((width - t_width) // 2, 25), title, font=font_title, fill=(255, 255, 255))
     
-    # Load data
-    data = load_data()
-    users = data.get("users", {})
+    # Load running totals
+    totals = get_server_aggregates()["totals"]
     
-    total_xp = sum(u.get('xp', 0) for u in users.values())
-    total_coins = sum(u.get('coins', 0) for u in users.values())
-    total_voice = sum(u.get('voice_time', 0) for u in users.values())
-    total_wins = sum(u.get('wins', 0) for u in users.values())
-    total_raids = sum(u.get('raid_participation', 0) for u in users.values())
-    verified_count = sum(1 for u in users.values() if u.get('verified', False))
+    total_xp = totals["total_xp"]
+    total_coins = totals["total_coins"]
+    total_voice = totals["total_voice"]
+    total_wins = totals["total_wins"]
+    total_raids = totals["total_raids"]
+    verified_count = totals["verified_count"]
     
     # Stats boxes
     stats = [
@@ -3348,7 +4363,7 @@ async def create_server_stats_image(guild):
     section_y = 320
     draw.text((75, section_y), "🏆 TOP MEMBERS", font=font_label, fill=(200, 200, 200))
     
-    sorted_users = sorted(users.items(), key=lambda x: x[1].get('xp', 0), reverse=True)[:5]
+    sorted_users = heapq.nlargest(5, load_data()["users"].items(), key=lambda x: x[1].get('xp', 0))
     
     for i, (uid, udata) in enumerate(sorted_users):
         member = guild.get_member(int(uid))
@@ -3365,7 +4380,7 @@ async def create_server_stats_image(guild):
     # Recent activity
     draw.text((450, section_y), "📊 SERVER INFO", font=font_label, fill=(200, 200, 200))
     
-    online = sum(1 for m in guild.members if m.status != discord.Status.offline)
+    online = guild.member_count - (await get_presence_counts(guild))["offline"]
     text_channels = len(guild.text_channels)
     voice_channels = len(guild.voice_channels)
     roles = len(guild.roles)
@@ -3394,6 +4409,7 @@ async def create_server_stats_image(guild):
 # SHOP IMAGE GENERATOR
 # ==========================================
 
+@perf_render
 async def create_shop_image():
     """Create a visual shop image"""
     if not PIL_AVAILABLE:
@@ -3485,9 +4501,9 @@ async def create_shop_image():
 
 MEMBER_MILESTONES = [50, 100, 150, 200, 250, 300, 400, 500, 750, 1000]
 
-async def check_member_milestone(guild):
+async def check_member_milestone(guild, member_count=None):
     """Check if guild hit a member milestone and announce it"""
-    member_count = guild.member_count
+    member_count = member_count or guild.member_count
     
     for milestone in MEMBER_MILESTONES:
         if member_count == milestone:
@@ -3518,6 +4534,7 @@ async def check_member_milestone(guild):
                     await channel.send(embed=embed)
             break
 
+@perf_render
 async def create_milestone_image(guild, milestone):
     """Create a celebration image for member milestones"""
     if not PIL_AVAILABLE:
@@ -3597,6 +4614,7 @@ async def create_milestone_image(guild, milestone):
 # VOICE LEADERBOARD IMAGE GENERATOR
 # ==========================================
 
+@perf_render
 async def create_voice_leaderboard_image(guild):
     """Create a voice time leaderboard image"""
     if not PIL_AVAILABLE:
@@ -3727,42 +4745,44 @@ ELO_TIERS = [
 
 def load_duels_data():
     try:
-        with open(DUELS_FILE, "r") as f:
-            return json.load(f)
+        with open(guild_path(DUELS_FILE), "r") as f:
+            data = json.load(f)
+            perf_record_store(DUELS_FILE, "load", f.tell())
+            return data
     except:
         return {"elo": {}, "pending_duels": {}, "duel_history": [], "active_duels": {}}
 
 def save_duels_data(data):
-    with open(DUELS_FILE, "w") as f:
+    with open(guild_path(DUELS_FILE), "w") as f:
         json.dump(data, f, indent=2)
+        perf_record_store(DUELS_FILE, "save", f.tell())
     
     # Also save to PostgreSQL if available
     if db_pool:
-        asyncio.create_task(save_duels_to_postgres(data))
+        asyncio.create_task(save_duels_to_postgres(data, guild_db_id()))
 
-async def save_duels_to_postgres(data):
+async def save_duels_to_postgres(data, guild_id=0):
     """Save duels data to PostgreSQL"""
     if not db_pool:
         return
     try:
-        async with db_pool.acquire() as conn:
+        async with perf_db_acquire() as conn:
             await conn.execute('''
-                INSERT INTO duels (key, data, updated_at)
-                VALUES ('duels_data', $1, NOW())
-                ON CONFLICT (key) DO UPDATE SET data = $1, updated_at = NOW()
-            ''', json.dumps(data))
+                INSERT INTO duels (guild_id, key, data, updated_at)
+                VALUES ($2, 'duels_data', $1, NOW())
+                ON CONFLICT (guild_id, key) DO UPDATE SET data = $1, updated_at = NOW()
+            ''', json.dumps(data), guild_id)
     except Exception as e:
         print(f"PostgreSQL duels save error: {e}")
 
 async def load_duels_from_postgres():
-    """Load duels data from PostgreSQL"""
+    """Load duels data for every guild from PostgreSQL - {guild_id: data}"""
     if not db_pool:
         return None
     try:
-        async with db_pool.acquire() as conn:
-            row = await conn.fetchrow("SELECT data FROM duels WHERE key = 'duels_data'")
-            if row:
-                return json.loads(row['data'])
+        async with perf_db_acquire() as conn:
+            rows = await conn.fetch("SELECT guild_id, data FROM duels WHERE key = 'duels_data'")
+            return {row['guild_id']: json.loads(row['data']) for row in rows}
     except Exception as e:
         print(f"PostgreSQL duels load error: {e}")
     return None
@@ -4148,13 +5168,16 @@ TOURNAMENTS_FILE = "tournaments.json"
 def load_tournaments():
     try:
         with open(TOURNAMENTS_FILE, "r") as f:
-            return json.load(f)
+            data = json.load(f)
+            perf_record_store(TOURNAMENTS_FILE, "load", f.tell())
+            return data
     except:
         return {"active": None, "history": []}
 
 def save_tournaments(data):
     with open(TOURNAMENTS_FILE, "w") as f:
         json.dump(data, f, indent=2)
+        perf_record_store(TOURNAMENTS_FILE, "save", f.tell())
 
 def create_tournament(name, creator_id, required_role_id=None, required_role_name=None, channel_id=None, max_participants=16):
     """Create a new tournament"""
@@ -4563,8 +5586,7 @@ class SimpleWinnerSelect(discord.ui.View):
             
             tournament = get_active_tournament()
             if tournament and tournament.get("status") == "complete":
-                add_coins(int(winner_id), 5000)
-                add_xp_to_user(int(winner_id), 500)
+                award_tournament_prize(tournament, int(winner_id), 1, 5000, 500)
                 await interaction.response.send_message(f"🏆 **CHAMPION: {name}!**\n+5000 coins +500 XP!", ephemeral=True)
             else:
                 await interaction.response.send_message(f"✅ {name} wins!", ephemeral=True)
@@ -4876,9 +5898,7 @@ class TournamentWinnerSelectView(discord.ui.View):
                 # Check if complete
                 tournament = get_active_tournament()
                 if tournament and tournament.get("status") == "complete":
-                    # Award champion using correct function
-                    add_user_stat(int(winner_id), "coins", 5000)
-                    add_xp_to_user(int(winner_id), 500)
+                    award_tournament_prize(tournament, int(winner_id), 1, 5000, 500)
                     
                     await interaction.response.send_message(
                         f"🏆 **TOURNAMENT COMPLETE!**\n\n"
@@ -4988,7 +6008,6 @@ async def check_attendance_roles(member, guild):
     user_data = get_user_data(member.id)
     total_trainings = user_data.get("training_attendance", 0) + user_data.get("tryout_attendance", 0)
     
-    roles_to_add = []
     highest_earned = None
     
     # Check total attendance roles
@@ -4996,24 +6015,25 @@ async def check_attendance_roles(member, guild):
         if total_trainings >= threshold:
             highest_earned = role_name
     
-    if highest_earned:
-        # Remove lower attendance roles, keep only highest
-        for threshold, role_name in ATTENDANCE_ROLE_REWARDS.items():
-            role = discord.utils.get(guild.roles, name=role_name)
-            if role:
-                if role_name == highest_earned:
-                    if role not in member.roles:
-                        await safe_add_role(member, role)
-                        roles_to_add.append(role_name)
-                else:
-                    if role in member.roles:
-                        await safe_remove_role(member, role)
+    if not highest_earned:
+        return []
     
-    return roles_to_add
+    # Keep only the highest attendance role - one role update
+    return await set_reward_role(member, guild, ATTENDANCE_ROLE_REWARDS.values(), highest_earned)
+
+async def set_reward_role(member, guild, reward_role_names, keep):
+    """Leave the member with only `keep` out of a reward ladder (or none)"""
+    keep_role = discord.utils.get(guild.roles, name=keep) if keep else None
+    others = [discord.utils.get(guild.roles, name=name) for name in reward_role_names if name != keep]
+    try:
+        added, _ = await reconcile_member_roles(member, add=[keep_role], remove=others)
+    except Exception as e:
+        print(f"Reward role update failed for {member}: {e}")
+        return []
+    return [role.name for role in added]
 
 async def check_streak_roles(member, guild, current_streak):
     """Check and award streak milestone roles"""
-    roles_to_add = []
     highest_earned = None
     
     # Find highest earned streak role
@@ -5021,72 +6041,53 @@ async def check_streak_roles(member, guild, current_streak):
         if current_streak >= threshold:
             highest_earned = role_name
     
-    if highest_earned:
-        # Remove lower streak roles, keep only highest
-        for threshold, role_name in STREAK_ROLE_REWARDS.items():
-            role = discord.utils.get(guild.roles, name=role_name)
-            if role:
-                if role_name == highest_earned:
-                    if role not in member.roles:
-                        await safe_add_role(member, role)
-                        roles_to_add.append(role_name)
-                else:
-                    if role in member.roles:
-                        await safe_remove_role(member, role)
-    else:
-        # No streak role earned, remove all streak roles
-        for threshold, role_name in STREAK_ROLE_REWARDS.items():
-            role = discord.utils.get(guild.roles, name=role_name)
-            if role and role in member.roles:
-                await safe_remove_role(member, role)
-    
-    return roles_to_add
+    # Keep only the highest streak role, or none if no streak role earned
+    return await set_reward_role(member, guild, STREAK_ROLE_REWARDS.values(), highest_earned)
 
 async def remove_streak_roles(member, guild):
     """Remove all streak roles when streak breaks"""
-    for threshold, role_name in STREAK_ROLE_REWARDS.items():
-        role = discord.utils.get(guild.roles, name=role_name)
-        if role and role in member.roles:
-            await safe_remove_role(member, role)
+    await set_reward_role(member, guild, STREAK_ROLE_REWARDS.values(), None)
 
 def load_events_data():
     try:
-        with open(EVENTS_FILE, "r") as f:
-            return json.load(f)
+        with open(guild_path(EVENTS_FILE), "r") as f:
+            data = json.load(f)
+            perf_record_store(EVENTS_FILE, "load", f.tell())
+            return data
     except:
         return {"scheduled_events": [], "attendance_streaks": {}, "attendance_history": {}}
 
 def save_events_data(data):
-    with open(EVENTS_FILE, "w") as f:
+    with open(guild_path(EVENTS_FILE), "w") as f:
         json.dump(data, f, indent=2)
+        perf_record_store(EVENTS_FILE, "save", f.tell())
     
     # Also save to PostgreSQL if available
     if db_pool:
-        asyncio.create_task(save_events_to_postgres(data))
+        asyncio.create_task(save_events_to_postgres(data, guild_db_id()))
 
-async def save_events_to_postgres(data):
+async def save_events_to_postgres(data, guild_id=0):
     """Save events data to PostgreSQL"""
     if not db_pool:
         return
     try:
-        async with db_pool.acquire() as conn:
+        async with perf_db_acquire() as conn:
             await conn.execute('''
-                INSERT INTO events (key, data, updated_at)
-                VALUES ('events_data', $1, NOW())
-                ON CONFLICT (key) DO UPDATE SET data = $1, updated_at = NOW()
-            ''', json.dumps(data))
+                INSERT INTO events (guild_id, key, data, updated_at)
+                VALUES ($2, 'events_data', $1, NOW())
+                ON CONFLICT (guild_id, key) DO UPDATE SET data = $1, updated_at = NOW()
+            ''', json.dumps(data), guild_id)
     except Exception as e:
         print(f"PostgreSQL events save error: {e}")
 
 async def load_events_from_postgres():
-    """Load events data from PostgreSQL"""
+    """Load events data for every guild from PostgreSQL - {guild_id: data}"""
     if not db_pool:
         return None
     try:
-        async with db_pool.acquire() as conn:
-            row = await conn.fetchrow("SELECT data FROM events WHERE key = 'events_data'")
-            if row:
-                return json.loads(row['data'])
+        async with perf_db_acquire() as conn:
+            rows = await conn.fetch("SELECT guild_id, data FROM events WHERE key = 'events_data'")
+            return {row['guild_id']: json.loads(row['data']) for row in rows}
     except Exception as e:
         print(f"PostgreSQL events load error: {e}")
     return None
@@ -5098,43 +6099,45 @@ async def load_events_from_postgres():
 def load_recurring_events():
     """Load recurring events configuration"""
     try:
-        with open(RECURRING_EVENTS_FILE, "r") as f:
-            return json.load(f)
+        with open(guild_path(RECURRING_EVENTS_FILE), "r") as f:
+            data = json.load(f)
+            perf_record_store(RECURRING_EVENTS_FILE, "load", f.tell())
+            return data
     except:
         return {"recurring_events": [], "last_created": {}}
 
 def save_recurring_events(data):
     """Save recurring events configuration"""
-    with open(RECURRING_EVENTS_FILE, "w") as f:
+    with open(guild_path(RECURRING_EVENTS_FILE), "w") as f:
         json.dump(data, f, indent=2)
+        perf_record_store(RECURRING_EVENTS_FILE, "save", f.tell())
     
     # Also save to PostgreSQL if available
     if db_pool:
-        asyncio.create_task(save_recurring_to_postgres(data))
+        asyncio.create_task(save_recurring_to_postgres(data, guild_db_id()))
 
-async def save_recurring_to_postgres(data):
+async def save_recurring_to_postgres(data, guild_id=0):
     """Save recurring events to PostgreSQL"""
     if not db_pool:
         return
     try:
-        async with db_pool.acquire() as conn:
+        async with perf_db_acquire() as conn:
             await conn.execute('''
-                INSERT INTO json_data (key, data, updated_at)
-                VALUES ('recurring_events', $1, NOW())
-                ON CONFLICT (key) DO UPDATE SET data = $1, updated_at = NOW()
-            ''', json.dumps(data))
+                INSERT INTO json_data (guild_id, key, data, updated_at)
+                VALUES ($2, 'recurring_events', $1, NOW())
+                ON CONFLICT (guild_id, key) DO UPDATE SET data = $1, updated_at = NOW()
+            ''', json.dumps(data), guild_id)
     except Exception as e:
         print(f"PostgreSQL recurring save error: {e}")
 
 async def load_recurring_from_postgres():
-    """Load recurring events from PostgreSQL"""
+    """Load recurring events for every guild from PostgreSQL - {guild_id: data}"""
     if not db_pool:
         return None
     try:
-        async with db_pool.acquire() as conn:
-            row = await conn.fetchrow("SELECT data FROM json_data WHERE key = 'recurring_events'")
-            if row:
-                return json.loads(row['data'])
+        async with perf_db_acquire() as conn:
+            rows = await conn.fetch("SELECT guild_id, data FROM json_data WHERE key = 'recurring_events'")
+            return {row['guild_id']: json.loads(row['data']) for row in rows}
     except Exception as e:
         print(f"PostgreSQL recurring load error: {e}")
     return None
@@ -5230,7 +6233,8 @@ async def check_recurring_events(guild):
                     title=recurring["title"],
                     scheduled_time=scheduled_time.isoformat(),
                     host_id=recurring["created_by"],
-                    channel_id=recurring["channel_id"]
+                    channel_id=recurring["channel_id"],
+                    guild_id=guild.id
                 )
                 
                 # Mark as created
@@ -5259,13 +6263,14 @@ async def recurring_events_loop():
     while not bot.is_closed():
         try:
             for guild in bot.guilds:
-                await check_recurring_events(guild)
+                with guild_scope(guild.id):
+                    await check_recurring_events(guild)
         except Exception as e:
             print(f"Recurring events check error: {e}")
         
         await asyncio.sleep(300)  # Check every 5 minutes
 
-def create_event(event_type, title, scheduled_time, host_id, ping_role=None, channel_id=None, server_link=None):
+def create_event(event_type, title, scheduled_time, host_id, ping_role=None, channel_id=None, server_link=None, guild_id=None):
     """Create a new scheduled event"""
     data = load_events_data()
     
@@ -5279,6 +6284,7 @@ def create_event(event_type, title, scheduled_time, host_id, ping_role=None, cha
         "host_id": str(host_id),
         "ping_role": ping_role,
         "channel_id": str(channel_id) if channel_id else None,
+        "guild_id": str(guild_id) if guild_id else None,  # Reminders only go to this guild
         "server_link": server_link,  # Private server link for Roblox
         "message_id": None,  # Will store the announcement message ID
         "rsvp_yes": [],
@@ -5372,20 +6378,10 @@ def log_attendance(event_id, attendee_ids, host_id):
         uid = str(uid)
         rewards = ATTENDANCE_REWARDS.get(event_type, {"coins": 50, "xp": 25})
         
-        # Add base rewards
-        add_user_stat(int(uid), "coins", rewards["coins"])
-        add_xp_to_user(int(uid), rewards["xp"])
-        add_user_stat(int(uid), f"{event_type}_attendance", 1)
-        
-        # Reset activity timestamp - prevents inactivity strikes
-        reset_member_activity(int(uid))
-        
-        # Update streak
-        streak = update_attendance_streak(uid)
-        streak_bonus = get_streak_bonus(streak)
-        
-        if streak_bonus > 0:
-            add_user_stat(int(uid), "coins", streak_bonus)
+        result = award_attendance(int(uid), f"{event_type}_attendance", rewards, f"event:{event_id}:{uid}")
+        if result is None:
+            continue
+        streak, streak_bonus = result
         
         rewards_given.append({
             "user_id": uid,
@@ -5396,11 +6392,7 @@ def log_attendance(event_id, attendee_ids, host_id):
         })
     
     # Award host
-    host_rewards = ATTENDANCE_REWARDS.get("host", {"coins": 300, "xp": 100})
-    add_user_stat(int(host_id), "coins", host_rewards["coins"])
-    add_xp_to_user(int(host_id), host_rewards["xp"])
-    add_user_stat(int(host_id), "events_hosted", 1)
-    reset_member_activity(int(host_id))  # Reset host activity too
+    host_rewards = award_host(int(host_id), f"event:{event_id}:host")
     
     # Update event status
     event["attendees"] = [str(uid) for uid in attendee_ids]
@@ -5466,6 +6458,31 @@ def get_streak_bonus(streak):
             break
     return bonus
 
+def award_attendance(user_id, stat, rewards, key):
+    """Pay an attendee their reward plus any streak bonus as one ledger entry.
+    Returns (streak, bonus), or None if this key was already paid out."""
+    if ledger_seen(key):
+        return None
+    streak = update_attendance_streak(user_id)
+    bonus = get_streak_bonus(streak)
+    ledger_apply(
+        user_id, f"attendance:{stat}", coins=rewards["coins"] + bonus, xp=rewards["xp"],
+        key=key, incr={stat: 1}
+    )
+    # Reset activity timestamp - prevents inactivity strikes
+    reset_member_activity(user_id)
+    return streak, bonus
+
+def award_host(user_id, key):
+    """Pay the host reward as one ledger entry"""
+    host_rewards = ATTENDANCE_REWARDS["host"]
+    ledger_apply(
+        user_id, "attendance:host", coins=host_rewards["coins"], xp=host_rewards["xp"],
+        key=key, incr={"events_hosted": 1}
+    )
+    reset_member_activity(user_id)
+    return host_rewards
+
 def get_upcoming_events(limit=10):
     """Get upcoming scheduled events"""
     data = load_events_data()
@@ -5626,25 +6643,30 @@ async def check_event_reminders():
     
     while not bot.is_closed():
         try:
-            needs_30, needs_5 = get_events_needing_reminder()
-            
-            for event in needs_30:
-                await send_event_reminder(event, 30)
-                update_event(event["id"], {"reminder_30_sent": True})
-                await asyncio.sleep(1)
-            
-            for event in needs_5:
-                await send_event_reminder(event, 5)
-                update_event(event["id"], {"reminder_5_sent": True})
-                await asyncio.sleep(1)
+            # One pass per partition - guilds sharing the home files share its events
+            for guilds in guilds_by_partition().values():
+                with guild_scope(guilds[0].id):
+                    needs_30, needs_5 = get_events_needing_reminder()
+                    
+                    for event in needs_30:
+                        await send_event_reminder(event, 30, guilds)
+                        update_event(event["id"], {"reminder_30_sent": True})
+                        await asyncio.sleep(1)
+                    
+                    for event in needs_5:
+                        await send_event_reminder(event, 5, guilds)
+                        update_event(event["id"], {"reminder_5_sent": True})
+                        await asyncio.sleep(1)
         except Exception as e:
             print(f"Event reminder error: {e}")
         
         await asyncio.sleep(60)  # Check every minute
 
-async def send_event_reminder(event, minutes):
-    """Send a reminder for an event"""
-    for guild in bot.guilds:
+async def send_event_reminder(event, minutes, guilds):
+    """Send a reminder for an event to its guild (older events without one go to every guild given)"""
+    if event.get("guild_id"):
+        guilds = [guild for guild in guilds if str(guild.id) == event["guild_id"]]
+    for guild in guilds:
         if event.get("channel_id"):
             channel = guild.get_channel(int(event["channel_id"]))
         else:
@@ -5805,49 +6827,119 @@ PUNISHMENT_THRESHOLDS = [
     {"points": 10, "action": "ban", "duration": 0, "name": "Ban"},
 ]
 
-def load_warnings_data():
-    """Load warnings data from file"""
+WARNING_EXPIRY_DAYS = 30
+
+# In-memory moderation store (one per guild partition). Each user's warnings stay in timestamp order,
+# a min-heap holds the next expiry so sweeps only touch warnings that are due,
+# and per-staff timelines (times + running point totals) answer !staffstats
+# with a bisect instead of a scan over every warning.
+def _warnings_store():
+    return guild_state("warnings", lambda: {
+        "data": None,
+        "expiry_heap": [],   # (expires_at, user_id, warning_id)
+        "staff": None,       # staff_id -> {"times": [...], "points": [running total]}
+        "kicked": set(),
+    })
+
+def _warning_time(warning):
     try:
-        with open(WARNINGS_FILE, "r") as f:
-            return json.load(f)
+        return datetime.datetime.fromisoformat(warning["timestamp"].replace('Z', '+00:00')).timestamp()
     except:
-        return {"users": {}, "recent_warnings": [], "kicked_users": []}
+        return 0
+
+def _index_warnings_data(data):
+    heap = []
+    for uid, user_data in data["users"].items():
+        user_data["warnings"].sort(key=_warning_time)
+        for w in user_data["warnings"]:
+            issued = _warning_time(w)
+            if issued and not w.get("expired", False):
+                heap.append((issued + WARNING_EXPIRY_DAYS * 86400, uid, w["id"]))
+    heapq.heapify(heap)
+    store = _warnings_store()
+    store["expiry_heap"] = heap
+    store["staff"] = None
+    store["kicked"] = {k["user_id"] for k in data.get("kicked_users", [])}
+
+def load_warnings_data():
+    """Load warnings data from file"""
+    store = _warnings_store()
+    if store["data"] is None:
+        try:
+            with open(guild_path(WARNINGS_FILE), "r") as f:
+                data = json.load(f)
+                perf_record_store(WARNINGS_FILE, "load", f.tell())
+        except:
+            data = {"users": {}, "recent_warnings": [], "kicked_users": []}
+        _index_warnings_data(data)
+        store["data"] = data
+    return store["data"]
 
 def save_warnings_data(data):
     """Save warnings data to file"""
-    with open(WARNINGS_FILE, "w") as f:
+    with open(guild_path(WARNINGS_FILE), "w") as f:
         json.dump(data, f, indent=2)
+        perf_record_store(WARNINGS_FILE, "save", f.tell())
+
+def get_staff_warning_index():
+    """Per-staff warning timelines, rebuilt only after warnings are removed"""
+    store = _warnings_store()
+    if store["staff"] is None:
+        data = load_warnings_data()
+        issued = sorted(
+            (_warning_time(w), w.get("staff_id", "unknown"), w.get("points", 0))
+            for user_data in data["users"].values() for w in user_data.get("warnings", [])
+        )
+        staff = {}
+        for ts, staff_id, points in issued:
+            _record_staff_warning(staff, staff_id, ts, points)
+        store["staff"] = staff
+    return store["staff"]
+
+def _record_staff_warning(staff, staff_id, ts, points):
+    timeline = staff.setdefault(staff_id, {"times": [], "points": []})
+    timeline["times"].append(ts)
+    timeline["points"].append((timeline["points"][-1] if timeline["points"] else 0) + points)
+
+def get_staff_warning_counts(since):
+    """{staff_id: {"total", "points"}} for warnings issued at or after `since`"""
+    cutoff = since.timestamp()
+    counts = {}
+    for staff_id, timeline in get_staff_warning_index().items():
+        idx = bisect.bisect_left(timeline["times"], cutoff)
+        total = len(timeline["times"]) - idx
+        if total:
+            before = timeline["points"][idx - 1] if idx else 0
+            counts[staff_id] = {"total": total, "points": timeline["points"][-1] - before}
+    return counts
+
+def expire_due_warnings(now=None):
+    """Mark warnings past WARNING_EXPIRY_DAYS as expired. Only pops what's due."""
+    data = load_warnings_data()
+    heap = _warnings_store()["expiry_heap"]
+    now = (now or datetime.datetime.now(datetime.timezone.utc)).timestamp()
+    updated = False
+    while heap and heap[0][0] <= now:
+        _, uid, warning_id = heapq.heappop(heap)
+        user_data = data["users"].get(uid)
+        if not user_data:
+            continue
+        for w in user_data["warnings"]:
+            if w["id"] == warning_id and not w.get("expired", False):
+                w["expired"] = True
+                user_data["total_points"] -= w["points"]
+                updated = True
+                break
+    if updated:
+        save_warnings_data(data)
+    return updated
 
 def get_user_warnings(user_id, check_expiry=True):
     """Get all warnings for a user, optionally checking for expired warnings"""
     data = load_warnings_data()
-    uid = str(user_id)
-    user_data = data["users"].get(uid, {"warnings": [], "total_points": 0})
-    
-    # Check for expired warnings (30 days)
-    if check_expiry and user_data.get("warnings"):
-        now = datetime.datetime.now(datetime.timezone.utc)
-        updated = False
-        for w in user_data["warnings"]:
-            if not w.get("expired", False):
-                try:
-                    warn_time = datetime.datetime.fromisoformat(w["timestamp"].replace('Z', '+00:00'))
-                    days_old = (now - warn_time).days
-                    if days_old >= 30:
-                        w["expired"] = True
-                        updated = True
-                except:
-                    pass
-        
-        if updated:
-            # Recalculate active points
-            user_data["total_points"] = sum(
-                w["points"] for w in user_data["warnings"] if not w.get("expired", False)
-            )
-            data["users"][uid] = user_data
-            save_warnings_data(data)
-    
-    return user_data
+    if check_expiry:
+        expire_due_warnings()
+    return data["users"].get(str(user_id), {"warnings": [], "total_points": 0})
 
 def add_warning(user_id, category, reason, staff_id, points=None, guild_id=None):
     """Add a warning to a user"""
@@ -5862,6 +6954,7 @@ def add_warning(user_id, category, reason, staff_id, points=None, guild_id=None)
         cat_info = WARNING_CATEGORIES.get(category, {})
         points = cat_info.get("points", 1)
     
+    now = datetime.datetime.now(datetime.timezone.utc)
     warning = {
         "id": f"w_{int(datetime.datetime.now().timestamp())}",
         "category": category,
@@ -5869,14 +6962,16 @@ def add_warning(user_id, category, reason, staff_id, points=None, guild_id=None)
         "points": points,
         "staff_id": str(staff_id),
         "user_id": str(user_id),
-        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "timestamp": now.isoformat(),
         "expired": False
     }
     
     data["users"][uid]["warnings"].append(warning)
-    data["users"][uid]["total_points"] = sum(
-        w["points"] for w in data["users"][uid]["warnings"] if not w.get("expired", False)
-    )
+    data["users"][uid]["total_points"] += points
+    store = _warnings_store()
+    heapq.heappush(store["expiry_heap"], (now.timestamp() + WARNING_EXPIRY_DAYS * 86400, uid, warning["id"]))
+    if store["staff"] is not None:
+        _record_staff_warning(store["staff"], warning["staff_id"], now.timestamp(), points)
     
     # Add to recent warnings log (keep last 100)
     if "recent_warnings" not in data:
@@ -5904,13 +6999,13 @@ def add_kicked_user(user_id, reason, staff_id):
         "staff_id": str(staff_id),
         "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat()
     })
+    _warnings_store()["kicked"].add(str(user_id))
     save_warnings_data(data)
 
 def was_previously_kicked(user_id):
     """Check if a user was previously kicked"""
-    data = load_warnings_data()
-    kicked = data.get("kicked_users", [])
-    return any(k["user_id"] == str(user_id) for k in kicked)
+    load_warnings_data()
+    return str(user_id) in _warnings_store()["kicked"]
 
 def clear_user_warnings(user_id):
     """Clear all warnings for a user"""
@@ -5919,6 +7014,7 @@ def clear_user_warnings(user_id):
     
     if uid in data["users"]:
         data["users"][uid] = {"warnings": [], "total_points": 0}
+        _warnings_store()["staff"] = None  # Stale heap entries are skipped on pop
         save_warnings_data(data)
         return True
     return False
@@ -5934,6 +7030,7 @@ def remove_warning(user_id, warning_id):
         data["users"][uid]["total_points"] = sum(
             w["points"] for w in data["users"][uid]["warnings"] if not w.get("expired", False)
         )
+        _warnings_store()["staff"] = None
         save_warnings_data(data)
         return True
     return False
@@ -6125,42 +7222,44 @@ def get_next_demotion_rank(current_rank):
 
 def load_inactivity_data():
     try:
-        with open(INACTIVITY_FILE, "r") as f:
-            return json.load(f)
+        with open(guild_path(INACTIVITY_FILE), "r") as f:
+            data = json.load(f)
+            perf_record_store(INACTIVITY_FILE, "load", f.tell())
+            return data
     except:
         return {"strikes": {}, "last_check": None}
 
 def save_inactivity_data(data):
-    with open(INACTIVITY_FILE, "w") as f:
+    with open(guild_path(INACTIVITY_FILE), "w") as f:
         json.dump(data, f, indent=2)
+        perf_record_store(INACTIVITY_FILE, "save", f.tell())
     
     # Also save to PostgreSQL if available
     if db_pool:
-        asyncio.create_task(save_inactivity_to_postgres(data))
+        asyncio.create_task(save_inactivity_to_postgres(data, guild_db_id()))
 
-async def save_inactivity_to_postgres(data):
+async def save_inactivity_to_postgres(data, guild_id=0):
     """Save inactivity data to PostgreSQL"""
     if not db_pool:
         return
     try:
-        async with db_pool.acquire() as conn:
+        async with perf_db_acquire() as conn:
             await conn.execute('''
-                INSERT INTO inactivity (key, data, updated_at)
-                VALUES ('inactivity_data', $1, NOW())
-                ON CONFLICT (key) DO UPDATE SET data = $1, updated_at = NOW()
-            ''', json.dumps(data))
+                INSERT INTO inactivity (guild_id, key, data, updated_at)
+                VALUES ($2, 'inactivity_data', $1, NOW())
+                ON CONFLICT (guild_id, key) DO UPDATE SET data = $1, updated_at = NOW()
+            ''', json.dumps(data), guild_id)
     except Exception as e:
         print(f"PostgreSQL inactivity save error: {e}")
 
 async def load_inactivity_from_postgres():
-    """Load inactivity data from PostgreSQL"""
+    """Load inactivity data for every guild from PostgreSQL - {guild_id: data}"""
     if not db_pool:
         return None
     try:
-        async with db_pool.acquire() as conn:
-            row = await conn.fetchrow("SELECT data FROM inactivity WHERE key = 'inactivity_data'")
-            if row:
-                return json.loads(row['data'])
+        async with perf_db_acquire() as conn:
+            rows = await conn.fetch("SELECT guild_id, data FROM inactivity WHERE key = 'inactivity_data'")
+            return {row['guild_id']: json.loads(row['data']) for row in rows}
     except Exception as e:
         print(f"PostgreSQL inactivity load error: {e}")
     return None
@@ -6355,8 +7454,7 @@ async def check_member_inactivity(member, guild):
                 next_role = discord.utils.get(guild.roles, name=next_rank)
                 
                 if current_role and next_role:
-                    await safe_remove_role(member, current_role)
-                    await safe_add_role(member, next_role)
+                    await reconcile_member_roles(member, add=[next_role], remove=[current_role], reason="Inactivity demotion")
                     result["action"] = "demoted"
                     result["new_rank"] = next_rank
                     await send_inactivity_strike_dm(member, new_strike_count, demoted=True, old_rank=current_rank, new_rank=next_rank)
@@ -6396,7 +7494,7 @@ async def run_inactivity_check(guild):
         print(f"Warning: {INACTIVITY_REQUIRED_ROLE} role not found!")
         return results
     
-    for member in guild.members:
+    for member in await guild_members(guild):
         if member.bot:
             continue
         
@@ -6470,6 +7568,17 @@ async def log_to_dashboard(guild, log_type, title, description, color=0x3498db,
         pass
 
 # --- LEVELING CHECKER ---
+# Level-ups are published as events instead of being announced inline. A
+# per-guild consumer waits LEVEL_UP_BATCH_WINDOW seconds, grants milestone
+# roles through the rate-limited role helpers and posts one message - the
+# usual cards for a single level-up, or one summary embed when several
+# members levelled together (attendance logs, raids, voice ticks).
+
+LEVEL_UP_BATCH_WINDOW = 3.0
+LEVEL_UP_SUMMARY_LINES = 25
+
+_level_up_events = {}  # guild_id -> {"guild", "events": {user_id: event}, "task"}
+
 async def check_level_up(user_id, guild):
     """Check if user leveled up - continuous leveling with milestone rewards"""
     data = load_data()
@@ -6485,60 +7594,146 @@ async def check_level_up(user_id, guild):
     
     # Check if they leveled up
     if new_level > current_level:
-        # Update their level
-        update_user_data(user_id, "level", new_level)
-        
-        member = guild.get_member(user_id)
-        channel = discord.utils.get(guild.text_channels, name=LEVEL_UP_CHANNEL_NAME)
-        
-        # Check each level they passed for milestone rewards
-        levels_gained = []
+        # Level and milestone coins land in a single ledger entry; the key
+        # pays each milestone once even if a level is lost and regained
+        user_data["level"] = new_level
+        milestones = []
         for lvl in range(current_level + 1, new_level + 1):
-            levels_gained.append(lvl)
-            
-            # Check if this is a milestone level
             milestone = get_milestone_reward(lvl)
             if milestone:
-                coins = milestone["coins"]
-                role_name = milestone["role"]
-                add_user_stat(user_id, "coins", coins)
-                
-                role_msg = ""
-                if member and role_name:
-                    role = discord.utils.get(guild.roles, name=role_name)
-                    if role:
-                        try: 
-                            await member.add_roles(role)
-                            role_msg = f"\n🎭 **Role Unlocked:** {role.mention}"
-                        except Exception as e:
-                            print(f"Role assign error: {e}")
-                            role_msg = "\n❌ Role assign failed (Hierarchy)."
-                
-                # Send milestone announcement
-                if channel:
-                    embed = discord.Embed(
-                        title="🌟 MILESTONE REACHED! 🌟", 
-                        description=f"<@{user_id}> has reached **Level {lvl}**!", 
-                        color=0xFFD700
-                    )
-                    embed.add_field(name="🎁 Rewards", value=f"💰 +{coins} Fallen Coins{role_msg}")
-                    if member: 
-                        embed.set_thumbnail(url=member.display_avatar.url)
-                    await channel.send(embed=embed)
-                    await asyncio.sleep(0.5)  # Small delay to avoid rate limits
-        
-        # Send regular level up for non-milestone levels (only if didn't hit milestone)
-        if channel and new_level not in LEVEL_CONFIG:
-            embed = discord.Embed(
-                title="✨ LEVEL UP!", 
-                description=f"<@{user_id}> is now **Level {new_level}**!", 
-                color=0xDC143C
+                milestones.append({"level": lvl, "coins": milestone["coins"], "role": milestone["role"]})
+        coins = sum(m["coins"] for m in milestones)
+        status = None
+        if coins:
+            status, _ = ledger_apply(
+                user_id, "level_milestone", coins=coins,
+                key=f"milestone:{uid}:{milestones[-1]['level']}", fields={"level": new_level}
             )
-            xp_needed = calculate_next_level_xp(new_level)
-            embed.add_field(name="Next Level", value=f"{xp_into_level}/{xp_needed} XP")
-            if member: 
-                embed.set_thumbnail(url=member.display_avatar.url)
-            await channel.send(embed=embed)
+        if status != "ok":
+            save_data(data, touched=(uid,))
+        
+        publish_level_up(guild, user_id, current_level, new_level, xp_into_level, milestones)
+
+def publish_level_up(guild, user_id, old_level, new_level, xp_into_level, milestones):
+    pending = _level_up_events.setdefault(guild.id, {"guild": guild, "events": {}, "task": None})
+    event = pending["events"].get(user_id)
+    if event:
+        event["to"] = new_level
+        event["xp_into_level"] = xp_into_level
+        event["milestones"].extend(milestones)
+    else:
+        pending["events"][user_id] = {
+            "user_id": user_id,
+            "from": old_level,
+            "to": new_level,
+            "xp_into_level": xp_into_level,
+            "milestones": milestones,
+        }
+    if pending["task"] is None:
+        pending["task"] = asyncio.create_task(flush_level_ups(guild.id))
+
+async def grant_milestone_roles(guild, member, milestones):
+    """Grant every milestone role a member earned in one rate-limited roles edit"""
+    roles = {}
+    for milestone in milestones:
+        milestone["role_msg"] = ""
+        if member and milestone["role"]:
+            role = discord.utils.get(guild.roles, name=milestone["role"])
+            if role:
+                roles[milestone["level"]] = role
+    if not roles:
+        return
+    
+    try:
+        await reconcile_member_roles(member, add=roles.values(), reason="Level milestone")
+        granted = True
+    except Exception as e:
+        print(f"Role assign error: {', '.join(r.name for r in roles.values())} for {member}: {e}")
+        granted = False
+    for milestone in milestones:
+        role = roles.get(milestone["level"])
+        if role:
+            milestone["role_msg"] = f"\n🎭 **Role Unlocked:** {role.mention}" if granted else "\n❌ Role assign failed (Hierarchy)."
+
+def level_up_embeds(event, member):
+    """The cards for a single member's level-up"""
+    user_id = event["user_id"]
+    embeds = []
+    for milestone in event["milestones"]:
+        embed = discord.Embed(
+            title="🌟 MILESTONE REACHED! 🌟", 
+            description=f"<@{user_id}> has reached **Level {milestone['level']}**!", 
+            color=0xFFD700
+        )
+        embed.add_field(name="🎁 Rewards", value=f"💰 +{milestone['coins']} Fallen Coins{milestone['role_msg']}")
+        if member: 
+            embed.set_thumbnail(url=member.display_avatar.url)
+        embeds.append(embed)
+    
+    # Regular level up for non-milestone levels (only if didn't hit milestone)
+    if event["to"] not in LEVEL_CONFIG:
+        embed = discord.Embed(
+            title="✨ LEVEL UP!", 
+            description=f"<@{user_id}> is now **Level {event['to']}**!", 
+            color=0xDC143C
+        )
+        xp_needed = calculate_next_level_xp(event["to"])
+        embed.add_field(name="Next Level", value=f"{event['xp_into_level']}/{xp_needed} XP")
+        if member: 
+            embed.set_thumbnail(url=member.display_avatar.url)
+        embeds.append(embed)
+    return embeds[-10:]
+
+def level_up_summary_embed(events):
+    """One embed for a batch of level-ups"""
+    lines = []
+    for event in sorted(events, key=lambda e: e["to"], reverse=True):
+        line = f"<@{event['user_id']}> → **Level {event['to']}**"
+        for milestone in event["milestones"]:
+            line += f"\n┗ 🌟 Level {milestone['level']}: 💰 +{milestone['coins']}{milestone['role_msg'].replace(chr(10), ' ')}"
+        lines.append(line)
+    
+    shown = lines[:LEVEL_UP_SUMMARY_LINES]
+    if len(lines) > len(shown):
+        shown.append(f"*...and {len(lines) - len(shown)} more*")
+    
+    has_milestone = any(event["milestones"] for event in events)
+    embed = discord.Embed(
+        title=f"✨ {len(events)} MEMBERS LEVELED UP!",
+        description="\n".join(shown)[:4000],
+        color=0xFFD700 if has_milestone else 0xDC143C
+    )
+    return embed
+
+async def flush_level_ups(guild_id):
+    await asyncio.sleep(LEVEL_UP_BATCH_WINDOW)
+    pending = _level_up_events.pop(guild_id, None)
+    if not pending:
+        return
+    guild = pending["guild"]
+    events = list(pending["events"].values())
+    
+    try:
+        with perf_timer("loop", "level_up_flush"):
+            members = {}
+            for event in events:
+                if event["milestones"] or len(events) == 1:
+                    member = members[event["user_id"]] = await fetch_guild_member(guild, event["user_id"])
+                    await grant_milestone_roles(guild, member, event["milestones"])
+            
+            channel = discord.utils.get(guild.text_channels, name=LEVEL_UP_CHANNEL_NAME)
+            if not channel:
+                return
+            
+            if len(events) == 1:
+                event = events[0]
+                embeds = level_up_embeds(event, members[event["user_id"]])
+            else:
+                embeds = [level_up_summary_embed(events)]
+            if embeds:
+                await channel.send(embeds=embeds)
+    except Exception as e:
+        print(f"Level up announce error: {e}")
 
 # --- TOURNAMENT FUNCTIONS ---
 async def generate_matchups(channel):
@@ -6958,53 +8153,102 @@ class AddUserToTicketModal(discord.ui.Modal, title="Add User to Ticket"):
 # ADVANCED STATS SYSTEM
 # ==========================================
 
-def get_server_stats(guild):
-    """Calculate comprehensive server statistics"""
-    data = load_data()
-    users = data.get("users", {})
-    now = datetime.datetime.now(datetime.timezone.utc)
+# Per-guild presence counts, seeded by one scan and then kept up to date
+# from presence/join/leave events. Presence updates only arrive for cached
+# members, so with a partial member cache (MEMBER_CACHE) the counts come from
+# Discord's approximate counts instead, refreshed every PRESENCE_APPROX_TTL.
+PRESENCE_APPROX_TTL = 300
+
+_presence_counts = {}
+_approx_presence = {}  # guild_id -> (monotonic fetch time, counts)
+
+def _presence_key(status):
+    if status == discord.Status.online:
+        return "online"
+    if status == discord.Status.idle:
+        return "idle"
+    if status == discord.Status.dnd:
+        return "dnd"
+    return "offline"
+
+def rebuild_presence_counts(guild):
+    counts = {"online": 0, "idle": 0, "dnd": 0, "offline": 0, "bots": 0}
+    for m in guild.members:
+        counts[_presence_key(m.status)] += 1
+        if m.bot:
+            counts["bots"] += 1
+    _presence_counts[guild.id] = counts
+    return counts
+
+async def approximate_presence_counts(guild):
+    """Presence counts for a guild whose members aren't all cached. The
+    approximate online count isn't split by status, so it's all "online"."""
+    cached = _approx_presence.get(guild.id)
+    if cached and time.monotonic() - cached[0] < PRESENCE_APPROX_TTL:
+        return cached[1]
+    try:
+        full = await bot.fetch_guild(guild.id, with_counts=True)
+        members = await guild_members(guild)
+    except (discord.HTTPException, asyncio.TimeoutError) as e:
+        if getattr(e, "status", None) == 429:
+            perf_record_rate_limit()
+        print(f"Presence count fetch error: {e}")
+        if cached:
+            return cached[1]  # Stale beats nothing
+        return {
+            "online": 0, "idle": 0, "dnd": 0, "offline": guild.member_count or 0,
+            "bots": sum(1 for m in guild.members if m.bot),
+        }
+    online = full.approximate_presence_count or 0
+    total = full.approximate_member_count or guild.member_count or 0
+    counts = {
+        "online": online, "idle": 0, "dnd": 0, "offline": max(0, total - online),
+        "bots": sum(1 for m in members if m.bot),
+    }
+    _approx_presence[guild.id] = (time.monotonic(), counts)
+    return counts
+
+async def get_presence_counts(guild):
+    counts = _presence_counts.get(guild.id)
+    if counts is None:
+        if not guild.chunked:
+            return await approximate_presence_counts(guild)
+        counts = rebuild_presence_counts(guild)
+    return counts
+
+def adjust_presence_counts(member, sign, status=None):
+    """Add (sign=1) or remove (sign=-1) a member from the guild's presence counts"""
+    counts = _presence_counts.get(member.guild.id)
+    if counts is None:
+        return
+    counts[_presence_key(status if status is not None else member.status)] += sign
+    if member.bot:
+        counts["bots"] += sign
+
+async def get_server_stats(guild):
+    """Calculate comprehensive server statistics from running aggregates"""
+    agg = get_server_aggregates()
+    presence = await get_presence_counts(guild)
+    today = datetime.datetime.now(datetime.timezone.utc).date().toordinal()
+    active_days = agg["active_days"]
+    
+    def active_within(days):
+        return sum(active_days.get(today - d, 0) for d in range(days))
+    
+    levels = [lvl for lvl, count in agg["levels"].items() if count > 0]
     
     stats = {
         "total_members": guild.member_count,
-        "online_members": sum(1 for m in guild.members if m.status != discord.Status.offline),
-        "bot_count": sum(1 for m in guild.members if m.bot),
-        "total_xp": sum(u.get("xp", 0) for u in users.values()),
-        "total_coins": sum(u.get("coins", 0) for u in users.values()),
-        "total_messages": len(users),  # Approximation
-        "active_today": 0,
-        "active_week": 0,
-        "active_month": 0,
-        "top_level": 0,
-        "avg_level": 0,
-        "total_wins": sum(u.get("wins", 0) for u in users.values()),
-        "total_losses": sum(u.get("losses", 0) for u in users.values()),
-        "total_raids": sum(u.get("raid_participation", 0) for u in users.values()),
-        "total_trainings": sum(u.get("training_attendance", 0) for u in users.values()),
+        "online_members": presence["online"] + presence["idle"] + presence["dnd"],
+        "bot_count": presence["bots"],
+        "total_messages": agg["user_count"],  # Approximation
+        "active_today": active_within(1),
+        "active_week": active_within(7),
+        "active_month": active_within(30),
+        "top_level": max(levels) if levels else 0,
+        "avg_level": round(agg["level_sum"] / agg["user_count"], 1) if agg["user_count"] else 0,
     }
-    
-    levels = []
-    for uid, udata in users.items():
-        levels.append(udata.get("level", 0))
-        
-        last_active = udata.get("last_active")
-        if last_active:
-            try:
-                last_dt = datetime.datetime.fromisoformat(last_active)
-                if last_dt.tzinfo is None:
-                    last_dt = last_dt.replace(tzinfo=datetime.timezone.utc)
-                diff = (now - last_dt).days
-                if diff < 1:
-                    stats["active_today"] += 1
-                if diff < 7:
-                    stats["active_week"] += 1
-                if diff < 30:
-                    stats["active_month"] += 1
-            except:
-                pass
-    
-    if levels:
-        stats["top_level"] = max(levels)
-        stats["avg_level"] = round(sum(levels) / len(levels), 1)
+    stats.update(agg["totals"])
     
     return stats
 
@@ -7030,7 +8274,7 @@ def get_user_activity_stats(user_id):
         "last_active": data.get("last_active"),
     }
 
-def get_top_active_users(guild, days=7, limit=10):
+async def get_top_active_users(guild, days=7, limit=10):
     """Get most active users in the past X days based on XP gains"""
     data = load_data()
     users = data.get("users", {})
@@ -7046,26 +8290,25 @@ def get_top_active_users(guild, days=7, limit=10):
     
     result = []
     for uid, xp in sorted_users:
-        member = guild.get_member(int(uid))
-        if member and xp > 0:
+        if xp <= 0:
+            continue
+        member = await fetch_guild_member(guild, uid)
+        if member:
             result.append((member, xp))
     
     return result
 
-def get_activity_by_hour(guild):
-    """Analyze when members are most active (simplified)"""
-    # This would need message tracking over time for accuracy
-    # For now, return current online distribution
-    online_count = sum(1 for m in guild.members if m.status == discord.Status.online)
-    idle_count = sum(1 for m in guild.members if m.status == discord.Status.idle)
-    dnd_count = sum(1 for m in guild.members if m.status == discord.Status.dnd)
-    offline_count = sum(1 for m in guild.members if m.status == discord.Status.offline)
+async def get_activity_by_hour(guild):
+    """Current presence distribution plus precomputed hourly activity"""
+    presence = await get_presence_counts(guild)
     
     return {
-        "online": online_count,
-        "idle": idle_count,
-        "dnd": dnd_count,
-        "offline": offline_count
+        "online": presence["online"],
+        "idle": presence["idle"],
+        "dnd": presence["dnd"],
+        "offline": presence["offline"],
+        "hourly": get_guild_hourly_activity(guild.id),
+        "peak_hours": get_peak_hours(guild.id),
     }
 
 class LeaderboardSelect(discord.ui.Select):
@@ -7373,19 +8616,8 @@ class RankSelectView(discord.ui.View):
             "High", "Mid", "Low", "Strong", "Stable", "Weak"
         ]
         
-        # Remove all current result roles
-        roles_to_remove = []
-        for role_name in ALL_RESULT_ROLES:
-            role = discord.utils.get(interaction.guild.roles, name=role_name)
-            if role and role in target_user.roles:
-                roles_to_remove.append(role)
-        
-        if roles_to_remove:
-            try:
-                await target_user.remove_roles(*roles_to_remove)
-                await asyncio.sleep(0.5)
-            except Exception as e:
-                print(f"Error removing roles: {e}")
+        # Current result roles are swapped for the new ones in one update
+        roles_to_remove = [discord.utils.get(interaction.guild.roles, name=role_name) for role_name in ALL_RESULT_ROLES]
         
         # Add new roles
         roles_to_add = []
@@ -7413,9 +8645,9 @@ class RankSelectView(discord.ui.View):
                 roles_to_add.append(strength_role)
                 result_parts.append(self.selected_strength)
         
-        # Add all roles
+        # Swap all result roles at once
         try:
-            await target_user.add_roles(*roles_to_add)
+            await reconcile_member_roles(target_user, add=roles_to_add, remove=roles_to_remove, reason="Stage transfer approved")
         except Exception as e:
             return await interaction.response.send_message(f"❌ Failed to add roles: {e}", ephemeral=True)
         
@@ -7535,13 +8767,19 @@ class ShopView(discord.ui.View):
         if not item: 
             return await interaction.response.send_message("❌ Item not found.", ephemeral=True)
         
-        user_data = get_user_data(interaction.user.id)
-        if user_data["coins"] < item["price"]:
+        # Check and deduct in one ledger write (keyed by the interaction so a retry can't charge twice)
+        status, user_data = ledger_apply(
+            interaction.user.id, f"shop:{item_id}", coins=-item["price"],
+            key=f"shop:{interaction.id}", require_funds=True
+        )
+        if status == "duplicate":
+            notice = "⏳ That purchase was already processed."
+            if interaction.response.is_done():
+                return await interaction.followup.send(notice, ephemeral=True)
+            return await interaction.response.send_message(notice, ephemeral=True)
+        if status == "insufficient":
             return await interaction.response.send_message(f"❌ **Insufficient Funds.**\nYou need {item['price']} coins, you have {user_data['coins']}.", ephemeral=True)
         
-        # Deduct coins
-        add_user_stat(interaction.user.id, "coins", -item["price"])
-        
         # Handle different item types
         item_type = item.get("type", "ticket")
         
@@ -7652,19 +8890,21 @@ class ShopView(discord.ui.View):
         """Open a coaching session ticket with coach selection"""
         # Find all coaches
         coach_role = discord.utils.get(interaction.guild.roles, name=COACHING_ROLE)
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        coaches = await role_members(coach_role) if coach_role else []
         
-        if not coach_role or len(coach_role.members) == 0:
+        if not coaches:
             # Refund if no coaches available
-            add_user_stat(interaction.user.id, "coins", 1500)
-            return await interaction.response.send_message(
+            ledger_apply(interaction.user.id, "refund:coaching", coins=1500, key=f"refund:{interaction.id}")
+            return await interaction.followup.send(
                 "❌ No coaches are currently available. You have been refunded.",
                 ephemeral=True
             )
         
         # Create selection view
-        await interaction.response.send_message(
+        await interaction.followup.send(
             "🎯 **Select Your Coach**\n\nChoose who you'd like to train with:",
-            view=CoachSelectView(interaction.user, coach_role.members),
+            view=CoachSelectView(interaction.user, coaches),
             ephemeral=True
         )
 
@@ -7699,7 +8939,7 @@ class CoachSelectView(discord.ui.View):
             return await interaction.response.send_message("❌ This isn't your purchase!", ephemeral=True)
         
         coach_id = int(self.coach_select.values[0])
-        coach = interaction.guild.get_member(coach_id)
+        coach = next((c for c in self.coaches if c.id == coach_id), None)
         
         if not coach:
             return await interaction.response.send_message("❌ Coach not found!", ephemeral=True)
@@ -7793,351 +9033,362 @@ class ShopSelectView(discord.ui.View):
         shop_view = ShopView()
         await shop_view.buy_item(interaction, "custom_role")
 
+HELP_CATEGORIES = [
+    discord.SelectOption(label="Member", emoji="👤", description="Basic member commands"),
+    discord.SelectOption(label="Profile & Stats", emoji="📊", description="Profile, rank, stats"),
+    discord.SelectOption(label="Perks & Rewards", emoji="🎭", description="Role perks, daily, weekly"),
+    discord.SelectOption(label="Events", emoji="📅", description="Trainings & tryouts"),
+    discord.SelectOption(label="Polls", emoji="📊", description="Availability polls"),
+    discord.SelectOption(label="Duels & ELO", emoji="⚔️", description="1v1 duels & rankings"),
+    discord.SelectOption(label="Spar Finder", emoji="🎯", description="Tier-based spar matchmaking"),
+    discord.SelectOption(label="Tournaments", emoji="🏆", description="Tournament system"),
+    discord.SelectOption(label="Economy & Shop", emoji="💰", description="Coins, shop & items"),
+    discord.SelectOption(label="Backup", emoji="🆘", description="Request backup help"),
+    discord.SelectOption(label="Stage Transfer", emoji="📋", description="Rank transfers & results"),
+    discord.SelectOption(label="Staff", emoji="🛡️", description="Staff commands"),
+    discord.SelectOption(label="Admin", emoji="⚙️", description="Setup & management"),
+]
+
+def build_help_page(category):
+    e = discord.Embed(color=0x8B0000)
+    
+    if category == "Member": 
+        e.title="👤 Member Commands"
+        e.description=(
+            "**🔗 Verification**\n"
+            "`/verify` - Link your Roblox account\n\n"
+            "**📊 Quick Stats**\n"
+            "`/level` - View your level card\n"
+            "`/rank` - View your rank card\n"
+            "`/profile` - Full profile with all stats\n"
+            "`/fcoins` - Check coin balance\n"
+            "`/inventory` - View purchased items\n\n"
+            "**🎁 Rewards**\n"
+            "`/daily` - Claim daily reward\n"
+            "`/weekly` - Claim weekly role reward\n"
+            "`/perks` - View your current perks\n\n"
+            "**📅 Events**\n"
+            "`/schedule` - View upcoming events\n"
+            "Click RSVP buttons on event posts!"
+        )
+        
+    elif category == "Profile & Stats":
+        e.title="📊 Profile & Statistics"
+        e.description=(
+            "**🖼️ Visual Cards**\n"
+            "`/profile` - Full profile card with avatar\n"
+            "`/rank` - Rank card with XP bar\n"
+            "`/level` - Level card (animated for boosters!)\n\n"
+            "**📈 Statistics**\n"
+            "`/stats` - Combat stats (W/L)\n"
+            "`!mystats` - Detailed stats breakdown\n"
+            "`!achievements` - View your badges\n"
+            "`!activity` - Activity graph\n\n"
+            "**🏆 Leaderboards**\n"
+            "`/leaderboard` - XP leaderboard\n"
+            "`!voicetop` - Voice time leaders\n"
+            "`!topactive` - Most active this week\n"
+            "`!serverstats` - Server statistics\n"
+            "`!compare @user` - Compare with someone"
+        )
+    
+    elif category == "Perks & Rewards":
+        e.title="🎭 Perks & Rewards System"
+        e.description=(
+            "**🎭 Role Perks**\n"
+            "`/perks` - View all your current perks\n"
+            "Each milestone role gives XP bonuses!\n\n"
+            "**📈 XP Multipliers (by Level)**\n"
+            "Lvl 10: +5% • Lvl 20: +10% • Lvl 30: +15%\n"
+            "Lvl 50: +20% • Lvl 70: +25% • Lvl 100: +30%\n"
+            "Lvl 140: +40% • Lvl 200: +50%\n\n"
+            "**🎁 Daily & Weekly**\n"
+            "`/daily` - Daily coins + XP (role multiplier!)\n"
+            "`/weekly` - Weekly bonus from your role\n"
+            "`/boosterreward` - Weekly booster bonus\n\n"
+            "**🛒 Exclusive Shop**\n"
+            "`!exclusiveshop` - Browse exclusive items\n"
+            "`!buyexclusive <item>` - Purchase items\n"
+            "Higher levels unlock more tiers!\n\n"
+            "**💎 Booster Perks**\n"
+            "+25% XP • 2x Daily • Animated card\n"
+            "Weekly bonus • Diamond border"
+        )
+    
+    elif category == "Duels & ELO":
+        e.title="⚔️ Duels & ELO System"
+        e.description=(
+            "**⚔️ Duel Commands**\n"
+            "`/duel @user` - Challenge to 1v1\n"
+            "`/elo` - Check your ELO rating\n"
+            "`/elo @user` - Check someone's ELO\n"
+            "`!elo_leaderboard` - Top ranked players\n"
+            "`!duel_history` - Your match history\n\n"
+            "**🛡️ ELO Shield (Shop Item)**\n"
+            "Protects you from ELO loss once!\n\n"
+            "**🏅 ELO Ranks**\n"
+            "🏆 Grandmaster (2000+)\n"
+            "💎 Diamond (1800+)\n"
+            "🥇 Platinum (1600+)\n"
+            "🥈 Gold (1400+)\n"
+            "🥉 Silver (1200+)\n"
+            "⚔️ Bronze (1000+)\n\n"
+            "*Win duels to climb!*"
+        )
+    
+    elif category == "Spar Finder":
+        e.title="🎯 Spar Finder"
+        e.description=(
+            "**⚔️ Tier-Based Matchmaking**\n"
+            "Your Stage + Rank + Strength = Your Tier\n"
+            "54 tiers total (lower = stronger)\n\n"
+            "**Match Types:**\n"
+            "⭐ Perfect (±1 tier)\n"
+            "✅ Good (±2-3 tiers)\n"
+            "⚠️ Fair (±4-6 tiers)\n\n"
+            "**📋 Panel Buttons**\n"
+            "• **🎯 Find Spar** - Join queue\n"
+            "• **📋 View Queue** - See who's waiting\n"
+            "• **🔍 Find Match** - Auto-find opponents\n"
+            "• **⚔️ Challenge** - Pick directly\n\n"
+            "**🎮 In Match Channel**\n"
+            "• Post private server link\n"
+            "• Play your set (FT5, FT10, etc.)\n"
+            "• Post proof & submit result\n"
+            "• Rate your partner!\n\n"
+            "**📊 Commands**\n"
+            "`/practice_stats` - View your stats"
+        )
+    
+    elif category == "Tournaments":
+        e.title="🏆 Tournament System V3"
+        e.description=(
+            "**👤 How to Participate**\n"
+            "• Click **Register** on tournament portal\n"
+            "• Click **Leave** to withdraw\n"
+            "• Click **Spectate** to watch\n\n"
+            "**⚔️ During Matches**\n"
+            "• Match threads created automatically\n"
+            "• Staff click **Report Score** button\n"
+            "• Bracket image updates live!\n\n"
+            "**🛠️ Staff Commands**\n"
+            "`!tournament` — Create new tournament\n"
+            "`!bracket` — View current bracket\n"
+            "`!tparticipants` — View registered players\n"
+            "`!tstatus` — Tournament status\n"
+            "`!tsetwinner @user` — Set winner manually\n"
+            "`!tformat single|double` — Set bracket format\n"
+            "`!tendtournament` — End tournament\n"
+            "`!tdeletetournament` — Delete tournament\n\n"
+            "**💰 Reward Amounts**\n"
+            "🥇 1st: 5,000 coins + 500 XP\n"
+            "🥈 2nd: 2,500 coins + 250 XP\n"
+            "🥉 3rd: 1,000 coins + 100 XP"
+        )
+        
+    elif category == "Events":
+        e.title="📅 Events (Trainings & Tryouts)"
+        e.description=(
+            "**👤 Member Commands**\n"
+            "`/schedule` - View upcoming events\n"
+            "`/event list` - All scheduled events\n"
+            "`/attendance_streak` - Your streak\n\n"
+            "**💰 Attendance Rewards**\n"
+            "• Training: 100 coins + 50 XP\n"
+            "• Tryout: 150 coins + 75 XP\n"
+            "• Host: 300 coins + 100 XP\n\n"
+            "**🔥 Streak Bonuses**\n"
+            "• 3 streak: +50 | 5: +100\n"
+            "• 7 streak: +200 | 10: +500\n\n"
+            "**🎖️ Attendance Roles**\n"
+            "5→Fallen Initiate | 15→Disciple\n"
+            "30→Warrior | 50→Slayer | 100→Immortal\n\n"
+            "**🔥 Streak Roles**\n"
+            "3→♰Shadow Initiate | 5→♰Rising Shadow\n"
+            "10→♰Relentless | 20→♰Undying | 50→♰Eternal"
+        )
+    
+    elif category == "Polls":
+        e.title="📊 Availability Polls"
+        e.description=(
+            "**📋 What Are Polls?**\n"
+            "Staff can create polls to find the best\n"
+            "times for trainings and tryouts!\n\n"
+            "**👤 How to Respond**\n"
+            "1️⃣ Click a **day button** (Mon-Sun)\n"
+            "2️⃣ Enter your **available times**\n"
+            "3️⃣ Repeat for other days\n"
+            "4️⃣ Click **✅ Submit** when done!\n\n"
+            "**🔘 Poll Buttons**\n"
+            "• Day buttons (Mon-Sun) - Select times\n"
+            "• ✅ Submit - Finalize response\n"
+            "• 👁️ My Times - View your selections\n"
+            "• 📊 Results - Staff only\n"
+            "• 🔒 Close - Staff only\n\n"
+            "**🛡️ Staff Commands**\n"
+            "`!poll training` - Create training poll\n"
+            "`!poll tryout` - Create tryout poll\n"
+            "`!poll list` - View active polls\n"
+            "`!poll results <id>` - View results\n\n"
+            "**📈 Results Show**\n"
+            "🏆 Best times ranked with medals\n"
+            "📊 Visual bar chart by day\n"
+            "👥 Total response count"
+        )
+        
+    elif category == "Economy & Shop": 
+        e.title="💰 Economy & Shop"
+        e.description=(
+            "**💵 Earning Coins**\n"
+            "• Chat messages & reactions\n"
+            "• Voice channel time\n"
+            "• Attend trainings/tryouts\n"
+            "• `/daily` & `/weekly` rewards\n"
+            "• Win duels & raids\n\n"
+            "**📜 Commands**\n"
+            "`/fcoins` - Check balance\n"
+            "`/inventory` - View items\n"
+            "`/setbackground <url>` - Custom bg\n\n"
+            "**🛒 Regular Shop Items**\n"
+            "• Private Tryout (500)\n"
+            "• Custom Role (2000)\n"
+            "• Custom Role Color (1500)\n"
+            "• Hoisted Role (5000)\n"
+            "• Custom Level BG (3000)\n"
+            "• ELO Shield (1000)\n"
+            "• Streak Saver (1500)\n\n"
+            "**✨ Exclusive Shop**\n"
+            "`!exclusiveshop` - Role-locked items\n"
+            "`!buyexclusive <item>` - Purchase\n"
+            "*Higher levels = more items!*"
+        )
+    
+    elif category == "Backup":
+        e.title="🆘 Backup System"
+        e.description=(
+            "**🆘 Request Backup**\n"
+            "`/backup` or `!backup`\n"
+            "Opens a form to request backup!\n\n"
+            "**📋 Requirements:**\n"
+            "• List at least **3 enemies**\n"
+            "• Include a valid **invite link**\n\n"
+            "**🔗 Valid Links:**\n"
+            "• Roblox Invite: `roblox.com/share?code=...`\n"
+            "• RO-PRO: `ro.pro/XXXXXX`\n\n"
+            "**📢 What Happens:**\n"
+            "Your request pings @Backup Ping\n"
+            "so members can join and help!\n\n"
+            "**⚠️ Rules:**\n"
+            "• Don't spam backup requests\n"
+            "• Only use for real situations\n"
+            "• Include accurate enemy count"
+        )
+    
+    elif category == "Stage Transfer":
+        e.title="📋 Stage Transfer & Results"
+        e.description=(
+            "**📋 Request a Transfer**\n"
+            "Click **Stage Transfer** button\n"
+            "Upload proof from: TSBCC, VALHALLA, TSBER\n"
+            "Staff will approve/deny\n\n"
+            "**📸 Proof Requirements**\n"
+            "• Shows your username + rank\n"
+            "• Recent (within 24 hours)\n\n"
+            "**📊 Stage Ranks**\n"
+            "Stage 0 - FALLEN DEITY\n"
+            "Stage 1 - FALLEN APEX\n"
+            "Stage 2 - FALLEN ASCENDANT\n"
+            "Stage 3 - FORSAKEN WARRIOR\n"
+            "Stage 4 - ABYSS-TOUCHED\n"
+            "Stage 5 - BROKEN INITIATE\n\n"
+            "**📈 Rank Levels:** High/Mid/Low/Stable\n"
+            "**💪 Strength:** Strong/Moderate/Weak\n\n"
+            "**🛡️ Staff:** `/result @user <stage> [rank] [str]`"
+        )
+        
+    elif category == "Staff": 
+        e.title="🛡️ Staff Commands"
+        e.description=(
+            "**⚠️ Warning System**\n"
+            "`!warn @user <category> [reason]` - Issue warning\n"
+            "`!strike @user <points> <reason>` - Custom strike\n"
+            "`!warnings @user` - View warnings (shows IDs)\n"
+            "`!removewarn @user <id>` - Remove warning\n"
+            "`!clearwarns @user` - Clear all (High Staff)\n"
+            "`!warnlog` - Recent server warnings\n"
+            "`!warnlist` - All categories\n"
+            "`!staffstats [days]` - Staff warning stats\n\n"
+            "**🔇 Moderation**\n"
+            "`!mute @user <time> [reason]` - Mute user\n"
+            "`!unmute @user` - Unmute user\n"
+            "`!softban @user [reason]` - Clear messages\n"
+            "`!purge <1-100>` - Delete messages\n"
+            "`!lock [reason]` - Lock channel\n"
+            "`!unlock` - Unlock channel\n"
+            "`!slowmode <seconds>` - Set slowmode\n\n"
+            "**😴 Inactivity System (Mainers)**\n"
+            "`!mainers` - View all Mainers & status\n"
+            "`!inactivity_check` - Run inactivity check\n"
+            "`!inactivity_strikes @user` - View strikes\n"
+            "`!inactive_list` - All striked members\n\n"
+            "**👤 User Management**\n"
+            "`!userinfo @user` - Full user info\n"
+            "`!checklevel @user` - Check stats\n"
+            "`!addxp / !removexp` - Manage XP\n"
+            "`!addfcoins / !removefcoins` - Manage coins\n"
+            "`!setlevel @user <level>` - Set level\n\n"
+            "**🏆 Other**\n"
+            "`!tournament` - Tournament commands\n"
+            "`!activitycheck` - Activity check\n"
+            "`!giveaway` - Start giveaway"
+        )
+        
+    elif category == "Admin":
+        e.title="⚙️ Admin Commands"
+        e.description=(
+            "**🔐 Command Permissions**\n"
+            "`!cmdperms list` - View all custom perms\n"
+            "`!cmdperms add <cmd> @Role` - Allow role\n"
+            "`!cmdperms remove <cmd> @Role` - Remove\n"
+            "`!cmdperms commands` - List available cmds\n\n"
+            "**🔒 Permission Setup**\n"
+            "`!setup_permissions confirm` - Fix all perms\n"
+            "`!fix_muted` - Fix Muted role everywhere\n"
+            "`!lockdown confirm` - Emergency lock\n"
+            "`!unlockdown confirm` - Remove lockdown\n\n"
+            "**📋 Setup Panels**\n"
+            "`!setup_verify` `!setup_tickets`\n"
+            "`!setup_shop` `!setup_transfer`\n"
+            "`!setup_practice` `!setup_attendance`\n"
+            "`!setup_staffpanel` `!setup_applications`\n"
+            "`!setup_tournament` `!setup_modlog`\n\n"
+            "**📊 Management**\n"
+            "`!massrole add/remove @Role target`\n"
+            "`!archive_old_apps <days>`\n"
+            "`!db_status` - Database status\n"
+            "`!perf [section]` - Performance metrics\n\n"
+            "**⚙️ Sync**\n"
+            "`!sync` `!clearsync`"
+        )
+    
+    e.set_footer(text="The Fallen Bot • / = slash • ! = prefix")
+    return e
+
+for _option in HELP_CATEGORIES:
+    STATIC_PAGE_BUILDERS[f"help:{_option.label}"] = functools.partial(build_help_page, _option.label)
+
 class HelpSelect(discord.ui.Select):
     def __init__(self):
-        options = [
-            discord.SelectOption(label="Member", emoji="👤", description="Basic member commands"),
-            discord.SelectOption(label="Profile & Stats", emoji="📊", description="Profile, rank, stats"),
-            discord.SelectOption(label="Perks & Rewards", emoji="🎭", description="Role perks, daily, weekly"),
-            discord.SelectOption(label="Events", emoji="📅", description="Trainings & tryouts"),
-            discord.SelectOption(label="Polls", emoji="📊", description="Availability polls"),
-            discord.SelectOption(label="Duels & ELO", emoji="⚔️", description="1v1 duels & rankings"),
-            discord.SelectOption(label="Spar Finder", emoji="🎯", description="Tier-based spar matchmaking"),
-            discord.SelectOption(label="Tournaments", emoji="🏆", description="Tournament system"),
-            discord.SelectOption(label="Economy & Shop", emoji="💰", description="Coins, shop & items"),
-            discord.SelectOption(label="Backup", emoji="🆘", description="Request backup help"),
-            discord.SelectOption(label="Stage Transfer", emoji="📋", description="Rank transfers & results"),
-            discord.SelectOption(label="Staff", emoji="🛡️", description="Staff commands"),
-            discord.SelectOption(label="Admin", emoji="⚙️", description="Setup & management"),
-        ]
-        super().__init__(placeholder="Select a category...", min_values=1, max_values=1, options=options)
+        super().__init__(placeholder="Select a category...", min_values=1, max_values=1,
+                         options=list(HELP_CATEGORIES), custom_id="help_select")
     
     async def callback(self, interaction: discord.Interaction):
-        e = discord.Embed(color=0x8B0000)
-        
-        if self.values[0] == "Member": 
-            e.title="👤 Member Commands"
-            e.description=(
-                "**🔗 Verification**\n"
-                "`/verify` - Link your Roblox account\n\n"
-                "**📊 Quick Stats**\n"
-                "`/level` - View your level card\n"
-                "`/rank` - View your rank card\n"
-                "`/profile` - Full profile with all stats\n"
-                "`/fcoins` - Check coin balance\n"
-                "`/inventory` - View purchased items\n\n"
-                "**🎁 Rewards**\n"
-                "`/daily` - Claim daily reward\n"
-                "`/weekly` - Claim weekly role reward\n"
-                "`/perks` - View your current perks\n\n"
-                "**📅 Events**\n"
-                "`/schedule` - View upcoming events\n"
-                "Click RSVP buttons on event posts!"
-            )
-            
-        elif self.values[0] == "Profile & Stats":
-            e.title="📊 Profile & Statistics"
-            e.description=(
-                "**🖼️ Visual Cards**\n"
-                "`/profile` - Full profile card with avatar\n"
-                "`/rank` - Rank card with XP bar\n"
-                "`/level` - Level card (animated for boosters!)\n\n"
-                "**📈 Statistics**\n"
-                "`/stats` - Combat stats (W/L)\n"
-                "`!mystats` - Detailed stats breakdown\n"
-                "`!achievements` - View your badges\n"
-                "`!activity` - Activity graph\n\n"
-                "**🏆 Leaderboards**\n"
-                "`/leaderboard` - XP leaderboard\n"
-                "`!voicetop` - Voice time leaders\n"
-                "`!topactive` - Most active this week\n"
-                "`!serverstats` - Server statistics\n"
-                "`!compare @user` - Compare with someone"
-            )
-        
-        elif self.values[0] == "Perks & Rewards":
-            e.title="🎭 Perks & Rewards System"
-            e.description=(
-                "**🎭 Role Perks**\n"
-                "`/perks` - View all your current perks\n"
-                "Each milestone role gives XP bonuses!\n\n"
-                "**📈 XP Multipliers (by Level)**\n"
-                "Lvl 10: +5% • Lvl 20: +10% • Lvl 30: +15%\n"
-                "Lvl 50: +20% • Lvl 70: +25% • Lvl 100: +30%\n"
-                "Lvl 140: +40% • Lvl 200: +50%\n\n"
-                "**🎁 Daily & Weekly**\n"
-                "`/daily` - Daily coins + XP (role multiplier!)\n"
-                "`/weekly` - Weekly bonus from your role\n"
-                "`/boosterreward` - Weekly booster bonus\n\n"
-                "**🛒 Exclusive Shop**\n"
-                "`!exclusiveshop` - Browse exclusive items\n"
-                "`!buyexclusive <item>` - Purchase items\n"
-                "Higher levels unlock more tiers!\n\n"
-                "**💎 Booster Perks**\n"
-                "+25% XP • 2x Daily • Animated card\n"
-                "Weekly bonus • Diamond border"
-            )
-        
-        elif self.values[0] == "Duels & ELO":
-            e.title="⚔️ Duels & ELO System"
-            e.description=(
-                "**⚔️ Duel Commands**\n"
-                "`/duel @user` - Challenge to 1v1\n"
-                "`/elo` - Check your ELO rating\n"
-                "`/elo @user` - Check someone's ELO\n"
-                "`!elo_leaderboard` - Top ranked players\n"
-                "`!duel_history` - Your match history\n\n"
-                "**🛡️ ELO Shield (Shop Item)**\n"
-                "Protects you from ELO loss once!\n\n"
-                "**🏅 ELO Ranks**\n"
-                "🏆 Grandmaster (2000+)\n"
-                "💎 Diamond (1800+)\n"
-                "🥇 Platinum (1600+)\n"
-                "🥈 Gold (1400+)\n"
-                "🥉 Silver (1200+)\n"
-                "⚔️ Bronze (1000+)\n\n"
-                "*Win duels to climb!*"
-            )
-        
-        elif self.values[0] == "Spar Finder":
-            e.title="🎯 Spar Finder"
-            e.description=(
-                "**⚔️ Tier-Based Matchmaking**\n"
-                "Your Stage + Rank + Strength = Your Tier\n"
-                "54 tiers total (lower = stronger)\n\n"
-                "**Match Types:**\n"
-                "⭐ Perfect (±1 tier)\n"
-                "✅ Good (±2-3 tiers)\n"
-                "⚠️ Fair (±4-6 tiers)\n\n"
-                "**📋 Panel Buttons**\n"
-                "• **🎯 Find Spar** - Join queue\n"
-                "• **📋 View Queue** - See who's waiting\n"
-                "• **🔍 Find Match** - Auto-find opponents\n"
-                "• **⚔️ Challenge** - Pick directly\n\n"
-                "**🎮 In Match Channel**\n"
-                "• Post private server link\n"
-                "• Play your set (FT5, FT10, etc.)\n"
-                "• Post proof & submit result\n"
-                "• Rate your partner!\n\n"
-                "**📊 Commands**\n"
-                "`/practice_stats` - View your stats"
-            )
-        
-        elif self.values[0] == "Tournaments":
-            e.title="🏆 Tournament System V3"
-            e.description=(
-                "**👤 How to Participate**\n"
-                "• Click **Register** on tournament portal\n"
-                "• Click **Leave** to withdraw\n"
-                "• Click **Spectate** to watch\n\n"
-                "**⚔️ During Matches**\n"
-                "• Match threads created automatically\n"
-                "• Staff click **Report Score** button\n"
-                "• Bracket image updates live!\n\n"
-                "**🛠️ Staff Commands**\n"
-                "`!tournament` — Create new tournament\n"
-                "`!bracket` — View current bracket\n"
-                "`!tparticipants` — View registered players\n"
-                "`!tstatus` — Tournament status\n"
-                "`!tsetwinner @user` — Set winner manually\n"
-                "`!tendtournament` — End tournament\n"
-                "`!tdeletetournament` — Delete tournament\n\n"
-                "**💰 Reward Amounts**\n"
-                "🥇 1st: 5,000 coins + 500 XP\n"
-                "🥈 2nd: 2,500 coins + 250 XP\n"
-                "🥉 3rd: 1,000 coins + 100 XP"
-            )
-            
-        elif self.values[0] == "Events":
-            e.title="📅 Events (Trainings & Tryouts)"
-            e.description=(
-                "**👤 Member Commands**\n"
-                "`/schedule` - View upcoming events\n"
-                "`/event list` - All scheduled events\n"
-                "`/attendance_streak` - Your streak\n\n"
-                "**💰 Attendance Rewards**\n"
-                "• Training: 100 coins + 50 XP\n"
-                "• Tryout: 150 coins + 75 XP\n"
-                "• Host: 300 coins + 100 XP\n\n"
-                "**🔥 Streak Bonuses**\n"
-                "• 3 streak: +50 | 5: +100\n"
-                "• 7 streak: +200 | 10: +500\n\n"
-                "**🎖️ Attendance Roles**\n"
-                "5→Fallen Initiate | 15→Disciple\n"
-                "30→Warrior | 50→Slayer | 100→Immortal\n\n"
-                "**🔥 Streak Roles**\n"
-                "3→♰Shadow Initiate | 5→♰Rising Shadow\n"
-                "10→♰Relentless | 20→♰Undying | 50→♰Eternal"
-            )
-        
-        elif self.values[0] == "Polls":
-            e.title="📊 Availability Polls"
-            e.description=(
-                "**📋 What Are Polls?**\n"
-                "Staff can create polls to find the best\n"
-                "times for trainings and tryouts!\n\n"
-                "**👤 How to Respond**\n"
-                "1️⃣ Click a **day button** (Mon-Sun)\n"
-                "2️⃣ Enter your **available times**\n"
-                "3️⃣ Repeat for other days\n"
-                "4️⃣ Click **✅ Submit** when done!\n\n"
-                "**🔘 Poll Buttons**\n"
-                "• Day buttons (Mon-Sun) - Select times\n"
-                "• ✅ Submit - Finalize response\n"
-                "• 👁️ My Times - View your selections\n"
-                "• 📊 Results - Staff only\n"
-                "• 🔒 Close - Staff only\n\n"
-                "**🛡️ Staff Commands**\n"
-                "`!poll training` - Create training poll\n"
-                "`!poll tryout` - Create tryout poll\n"
-                "`!poll list` - View active polls\n"
-                "`!poll results <id>` - View results\n\n"
-                "**📈 Results Show**\n"
-                "🏆 Best times ranked with medals\n"
-                "📊 Visual bar chart by day\n"
-                "👥 Total response count"
-            )
-            
-        elif self.values[0] == "Economy & Shop": 
-            e.title="💰 Economy & Shop"
-            e.description=(
-                "**💵 Earning Coins**\n"
-                "• Chat messages & reactions\n"
-                "• Voice channel time\n"
-                "• Attend trainings/tryouts\n"
-                "• `/daily` & `/weekly` rewards\n"
-                "• Win duels & raids\n\n"
-                "**📜 Commands**\n"
-                "`/fcoins` - Check balance\n"
-                "`/inventory` - View items\n"
-                "`/setbackground <url>` - Custom bg\n\n"
-                "**🛒 Regular Shop Items**\n"
-                "• Private Tryout (500)\n"
-                "• Custom Role (2000)\n"
-                "• Custom Role Color (1500)\n"
-                "• Hoisted Role (5000)\n"
-                "• Custom Level BG (3000)\n"
-                "• ELO Shield (1000)\n"
-                "• Streak Saver (1500)\n\n"
-                "**✨ Exclusive Shop**\n"
-                "`!exclusiveshop` - Role-locked items\n"
-                "`!buyexclusive <item>` - Purchase\n"
-                "*Higher levels = more items!*"
-            )
-        
-        elif self.values[0] == "Backup":
-            e.title="🆘 Backup System"
-            e.description=(
-                "**🆘 Request Backup**\n"
-                "`/backup` or `!backup`\n"
-                "Opens a form to request backup!\n\n"
-                "**📋 Requirements:**\n"
-                "• List at least **3 enemies**\n"
-                "• Include a valid **invite link**\n\n"
-                "**🔗 Valid Links:**\n"
-                "• Roblox Invite: `roblox.com/share?code=...`\n"
-                "• RO-PRO: `ro.pro/XXXXXX`\n\n"
-                "**📢 What Happens:**\n"
-                "Your request pings @Backup Ping\n"
-                "so members can join and help!\n\n"
-                "**⚠️ Rules:**\n"
-                "• Don't spam backup requests\n"
-                "• Only use for real situations\n"
-                "• Include accurate enemy count"
-            )
-        
-        elif self.values[0] == "Stage Transfer":
-            e.title="📋 Stage Transfer & Results"
-            e.description=(
-                "**📋 Request a Transfer**\n"
-                "Click **Stage Transfer** button\n"
-                "Upload proof from: TSBCC, VALHALLA, TSBER\n"
-                "Staff will approve/deny\n\n"
-                "**📸 Proof Requirements**\n"
-                "• Shows your username + rank\n"
-                "• Recent (within 24 hours)\n\n"
-                "**📊 Stage Ranks**\n"
-                "Stage 0 - FALLEN DEITY\n"
-                "Stage 1 - FALLEN APEX\n"
-                "Stage 2 - FALLEN ASCENDANT\n"
-                "Stage 3 - FORSAKEN WARRIOR\n"
-                "Stage 4 - ABYSS-TOUCHED\n"
-                "Stage 5 - BROKEN INITIATE\n\n"
-                "**📈 Rank Levels:** High/Mid/Low/Stable\n"
-                "**💪 Strength:** Strong/Moderate/Weak\n\n"
-                "**🛡️ Staff:** `/result @user <stage> [rank] [str]`"
-            )
-            
-        elif self.values[0] == "Staff": 
-            e.title="🛡️ Staff Commands"
-            e.description=(
-                "**⚠️ Warning System**\n"
-                "`!warn @user <category> [reason]` - Issue warning\n"
-                "`!strike @user <points> <reason>` - Custom strike\n"
-                "`!warnings @user` - View warnings (shows IDs)\n"
-                "`!removewarn @user <id>` - Remove warning\n"
-                "`!clearwarns @user` - Clear all (High Staff)\n"
-                "`!warnlog` - Recent server warnings\n"
-                "`!warnlist` - All categories\n"
-                "`!staffstats [days]` - Staff warning stats\n\n"
-                "**🔇 Moderation**\n"
-                "`!mute @user <time> [reason]` - Mute user\n"
-                "`!unmute @user` - Unmute user\n"
-                "`!softban @user [reason]` - Clear messages\n"
-                "`!purge <1-100>` - Delete messages\n"
-                "`!lock [reason]` - Lock channel\n"
-                "`!unlock` - Unlock channel\n"
-                "`!slowmode <seconds>` - Set slowmode\n\n"
-                "**😴 Inactivity System (Mainers)**\n"
-                "`!mainers` - View all Mainers & status\n"
-                "`!inactivity_check` - Run inactivity check\n"
-                "`!inactivity_strikes @user` - View strikes\n"
-                "`!inactive_list` - All striked members\n\n"
-                "**👤 User Management**\n"
-                "`!userinfo @user` - Full user info\n"
-                "`!checklevel @user` - Check stats\n"
-                "`!addxp / !removexp` - Manage XP\n"
-                "`!addfcoins / !removefcoins` - Manage coins\n"
-                "`!setlevel @user <level>` - Set level\n\n"
-                "**🏆 Other**\n"
-                "`!tournament` - Tournament commands\n"
-                "`!activitycheck` - Activity check\n"
-                "`!giveaway` - Start giveaway"
-            )
-            
-        elif self.values[0] == "Admin":
-            e.title="⚙️ Admin Commands"
-            e.description=(
-                "**🔐 Command Permissions**\n"
-                "`!cmdperms list` - View all custom perms\n"
-                "`!cmdperms add <cmd> @Role` - Allow role\n"
-                "`!cmdperms remove <cmd> @Role` - Remove\n"
-                "`!cmdperms commands` - List available cmds\n\n"
-                "**🔒 Permission Setup**\n"
-                "`!setup_permissions confirm` - Fix all perms\n"
-                "`!fix_muted` - Fix Muted role everywhere\n"
-                "`!lockdown confirm` - Emergency lock\n"
-                "`!unlockdown confirm` - Remove lockdown\n\n"
-                "**📋 Setup Panels**\n"
-                "`!setup_verify` `!setup_tickets`\n"
-                "`!setup_shop` `!setup_transfer`\n"
-                "`!setup_practice` `!setup_attendance`\n"
-                "`!setup_staffpanel` `!setup_applications`\n"
-                "`!setup_tournament` `!setup_modlog`\n\n"
-                "**📊 Management**\n"
-                "`!massrole add/remove @Role target`\n"
-                "`!archive_old_apps <days>`\n"
-                "`!db_status` - Database status\n\n"
-                "**⚙️ Sync**\n"
-                "`!sync` `!clearsync`"
-            )
-        
-        e.set_footer(text="The Fallen Bot • / = slash • ! = prefix")
-        await interaction.response.edit_message(embed=e)
+        await interaction.response.edit_message(embed=static_page(f"help:{self.values[0]}"))
 
 class HelpView(discord.ui.View):
+    """Persistent - the select only swaps the embed, so one view serves every help menu"""
     def __init__(self): 
-        super().__init__(timeout=180)
+        super().__init__(timeout=None)
         self.add_item(HelpSelect())
 
     claimed_rank = discord.ui.TextInput(label="Your Rank", max_length=5)
@@ -8145,19 +9396,20 @@ class HelpView(discord.ui.View):
     
     async def on_submit(self, interaction: discord.Interaction):
         guild, user = interaction.guild, interaction.user
-        opponent = discord.utils.get(guild.members, name=self.opponent_name.value)
+        await interaction.response.defer(ephemeral=True)
+        opponent = await resolve_member(guild, self.opponent_name.value)
         if not opponent: 
-            return await interaction.response.send_message("❌ User not found. Make sure you typed their exact username.", ephemeral=True)
+            return await interaction.followup.send("❌ User not found. Make sure you typed their exact username.", ephemeral=True)
         
         my_rank = get_rank(user.id)
         opp_rank = get_rank(opponent.id)
         
         if not my_rank or not opp_rank: 
-            return await interaction.response.send_message("❌ Both players must be on the leaderboard.", ephemeral=True)
+            return await interaction.followup.send("❌ Both players must be on the leaderboard.", ephemeral=True)
         if str(my_rank) != self.claimed_rank.value.strip(): 
-            return await interaction.response.send_message(f"❌ Rank mismatch. Your actual rank is {my_rank}.", ephemeral=True)
+            return await interaction.followup.send(f"❌ Rank mismatch. Your actual rank is {my_rank}.", ephemeral=True)
         if (my_rank - opp_rank) != 1: 
-            return await interaction.response.send_message(f"❌ You can only challenge Rank {my_rank - 1}.", ephemeral=True)
+            return await interaction.followup.send(f"❌ You can only challenge Rank {my_rank - 1}.", ephemeral=True)
         
         overwrites = {
             guild.default_role: discord.PermissionOverwrite(read_messages=False), 
@@ -8184,7 +9436,7 @@ class HelpView(discord.ui.View):
             color=0xE74C3C
         )
         await ch.send(f"{staff.mention if staff else ''}", embed=embed, view=StaffApprovalView(user, opponent))
-        await interaction.response.send_message(f"✅ Challenge ticket created: {ch.mention}", ephemeral=True)
+        await interaction.followup.send(f"✅ Challenge ticket created: {ch.mention}", ephemeral=True)
 
 class StaffApprovalView(discord.ui.View):
     def __init__(self, challenger=None, opponent=None): 
@@ -8869,6 +10121,277 @@ class ApplicationNoteModal(discord.ui.Modal, title="📝 Add Staff Note"):
 # SERVER INFO PANEL SYSTEM
 # ==========================================
 
+def build_high_ranks_page():
+    embed = discord.Embed(
+        title="🎖️ ✦ HIGH RANKS ✦",
+        description="**The leadership of The Fallen.**",
+        color=0x8B0000
+    )
+    embed.add_field(
+        name="👑 Owner",
+        value="Supreme authority over The Fallen. Final say on all matters.",
+        inline=False
+    )
+    embed.add_field(
+        name="⚔️ Co-Owner",
+        value="Second in command. Manages high-level operations and staff.",
+        inline=False
+    )
+    embed.add_field(
+        name="🛡️ Head Staff",
+        value="Oversees all staff members. Handles promotions and demotions.",
+        inline=False
+    )
+    embed.add_field(
+        name="📋 Staff",
+        value="Moderates the server, hosts events, manages members.",
+        inline=False
+    )
+    embed.add_field(
+        name="🎯 Trial Staff",
+        value="Probationary staff. Proving their worth before full promotion.",
+        inline=False
+    )
+    embed.add_field(
+        name="⚠️ How to Become Staff",
+        value="• Be active and trusted\n• Apply when applications open\n• Show leadership qualities\n• No begging or asking",
+        inline=False
+    )
+    embed.set_footer(text="✝ The Fallen ✝ • Staff roles are earned through trust")
+    return embed
+
+def build_low_ranks_page():
+    embed = discord.Embed(
+        title="💀 ✦ MEMBER RANKS (STAGES) ✦",
+        description="**Combat ranks within The Fallen.**\nEarned through tryouts and performance.",
+        color=0x8B0000
+    )
+    embed.add_field(
+        name="⭐ Stage 5 — Elite",
+        value="The best of the best. Top performers.",
+        inline=False
+    )
+    embed.add_field(
+        name="⭐ Stage 4 — Veteran",
+        value="Highly skilled and proven in combat.",
+        inline=False
+    )
+    embed.add_field(
+        name="⭐ Stage 3 — Experienced",
+        value="Solid skill level, consistent performer.",
+        inline=False
+    )
+    embed.add_field(
+        name="⭐ Stage 2 — Intermediate",
+        value="Developing skills, shows potential.",
+        inline=False
+    )
+    embed.add_field(
+        name="⭐ Stage 1 — Beginner",
+        value="New to competitive play, learning.",
+        inline=False
+    )
+    embed.add_field(
+        name="⭐ Stage 0 — Unranked",
+        value="Just joined, needs to tryout.",
+        inline=False
+    )
+    embed.add_field(
+        name="🎮 Mainer",
+        value="Full member of The Fallen. Base rank for all members.",
+        inline=False
+    )
+    embed.add_field(
+        name="📈 How to Rank Up",
+        value="• Attend tryouts\n• Perform well in scrims/wars\n• Show consistency\n• Be active",
+        inline=False
+    )
+    embed.set_footer(text="✝ The Fallen ✝ • Ranks are earned, not requested")
+    return embed
+
+def build_raid_ranks_page():
+    embed = discord.Embed(
+        title="⚔️ ✦ RAID/WAR RANKS ✦",
+        description="**Performance-based roles for clan battles.**",
+        color=0x8B0000
+    )
+    embed.add_field(
+        name="🔥 Raid Leader",
+        value="Leads raids and coordinates attacks. Calls strats.",
+        inline=False
+    )
+    embed.add_field(
+        name="⚔️ War Veteran",
+        value="Experienced in clan wars. Reliable in battle.",
+        inline=False
+    )
+    embed.add_field(
+        name="🎯 Raider",
+        value="Active participant in raids and wars.",
+        inline=False
+    )
+    embed.add_field(
+        name="📊 How to Earn",
+        value="• Participate in clan wars\n• Show up consistently\n• Perform well in raids\n• Follow raid leader calls",
+        inline=False
+    )
+    embed.set_footer(text="✝ The Fallen ✝ • War roles are earned through battle")
+    return embed
+
+def build_activity_ranks_page():
+    embed = discord.Embed(
+        title="📊 ✦ ACTIVITY RANKS ✦",
+        description="**Level roles earned through activity.**\nGain XP by chatting, joining VC, and participating.",
+        color=0x8B0000
+    )
+    embed.add_field(
+        name="How XP Works",
+        value="• **Chat:** 15-25 XP per message (60s cooldown)\n• **Voice:** 10-20 XP per 2 minutes\n• **Events:** Bonus XP for attending\n• **Daily:** Claim daily rewards",
+        inline=False
+    )
+    embed.add_field(
+        name="Level Milestones",
+        value="• Level 5 → Faint Emberling\n• Level 10 → Initiate of Shadows\n• Level 20 → Abysswalk Student\n• Level 50 → Bearer of Abyssal Echo\n• Level 100 → Abyssforged Warden\n• Level 200 → Eternal Shadow Sovereign",
+        inline=False
+    )
+    embed.add_field(
+        name="Benefits",
+        value="• Higher levels = more recognition\n• Coin rewards at milestones\n• Special channel access\n• Flex on the leaderboard",
+        inline=False
+    )
+    embed.set_footer(text="✝ The Fallen ✝ • Check !level to see your progress")
+    return embed
+
+# Flavour lines under the higher level milestones (coins come from LEVEL_CONFIG)
+LEVEL_PAGE_NOTES = {
+    100: "⭐ Elite recognition",
+    120: "⭐ Veteran status",
+    140: "⭐ Respected member",
+    160: "⭐ Top tier",
+    200: "👑 Maximum prestige\n🏆 The highest honor",
+}
+
+def add_level_milestone_fields(embed, levels):
+    top = max(LEVEL_CONFIG)
+    for lvl in levels:
+        milestone = LEVEL_CONFIG[lvl]
+        value = f"💰 {milestone['coins']:,} coins"
+        if lvl in LEVEL_PAGE_NOTES:
+            value += "\n" + LEVEL_PAGE_NOTES[lvl]
+        embed.add_field(name=f"Level {lvl} — {milestone['role']}", value=value, inline=lvl != top)
+
+def build_lower_levels_page():
+    embed = discord.Embed(
+        title="📈 ✦ LOWER LEVELS (5 - 80) ✦",
+        description="**Early level rewards and roles.**",
+        color=0x2ecc71
+    )
+    add_level_milestone_fields(embed, [lvl for lvl in sorted(LEVEL_CONFIG) if lvl < 100])
+    embed.set_footer(text="✝ The Fallen ✝ • Keep grinding!")
+    return embed
+
+def build_higher_levels_page():
+    embed = discord.Embed(
+        title="🔥 ✦ HIGHER LEVELS (100 - 200) ✦",
+        description="**Elite level rewards and roles.**",
+        color=0xe74c3c
+    )
+    add_level_milestone_fields(embed, [lvl for lvl in sorted(LEVEL_CONFIG) if lvl >= 100])
+    embed.add_field(
+        name="💡 Tips for High Levels",
+        value="• Stay consistently active\n• Attend all events\n• Use daily rewards\n• Chat in voice channels",
+        inline=False
+    )
+    embed.set_footer(text="✝ The Fallen ✝ • Only the dedicated reach 200")
+    return embed
+
+def build_booster_info_page():
+    embed = discord.Embed(
+        title="💎 ✦ BOOSTER PERKS ✦",
+        description="**Support The Fallen and be rewarded.**\nBoost the server to unlock exclusive benefits.",
+        color=0xf47fff
+    )
+    embed.add_field(
+        name="🎭 Exclusive Role",
+        value="Special Booster role with unique color",
+        inline=False
+    )
+    embed.add_field(
+        name="⚡ Priority Access",
+        value="• First pick for events & trainings\n• Priority in tryout queues\n• Access to booster-only events",
+        inline=False
+    )
+    embed.add_field(
+        name="💬 Special Channels",
+        value="• Booster lounge access\n• Behind-the-scenes chat\n• Direct line to staff",
+        inline=False
+    )
+    embed.add_field(
+        name="🏆 Recognition",
+        value="• Special mention in announcements\n• Booster badge on profile\n• Appreciation from the clan",
+        inline=False
+    )
+    embed.add_field(
+        name="📋 Faster Response",
+        value="• Applications reviewed first\n• Support tickets prioritized\n• Questions answered faster",
+        inline=False
+    )
+    embed.add_field(
+        name="💰 Bonus Rewards",
+        value="• 2x daily coin bonus\n• Extra XP multiplier\n• Exclusive shop items",
+        inline=False
+    )
+    embed.set_footer(text="✝ The Fallen ✝ • Thank you for supporting us!")
+    return embed
+
+def build_bot_info_page():
+    embed = discord.Embed(
+        title="🤖 ✦ BOT COMMANDS ✦",
+        description="**The Fallen Bot — Your clan companion.**",
+        color=0x3498db
+    )
+    embed.add_field(
+        name="📊 Profile & Stats",
+        value="`!profile` — View your profile\n`!level` — Check your level\n`!rank` — See leaderboard position\n`!stats` — Detailed statistics",
+        inline=False
+    )
+    embed.add_field(
+        name="💰 Economy",
+        value="`!daily` — Claim daily reward\n`!balance` — Check coins\n`!shop` — Buy items\n`!inventory` — View owned items",
+        inline=False
+    )
+    embed.add_field(
+        name="🏆 Leaderboards",
+        value="`!leaderboard` — XP rankings\n`!top10` — Combat top 10\n`!elolb` — ELO rankings\n`!coinlb` — Richest members",
+        inline=False
+    )
+    embed.add_field(
+        name="⚔️ Competitive",
+        value="`!duel @user` — 1v1 duel\n`!elo` — Check ELO rating\n`!record` — Win/loss record",
+        inline=False
+    )
+    embed.add_field(
+        name="🎮 Fun",
+        value="`!achievements` — View badges\n`!coinflip` — Gamble coins\n`!train` — Training mode",
+        inline=False
+    )
+    embed.add_field(
+        name="📋 Info",
+        value="`!help` — Full command list\n`!roster` — Clan roster\n`!events` — Upcoming events",
+        inline=False
+    )
+    embed.set_footer(text="✝ The Fallen ✝ • Use !help for full command list")
+    return embed
+
+STATIC_PAGE_BUILDERS["info:high_ranks"] = build_high_ranks_page
+STATIC_PAGE_BUILDERS["info:low_ranks"] = build_low_ranks_page
+STATIC_PAGE_BUILDERS["info:raid_ranks"] = build_raid_ranks_page
+STATIC_PAGE_BUILDERS["info:activity_ranks"] = build_activity_ranks_page
+STATIC_PAGE_BUILDERS["info:lower_levels"] = build_lower_levels_page
+STATIC_PAGE_BUILDERS["info:higher_levels"] = build_higher_levels_page
+STATIC_PAGE_BUILDERS["info:booster_info"] = build_booster_info_page
+STATIC_PAGE_BUILDERS["info:bot_info"] = build_bot_info_page
+
 class ServerInfoView(discord.ui.View):
     """Main server info panel with category buttons"""
     def __init__(self):
@@ -8876,148 +10399,19 @@ class ServerInfoView(discord.ui.View):
     
     @discord.ui.button(label="🎖️ High Ranks", style=discord.ButtonStyle.secondary, custom_id="info_high_ranks", row=0)
     async def high_ranks(self, interaction: discord.Interaction, button: discord.ui.Button):
-        embed = discord.Embed(
-            title="🎖️ ✦ HIGH RANKS ✦",
-            description="**The leadership of The Fallen.**",
-            color=0x8B0000
-        )
-        embed.add_field(
-            name="👑 Owner",
-            value="Supreme authority over The Fallen. Final say on all matters.",
-            inline=False
-        )
-        embed.add_field(
-            name="⚔️ Co-Owner",
-            value="Second in command. Manages high-level operations and staff.",
-            inline=False
-        )
-        embed.add_field(
-            name="🛡️ Head Staff",
-            value="Oversees all staff members. Handles promotions and demotions.",
-            inline=False
-        )
-        embed.add_field(
-            name="📋 Staff",
-            value="Moderates the server, hosts events, manages members.",
-            inline=False
-        )
-        embed.add_field(
-            name="🎯 Trial Staff",
-            value="Probationary staff. Proving their worth before full promotion.",
-            inline=False
-        )
-        embed.add_field(
-            name="⚠️ How to Become Staff",
-            value="• Be active and trusted\n• Apply when applications open\n• Show leadership qualities\n• No begging or asking",
-            inline=False
-        )
-        embed.set_footer(text="✝ The Fallen ✝ • Staff roles are earned through trust")
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+        await interaction.response.send_message(embed=static_page("info:high_ranks"), ephemeral=True)
     
     @discord.ui.button(label="💀 Low Ranks", style=discord.ButtonStyle.secondary, custom_id="info_low_ranks", row=0)
     async def low_ranks(self, interaction: discord.Interaction, button: discord.ui.Button):
-        embed = discord.Embed(
-            title="💀 ✦ MEMBER RANKS (STAGES) ✦",
-            description="**Combat ranks within The Fallen.**\nEarned through tryouts and performance.",
-            color=0x8B0000
-        )
-        embed.add_field(
-            name="⭐ Stage 5 — Elite",
-            value="The best of the best. Top performers.",
-            inline=False
-        )
-        embed.add_field(
-            name="⭐ Stage 4 — Veteran",
-            value="Highly skilled and proven in combat.",
-            inline=False
-        )
-        embed.add_field(
-            name="⭐ Stage 3 — Experienced",
-            value="Solid skill level, consistent performer.",
-            inline=False
-        )
-        embed.add_field(
-            name="⭐ Stage 2 — Intermediate",
-            value="Developing skills, shows potential.",
-            inline=False
-        )
-        embed.add_field(
-            name="⭐ Stage 1 — Beginner",
-            value="New to competitive play, learning.",
-            inline=False
-        )
-        embed.add_field(
-            name="⭐ Stage 0 — Unranked",
-            value="Just joined, needs to tryout.",
-            inline=False
-        )
-        embed.add_field(
-            name="🎮 Mainer",
-            value="Full member of The Fallen. Base rank for all members.",
-            inline=False
-        )
-        embed.add_field(
-            name="📈 How to Rank Up",
-            value="• Attend tryouts\n• Perform well in scrims/wars\n• Show consistency\n• Be active",
-            inline=False
-        )
-        embed.set_footer(text="✝ The Fallen ✝ • Ranks are earned, not requested")
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+        await interaction.response.send_message(embed=static_page("info:low_ranks"), ephemeral=True)
     
     @discord.ui.button(label="⚔️ Raid Ranks", style=discord.ButtonStyle.secondary, custom_id="info_raid_ranks", row=0)
     async def raid_ranks(self, interaction: discord.Interaction, button: discord.ui.Button):
-        embed = discord.Embed(
-            title="⚔️ ✦ RAID/WAR RANKS ✦",
-            description="**Performance-based roles for clan battles.**",
-            color=0x8B0000
-        )
-        embed.add_field(
-            name="🔥 Raid Leader",
-            value="Leads raids and coordinates attacks. Calls strats.",
-            inline=False
-        )
-        embed.add_field(
-            name="⚔️ War Veteran",
-            value="Experienced in clan wars. Reliable in battle.",
-            inline=False
-        )
-        embed.add_field(
-            name="🎯 Raider",
-            value="Active participant in raids and wars.",
-            inline=False
-        )
-        embed.add_field(
-            name="📊 How to Earn",
-            value="• Participate in clan wars\n• Show up consistently\n• Perform well in raids\n• Follow raid leader calls",
-            inline=False
-        )
-        embed.set_footer(text="✝ The Fallen ✝ • War roles are earned through battle")
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+        await interaction.response.send_message(embed=static_page("info:raid_ranks"), ephemeral=True)
     
     @discord.ui.button(label="📊 Activity Ranks", style=discord.ButtonStyle.secondary, custom_id="info_activity_ranks", row=0)
     async def activity_ranks(self, interaction: discord.Interaction, button: discord.ui.Button):
-        embed = discord.Embed(
-            title="📊 ✦ ACTIVITY RANKS ✦",
-            description="**Level roles earned through activity.**\nGain XP by chatting, joining VC, and participating.",
-            color=0x8B0000
-        )
-        embed.add_field(
-            name="How XP Works",
-            value="• **Chat:** 15-25 XP per message (60s cooldown)\n• **Voice:** 10-20 XP per 2 minutes\n• **Events:** Bonus XP for attending\n• **Daily:** Claim daily rewards",
-            inline=False
-        )
-        embed.add_field(
-            name="Level Milestones",
-            value="• Level 5 → Faint Emberling\n• Level 10 → Initiate of Shadows\n• Level 20 → Abysswalk Student\n• Level 50 → Bearer of Abyssal Echo\n• Level 100 → Abyssforged Warden\n• Level 200 → Eternal Shadow Sovereign",
-            inline=False
-        )
-        embed.add_field(
-            name="Benefits",
-            value="• Higher levels = more recognition\n• Coin rewards at milestones\n• Special channel access\n• Flex on the leaderboard",
-            inline=False
-        )
-        embed.set_footer(text="✝ The Fallen ✝ • Check !level to see your progress")
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+        await interaction.response.send_message(embed=static_page("info:activity_ranks"), ephemeral=True)
 
 
 class ServerInfoLevelsView(discord.ui.View):
@@ -9027,98 +10421,11 @@ class ServerInfoLevelsView(discord.ui.View):
     
     @discord.ui.button(label="Lower Levels (5 - 80)", style=discord.ButtonStyle.success, custom_id="info_levels_low", row=0)
     async def lower_levels(self, interaction: discord.Interaction, button: discord.ui.Button):
-        embed = discord.Embed(
-            title="📈 ✦ LOWER LEVELS (5 - 80) ✦",
-            description="**Early level rewards and roles.**",
-            color=0x2ecc71
-        )
-        embed.add_field(
-            name="Level 5 — Faint Emberling",
-            value="💰 50 coins",
-            inline=True
-        )
-        embed.add_field(
-            name="Level 10 — Initiate of Shadows",
-            value="💰 100 coins",
-            inline=True
-        )
-        embed.add_field(
-            name="Level 20 — Abysswalk Student",
-            value="💰 200 coins",
-            inline=True
-        )
-        embed.add_field(
-            name="Level 30 — Twilight Disciple",
-            value="💰 400 coins",
-            inline=True
-        )
-        embed.add_field(
-            name="Level 40 — Duskforged Aspirant",
-            value="💰 600 coins",
-            inline=True
-        )
-        embed.add_field(
-            name="Level 50 — Bearer of Abyssal Echo",
-            value="💰 1,000 coins",
-            inline=True
-        )
-        embed.add_field(
-            name="Level 60 — Nightwoven Adept",
-            value="💰 1,500 coins",
-            inline=True
-        )
-        embed.add_field(
-            name="Level 70 — Veilmarked Veteran",
-            value="💰 2,000 coins",
-            inline=True
-        )
-        embed.add_field(
-            name="Level 80 — Shadowborn Ascendant",
-            value="💰 2,500 coins",
-            inline=True
-        )
-        embed.set_footer(text="✝ The Fallen ✝ • Keep grinding!")
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+        await interaction.response.send_message(embed=static_page("info:lower_levels"), ephemeral=True)
     
     @discord.ui.button(label="Higher Levels (100 - 200)", style=discord.ButtonStyle.danger, custom_id="info_levels_high", row=0)
     async def higher_levels(self, interaction: discord.Interaction, button: discord.ui.Button):
-        embed = discord.Embed(
-            title="🔥 ✦ HIGHER LEVELS (100 - 200) ✦",
-            description="**Elite level rewards and roles.**",
-            color=0xe74c3c
-        )
-        embed.add_field(
-            name="Level 100 — Abyssforged Warden",
-            value="💰 5,000 coins\n⭐ Elite recognition",
-            inline=True
-        )
-        embed.add_field(
-            name="Level 120 — Eclipsed Oathbearer",
-            value="💰 7,500 coins\n⭐ Veteran status",
-            inline=True
-        )
-        embed.add_field(
-            name="Level 140 — Harbinger of Dusk",
-            value="💰 10,000 coins\n⭐ Respected member",
-            inline=True
-        )
-        embed.add_field(
-            name="Level 160 — Ascended Dreadkeeper",
-            value="💰 15,000 coins\n⭐ Top tier",
-            inline=True
-        )
-        embed.add_field(
-            name="Level 200 — Eternal Shadow Sovereign",
-            value="💰 50,000 coins\n👑 Maximum prestige\n🏆 The highest honor",
-            inline=False
-        )
-        embed.add_field(
-            name="💡 Tips for High Levels",
-            value="• Stay consistently active\n• Attend all events\n• Use daily rewards\n• Chat in voice channels",
-            inline=False
-        )
-        embed.set_footer(text="✝ The Fallen ✝ • Only the dedicated reach 200")
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+        await interaction.response.send_message(embed=static_page("info:higher_levels"), ephemeral=True)
 
 
 class ServerInfoBoosterView(discord.ui.View):
@@ -9128,43 +10435,7 @@ class ServerInfoBoosterView(discord.ui.View):
     
     @discord.ui.button(label="💎 Booster Info", style=discord.ButtonStyle.secondary, custom_id="info_booster", row=0)
     async def booster_info(self, interaction: discord.Interaction, button: discord.ui.Button):
-        embed = discord.Embed(
-            title="💎 ✦ BOOSTER PERKS ✦",
-            description="**Support The Fallen and be rewarded.**\nBoost the server to unlock exclusive benefits.",
-            color=0xf47fff
-        )
-        embed.add_field(
-            name="🎭 Exclusive Role",
-            value="Special Booster role with unique color",
-            inline=False
-        )
-        embed.add_field(
-            name="⚡ Priority Access",
-            value="• First pick for events & trainings\n• Priority in tryout queues\n• Access to booster-only events",
-            inline=False
-        )
-        embed.add_field(
-            name="💬 Special Channels",
-            value="• Booster lounge access\n• Behind-the-scenes chat\n• Direct line to staff",
-            inline=False
-        )
-        embed.add_field(
-            name="🏆 Recognition",
-            value="• Special mention in announcements\n• Booster badge on profile\n• Appreciation from the clan",
-            inline=False
-        )
-        embed.add_field(
-            name="📋 Faster Response",
-            value="• Applications reviewed first\n• Support tickets prioritized\n• Questions answered faster",
-            inline=False
-        )
-        embed.add_field(
-            name="💰 Bonus Rewards",
-            value="• 2x daily coin bonus\n• Extra XP multiplier\n• Exclusive shop items",
-            inline=False
-        )
-        embed.set_footer(text="✝ The Fallen ✝ • Thank you for supporting us!")
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+        await interaction.response.send_message(embed=static_page("info:booster_info"), ephemeral=True)
 
 
 class ServerInfoBotView(discord.ui.View):
@@ -9174,43 +10445,7 @@ class ServerInfoBotView(discord.ui.View):
     
     @discord.ui.button(label="🤖 Bot Info", style=discord.ButtonStyle.secondary, custom_id="info_bot", row=0)
     async def bot_info(self, interaction: discord.Interaction, button: discord.ui.Button):
-        embed = discord.Embed(
-            title="🤖 ✦ BOT COMMANDS ✦",
-            description="**The Fallen Bot — Your clan companion.**",
-            color=0x3498db
-        )
-        embed.add_field(
-            name="📊 Profile & Stats",
-            value="`!profile` — View your profile\n`!level` — Check your level\n`!rank` — See leaderboard position\n`!stats` — Detailed statistics",
-            inline=False
-        )
-        embed.add_field(
-            name="💰 Economy",
-            value="`!daily` — Claim daily reward\n`!balance` — Check coins\n`!shop` — Buy items\n`!inventory` — View owned items",
-            inline=False
-        )
-        embed.add_field(
-            name="🏆 Leaderboards",
-            value="`!leaderboard` — XP rankings\n`!top10` — Combat top 10\n`!elolb` — ELO rankings\n`!coinlb` — Richest members",
-            inline=False
-        )
-        embed.add_field(
-            name="⚔️ Competitive",
-            value="`!duel @user` — 1v1 duel\n`!elo` — Check ELO rating\n`!record` — Win/loss record",
-            inline=False
-        )
-        embed.add_field(
-            name="🎮 Fun",
-            value="`!achievements` — View badges\n`!coinflip` — Gamble coins\n`!train` — Training mode",
-            inline=False
-        )
-        embed.add_field(
-            name="📋 Info",
-            value="`!help` — Full command list\n`!roster` — Clan roster\n`!events` — Upcoming events",
-            inline=False
-        )
-        embed.set_footer(text="✝ The Fallen ✝ • Use !help for full command list")
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+        await interaction.response.send_message(embed=static_page("info:bot_info"), ephemeral=True)
 
 
 class ApplicationStartView(discord.ui.View):
@@ -9475,46 +10710,160 @@ def generate_verify_code(user_id: int) -> str:
     hash_input = f"{user_id}-{datetime.datetime.now().timestamp()}-fallen"
     return "FALLEN-" + hashlib.md5(hash_input.encode()).hexdigest()[:8].upper()
 
+# --- ROBLOX IDENTITY SERVICE ---
+# One shared session for every Roblox call. Username lookups that arrive
+# within ROBLOX_BATCH_WINDOW are sent as a single multi-username POST, results
+# (including "no such user") are cached, and after repeated failures the
+# breaker opens so a verification rush doesn't keep hammering a struggling API.
+# Point ROBLOX_USERS_API at a local stub server to test without Roblox.
+
+ROBLOX_USERS_API = os.getenv("ROBLOX_USERS_API", "https://users.roblox.com").rstrip("/")
+ROBLOX_TIMEOUT = 5              # Seconds per request
+ROBLOX_BATCH_WINDOW = 0.02      # Seconds to gather concurrent username lookups
+ROBLOX_BATCH_MAX = 100          # Usernames per POST
+ROBLOX_USER_TTL = 6 * 60 * 60   # username -> id
+ROBLOX_MISSING_TTL = 5 * 60     # Usernames that don't exist
+ROBLOX_PROFILE_TTL = 10 * 60    # id -> profile
+ROBLOX_CACHE_MAX = 5000
+ROBLOX_BREAKER_FAILURES = 5     # Consecutive failures that open the breaker
+ROBLOX_BREAKER_COOLDOWN = 30    # Seconds the breaker stays open
+
+_roblox = {
+    "session": None,
+    "users": {},       # lowercase username -> (expires, user or None)
+    "profiles": {},    # roblox id -> (expires, profile)
+    "pending": {},     # lowercase username -> future, waiting for the next batch
+    "batch_task": None,
+    "failures": 0,
+    "open_until": 0.0,
+}
+
+async def get_roblox_session():
+    session = _roblox["session"]
+    if session is None or session.closed:
+        session = _roblox["session"] = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=ROBLOX_TIMEOUT))
+    return session
+
+def roblox_available():
+    """False while the circuit breaker is open"""
+    return time.monotonic() >= _roblox["open_until"]
+
+def roblox_record_result(ok):
+    if ok:
+        _roblox["failures"] = 0
+        return
+    _roblox["failures"] += 1
+    if _roblox["failures"] >= ROBLOX_BREAKER_FAILURES:
+        _roblox["open_until"] = time.monotonic() + ROBLOX_BREAKER_COOLDOWN
+        _roblox["failures"] = 0
+        print(f"⚠️ Roblox API failing - pausing lookups for {ROBLOX_BREAKER_COOLDOWN}s")
+
+def roblox_cache_get(cache, key):
+    hit = cache.get(key)
+    if hit and hit[0] > time.monotonic():
+        return True, hit[1]
+    return False, None
+
+def roblox_cache_put(cache, key, value, ttl):
+    if len(cache) >= ROBLOX_CACHE_MAX:
+        now = time.monotonic()
+        for k in [k for k, (expires, _) in cache.items() if expires <= now] or list(cache)[:ROBLOX_CACHE_MAX // 10]:
+            del cache[k]
+    cache[key] = (time.monotonic() + ttl, value)
+
+async def flush_roblox_lookups():
+    await asyncio.sleep(ROBLOX_BATCH_WINDOW)
+    pending, _roblox["pending"] = _roblox["pending"], {}
+    _roblox["batch_task"] = None
+    
+    names = list(pending)
+    for i in range(0, len(names), ROBLOX_BATCH_MAX):
+        chunk = names[i:i + ROBLOX_BATCH_MAX]
+        found = None
+        if roblox_available():
+            try:
+                session = await get_roblox_session()
+                with perf_timer("api", "roblox_usernames"):
+                    async with session.post(
+                        f"{ROBLOX_USERS_API}/v1/usernames/users",
+                        json={"usernames": chunk, "excludeBannedUsers": True}
+                    ) as resp:
+                        if resp.status == 429:
+                            perf_record_rate_limit()
+                        if resp.status == 200:
+                            data = await resp.json()
+                            found = {
+                                u.get("requestedUsername", u["name"]).lower(): {
+                                    "id": u["id"],
+                                    "name": u["name"],
+                                    "display_name": u.get("displayName", u["name"])
+                                }
+                                for u in data.get("data", [])
+                            }
+            except Exception as e:
+                print(f"Roblox API error: {e}")
+            roblox_record_result(found is not None)
+        
+        for name in chunk:
+            user = None
+            if found is not None:
+                user = found.get(name)
+                roblox_cache_put(_roblox["users"], name, user, ROBLOX_USER_TTL if user else ROBLOX_MISSING_TTL)
+            if not pending[name].done():
+                pending[name].set_result(user)
+
 async def get_roblox_user_by_username(username: str) -> dict:
     """Get Roblox user info by username"""
+    key = username.strip().lower()
+    hit, user = roblox_cache_get(_roblox["users"], key)
+    if hit:
+        return user
+    if not roblox_available():
+        return None
+    
+    future = _roblox["pending"].get(key)
+    if future is None:
+        future = _roblox["pending"][key] = asyncio.get_running_loop().create_future()
+        if _roblox["batch_task"] is None:
+            _roblox["batch_task"] = asyncio.create_task(flush_roblox_lookups())
+    return await asyncio.shield(future)
+
+async def get_roblox_profile(roblox_id: int, fresh=False) -> dict:
+    """Get a Roblox user's profile. Pass fresh=True when it must be current."""
+    if not fresh:
+        hit, profile = roblox_cache_get(_roblox["profiles"], int(roblox_id))
+        if hit:
+            return profile
+    if not roblox_available():
+        return None
+    
+    profile = None
     try:
-        async with aiohttp.ClientSession() as session:
-            # First, get user ID from username
-            async with session.post(
-                "https://users.roblox.com/v1/usernames/users",
-                json={"usernames": [username], "excludeBannedUsers": True}
-            ) as resp:
-                if resp.status != 200:
-                    return None
-                data = await resp.json()
-                if not data.get("data"):
-                    return None
-                user_data = data["data"][0]
-                return {
-                    "id": user_data["id"],
-                    "name": user_data["name"],
-                    "display_name": user_data.get("displayName", user_data["name"])
-                }
+        session = await get_roblox_session()
+        with perf_timer("api", "roblox_profile"):
+            async with session.get(f"{ROBLOX_USERS_API}/v1/users/{roblox_id}") as resp:
+                if resp.status == 429:
+                    perf_record_rate_limit()
+                if resp.status == 200:
+                    profile = await resp.json()
+                roblox_record_result(resp.status == 200 or resp.status == 404)
     except Exception as e:
         print(f"Roblox API error: {e}")
-        return None
+        roblox_record_result(False)
+    
+    if profile is not None:
+        roblox_cache_put(_roblox["profiles"], int(roblox_id), profile, ROBLOX_PROFILE_TTL)
+    return profile
 
-async def get_roblox_user_description(roblox_id: int) -> str:
+async def get_roblox_user_description(roblox_id: int, fresh=False) -> str:
     """Get a Roblox user's profile description"""
-    try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(f"https://users.roblox.com/v1/users/{roblox_id}") as resp:
-                if resp.status != 200:
-                    return ""
-                data = await resp.json()
-                return data.get("description", "")
-    except Exception as e:
-        print(f"Roblox API error: {e}")
-        return ""
+    profile = await get_roblox_profile(roblox_id, fresh=fresh)
+    return (profile or {}).get("description", "")
 
 async def verify_roblox_code(roblox_id: int, code: str) -> bool:
     """Check if the verification code is in the user's Roblox description"""
-    description = await get_roblox_user_description(roblox_id)
+    # The user has just edited their profile - never use a cached copy here
+    description = await get_roblox_user_description(roblox_id, fresh=True)
     return code in description
 
 class VerifyUsernameModal(discord.ui.Modal, title="🔗 Step 1: Enter Roblox Username"):
@@ -9734,37 +11083,18 @@ class VerifyView(discord.ui.View):
             except Exception as e:
                 print(f"Roblox API error: {e}")
             
-            # Give roles
-            roles_given = []
-            roles_removed = []
-            
-            # Remove Unverified
+            # Swap Unverified for Verified (Fallen's own verified role, can be
+            # different from Bloxlink's) + Abyssbound in a single role update
             unverified = discord.utils.get(guild.roles, name=UNVERIFIED_ROLE_NAME)
-            if unverified and unverified in member.roles:
-                try:
-                    await member.remove_roles(unverified)
-                    roles_removed.append(unverified.name)
-                    await asyncio.sleep(0.5)  # Small delay between role operations
-                except:
-                    pass
-            
-            # Add Verified (Fallen's own verified role, can be different from Bloxlink's)
             fallen_verified = discord.utils.get(guild.roles, name=FALLEN_VERIFIED_ROLE)
-            if fallen_verified and fallen_verified not in member.roles:
-                try:
-                    await member.add_roles(fallen_verified)
-                    roles_given.append(fallen_verified.name)
-                    await asyncio.sleep(0.5)  # Small delay between role operations
-                except:
-                    pass
-            
-            # Add Abyssbound (member role)
-            if abyssbound and abyssbound not in member.roles:
-                try:
-                    await member.add_roles(abyssbound)
-                    roles_given.append(abyssbound.name)
-                except:
-                    pass
+            roles_given = []
+            try:
+                added, _ = await reconcile_member_roles(
+                    member, add=[fallen_verified, abyssbound], remove=[unverified], reason="Verified"
+                )
+                roles_given = [role.name for role in added]
+            except Exception as e:
+                print(f"Verify role update failed for {member}: {e}")
             
             # Save to database
             data = load_data()
@@ -10023,19 +11353,84 @@ class DataWipeConfirmView(discord.ui.View):
         await interaction.response.edit_message(content="❌ Data wipe cancelled.", embed=None, view=None)
 
 # --- BOT SETUP ---
-class PersistentBot(commands.Bot):
+
+def member_cache_settings():
+    """(MemberCacheFlags, chunk guilds at startup) from MEMBER_CACHE"""
+    if MEMBER_CACHE.strip().lower() == "all":
+        return discord.MemberCacheFlags.all(), True
+    names = [part.strip().lower() for part in MEMBER_CACHE.split(",") if part.strip()]
+    unknown = [name for name in names if name not in discord.MemberCacheFlags.VALID_FLAGS]
+    if unknown:
+        raise ValueError(
+            f"MEMBER_CACHE: unknown member cache flag(s) {', '.join(unknown)} - "
+            f"use \"all\" or a comma list of {', '.join(discord.MemberCacheFlags.VALID_FLAGS)}"
+        )
+    flags = discord.MemberCacheFlags.none()
+    for name in names:
+        setattr(flags, name, True)
+    return flags, False
+
+def shard_settings():
+    """AutoShardedBot keyword arguments from SHARD_COUNT"""
+    return {"shard_count": None if SHARD_COUNT == "auto" else int(SHARD_COUNT)}
+
+async def guild_members(guild):
+    """Every member of a guild - the cache when it's complete, otherwise one
+    chunk request whose members aren't kept (see MEMBER_CACHE)"""
+    if guild.chunked:
+        return guild.members
+    return await guild.chunk(cache=False)
+
+async def role_members(role):
+    """Members holding a role - role.members only sees cached members"""
+    if role.guild.chunked:
+        return role.members
+    return [m for m in await guild_members(role.guild) if m.get_role(role.id)]
+
+async def fetch_guild_member(guild, user_id):
+    """guild.get_member, asking the API when the member cache is partial"""
+    member = guild.get_member(int(user_id))
+    if member is None and not guild.chunked:
+        try:
+            member = await guild.fetch_member(int(user_id))
+        except discord.HTTPException:
+            pass
+    return member
+
+async def resolve_member(guild, text):
+    """Find a member from an ID, mention, username or display name"""
+    text = text.strip()
+    member = None
+    digits = text.strip("<@!>")
+    if digits.isdigit():
+        member = await fetch_guild_member(guild, digits)
+    if member is None:
+        member = discord.utils.get(guild.members, name=text) or discord.utils.get(guild.members, display_name=text)
+    if member is None and text and not guild.chunked:
+        try:
+            matches = await guild.query_members(query=text, limit=100, cache=False)
+        except (discord.HTTPException, asyncio.TimeoutError):
+            matches = []
+        member = discord.utils.get(matches, name=text) or discord.utils.get(matches, display_name=text)
+    return member
+
+class PersistentBot(commands.AutoShardedBot if SHARD_COUNT else commands.Bot):
     def __init__(self): 
         intents = discord.Intents.all()
+        member_cache_flags, chunk_at_startup = member_cache_settings()
         
         super().__init__(
             command_prefix="!", 
             intents=intents, 
             help_command=None,
+            member_cache_flags=member_cache_flags,
+            chunk_guilds_at_startup=chunk_at_startup,
             # Rate limit settings
             max_messages=1000,  # Reduce message cache to save memory
             heartbeat_timeout=120.0,  # Longer timeout for stability
             guild_ready_timeout=10.0,  # Faster guild ready
             assume_unsync_clock=True,  # Better for cloud hosting
+            **(shard_settings() if SHARD_COUNT else {}),
         )
         
         # Track rate limits
@@ -10048,6 +11443,9 @@ class PersistentBot(commands.Bot):
         print(f"Error in {event_method}: {traceback.format_exc()}")
     
     async def setup_hook(self):
+        # Serve each gateway event from its guild's data partition
+        wrap_gateway_parsers(self._connection)
+        
         # Register persistent views (only views with custom_id buttons that persist after restart)
         self.add_view(LeaderboardView())
         self.add_view(TournamentAdminView(""))
@@ -10077,34 +11475,110 @@ class PersistentBot(commands.Bot):
         self.add_view(ServerInfoLevelsView())
         self.add_view(ServerInfoBoosterView())
         self.add_view(ServerInfoBotView())
+        self.add_view(HelpView())
+        self.add_dynamic_items(
+            PollDayButton, PollSubmitButton, PollViewSelectionsButton,
+            PollStaffResultsButton, PollStaffCloseButton
+        )
         
-        # Start background task
-        self.bg_voice_xp.start()
+        # Instrumentation
+        self.loop.create_task(loop_lag_monitor())
+        try:
+            self.metrics_runner = await start_metrics_server()
+        except Exception as e:
+            print(f"Metrics endpoint failed to start: {e}")
+        
+        # Database, store restores, cogs and poll views (once per process)
+        await run_startup_sequence()
+        
+        # Start background tasks (per-shard loops start in on_shard_ready when sharded)
+        if not SHARD_COUNT:
+            start_shard_loops(None)
+        self.loop.create_task(check_event_reminders())
+        self.loop.create_task(recurring_events_loop())
+        self.loop.create_task(activity_rollup_flush_loop())
+        self.loop.create_task(resume_match_threads())
+        self.loop.create_task(giveaway_draw_loop())
+        self.loop.create_task(application_maintenance_loop())
+        start_join_workers()
         print("Bot setup complete!")
 
-    @tasks.loop(minutes=2)  # Changed from 1 to 2 minutes to reduce API calls
-    async def bg_voice_xp(self):
-        try:
-            for guild in self.guilds:
-                for member in guild.members:
+    async def close(self):
+        # Rollups are otherwise only written every ACTIVITY_FLUSH_INTERVAL
+        if _activity_rollups_dirty:
+            try:
+                save_activity_rollups()
+            except Exception as e:
+                print(f"Activity rollup flush error: {e}")
+        if _roblox["session"] and not _roblox["session"].closed:
+            await _roblox["session"].close()
+        await super().close()
+
+bot = PersistentBot()
+
+# --- PER-SHARD LOOPS ---
+# Loops that walk members run once per shard over that shard's guilds only,
+# so one busy shard doesn't hold up the others. Unsharded, the single loop
+# (shard None) covers every guild.
+
+VOICE_XP_INTERVAL = 120  # Seconds between voice XP ticks
+
+_shard_loops = {}  # shard id -> [tasks]
+
+def shard_guilds(shard_id):
+    if shard_id is None:
+        return list(bot.guilds)
+    return [guild for guild in bot.guilds if guild.shard_id == shard_id]
+
+def start_shard_loops(shard_id):
+    """Start a shard's loops once - shards can become ready again after a reconnect"""
+    if shard_id not in _shard_loops:
+        _shard_loops[shard_id] = [bot.loop.create_task(voice_xp_loop(shard_id))]
+
+async def award_voice_xp(guilds):
+    """Voice XP for everyone in a voice or stage channel (deafened users and bots excluded)"""
+    for guild in guilds:
+        with guild_scope(guild.id):
+            for channel in (*guild.voice_channels, *guild.stage_channels):
+                for member in channel.members:
                     if member.voice and not member.voice.self_deaf and not member.bot:
                         xp = random.randint(*XP_VOICE_RANGE)
                         add_xp_to_user(member.id, xp)
                         # Track voice time (in minutes)
                         add_user_stat(member.id, 'voice_time', 2)  # 2 minutes now
+                        record_activity(member.id, voice=2, guild_id=guild.id)
                         # Update last_active for inactivity tracking
                         update_user_data(member.id, "last_active", datetime.datetime.now(datetime.timezone.utc).isoformat())
                         await check_level_up(member.id, guild)
                         await asyncio.sleep(0.1)  # Small delay between users
+
+async def voice_xp_loop(shard_id):
+    await bot.wait_until_ready()
+    await asyncio.sleep(30)  # Wait 30 seconds after ready before starting
+    
+    while not bot.is_closed():
+        try:
+            with perf_timer("loop", "bg_voice_xp"):
+                await award_voice_xp(shard_guilds(shard_id))
         except Exception as e:
-            print(f"Voice XP error: {e}")
+            print(f"Voice XP error (shard {shard_id}): {e}")
+        
+        await asyncio.sleep(VOICE_XP_INTERVAL)
 
-    @bg_voice_xp.before_loop
-    async def before_voice_xp(self):
-        await self.wait_until_ready()
-        await asyncio.sleep(30)  # Wait 30 seconds after ready before starting
+@bot.event
+async def on_shard_ready(shard_id):
+    print(f"✅ Shard {shard_id} ready ({len(shard_guilds(shard_id))} guilds)")
+    start_shard_loops(shard_id)
 
-bot = PersistentBot()
+@bot.before_invoke
+async def perf_before_command(ctx):
+    ctx.perf_start = time.perf_counter()
+
+@bot.after_invoke
+async def perf_after_command(ctx):
+    start = getattr(ctx, "perf_start", None)
+    if start is not None and ctx.command:
+        perf_observe("command", ctx.command.qualified_name, (time.perf_counter() - start) * 1000)
 
 # ==========================================
 # WARNING SYSTEM COMMANDS
@@ -10704,24 +12178,9 @@ async def staff_stats(ctx, days: int = 7):
     if days < 1 or days > 30:
         days = 7
     
-    # Get all warnings
-    data = load_warnings_data()
-    cutoff = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=days)
-    
     # Count warnings per staff member
-    staff_counts = {}
-    for uid, user_data in data.get("users", {}).items():
-        for w in user_data.get("warnings", []):
-            try:
-                warn_time = datetime.datetime.fromisoformat(w["timestamp"].replace('Z', '+00:00'))
-                if warn_time >= cutoff:
-                    staff_id = w.get("staff_id", "unknown")
-                    if staff_id not in staff_counts:
-                        staff_counts[staff_id] = {"total": 0, "points": 0}
-                    staff_counts[staff_id]["total"] += 1
-                    staff_counts[staff_id]["points"] += w.get("points", 0)
-            except:
-                continue
+    cutoff = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=days)
+    staff_counts = get_staff_warning_counts(cutoff)
     
     embed = discord.Embed(
         title=f"📊 Staff Warning Stats (Last {days} days)",
@@ -11332,7 +12791,8 @@ class ImmunityCommands(commands.GroupCog, name="immunity"):
         if not immunity_role:
             return await interaction.response.send_message(f"❌ Role **{INACTIVITY_IMMUNITY_ROLE}** not found!", ephemeral=True)
         
-        members_with_immunity = [m for m in interaction.guild.members if immunity_role in m.roles]
+        await interaction.response.defer()
+        members_with_immunity = await role_members(immunity_role)
         
         if not members_with_immunity:
             embed = discord.Embed(
@@ -11348,7 +12808,7 @@ class ImmunityCommands(commands.GroupCog, name="immunity"):
                 color=0x3498db
             )
         
-        await interaction.response.send_message(embed=embed)
+        await interaction.followup.send(embed=embed)
 
 
 class EventCommands(commands.GroupCog, name="event"):
@@ -11394,7 +12854,8 @@ class EventCommands(commands.GroupCog, name="event"):
                 scheduled_time=scheduled_time.isoformat(),
                 host_id=interaction.user.id,
                 channel_id=interaction.channel.id,
-                server_link=server_link
+                server_link=server_link,
+                guild_id=interaction.guild.id
             )
             
             ping_role_name = TRAINING_PING_ROLE if event_type.lower() == "training" else TRYOUT_PING_ROLE
@@ -11457,7 +12918,8 @@ class EventCommands(commands.GroupCog, name="event"):
             scheduled_time=scheduled_time.isoformat(),
             host_id=interaction.user.id,
             channel_id=interaction.channel.id,
-            server_link=server_link
+            server_link=server_link,
+            guild_id=interaction.guild.id
         )
         
         ping_role_name = TRAINING_PING_ROLE if event_type.lower() == "training" else TRYOUT_PING_ROLE
@@ -11837,108 +13299,138 @@ async def setup_cogs():
         except Exception as e:
             print(f"Cog already registered or error: {e}")
 
-@bot.event
-async def on_ready():
-    print("=" * 50)
-    print(f"✅ Logged in as {bot.user} (ID: {bot.user.id})")
-    print(f"✅ Connected to {len(bot.guilds)} guild(s)")
-    print(f"✅ PIL Available: {PIL_AVAILABLE}")
-    print(f"✅ PostgreSQL Available: {POSTGRES_AVAILABLE}")
-    print("=" * 50)
-    
-    # Add startup delay to avoid rate limits
-    print("⏳ Waiting 5 seconds before initializing...")
-    await asyncio.sleep(5)
+# ==========================================
+# STARTUP SEQUENCE
+# ==========================================
+# Runs once from setup_hook (never again on reconnects): open the pool,
+# restore every store from PostgreSQL concurrently, repair profiles,
+# register cogs and build the static help/info pages. Each phase is timed.
+
+startup_timings = {}
+
+async def timed_phase(name, coro):
+    """Await a startup phase and record how long it took"""
+    start = time.perf_counter()
+    try:
+        return await coro
+    finally:
+        ms = (time.perf_counter() - start) * 1000
+        startup_timings[name] = ms
+        perf_observe("startup", name, ms)
+
+async def restore_store(label, loader, path):
+    """Pull one JSON store (every guild's copy) from PostgreSQL and write it locally off the event loop"""
+    partitions = await loader()
+    if not partitions:
+        return False
+    for guild_id, data in partitions.items():
+        await asyncio.to_thread(write_json_file, guild_path(path, db_partition(guild_id)), data)
+    print(f"✅ {label} synced from PostgreSQL!")
+    return True
+
+async def repair_user_profiles():
+    """Fill in missing fields on old profiles - returns how many were fixed"""
+    data = load_data()
+    fixed = [uid for uid in data["users"] if "weekly_xp" not in data["users"][uid] or "monthly_xp" not in data["users"][uid]]
+    for uid in fixed:
+        ensure_user_structure(data, uid)
+    if fixed:
+        save_data(data, touched=fixed)
+    return len(fixed)
+
+async def run_startup_sequence():
+    total_start = time.perf_counter()
     
-    # Initialize PostgreSQL database
     if POSTGRES_AVAILABLE and DATABASE_URL:
-        print("Connecting to PostgreSQL database...")
-        db_connected = await init_database()
+        db_connected = await timed_phase("database", init_database())
         
         if db_connected:
-            # Sync data from PostgreSQL (restore after redeploy)
-            print("Syncing data from PostgreSQL...")
-            await sync_data_from_postgres()
-            await asyncio.sleep(1)  # Small delay
-            
-            # Sync other data files
-            duels_data = await load_duels_from_postgres()
-            if duels_data:
-                with open(DUELS_FILE, "w") as f:
-                    json.dump(duels_data, f, indent=2)
-                print("✅ Duels data synced from PostgreSQL!")
-            
-            await asyncio.sleep(1)  # Small delay
-            
-            events_data = await load_events_from_postgres()
-            if events_data:
-                with open(EVENTS_FILE, "w") as f:
-                    json.dump(events_data, f, indent=2)
-                print("✅ Events data synced from PostgreSQL!")
-            
-            await asyncio.sleep(1)  # Small delay
-            
-            inactivity_data = await load_inactivity_from_postgres()
-            if inactivity_data:
-                with open(INACTIVITY_FILE, "w") as f:
-                    json.dump(inactivity_data, f, indent=2)
-                print("✅ Inactivity data synced from PostgreSQL!")
+            restores = {
+                "restore:main": sync_data_from_postgres(),
+                "restore:duels": restore_store("Duels data", load_duels_from_postgres, DUELS_FILE),
+                "restore:events": restore_store("Events data", load_events_from_postgres, EVENTS_FILE),
+                "restore:recurring": restore_store("Recurring events", load_recurring_from_postgres, RECURRING_EVENTS_FILE),
+                "restore:inactivity": restore_store("Inactivity data", load_inactivity_from_postgres, INACTIVITY_FILE),
+                "restore:rollups": restore_store("Activity rollups", load_activity_rollups_from_postgres, ACTIVITY_ROLLUP_FILE),
+            }
+            results = await asyncio.gather(
+                *(timed_phase(name, coro) for name, coro in restores.items()),
+                return_exceptions=True
+            )
+            for name, result in zip(restores, results):
+                if isinstance(result, Exception):
+                    print(f"❌ {name} failed: {result}")
     else:
         print("📁 Using JSON file storage (no PostgreSQL)")
     
-    # Check database health
-    print("Checking database health...")
-    data = load_data()
-    fixed_count = 0
-    for uid in list(data["users"].keys()):
-        if "weekly_xp" not in data["users"][uid] or "monthly_xp" not in data["users"][uid]:
-            ensure_user_structure(data, uid)
-            fixed_count += 1
-    if fixed_count > 0:
-        save_data(data)
+    fixed_count = await timed_phase("repair", repair_user_profiles())
+    if fixed_count:
         print(f"✅ Repaired {fixed_count} user profiles.")
     
-    # Setup subcommand cogs
-    if not hasattr(bot, 'cogs_loaded'):
-        await setup_cogs()
-        bot.cogs_loaded = True
-        print("✅ Subcommand groups loaded!")
-    
-    # DON'T auto-sync on startup - use !sync command instead to avoid rate limits
-    print("⚠️ Slash commands NOT auto-synced. Use !sync to sync manually.")
-    
-    # Start event reminder background task
-    if not hasattr(bot, 'event_reminder_task_started'):
-        bot.loop.create_task(check_event_reminders())
-        bot.event_reminder_task_started = True
-        print("✅ Event reminder task started!")
-    
-    # Start recurring events background task
-    if not hasattr(bot, 'recurring_events_task_started'):
-        bot.loop.create_task(recurring_events_loop())
-        bot.recurring_events_task_started = True
-        print("✅ Recurring events task started!")
+    await timed_phase("cogs", setup_cogs())
+    print("✅ Subcommand groups loaded!")
     
-    # Setup persistent poll views
-    if not hasattr(bot, 'poll_views_loaded'):
-        await setup_poll_views()
-        bot.poll_views_loaded = True
+    await timed_phase("pages", compile_static_pages())
     
+    total_ms = (time.perf_counter() - total_start) * 1000
+    startup_timings["total"] = total_ms
+    print("⏱️ Startup: " + " | ".join(f"{name} {ms:.0f}ms" for name, ms in startup_timings.items()))
+
+@bot.event
+async def on_ready():
+    # Can fire again after reconnects - all one-time work lives in setup_hook
+    print("=" * 50)
+    print(f"✅ Logged in as {bot.user} (ID: {bot.user.id})")
+    print(f"✅ Connected to {len(bot.guilds)} guild(s)")
+    print(f"✅ PIL Available: {PIL_AVAILABLE}")
+    print(f"✅ PostgreSQL Available: {POSTGRES_AVAILABLE}")
+    print("⚠️ Slash commands NOT auto-synced. Use !sync to sync manually.")
     print("=" * 50)
     print("🚀 Bot is ready!")
     print("=" * 50)
 
-@bot.event
-async def on_member_join(member):
-    # Give Unverified role
-    unv_role = discord.utils.get(member.guild.roles, name=UNVERIFIED_ROLE_NAME)
-    if unv_role:
+# --- JOIN PIPELINE ---
+# on_member_join only does the critical step (Unverified role) inline and
+# queues everything else for a small pool of workers. Lower numbers run
+# first, so during a spike staff checks and the join log go out before the
+# welcome cards and DMs.
+
+JOIN_WORKERS = 2
+JOIN_PRIORITY_SAFETY = 0     # Alt score, previously-kicked check
+JOIN_PRIORITY_LOG = 1        # Join log embed
+JOIN_PRIORITY_WELCOME = 2    # Welcome card
+JOIN_PRIORITY_DM = 3         # Verification DM
+JOIN_PRIORITY_MILESTONE = 4  # Member milestones
+
+_join_pipeline = {"queue": None, "seq": 0, "workers": []}
+
+def get_join_queue():
+    if _join_pipeline["queue"] is None:
+        _join_pipeline["queue"] = asyncio.PriorityQueue()
+    return _join_pipeline["queue"]
+
+def queue_join_task(priority, job, *args):
+    _join_pipeline["seq"] += 1  # Keeps FIFO order within a priority
+    # The workers are long-lived tasks, so carry the joining guild's partition with the job
+    get_join_queue().put_nowait((priority, _join_pipeline["seq"], job, args, _current_guild.get()))
+
+async def join_worker():
+    queue = get_join_queue()
+    while True:
+        priority, _, job, args, guild_id = await queue.get()
         try:
-            await member.add_roles(unv_role)
+            with guild_scope(guild_id), perf_timer("loop", f"join_{job.__name__}"):
+                await job(*args)
         except Exception as e:
-            print(f"Could not add unverified role: {e}")
-    
-    # Send welcome card to welcome channel
+            print(f"Join task {job.__name__} error: {e}")
+        finally:
+            queue.task_done()
+
+def start_join_workers():
+    if not _join_pipeline["workers"]:
+        _join_pipeline["workers"] = [asyncio.create_task(join_worker()) for _ in range(JOIN_WORKERS)]
+
+async def send_welcome_card(member):
     welcome_channel = discord.utils.get(member.guild.text_channels, name=WELCOME_CHANNEL_NAME) or \
                       discord.utils.get(member.guild.text_channels, name="welcome") or \
                       discord.utils.get(member.guild.text_channels, name="welcomes")
@@ -12002,7 +13494,8 @@ async def on_member_join(member):
                 await welcome_channel.send(f"✝ Welcome to The Fallen, {member.mention}! ✝")
             except:
                 pass
-    
+
+async def send_welcome_dm(member):
     # Try to DM them with verification instructions
     try:
         embed = discord.Embed(
@@ -12028,31 +13521,24 @@ async def on_member_join(member):
         await member.send(embed=embed)
     except:
         pass  # Can't DM user
-    
-    # Log to dashboard
+
+async def log_member_join(member):
+    """One join log embed (was a dashboard log plus a separate log_action)"""
+    created = f"<t:{int(member.created_at.timestamp())}:R>"
     await log_to_dashboard(
         member.guild, "👋 JOIN", "Member Joined",
-        f"{member.mention} joined the server",
+        f"{member.mention} joined the server\nAccount created: {created}",
         color=0x2ecc71,
-        fields={"Account Age": f"<t:{int(member.created_at.timestamp())}:R>", "Member #": str(member.guild.member_count)}
+        fields={"Account Age": created, "Member #": str(member.guild.member_count)}
     )
-    
-    # Log the join
-    await log_action(member.guild, "👋 Member Joined", f"{member.mention} joined the server\nAccount created: <t:{int(member.created_at.timestamp())}:R>", 0x3498db)
-    
-    # Check for member milestones
-    await check_member_milestone(member.guild)
-    
+
+async def check_new_member(member):
     # Alt account detection
     try:
         score, reasons = calculate_alt_score(member)
         
-        if score >= 50:
-            alt_flags[str(member.id)] = {
-                "score": score,
-                "reasons": reasons,
-                "flagged_at": datetime.datetime.now(datetime.timezone.utc).isoformat()
-            }
+        if score >= ALT_FLAG_SCORE:
+            flag_alt_account(member.id, score, reasons)
             
             # Alert staff
             log_channel = discord.utils.get(member.guild.text_channels, name=LOG_CHANNEL_NAME)
@@ -12108,8 +13594,42 @@ async def on_member_join(member):
 
 
 @bot.event
+@perf_event
+async def on_member_join(member):
+    adjust_presence_counts(member, 1)
+    
+    # Give Unverified role
+    unv_role = discord.utils.get(member.guild.roles, name=UNVERIFIED_ROLE_NAME)
+    if unv_role:
+        try:
+            await member.add_roles(unv_role)
+        except Exception as e:
+            print(f"Could not add unverified role: {e}")
+    
+    # During a join burst, skip the welcome card, DM and per-join logs -
+    # raid mode scores these members in batches and posts one summary
+    if track_member_join(member):
+        return
+    
+    queue_join_task(JOIN_PRIORITY_SAFETY, check_new_member, member)
+    queue_join_task(JOIN_PRIORITY_LOG, log_member_join, member)
+    queue_join_task(JOIN_PRIORITY_WELCOME, send_welcome_card, member)
+    queue_join_task(JOIN_PRIORITY_DM, send_welcome_dm, member)
+    queue_join_task(JOIN_PRIORITY_MILESTONE, check_member_milestone, member.guild, member.guild.member_count)
+
+
+@bot.event
+@perf_event
+async def on_presence_update(before, after):
+    if before.status != after.status:
+        adjust_presence_counts(after, -1, status=before.status)
+        adjust_presence_counts(after, 1)
+
+@bot.event
+@perf_event
 async def on_member_remove(member):
     """Log when members leave, especially those with warnings"""
+    adjust_presence_counts(member, -1)
     try:
         # Check if they had warnings
         warn_data = get_user_warnings(member.id, check_expiry=False)
@@ -12162,6 +13682,7 @@ async def on_member_remove(member):
         print(f"Member remove log error: {e}")
 
 @bot.event
+@perf_event
 async def on_message(message):
     if not message.author.bot and message.guild:
         # === XP & ACTIVITY ===
@@ -12182,12 +13703,15 @@ async def on_message(message):
             add_xp_to_user(message.author.id, xp)
             await check_level_up(message.author.id, message.guild)
         
+        record_activity(message.author.id, messages=1, guild_id=message.guild.id)
+        
         # Always update last_active timestamp for inactivity tracking
         update_user_data(message.author.id, "last_active", datetime.datetime.now(datetime.timezone.utc).isoformat())
         
     await bot.process_commands(message)
 
 @bot.event
+@perf_event
 async def on_reaction_add(reaction, user):
     if not user.bot and reaction.message.guild:
         # Check cooldown before giving XP
@@ -12207,6 +13731,8 @@ async def on_reaction_add(reaction, user):
             add_xp_to_user(user.id, xp)
             await check_level_up(user.id, reaction.message.guild)
         
+        record_activity(user.id, guild_id=reaction.message.guild.id)
+        
         # Always update last_active timestamp for inactivity tracking
         update_user_data(user.id, "last_active", datetime.datetime.now(datetime.timezone.utc).isoformat())
 
@@ -12236,14 +13762,15 @@ async def mass_role_add(ctx, action: str, role: discord.Role, target: str = "eve
         return await ctx.send("❌ Action must be `add` or `remove`!\nUsage: `!massrole add @Role everyone`")
     
     # Determine target members
+    guild_member_list = await guild_members(ctx.guild)
     if target.lower() == "everyone":
-        members = [m for m in ctx.guild.members if not m.bot]
+        members = [m for m in guild_member_list if not m.bot]
     elif target.lower() == "humans":
-        members = [m for m in ctx.guild.members if not m.bot]
+        members = [m for m in guild_member_list if not m.bot]
     elif target.lower() == "bots":
-        members = [m for m in ctx.guild.members if m.bot]
+        members = [m for m in guild_member_list if m.bot]
     elif target.lower() == "all":
-        members = ctx.guild.members
+        members = guild_member_list
     else:
         # Check if target is a role mention
         target_role = None
@@ -12253,7 +13780,7 @@ async def mass_role_add(ctx, action: str, role: discord.Role, target: str = "eve
                 break
         
         if target_role:
-            members = [m for m in ctx.guild.members if target_role in m.roles and not m.bot]
+            members = [m for m in guild_member_list if target_role in m.roles and not m.bot]
         else:
             return await ctx.send("❌ Invalid target! Use: `everyone`, `humans`, `bots`, `all`, or `@Role`")
     
@@ -12376,7 +13903,7 @@ async def take_role_all(ctx, role: discord.Role):
 @commands.has_permissions(manage_roles=True)
 async def in_role(ctx, role: discord.Role):
     """See how many members have a specific role"""
-    members = [m for m in ctx.guild.members if role in m.roles]
+    members = await role_members(role)
     humans = [m for m in members if not m.bot]
     bots = [m for m in members if m.bot]
     
@@ -12410,7 +13937,7 @@ async def role_info(ctx, role: discord.Role):
     embed.add_field(name="ID", value=f"`{role.id}`", inline=True)
     embed.add_field(name="Color", value=f"`{role.color}`", inline=True)
     embed.add_field(name="Position", value=f"{role.position}/{len(ctx.guild.roles)}", inline=True)
-    embed.add_field(name="Members", value=str(len(role.members)), inline=True)
+    embed.add_field(name="Members", value=str(len(await role_members(role))), inline=True)
     embed.add_field(name="Hoisted", value="✅" if role.hoist else "❌", inline=True)
     embed.add_field(name="Mentionable", value="✅" if role.mentionable else "❌", inline=True)
     
@@ -12865,9 +14392,7 @@ async def setbackground_cmd(ctx, url: str):
     
     await ctx.send(embed=embed)
 
-@bot.hybrid_command(name="help", description="Get help with bot commands")
-async def help_cmd(ctx):
-    """Display help information"""
+def build_help_home_page():
     embed = discord.Embed(
         title="✝ THE FALLEN ✝",
         description="**Welcome to the Fallen Bot!**\n\nSelect a category below to explore commands.",
@@ -12907,9 +14432,16 @@ async def help_cmd(ctx):
         inline=False
     )
     
-    embed.set_thumbnail(url=ctx.guild.icon.url if ctx.guild.icon else None)
     embed.set_footer(text="Use the dropdown below to view commands • / or ! prefix")
-    
+    return embed
+
+STATIC_PAGE_BUILDERS["help:home"] = build_help_home_page
+
+@bot.hybrid_command(name="help", description="Get help with bot commands")
+async def help_cmd(ctx):
+    """Display help information"""
+    embed = static_page("help:home").copy()
+    embed.set_thumbnail(url=ctx.guild.icon.url if ctx.guild.icon else None)
     await ctx.send(embed=embed, view=HelpView())
 
 # --- STAFF COMMANDS ---
@@ -13172,7 +14704,8 @@ async def addfcoins(ctx, member: discord.Member, amount: int):
     if not is_staff(ctx.author):
         return await ctx.send("❌ Staff only.", ephemeral=True)
     
-    new_coins = add_user_stat(member.id, "coins", amount)
+    _, user = ledger_apply(member.id, f"staff:add:{ctx.author.id}", coins=amount)
+    new_coins = user["coins"]
     await ctx.send(f"✅ Added **{amount:,} coins** to {member.mention}. Total: **{new_coins:,}**")
     await log_action(ctx.guild, "💰 Coins Added", f"{member.mention} received +{amount:,} coins from {ctx.author.mention}", 0xF1C40F)
 
@@ -13182,7 +14715,8 @@ async def removefcoins(ctx, member: discord.Member, amount: int):
     if not is_staff(ctx.author):
         return await ctx.send("❌ Staff only.", ephemeral=True)
     
-    new_coins = add_user_stat(member.id, "coins", -amount)
+    _, user = ledger_apply(member.id, f"staff:remove:{ctx.author.id}", coins=-amount)
+    new_coins = user["coins"]
     await ctx.send(f"✅ Removed **{amount:,} coins** from {member.mention}. Total: **{new_coins:,}**")
     await log_action(ctx.guild, "💰 Coins Removed", f"{member.mention} lost -{amount:,} coins by {ctx.author.mention}", 0xe74c3c)
 
@@ -13483,19 +15017,8 @@ async def result_transfer(ctx, member: discord.Member, stage: str, rank_level: s
             old_strength = role_name
             break
     
-    # Remove all current result roles
-    roles_to_remove = []
-    for role_name in ALL_RESULT_ROLES:
-        role = discord.utils.get(ctx.guild.roles, name=role_name)
-        if role and role in member.roles:
-            roles_to_remove.append(role)
-    
-    if roles_to_remove:
-        try:
-            await member.remove_roles(*roles_to_remove)
-            await asyncio.sleep(0.5)
-        except Exception as e:
-            print(f"Error removing roles: {e}")
+    # Current result roles are swapped for the new ones in one update
+    roles_to_remove = [discord.utils.get(ctx.guild.roles, name=role_name) for role_name in ALL_RESULT_ROLES]
     
     # Add new roles
     roles_to_add = []
@@ -13527,9 +15050,9 @@ async def result_transfer(ctx, member: discord.Member, stage: str, rank_level: s
         else:
             await ctx.send(f"⚠️ Role `{strength_role_name}` not found, skipping...")
     
-    # Add all roles at once
+    # Swap all result roles at once
     try:
-        await member.add_roles(*roles_to_add)
+        await reconcile_member_roles(member, add=roles_to_add, remove=roles_to_remove, reason=f"Result assigned by {ctx.author}")
     except Exception as e:
         return await ctx.send(f"❌ Failed to add roles: {e}")
     
@@ -13704,7 +15227,9 @@ def load_clan_roster():
     """Load clan roster from file"""
     try:
         with open(CLAN_ROSTER_FILE, "r") as f:
-            return json.load(f)
+            data = json.load(f)
+            perf_record_store(CLAN_ROSTER_FILE, "load", f.tell())
+            return data
     except:
         return {"members": [], "title": "✝ FALLEN ✝ - The Fallen Saints", "description": "Through shattered skies and broken crowns,\nThe descent carves its mark.\nFallen endures — not erased, but remade.\nIn ruin lies the seed of power.", "role_name": "Fallen", "image_url": None}
 
@@ -13712,6 +15237,7 @@ def save_clan_roster(data):
     """Save clan roster to file"""
     with open(CLAN_ROSTER_FILE, "w") as f:
         json.dump(data, f, indent=2)
+        perf_record_store(CLAN_ROSTER_FILE, "save", f.tell())
 
 def create_clan_roster_embed(guild):
     """Create the clan roster embed like the EU Roster image"""
@@ -14019,10 +15545,13 @@ async def daily(ctx):
     coins = int(coins * total_multiplier)
     xp = int(xp * total_multiplier)
     
-    add_user_stat(ctx.author.id, "coins", coins)
-    add_xp_to_user(ctx.author.id, xp)
-    update_user_data(ctx.author.id, "last_daily", now.isoformat())
-    update_user_data(ctx.author.id, "daily_streak", streak)
+    status, _ = ledger_apply(
+        ctx.author.id, "daily", coins=coins, xp=xp,
+        key=f"daily:{ctx.author.id}:{now.date().isoformat()}",
+        fields={"last_daily": now.isoformat(), "daily_streak": streak}
+    )
+    if status == "duplicate":
+        return await ctx.send("⏰ You've already claimed today's daily!", ephemeral=True)
     
     embed = discord.Embed(title="🎁 Daily Reward Claimed!", color=0x2ecc71)
     
@@ -14083,9 +15612,14 @@ async def booster_reward(ctx):
         except:
             pass
     
-    add_user_stat(ctx.author.id, "coins", BOOSTER_WEEKLY_COINS)
-    add_xp_to_user(ctx.author.id, BOOSTER_WEEKLY_XP)
-    update_user_data(ctx.author.id, "last_booster_reward", now.isoformat())
+    year, week, _ = now.isocalendar()
+    status, _ = ledger_apply(
+        ctx.author.id, "booster_weekly", coins=BOOSTER_WEEKLY_COINS, xp=BOOSTER_WEEKLY_XP,
+        key=f"booster:{ctx.author.id}:{year}-W{week}",
+        fields={"last_booster_reward": now.isoformat()}
+    )
+    if status == "duplicate":
+        return await ctx.send("⏰ You've already claimed this week's booster reward!", ephemeral=True)
     
     embed = discord.Embed(
         title="💎 Weekly Booster Reward!",
@@ -14137,8 +15671,14 @@ async def weekly_reward(ctx):
         except:
             pass
     
-    add_user_stat(ctx.author.id, "coins", weekly_bonus)
-    update_user_data(ctx.author.id, "last_weekly_role_reward", now.isoformat())
+    year, week, _ = now.isocalendar()
+    status, _ = ledger_apply(
+        ctx.author.id, "weekly_role", coins=weekly_bonus,
+        key=f"weekly:{ctx.author.id}:{year}-W{week}",
+        fields={"last_weekly_role_reward": now.isoformat()}
+    )
+    if status == "duplicate":
+        return await ctx.send("⏰ You've already claimed this week's reward!", ephemeral=True)
     
     embed = discord.Embed(
         title="📅 Weekly Role Reward!",
@@ -14291,25 +15831,23 @@ async def buy_exclusive(ctx, *, item_name: str = None):
     if not found_item:
         return await ctx.send(f"❌ Item not found. Use `!exclusiveshop` to see available items.")
     
-    # Check if user can afford it
-    user_data = get_user_data(ctx.author.id)
-    coins = user_data.get("coins", 0)
-    
-    if coins < found_item['price']:
-        return await ctx.send(f"❌ You need **{found_item['price']:,}** coins but only have **{coins:,}**")
-    
     # Check if already owned
+    user_data = get_user_data(ctx.author.id)
     owned_items = user_data.get("exclusive_items", [])
     if found_id in owned_items:
         return await ctx.send(f"❌ You already own **{found_item['name']}**!")
     
-    # Purchase
-    add_user_stat(ctx.author.id, "coins", -found_item['price'])
-    if "exclusive_items" not in user_data:
-        update_user_data(ctx.author.id, "exclusive_items", [found_id])
-    else:
-        owned_items.append(found_id)
-        update_user_data(ctx.author.id, "exclusive_items", owned_items)
+    # Purchase - funds check, debit and the new item land in one ledger write
+    request_id = ctx.interaction.id if ctx.interaction else ctx.message.id
+    status, user_data = ledger_apply(
+        ctx.author.id, f"exclusive:{found_id}", coins=-found_item['price'],
+        key=f"exclusive:{request_id}", require_funds=True,
+        fields={"exclusive_items": owned_items + [found_id]}
+    )
+    if status == "duplicate":
+        return
+    if status == "insufficient":
+        return await ctx.send(f"❌ You need **{found_item['price']:,}** coins but only have **{user_data['coins']:,}**")
     
     embed = discord.Embed(
         title="🎉 Purchase Successful!",
@@ -14317,7 +15855,7 @@ async def buy_exclusive(ctx, *, item_name: str = None):
         color=0x2ecc71
     )
     embed.add_field(name="💰 Spent", value=f"{found_item['price']:,} coins", inline=True)
-    embed.add_field(name="💰 Remaining", value=f"{coins - found_item['price']:,} coins", inline=True)
+    embed.add_field(name="💰 Remaining", value=f"{user_data['coins']:,} coins", inline=True)
     
     await ctx.send(embed=embed)
 
@@ -14631,19 +16169,14 @@ async def log_training(ctx,
     rewards = ATTENDANCE_REWARDS["training"]
     streak_bonuses = []
     role_rewards = []
+    request_id = ctx.interaction.id if ctx.interaction else ctx.message.id
     
     for m in members:
-        add_user_stat(m.id, "coins", rewards["coins"])
-        add_xp_to_user(m.id, rewards["xp"])
-        add_user_stat(m.id, "training_attendance", 1)
-        
-        # Reset activity timestamp - prevents inactivity strikes
-        reset_member_activity(m.id)
-        
-        streak = update_attendance_streak(m.id)
-        bonus = get_streak_bonus(streak)
+        result = award_attendance(m.id, "training_attendance", rewards, f"training:{request_id}:{m.id}")
+        if result is None:
+            continue
+        streak, bonus = result
         if bonus > 0:
-            add_user_stat(m.id, "coins", bonus)
             streak_bonuses.append(f"🔥 {m.display_name}: {streak} streak (+{bonus})")
         
         # Check for attendance role rewards
@@ -14660,11 +16193,7 @@ async def log_training(ctx,
         await asyncio.sleep(0.3)
     
     # Host rewards
-    host_rewards = ATTENDANCE_REWARDS["host"]
-    add_user_stat(ctx.author.id, "coins", host_rewards["coins"])
-    add_xp_to_user(ctx.author.id, host_rewards["xp"])
-    add_user_stat(ctx.author.id, "events_hosted", 1)
-    reset_member_activity(ctx.author.id)  # Reset host activity too
+    host_rewards = award_host(ctx.author.id, f"host:{request_id}")
     
     # Build attendee list
     attendee_names = [m.display_name for m in members[:15]]
@@ -14745,19 +16274,14 @@ async def log_tryout(ctx,
     rewards = ATTENDANCE_REWARDS["tryout"]
     streak_bonuses = []
     role_rewards = []
+    request_id = ctx.interaction.id if ctx.interaction else ctx.message.id
     
     for m in members:
-        add_user_stat(m.id, "coins", rewards["coins"])
-        add_xp_to_user(m.id, rewards["xp"])
-        add_user_stat(m.id, "tryout_attendance", 1)
-        
-        # Reset activity timestamp - prevents inactivity strikes
-        reset_member_activity(m.id)
-        
-        streak = update_attendance_streak(m.id)
-        bonus = get_streak_bonus(streak)
+        result = award_attendance(m.id, "tryout_attendance", rewards, f"tryout:{request_id}:{m.id}")
+        if result is None:
+            continue
+        streak, bonus = result
         if bonus > 0:
-            add_user_stat(m.id, "coins", bonus)
             streak_bonuses.append(f"🔥 {m.display_name}: {streak} streak (+{bonus})")
         
         # Check for attendance role rewards
@@ -14774,11 +16298,7 @@ async def log_tryout(ctx,
         await asyncio.sleep(0.3)
     
     # Host rewards
-    host_rewards = ATTENDANCE_REWARDS["host"]
-    add_user_stat(ctx.author.id, "coins", host_rewards["coins"])
-    add_xp_to_user(ctx.author.id, host_rewards["xp"])
-    add_user_stat(ctx.author.id, "events_hosted", 1)
-    reset_member_activity(ctx.author.id)  # Reset host activity too
+    host_rewards = award_host(ctx.author.id, f"host:{request_id}")
     
     # Build attendee list
     attendee_names = [m.display_name for m in members[:15]]
@@ -15007,7 +16527,7 @@ async def serverstats(ctx):
             print(f"Server stats image error: {e}")
     
     # Fallback to embed
-    stats = get_server_stats(ctx.guild)
+    stats = await get_server_stats(ctx.guild)
     
     embed = discord.Embed(
         title=f"📊 {ctx.guild.name} Statistics",
@@ -15056,7 +16576,7 @@ async def serverstats(ctx):
     )
     
     # Current status
-    activity = get_activity_by_hour(ctx.guild)
+    activity = await get_activity_by_hour(ctx.guild)
     embed.add_field(
         name="🟢 Current Status",
         value=f"🟢 {activity['online']} | 🟡 {activity['idle']} | 🔴 {activity['dnd']} | ⚫ {activity['offline']}",
@@ -15070,6 +16590,14 @@ async def serverstats(ctx):
         inline=True
     )
     
+    # Peak hours (from activity rollups)
+    if activity['peak_hours']:
+        embed.add_field(
+            name="⏰ Peak Hours (UTC)",
+            value=" | ".join(f"**{h:02d}:00**" for h, _ in activity['peak_hours']),
+            inline=True
+        )
+    
     embed.set_footer(text=f"Server ID: {ctx.guild.id}")
     await ctx.send(embed=embed)
 
@@ -15079,7 +16607,7 @@ async def topactive(ctx, days: int = 7):
     if days not in [7, 30]:
         days = 7
     
-    top_users = get_top_active_users(ctx.guild, days=days, limit=10)
+    top_users = await get_top_active_users(ctx.guild, days=days, limit=10)
     
     period = "This Week" if days == 7 else "This Month"
     xp_type = "Weekly" if days == 7 else "Monthly"
@@ -15949,7 +17477,7 @@ async def mainers_cmd(ctx):
     if not mainer_role:
         return await ctx.send(f"❌ Role **{INACTIVITY_REQUIRED_ROLE}** not found!")
     
-    mainers = [m for m in ctx.guild.members if mainer_role in m.roles and not m.bot]
+    mainers = [m for m in await role_members(mainer_role) if not m.bot]
     
     if not mainers:
         return await ctx.send("❌ No members with the Mainer role found!")
@@ -16205,11 +17733,7 @@ async def add_inactivity_strike_cmd(ctx, member: discord.Member, reason: str = "
                     new_role = discord.utils.get(ctx.guild.roles, name=next_rank)
                     
                     try:
-                        if old_role:
-                            await member.remove_roles(old_role)
-                            await asyncio.sleep(0.5)
-                        if new_role:
-                            await member.add_roles(new_role)
+                        await reconcile_member_roles(member, add=[new_role], remove=[old_role], reason="Inactivity demotion")
                         mark_user_demoted(member.id)
                         demoted = True
                         demoted_to_rank = next_rank
@@ -16462,7 +17986,7 @@ async def immunity_list(ctx):
     if not immunity_role:
         return await ctx.send(f"❌ Role **{INACTIVITY_IMMUNITY_ROLE}** not found!", ephemeral=True)
     
-    members_with_immunity = [m for m in ctx.guild.members if immunity_role in m.roles]
+    members_with_immunity = await role_members(immunity_role)
     
     if not members_with_immunity:
         embed = discord.Embed(
@@ -16511,6 +18035,79 @@ async def db_status(ctx):
     user_count = len(data.get("users", {}))
     embed.add_field(name="Users", value=str(user_count), inline=True)
     
+    acquire = perf_metrics["histograms"].get(("db", "acquire"))
+    if acquire:
+        embed.add_field(
+            name="Pool Acquire",
+            value=f"p50 {perf_percentile(acquire, 50):.0f}ms • p99 {perf_percentile(acquire, 99):.0f}ms",
+            inline=True
+        )
+    embed.add_field(name="Rate Limit Hits", value=str(bot.rate_limit_hits), inline=True)
+    embed.set_footer(text="Use !perf for full latency breakdown")
+    
+    await ctx.send(embed=embed)
+
+def _perf_lines(kind, limit=8):
+    """Top histograms of one kind, slowest p99 first"""
+    rows = [(name, hist) for (k, name), hist in perf_metrics["histograms"].items() if k == kind]
+    rows.sort(key=lambda r: perf_percentile(r[1], 99), reverse=True)
+    return "\n".join(
+        f"`{name[:24]}` n={hist['count']} p50 {perf_percentile(hist, 50):.0f} p99 {perf_percentile(hist, 99):.0f} max {hist['max']:.0f}ms"
+        for name, hist in rows[:limit]
+    ) or "No samples yet"
+
+@bot.command(name="perf", description="Staff: View bot performance metrics")
+@commands.has_any_role(*HIGH_STAFF_ROLES, STAFF_ROLE_NAME)
+async def perf(ctx, section: str = None):
+    """Show event-loop lag, latency histograms and store I/O"""
+    uptime = int(time.time() - perf_metrics["started_at"])
+    lag = perf_metrics["histograms"].get(("loop", "lag"))
+    
+    embed = discord.Embed(
+        title="⏱️ Performance",
+        description=(
+            f"**Uptime:** {uptime // 3600}h {(uptime % 3600) // 60}m\n"
+            f"**Loop Lag:** now {perf_metrics['loop_lag_ms']:.1f}ms • "
+            f"p99 {perf_percentile(lag, 99) if lag else 0:.0f}ms • max {perf_metrics['loop_lag_max_ms']:.0f}ms\n"
+            f"**Gateway Latency:** {bot.latency * 1000:.0f}ms\n"
+            f"**Rate Limit Hits:** {bot.rate_limit_hits}\n"
+            f"**Live Edits:** {perf_metrics['live_edits_sent']} sent • {perf_metrics['live_edits_superseded']} coalesced"
+        ),
+        color=0x3498db
+    )
+    
+    sections = {
+        "commands": ("⌨️ Commands", "command"),
+        "events": ("📨 Events", "event"),
+        "renders": ("🖼️ Image Renders", "render"),
+        "loops": ("🔁 Background Loops", "loop"),
+        "queue": ("🚦 Rate-Limit Queue", "ratelimit"),
+        "apis": ("🌐 External APIs", "api"),
+        "db": ("🗄️ PostgreSQL", "db"),
+        "startup": ("🚀 Startup Phases", "startup"),
+    }
+    if section and section.lower() == "stores":
+        wanted = []
+    elif section and section.lower() in sections:
+        wanted = [section.lower()]
+    else:
+        wanted = list(sections)
+    for key in wanted:
+        name, kind = sections[key]
+        embed.add_field(name=name, value=_perf_lines(kind)[:1024], inline=False)
+    
+    if not section or section.lower() == "stores":
+        stores = sorted(perf_metrics["stores"].items(), key=lambda s: s[1]["save_bytes"], reverse=True)
+        store_text = "\n".join(
+            f"`{store}` L{entry['load']} S{entry['save']} • {format_number(entry['save_bytes'] // 1024)}KB written"
+            for store, entry in stores[:8]
+        ) or "No store I/O yet"
+        embed.add_field(name="💾 Stores", value=store_text[:1024], inline=False)
+    
+    footer = "Sections: " + ", ".join(list(sections) + ["stores"])
+    if METRICS_PORT:
+        footer += f" • Prometheus: {METRICS_HOST}:{METRICS_PORT}/metrics"
+    embed.set_footer(text=footer)
     await ctx.send(embed=embed)
 
 @bot.command(name="setup_logs", description="Admin: Setup the logging dashboard channel")
@@ -16970,7 +18567,9 @@ def load_transcripts():
     """Load ticket transcripts from file"""
     try:
         with open(TRANSCRIPTS_FILE, "r") as f:
-            return json.load(f)
+            data = json.load(f)
+            perf_record_store(TRANSCRIPTS_FILE, "load", f.tell())
+            return data
     except:
         return {"transcripts": []}
 
@@ -16978,6 +18577,7 @@ def save_transcripts(data):
     """Save ticket transcripts to file"""
     with open(TRANSCRIPTS_FILE, "w") as f:
         json.dump(data, f, indent=2)
+        perf_record_store(TRANSCRIPTS_FILE, "save", f.tell())
 
 async def generate_transcript(channel, ticket_type="support", closer=None, ticket_info=None):
     """Generate a transcript of all messages in a ticket channel"""
@@ -17148,16 +18748,53 @@ async def list_transcripts(ctx, limit: int = 10):
 # ALT DETECTION SYSTEM
 # ==========================================
 
-# Store flagged users for alt detection
-alt_flags = {}
+ALT_FLAG_SCORE = 50          # Flag for staff at or above this score
+RAID_JOIN_WINDOW = 60        # Seconds of joins the burst detector looks at
+RAID_JOIN_THRESHOLD = 10     # Joins inside the window that trip raid mode
+RAID_MODE_QUIET = 120        # Raid mode ends after this long without a join
+RAID_SUMMARY_INTERVAL = 10   # Seconds between batch scoring passes
+RAID_CLUSTER_MIN = 3         # Joiners created in the same hour to count as a cluster
+
+# Flagged users for alt detection (persisted to ALT_FLAGS_FILE)
+_alt_flags = None
+
+# guild_id -> {"joins": deque of join times, "raid": None or raid state}
+_join_tracker = {}
+
+def get_alt_flags():
+    global _alt_flags
+    if _alt_flags is None:
+        try:
+            with open(ALT_FLAGS_FILE, "r") as f:
+                _alt_flags = json.load(f)
+                perf_record_store(ALT_FLAGS_FILE, "load", f.tell())
+        except:
+            _alt_flags = {}
+    return _alt_flags
+
+def save_alt_flags():
+    with open(ALT_FLAGS_FILE, "w") as f:
+        json.dump(get_alt_flags(), f)
+        perf_record_store(ALT_FLAGS_FILE, "save", f.tell())
+
+def flag_alt_account(member_id, score, reasons, raid=False, save=True):
+    get_alt_flags()[str(member_id)] = {
+        "score": score,
+        "reasons": reasons,
+        "raid": raid,
+        "flagged_at": datetime.datetime.now(datetime.timezone.utc).isoformat()
+    }
+    if save:
+        save_alt_flags()
 
-def calculate_alt_score(member):
+def calculate_alt_score(member, now=None):
     """Calculate likelihood of account being an alt (0-100)"""
     score = 0
     reasons = []
+    now = now or datetime.datetime.now(datetime.timezone.utc)
     
     # Account age
-    account_age = (datetime.datetime.now(datetime.timezone.utc) - member.created_at).days
+    account_age = (now - member.created_at).days
     if account_age < 1:
         score += 40
         reasons.append("Account less than 1 day old")
@@ -17182,13 +18819,147 @@ def calculate_alt_score(member):
     
     # Joined very recently
     if member.joined_at:
-        time_in_server = (datetime.datetime.now(datetime.timezone.utc) - member.joined_at).total_seconds()
+        time_in_server = (now - member.joined_at).total_seconds()
         if time_in_server < 60:  # Less than 1 minute
             score += 10
             reasons.append("Just joined")
     
     return min(score, 100), reasons
 
+def score_alt_batch(members, created_hours=None):
+    """
+    Score a batch of joiners together. On top of the per-account score,
+    accounts created in the same hour as other joiners in the batch get
+    bumped - raids are usually run from accounts made together.
+    `created_hours` carries the counts across batches of the same raid.
+    """
+    now = datetime.datetime.now(datetime.timezone.utc)
+    created_hours = Counter() if created_hours is None else created_hours
+    created_hours.update(int(m.created_at.timestamp() // 3600) for m in members)
+    
+    results = []
+    for member in members:
+        score, reasons = calculate_alt_score(member, now=now)
+        cluster = created_hours[int(member.created_at.timestamp() // 3600)]
+        if cluster >= RAID_CLUSTER_MIN:
+            score = min(score + 20, 100)
+            reasons.append(f"Created within the same hour as {cluster - 1} other joiners")
+        results.append((member, score, reasons))
+    return results
+
+def track_member_join(member):
+    """Record a join. Returns the raid state if the guild is in raid mode."""
+    state = _join_tracker.setdefault(member.guild.id, {"joins": deque(), "raid": None})
+    now = time.monotonic()
+    joins = state["joins"]
+    joins.append(now)
+    while joins and now - joins[0] > RAID_JOIN_WINDOW:
+        joins.popleft()
+    
+    raid = state["raid"]
+    if raid is None and len(joins) >= RAID_JOIN_THRESHOLD:
+        raid = state["raid"] = {
+            "started_at": datetime.datetime.now(datetime.timezone.utc),
+            "members": [],
+            "scored": 0,
+            "created_hours": Counter(),
+            "flagged": [],
+            "kicked": [],
+            "message": None,
+            "ended": False,
+        }
+        print(f"🚨 Raid mode engaged in {member.guild.name}: {len(joins)} joins in {RAID_JOIN_WINDOW}s")
+        asyncio.create_task(run_raid_mode(member.guild, raid))
+    
+    if raid:
+        raid["members"].append(member)
+        raid["last_join"] = now
+    return raid
+
+def raid_summary_embed(raid):
+    ended = raid["ended"]
+    embed = discord.Embed(
+        title="🛡️ Join Burst Ended" if ended else "🚨 Join Burst Detected - Raid Mode",
+        description=(
+            f"**{len(raid['members'])}** members joined since <t:{int(raid['started_at'].timestamp())}:R>.\n"
+            + ("Welcome cards and DMs were skipped for these joins." if ended else
+               "Welcome cards and DMs are paused. Joiners are scored in batches.")
+        ),
+        color=0x2ecc71 if ended else 0xe74c3c,
+        timestamp=datetime.datetime.now(datetime.timezone.utc)
+    )
+    embed.add_field(name="👥 Joins", value=str(len(raid["members"])), inline=True)
+    embed.add_field(name="🔍 Flagged Alts", value=str(len(raid["flagged"])), inline=True)
+    embed.add_field(name="👢 Previously Kicked", value=str(len(raid["kicked"])), inline=True)
+    
+    if raid["flagged"]:
+        top = sorted(raid["flagged"], key=lambda f: f[1], reverse=True)[:10]
+        embed.add_field(
+            name="🚩 Highest Risk",
+            value="\n".join(f"<@{uid}> - {score}/100" for uid, score in top),
+            inline=False
+        )
+    if raid["kicked"]:
+        embed.add_field(name="⚠️ Rejoined After Kick", value=" ".join(f"<@{uid}>" for uid in raid["kicked"][:20]), inline=False)
+    
+    embed.set_footer(text="Use !altflags to review • !altcheck @user for details")
+    return embed
+
+def process_raid_batch(raid):
+    """Score every joiner not yet scored and persist the flags in one write"""
+    batch = raid["members"][raid["scored"]:]
+    raid["scored"] = len(raid["members"])
+    if not batch:
+        return False
+    
+    flagged = False
+    for member, score, reasons in score_alt_batch(batch, raid["created_hours"]):
+        if score >= ALT_FLAG_SCORE:
+            flag_alt_account(member.id, score, reasons, raid=True, save=False)
+            raid["flagged"].append((str(member.id), score))
+            flagged = True
+        if was_previously_kicked(member.id):
+            raid["kicked"].append(str(member.id))
+    if flagged:
+        save_alt_flags()
+    return True
+
+async def run_raid_mode(guild, raid):
+    """Batch-score joiners while the burst lasts, then post the final summary"""
+    log_channel = discord.utils.get(guild.text_channels, name=LOG_CHANNEL_NAME) or \
+                  discord.utils.get(guild.text_channels, name="fallen-logs")
+    
+    try:
+        process_raid_batch(raid)
+        if log_channel:
+            staff_role = discord.utils.get(guild.roles, name=STAFF_ROLE_NAME)
+            raid["message"] = await log_channel.send(
+                content=staff_role.mention if staff_role else None,
+                embed=raid_summary_embed(raid)
+            )
+        
+        while time.monotonic() - raid["last_join"] < RAID_MODE_QUIET:
+            await asyncio.sleep(RAID_SUMMARY_INTERVAL)
+            if process_raid_batch(raid) and raid["message"]:
+                queue_live_edit(raid["message"], lambda: {"embed": raid_summary_embed(raid)})
+    except Exception as e:
+        print(f"Raid mode error: {e}")
+    finally:
+        _join_tracker[guild.id]["raid"] = None
+    
+    process_raid_batch(raid)
+    raid["ended"] = True
+    print(f"🛡️ Raid mode ended in {guild.name}: {len(raid['members'])} joins, {len(raid['flagged'])} flagged")
+    try:
+        if raid["message"]:
+            await cancel_live_edit(raid["message"].id)
+            await raid["message"].edit(embed=raid_summary_embed(raid))
+        elif log_channel:
+            await log_channel.send(embed=raid_summary_embed(raid))
+        await check_member_milestone(guild)
+    except Exception as e:
+        print(f"Raid summary error: {e}")
+
 @bot.command(name="altcheck")
 @commands.has_any_role(*HIGH_STAFF_ROLES, STAFF_ROLE_NAME)
 @commands.cooldown(1, 5, commands.BucketType.user)  # 5 second cooldown
@@ -17237,6 +19008,7 @@ async def alt_check_cmd(ctx, member: discord.Member):
 @commands.has_any_role(*HIGH_STAFF_ROLES, STAFF_ROLE_NAME)
 async def alt_flags_cmd(ctx):
     """View all flagged potential alt accounts"""
+    alt_flags = get_alt_flags()
     if not alt_flags:
         return await ctx.send("✅ No accounts currently flagged.")
     
@@ -17265,7 +19037,9 @@ def load_legacy_data():
     """Load legacy data"""
     try:
         with open(LEGACY_FILE, "r") as f:
-            return json.load(f)
+            data = json.load(f)
+            perf_record_store(LEGACY_FILE, "load", f.tell())
+            return data
     except:
         return {"members": {}, "milestones": []}
 
@@ -17273,6 +19047,7 @@ def save_legacy_data(data):
     """Save legacy data"""
     with open(LEGACY_FILE, "w") as f:
         json.dump(data, f, indent=2)
+        perf_record_store(LEGACY_FILE, "save", f.tell())
 
 def get_legacy_status(member):
     """Calculate legacy status based on join date"""
@@ -17400,7 +19175,7 @@ async def legacy_top(ctx, limit: int = 10):
     """View members with longest tenure"""
     members_with_dates = []
     
-    for member in ctx.guild.members:
+    for member in await guild_members(ctx.guild):
         if member.joined_at and not member.bot:
             days = (datetime.datetime.now(datetime.timezone.utc) - member.joined_at).days
             tier, _ = get_legacy_status(member)
@@ -17434,7 +19209,9 @@ def load_practice_data():
     """Load practice session data"""
     try:
         with open(PRACTICE_FILE, "r") as f:
-            return json.load(f)
+            data = json.load(f)
+            perf_record_store(PRACTICE_FILE, "load", f.tell())
+            return data
     except:
         return {"sessions": [], "ratings": {}, "queue": [], "stats": {}}
 
@@ -17442,9 +19219,94 @@ def save_practice_data(data):
     """Save practice session data"""
     with open(PRACTICE_FILE, "w") as f:
         json.dump(data, f, indent=2)
+        perf_record_store(PRACTICE_FILE, "save", f.tell())
+
+# --- SPAR MATCHMAKING INDEX ---
+# Queued players live in a dict (FIFO order) plus one bucket per precomputed
+# tier. Opponent searches walk the buckets outward from the player's tier,
+# so each search only looks at ±9 tiers and results come out already ranked.
+# Within a bucket, whoever queued first is offered first.
+
+SPAR_MAX_TIER_GAP = 9             # One full stage
+SPAR_AUTO_PAIR_PRIORITY = 1       # Auto-pair on join for Perfect/Good matches
+SPAR_QUEUE_MAX_AGE = 3 * 60 * 60  # Entries older than this are dropped on load
+SPAR_UNRANKED_TIER = 99
+SPAR_LOW_STAGE_TIERS = range(54, 36, -1)  # Stage 5 down to Stage 4 - unranked can meet these
+
+_spar_queue = {
+    "entries": None,   # user_id -> entry, in queue order
+    "buckets": {},     # tier -> {user_id: None}, in queue order
+    "seq": 0,
+}
 
-# Practice queue
-practice_queue = []  # [{user_id, skill_level, queued_at, server_link}]
+def get_spar_queue():
+    if _spar_queue["entries"] is None:
+        try:
+            with open(SPAR_QUEUE_FILE, "r") as f:
+                saved = json.load(f)
+                perf_record_store(SPAR_QUEUE_FILE, "load", f.tell())
+        except:
+            saved = {"entries": [], "seq": 0}
+        
+        _spar_queue["entries"] = {}
+        _spar_queue["buckets"] = {}
+        _spar_queue["seq"] = saved.get("seq", 0)
+        now = datetime.datetime.now(datetime.timezone.utc)
+        for entry in saved.get("entries", []):
+            try:
+                queued_at = datetime.datetime.fromisoformat(entry["queued_at"].replace('Z', '+00:00'))
+                if (now - queued_at).total_seconds() > SPAR_QUEUE_MAX_AGE:
+                    continue
+            except:
+                pass
+            _index_spar_entry(entry)
+    return _spar_queue
+
+def save_spar_queue():
+    with open(SPAR_QUEUE_FILE, "w") as f:
+        json.dump({"entries": list(_spar_queue["entries"].values()), "seq": _spar_queue["seq"]}, f)
+        perf_record_store(SPAR_QUEUE_FILE, "save", f.tell())
+
+def _index_spar_entry(entry):
+    if "tier" not in entry:
+        entry["tier"] = get_spar_tier(entry)
+    _spar_queue["entries"][entry["user_id"]] = entry
+    _spar_queue["buckets"].setdefault(entry["tier"], {})[entry["user_id"]] = None
+
+def spar_queue_entries():
+    """Queued players, first come first served"""
+    return list(get_spar_queue()["entries"].values())
+
+def spar_queue_get(user_id):
+    return get_spar_queue()["entries"].get(str(user_id))
+
+def spar_queue_add(entry):
+    state = get_spar_queue()
+    state["seq"] += 1
+    entry["seq"] = state["seq"]
+    _index_spar_entry(entry)
+    save_spar_queue()
+    return entry
+
+def spar_queue_remove(*user_ids):
+    """Take players out of the queue. Returns how many were queued."""
+    state = get_spar_queue()
+    removed = 0
+    for user_id in user_ids:
+        entry = state["entries"].pop(str(user_id), None)
+        if entry:
+            bucket = state["buckets"].get(entry["tier"], {})
+            bucket.pop(entry["user_id"], None)
+            if not bucket:
+                state["buckets"].pop(entry["tier"], None)
+            removed += 1
+    if removed:
+        save_spar_queue()
+    return removed
+
+def _spar_bucket(tier, exclude):
+    state = get_spar_queue()
+    return [state["entries"][uid] for uid in state["buckets"].get(tier, {}) if uid != exclude]
 
 class PracticeQueueView(discord.ui.View):
     """Spar finder based on Stage/Rank/Strength"""
@@ -17453,13 +19315,9 @@ class PracticeQueueView(discord.ui.View):
     
     @discord.ui.button(label="🎯 Find Spar", style=discord.ButtonStyle.success, custom_id="practice_join_queue")
     async def join_queue(self, interaction: discord.Interaction, button: discord.ui.Button):
-        global practice_queue
-        user_id = str(interaction.user.id)
-        
         # Check if already in queue
-        for entry in practice_queue:
-            if entry["user_id"] == user_id:
-                return await interaction.response.send_message("❌ You're already in the queue!", ephemeral=True)
+        if spar_queue_get(interaction.user.id):
+            return await interaction.response.send_message("❌ You're already in the queue!", ephemeral=True)
         
         # Get user's stage/rank/strength from roles
         member_rank = get_member_spar_rank(interaction.user)
@@ -17482,6 +19340,7 @@ class PracticeQueueView(discord.ui.View):
     
     @discord.ui.button(label="📋 View Queue", style=discord.ButtonStyle.primary, custom_id="practice_view_queue")
     async def view_queue(self, interaction: discord.Interaction, button: discord.ui.Button):
+        practice_queue = spar_queue_entries()
         if not practice_queue:
             return await interaction.response.send_message("📋 The spar queue is currently empty!", ephemeral=True)
         
@@ -17500,7 +19359,7 @@ class PracticeQueueView(discord.ui.View):
             rank_display = entry.get("display", "Unranked")
             rank_level = entry.get("rank", "")
             strength = entry.get("strength", "")
-            tier = entry.get("tier", get_spar_tier(entry))
+            tier = entry["tier"]
             
             extra = []
             if rank_level:
@@ -17529,6 +19388,7 @@ class PracticeQueueView(discord.ui.View):
     
     @discord.ui.button(label="⚔️ Challenge", style=discord.ButtonStyle.secondary, custom_id="practice_challenge")
     async def challenge_player(self, interaction: discord.Interaction, button: discord.ui.Button):
+        practice_queue = spar_queue_entries()
         if not practice_queue:
             return await interaction.response.send_message("📋 No one is in the queue to challenge!", ephemeral=True)
         
@@ -17549,19 +19409,15 @@ class PracticeQueueView(discord.ui.View):
         user_id = str(interaction.user.id)
         
         # Check if user is in queue
-        user_entry = None
-        for entry in practice_queue:
-            if entry["user_id"] == user_id:
-                user_entry = entry
-                break
+        user_entry = spar_queue_get(user_id)
         
         if not user_entry:
             return await interaction.response.send_message("❌ You need to join the queue first!", ephemeral=True)
         
         # Find suitable opponents
-        suitable = find_suitable_opponents(user_entry, practice_queue)
+        suitable = find_suitable_opponents(user_entry, limit=25)
         
-        user_tier = get_spar_tier(user_entry)
+        user_tier = user_entry["tier"]
         
         if not suitable:
             return await interaction.response.send_message(
@@ -17583,7 +19439,7 @@ class PracticeQueueView(discord.ui.View):
             user = interaction.guild.get_member(int(opp["user_id"]))
             name = user.display_name if user else "Unknown"
             rank_display = opp.get("display", "Unranked")
-            opp_tier = opp.get("tier", get_spar_tier(opp))
+            opp_tier = opp["tier"]
             compatibility = opp.get("compatibility", "Unknown")
             tier_diff = opp.get("tier_diff", abs(user_tier - opp_tier))
             lines.append(f"{compatibility}\n  **{name}** - {rank_display} (T{opp_tier}, {tier_diff} tiers apart)")
@@ -17599,18 +19455,39 @@ class PracticeQueueView(discord.ui.View):
     
     @discord.ui.button(label="🚪 Leave Queue", style=discord.ButtonStyle.danger, custom_id="practice_leave_queue")
     async def leave_queue(self, interaction: discord.Interaction, button: discord.ui.Button):
-        global practice_queue
-        
-        user_id = str(interaction.user.id)
-        initial_len = len(practice_queue)
-        practice_queue = [p for p in practice_queue if p["user_id"] != user_id]
-        
-        if len(practice_queue) < initial_len:
+        if spar_queue_remove(interaction.user.id):
             await interaction.response.send_message("✅ You've left the spar queue.", ephemeral=True)
         else:
             await interaction.response.send_message("❌ You're not in the queue.", ephemeral=True)
 
 
+SPAR_STAGE_MAPPING = {
+    "Stage 0": (0, "Stage 0〢FALLEN DEITY"),
+    "Stage 1": (1, "Stage 1〢FALLEN APEX"),
+    "Stage 2": (2, "Stage 2〢FALLEN ASCENDANT"),
+    "Stage 3": (3, "Stage 3〢FORSAKEN WARRIOR"),
+    "Stage 4": (4, "Stage 4〢ABYSS-TOUCHED"),
+    "Stage 5": (5, "Stage 5〢BROKEN INITIATE"),
+}
+
+_spar_role_cache = {}  # role name -> ("stage", (num, full_name)) / ("rank", name) / ("strength", name) / None
+
+def classify_spar_role(role_name):
+    """What a role means for spar rank - worked out once per role name"""
+    if role_name not in _spar_role_cache:
+        kind = None
+        for stage_key, stage in SPAR_STAGE_MAPPING.items():
+            if stage_key in role_name or stage[1] in role_name:
+                kind = ("stage", stage)
+                break
+        if kind is None and role_name in RANK_LEVELS:
+            kind = ("rank", role_name)
+        elif kind is None and role_name in STRENGTH_LEVELS:
+            kind = ("strength", role_name)
+        _spar_role_cache[role_name] = kind
+    return _spar_role_cache[role_name]
+
+
 def get_member_spar_rank(member):
     """Get a member's stage/rank/strength from their roles"""
     result = {
@@ -17621,33 +19498,18 @@ def get_member_spar_rank(member):
         "display": "Unranked"
     }
     
-    stage_mapping = {
-        "Stage 0": (0, "Stage 0〢FALLEN DEITY"),
-        "Stage 1": (1, "Stage 1〢FALLEN APEX"),
-        "Stage 2": (2, "Stage 2〢FALLEN ASCENDANT"),
-        "Stage 3": (3, "Stage 3〢FORSAKEN WARRIOR"),
-        "Stage 4": (4, "Stage 4〢ABYSS-TOUCHED"),
-        "Stage 5": (5, "Stage 5〢BROKEN INITIATE"),
-    }
-    
     for role in member.roles:
-        role_name = role.name
-        
-        # Check for stage
-        for stage_key, (stage_num, full_name) in stage_mapping.items():
-            if stage_key in role_name or full_name in role_name:
-                result["stage"] = full_name
-                result["stage_num"] = stage_num
-                result["display"] = f"Stage {stage_num}"
-                break
-        
-        # Check for rank level
-        if role_name in RANK_LEVELS:
-            result["rank"] = role_name
+        kind = classify_spar_role(role.name)
+        if kind is None:
+            continue
         
-        # Check for strength
-        if role_name in STRENGTH_LEVELS:
-            result["strength"] = role_name
+        if kind[0] == "stage":
+            stage_num, full_name = kind[1]
+            result["stage"] = full_name
+            result["stage_num"] = stage_num
+            result["display"] = f"Stage {stage_num}"
+        else:
+            result[kind[0]] = kind[1]
     
     return result
 
@@ -17777,7 +19639,18 @@ def get_tier_display(tier):
     return f"Tier {tier}"
 
 
-def find_suitable_opponents(user_entry, queue):
+def spar_compatibility(tier_diff):
+    """(label, priority) for two ranked players this many tiers apart"""
+    if tier_diff <= 1:
+        return "⭐ Perfect Match", 0
+    if tier_diff <= 3:
+        return "✅ Good Match", 1
+    if tier_diff <= 6:
+        return "⚠️ Fair Match", 2
+    return "⚠️ Challenging", 3  # Up to one full stage difference
+
+
+def find_suitable_opponents(user_entry, limit=None):
     """
     Find suitable opponents based on Stage/Rank/Strength tier system.
     
@@ -17787,61 +19660,45 @@ def find_suitable_opponents(user_entry, queue):
     - Fair Match: ±4 to ±6 tiers (within same stage usually)
     - Cross-stage matches allowed if within 6 tiers
     - Unranked can match with anyone in Stage 4-5 or other Unranked
+    
+    Walks the tier buckets nearest-first, so results are already ordered by
+    priority, then tier difference, then time in queue.
     """
-    user_tier = get_spar_tier(user_entry)
+    user_tier = user_entry["tier"]
     user_id = user_entry["user_id"]
-    user_stage = user_entry.get("stage_num", 99)
     
-    suitable = []
+    found = []  # (entry, compatibility, priority, tier_diff)
     
-    for entry in queue:
-        if entry["user_id"] == user_id:
-            continue
-        
-        opponent_tier = get_spar_tier(entry)
-        opponent_stage = entry.get("stage_num", 99)
-        tier_diff = abs(user_tier - opponent_tier)
-        
-        # Special handling for Unranked
-        if user_tier == 99 or opponent_tier == 99:
-            # Unranked can match with:
-            # - Other Unranked (perfect)
-            # - Stage 4-5 players (fair)
-            if user_tier == 99 and opponent_tier == 99:
-                compatibility = "⭐ Perfect Match"
-                priority = 0
-            elif opponent_stage in [4, 5] or user_stage in [4, 5]:
-                compatibility = "⚠️ Fair Match"
-                priority = 3
-            else:
-                continue  # Skip - too big skill gap
-        else:
-            # Determine compatibility based on tier difference
-            if tier_diff <= 1:
-                compatibility = "⭐ Perfect Match"
-                priority = 0
-            elif tier_diff <= 3:
-                compatibility = "✅ Good Match"
-                priority = 1
-            elif tier_diff <= 6:
-                compatibility = "⚠️ Fair Match"
-                priority = 2
-            elif tier_diff <= 9:  # Allow up to one full stage difference
-                compatibility = "⚠️ Challenging"
-                priority = 3
-            else:
-                continue  # Skip - too big skill gap
+    def take(entries, compatibility, priority, tier_diff):
+        for entry in entries:
+            found.append((entry, compatibility, priority, tier_diff))
+    
+    if user_tier == SPAR_UNRANKED_TIER:
+        take(_spar_bucket(SPAR_UNRANKED_TIER, user_id), "⭐ Perfect Match", 0, 0)
+        for tier in SPAR_LOW_STAGE_TIERS:
+            take(_spar_bucket(tier, user_id), "⚠️ Fair Match", 3, SPAR_UNRANKED_TIER - tier)
+    else:
+        for diff in range(SPAR_MAX_TIER_GAP + 1):
+            compatibility, priority = spar_compatibility(diff)
+            same_gap = _spar_bucket(user_tier - diff, user_id)
+            if diff:
+                same_gap += _spar_bucket(user_tier + diff, user_id)
+                same_gap.sort(key=lambda e: e.get("seq", 0))
+            take(same_gap, compatibility, priority, diff)
+            if limit and len(found) >= limit:
+                break
         
+        if user_entry.get("stage_num") in (4, 5):
+            take(_spar_bucket(SPAR_UNRANKED_TIER, user_id), "⚠️ Fair Match", 3, SPAR_UNRANKED_TIER - user_tier)
+    
+    suitable = []
+    for entry, compatibility, priority, tier_diff in found[:limit]:
         entry_copy = entry.copy()
         entry_copy["compatibility"] = compatibility
         entry_copy["tier_diff"] = tier_diff
         entry_copy["priority"] = priority
-        entry_copy["tier"] = opponent_tier
         suitable.append(entry_copy)
     
-    # Sort by priority first, then tier difference
-    suitable.sort(key=lambda x: (x["priority"], x["tier_diff"]))
-    
     return suitable
 
 
@@ -17881,13 +19738,11 @@ class ConfirmJoinQueueView(discord.ui.View):
     
     @discord.ui.button(label="✅ Join Queue", style=discord.ButtonStyle.success)
     async def confirm_join(self, interaction: discord.Interaction, button: discord.ui.Button):
-        global practice_queue
         user_id = str(interaction.user.id)
         
         # Double check not already in queue
-        for entry in practice_queue:
-            if entry["user_id"] == user_id:
-                return await interaction.response.edit_message(content="❌ You're already in the queue!", view=None)
+        if spar_queue_get(user_id):
+            return await interaction.response.edit_message(content="❌ You're already in the queue!", view=None)
         
         # Get partner rating
         data = load_practice_data()
@@ -17898,7 +19753,7 @@ class ConfirmJoinQueueView(discord.ui.View):
         tier = get_spar_tier(self.member_rank)
         
         # Add to queue
-        practice_queue.append({
+        entry = spar_queue_add({
             "user_id": user_id,
             "stage": self.member_rank.get("stage"),
             "stage_num": self.member_rank.get("stage_num", 99),
@@ -17912,13 +19767,35 @@ class ConfirmJoinQueueView(discord.ui.View):
         
         tier_display = f"Tier {tier}" if tier != 99 else "Unranked"
         
+        # Pair straight away if a close enough opponent is already waiting
+        opponent = None
+        for candidate in find_suitable_opponents(entry, limit=5):
+            if candidate["priority"] > SPAR_AUTO_PAIR_PRIORITY:
+                break
+            opponent = interaction.guild.get_member(int(candidate["user_id"]))
+            if opponent:
+                break
+            spar_queue_remove(candidate["user_id"])  # Left the server
+        
+        if opponent:
+            spar_queue_remove(user_id, opponent.id)
+            await interaction.response.edit_message(
+                content=(
+                    f"⚔️ **Match found!** You've been paired with **{opponent.display_name}** "
+                    f"({candidate['compatibility']}).\nCreating your spar channel..."
+                ),
+                view=None
+            )
+            return await create_spar_match(interaction.guild, opponent, interaction.user)
+        
         await interaction.response.edit_message(
             content=(
                 f"✅ You've joined the spar queue!\n\n"
                 f"**Your Rank:** {self.member_rank.get('display', 'Unranked')}\n"
                 f"**Tier:** {tier_display}\n"
-                f"**Position:** #{len(practice_queue)}\n\n"
-                f"Use **🔍 Find Match** to find suitable opponents!"
+                f"**Position:** #{len(get_spar_queue()['entries'])}\n\n"
+                f"You'll be paired automatically when a close match joins, "
+                f"or use **🔍 Find Match** to see suitable opponents!"
             ),
             view=None
         )
@@ -18018,10 +19895,8 @@ class SparChallengeResponseView(discord.ui.View):
     
     @discord.ui.button(label="✅ Accept", style=discord.ButtonStyle.success)
     async def accept(self, interaction: discord.Interaction, button: discord.ui.Button):
-        global practice_queue
-        
         # Remove both from queue if they're in it
-        practice_queue = [p for p in practice_queue if p["user_id"] not in [self.challenger_id, self.target_id]]
+        spar_queue_remove(self.challenger_id, self.target_id)
         
         guild = interaction.client.get_guild(self.guild_id)
         if not guild:
@@ -18053,8 +19928,6 @@ class SparChallengeResponseView(discord.ui.View):
 
 async def create_spar_match(guild, player1, player2):
     """Create a spar match between two players"""
-    global practice_queue
-    
     # Get ranks
     p1_rank = get_member_spar_rank(player1)
     p2_rank = get_member_spar_rank(player2)
@@ -18739,18 +20612,44 @@ async def setup_practice(ctx):
 
 ACTIVITY_CHECK_FILE = "activity_checks.json"
 
+_activity_checks = None  # activity_checks.json, loaded once and written through
+
 def load_activity_checks():
     """Load activity check data"""
-    try:
-        with open(ACTIVITY_CHECK_FILE, "r") as f:
-            return json.load(f)
-    except:
-        return {"checks": [], "current": None}
+    global _activity_checks
+    if _activity_checks is None:
+        try:
+            with open(ACTIVITY_CHECK_FILE, "r") as f:
+                _activity_checks = json.load(f)
+                perf_record_store(ACTIVITY_CHECK_FILE, "load", f.tell())
+        except:
+            _activity_checks = {"checks": [], "current": None}
+    return _activity_checks
 
 def save_activity_checks(data):
     """Save activity check data"""
+    global _activity_checks
+    _activity_checks = data
+    invalidate_view_index("activity_check")
     with open(ACTIVITY_CHECK_FILE, "w") as f:
         json.dump(data, f, indent=2)
+        perf_record_store(ACTIVITY_CHECK_FILE, "save", f.tell())
+
+def build_activity_check_index():
+    index = {}
+    for check in load_activity_checks()["checks"]:
+        for key in ("message_id", "control_message_id"):
+            if check.get(key):
+                index[check[key]] = check["id"]
+    return index
+
+VIEW_INDEX_BUILDERS["activity_check"] = build_activity_check_index
+
+def find_activity_check(interaction, check_id=None):
+    """The check a button belongs to: its own id, the clicked message, or the current check"""
+    data = load_activity_checks()
+    check_id = check_id or resolve_view_state("activity_check", interaction.message and interaction.message.id) or data.get("current")
+    return next((c for c in data["checks"] if c["id"] == check_id), None) if check_id else None
 
 
 class ActivityCheckView(discord.ui.View):
@@ -18762,14 +20661,10 @@ class ActivityCheckView(discord.ui.View):
     async def check_in(self, interaction: discord.Interaction, button: discord.ui.Button):
         try:
             data = load_activity_checks()
-            check_id = data.get("current")
-            
-            if not check_id:
-                return await interaction.response.send_message("❌ No active check!", ephemeral=True)
+            check = find_activity_check(interaction)
             
-            check = next((c for c in data["checks"] if c["id"] == check_id), None)
             if not check:
-                return await interaction.response.send_message("❌ Check not found!", ephemeral=True)
+                return await interaction.response.send_message("❌ No active check!", ephemeral=True)
             
             # Check if time expired
             is_expired = False
@@ -18785,7 +20680,8 @@ class ActivityCheckView(discord.ui.View):
                 if is_expired and not check.get("ended"):
                     check["ended"] = True
                     check["auto_ended"] = True
-                    data["current"] = None
+                    if data.get("current") == check["id"]:
+                        data["current"] = None
                     save_activity_checks(data)
                 
                 # RESPOND FIRST
@@ -18793,6 +20689,7 @@ class ActivityCheckView(discord.ui.View):
                 
                 # Then try to update message
                 try:
+                    await cancel_live_edit(interaction.message.id)
                     count = len(check.get("responses", []))
                     embed = interaction.message.embeds[0].copy() if interaction.message.embeds else None
                     if embed:
@@ -18824,10 +20721,12 @@ class ActivityCheckView(discord.ui.View):
             
             save_activity_checks(data)
             
-            # Give rewards
-            add_coins(interaction.user.id, 25)
-            add_xp_to_user(interaction.user.id, 15)
-            update_user_data(interaction.user.id, "last_active", datetime.datetime.now(datetime.timezone.utc).isoformat())
+            # Give rewards (keyed per check so a retried click pays once)
+            ledger_apply(
+                interaction.user.id, "activity_check", coins=25, xp=15,
+                key=f"activity_check:{check['id']}:{user_id}",
+                fields={"last_active": datetime.datetime.now(datetime.timezone.utc).isoformat()}
+            )
             
             count = len(check["responses"])
             
@@ -18837,18 +20736,20 @@ class ActivityCheckView(discord.ui.View):
                 ephemeral=True
             )
             
-            # Then update button counter and embed
-            try:
-                embed = interaction.message.embeds[0].copy() if interaction.message.embeds else None
+            # Then update button counter and embed (coalesced with other clicks)
+            message = interaction.message
+            
+            def counter_state():
+                count = len(check["responses"])  # Read at send time so coalesced clicks show the latest total
+                embed = message.embeds[0].copy() if message.embeds else None
                 if embed:
                     embed.set_footer(text=f"✝ {count} responses ✝")
                 
                 new_view = ActivityCheckView()
                 new_view.children[0].label = f"✅ I'm Active! ({count})"
-                
-                await interaction.message.edit(embed=embed, view=new_view)
-            except Exception as e:
-                print(f"Failed to update activity embed: {e}")
+                return {"embed": embed, "view": new_view}
+            
+            queue_live_edit(message, counter_state)
                 
         except Exception as e:
             print(f"Activity check error: {e}")
@@ -18871,14 +20772,8 @@ class ActivityCheckControlView(discord.ui.View):
         
         await interaction.response.defer(ephemeral=True)
         
-        data = load_activity_checks()
-        check_id = self.check_id or data.get("current")
-        
-        check = None
-        for c in data["checks"]:
-            if c["id"] == check_id:
-                check = c
-                break
+        check = find_activity_check(interaction, self.check_id)
+        check_id = check["id"] if check else None
         
         if not check:
             return await interaction.followup.send("❌ Check not found!", ephemeral=True)
@@ -18924,13 +20819,7 @@ class ActivityCheckControlView(discord.ui.View):
             return await interaction.response.send_message("❌ Staff only!", ephemeral=True)
         
         data = load_activity_checks()
-        check_id = self.check_id or data.get("current")
-        
-        check = None
-        for c in data["checks"]:
-            if c["id"] == check_id:
-                check = c
-                break
+        check = find_activity_check(interaction, self.check_id)
         
         if not check:
             return await interaction.response.send_message("❌ Check not found!", ephemeral=True)
@@ -18941,13 +20830,16 @@ class ActivityCheckControlView(discord.ui.View):
         check["ended"] = True
         check["ended_at"] = datetime.datetime.now(datetime.timezone.utc).isoformat()
         check["ended_by"] = str(interaction.user.id)
-        data["current"] = None
+        if data.get("current") == check["id"]:
+            data["current"] = None
         save_activity_checks(data)
         
         responses = check.get("responses", [])
         
+        await interaction.response.defer()
+        
         # Find who didn't respond
-        all_members = [m for m in interaction.guild.members if not m.bot]
+        all_members = [m for m in await guild_members(interaction.guild) if not m.bot]
         responded_ids = set(responses)
         not_responded = [m for m in all_members if str(m.id) not in responded_ids]
         
@@ -18970,6 +20862,8 @@ class ActivityCheckControlView(discord.ui.View):
             if check.get("message_id") and check.get("channel_id"):
                 channel = interaction.guild.get_channel(int(check["channel_id"]))
                 if channel:
+                    # Settle any queued counter edit so it can't land after the final one
+                    await cancel_live_edit(int(check["message_id"]))
                     ac_msg = await channel.fetch_message(int(check["message_id"]))
                     if ac_msg:
                         ac_embed = ac_msg.embeds[0] if ac_msg.embeds else None
@@ -18997,7 +20891,7 @@ class ActivityCheckControlView(discord.ui.View):
         except:
             pass
         
-        await interaction.response.send_message(embed=results_embed)
+        await interaction.followup.send(embed=results_embed)
     
     @discord.ui.button(label="📋 Export No-Shows", style=discord.ButtonStyle.secondary, custom_id="activity_check_export")
     async def export_noshows(self, interaction: discord.Interaction, button: discord.ui.Button):
@@ -19006,14 +20900,7 @@ class ActivityCheckControlView(discord.ui.View):
         
         await interaction.response.defer(ephemeral=True)
         
-        data = load_activity_checks()
-        check_id = self.check_id or data.get("current")
-        
-        check = None
-        for c in data["checks"]:
-            if c["id"] == check_id:
-                check = c
-                break
+        check = find_activity_check(interaction, self.check_id)
         
         if not check:
             return await interaction.followup.send("❌ Check not found!", ephemeral=True)
@@ -19021,7 +20908,7 @@ class ActivityCheckControlView(discord.ui.View):
         responses = set(check.get("responses", []))
         
         # Find who didn't respond (exclude bots and staff optionally)
-        all_members = [m for m in interaction.guild.members if not m.bot]
+        all_members = [m for m in await guild_members(interaction.guild) if not m.bot]
         not_responded = [m for m in all_members if str(m.id) not in responses]
         
         if not not_responded:
@@ -19146,10 +21033,14 @@ async def start_activity_check(ctx, duration: str = "1h", *, message: str = None
     save_activity_checks(data)
     
     # Staff controls
-    await ctx.send(
+    control_msg = await ctx.send(
         "**Staff Controls:**",
         view=ActivityCheckControlView()
     )
+    check = next((c for c in data["checks"] if c["id"] == check_id), None)
+    if check:
+        check["control_message_id"] = str(control_msg.id)
+        save_activity_checks(data)
     
     try:
         await ctx.message.delete()
@@ -19258,12 +21149,21 @@ async def check_member_participation(ctx, member: discord.Member):
 # ==========================================
 
 GIVEAWAY_FILE = "giveaways.json"
+GIVEAWAY_ENTRY_LOG = "giveaway_entries.log"   # Append-only "giveaway_id user_id" lines
+GIVEAWAY_EMBED_INTERVAL = 5                    # Min seconds between entry-counter edits
+GIVEAWAY_CHECK_INTERVAL = 30                   # How often ended giveaways are drawn
+GIVEAWAY_DURATIONS = {
+    "30m": 30, "1h": 60, "2h": 120, "3h": 180,
+    "6h": 360, "12h": 720, "24h": 1440, "48h": 2880, "7d": 10080
+}
 
 def load_giveaways():
     """Load giveaway data"""
     try:
         with open(GIVEAWAY_FILE, "r") as f:
-            return json.load(f)
+            data = json.load(f)
+            perf_record_store(GIVEAWAY_FILE, "load", f.tell())
+            return data
     except:
         return {"giveaways": [], "current": []}
 
@@ -19271,6 +21171,200 @@ def save_giveaways(data):
     """Save giveaway data"""
     with open(GIVEAWAY_FILE, "w") as f:
         json.dump(data, f, indent=2)
+        perf_record_store(GIVEAWAY_FILE, "save", f.tell())
+
+# --- GIVEAWAY ENGINE ---
+# Giveaways stay in memory, indexed by id and by message id. Entries are
+# per-giveaway dicts (ordered, O(1) membership) and each new entry is one
+# line appended to GIVEAWAY_ENTRY_LOG rather than a rewrite of giveaways.json.
+# The log is folded back into the JSON whenever the file is saved anyway.
+
+_giveaway_state = {
+    "data": None,         # giveaways.json contents (entries folded out)
+    "entries": {},        # giveaway_id -> {user_id: None}
+    "by_id": {},
+    "by_message": {},     # giveaway or control message id -> giveaway_id
+}
+
+def get_giveaway_state():
+    if _giveaway_state["data"] is None:
+        data = load_giveaways()
+        entries = {g["id"]: dict.fromkeys(g.get("entries", [])) for g in data["giveaways"]}
+        try:
+            with open(GIVEAWAY_ENTRY_LOG, "r") as f:
+                for line in f:
+                    giveaway_id, _, user_id = line.strip().partition(" ")
+                    if giveaway_id in entries and user_id:
+                        entries[giveaway_id][user_id] = None
+                perf_record_store(GIVEAWAY_ENTRY_LOG, "load", f.tell())
+        except FileNotFoundError:
+            pass
+        
+        _giveaway_state["data"] = data
+        _giveaway_state["entries"] = entries
+        _giveaway_state["by_id"] = {g["id"]: g for g in data["giveaways"]}
+        _giveaway_state["by_message"] = {}
+        for g in data["giveaways"]:
+            index_giveaway_messages(g)
+    return _giveaway_state
+
+def index_giveaway_messages(giveaway):
+    for key in ("message_id", "control_message_id"):
+        if giveaway.get(key):
+            _giveaway_state["by_message"][giveaway[key]] = giveaway["id"]
+
+def find_giveaway(giveaway_id=None, message_id=None):
+    """Look a giveaway up by id, or by its public/control message after a restart"""
+    state = get_giveaway_state()
+    if not giveaway_id and message_id:
+        giveaway_id = state["by_message"].get(str(message_id))
+    return state["by_id"].get(giveaway_id) if giveaway_id else None
+
+def get_giveaway_entries(giveaway_id):
+    return get_giveaway_state()["entries"].get(giveaway_id, {})
+
+def add_giveaway_entry(giveaway_id, user_id):
+    """Record an entry. Returns False if the user had already entered."""
+    entries = get_giveaway_state()["entries"].setdefault(giveaway_id, {})
+    user_id = str(user_id)
+    if user_id in entries:
+        return False
+    entries[user_id] = None
+    
+    line = f"{giveaway_id} {user_id}\n"
+    with open(GIVEAWAY_ENTRY_LOG, "a") as f:
+        f.write(line)
+    perf_record_store(GIVEAWAY_ENTRY_LOG, "save", len(line))
+    return True
+
+def save_giveaway_state():
+    """Fold logged entries into giveaways.json and start a fresh log"""
+    state = get_giveaway_state()
+    for g in state["data"]["giveaways"]:
+        g["entries"] = list(state["entries"].get(g["id"], {}))
+    save_giveaways(state["data"])
+    open(GIVEAWAY_ENTRY_LOG, "w").close()
+
+def register_giveaway(giveaway, current=False):
+    state = get_giveaway_state()
+    state["data"]["giveaways"].append(giveaway)
+    if current:
+        state["data"].setdefault("current", []).append(giveaway["id"])
+    state["by_id"][giveaway["id"]] = giveaway
+    state["entries"][giveaway["id"]] = dict.fromkeys(giveaway.get("entries", []))
+    index_giveaway_messages(giveaway)
+    save_giveaway_state()
+
+def queue_giveaway_counter_update(giveaway_id, message):
+    """Refresh the public entry counter at most once per GIVEAWAY_EMBED_INTERVAL"""
+    def counter_state():
+        giveaway = find_giveaway(giveaway_id)
+        if not giveaway or giveaway.get("ended") or not message.embeds:
+            return None
+        embed = message.embeds[0]
+        embed.set_footer(text=f"✝ {len(get_giveaway_entries(giveaway_id))} entries • ID: {giveaway_id} ✝")
+        return {"embed": embed}
+    
+    queue_live_edit(message, counter_state, interval=GIVEAWAY_EMBED_INTERVAL)
+
+async def close_giveaway(giveaway, cancelled=False):
+    """Mark a giveaway ended and draw its winners. Returns the winner ids."""
+    entries = list(get_giveaway_entries(giveaway["id"]))
+    winners = [] if cancelled else random.sample(entries, min(giveaway.get("winners", 1), len(entries)))
+    
+    giveaway["ended"] = True
+    giveaway["ended_at"] = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    if cancelled:
+        giveaway["cancelled"] = True
+    else:
+        giveaway["winner_ids"] = winners
+        giveaway["announced"] = False  # Set once the winners have been posted
+    
+    current = _giveaway_state["data"].get("current", [])
+    if giveaway["id"] in current:
+        current.remove(giveaway["id"])
+    
+    if giveaway.get("message_id"):
+        await cancel_live_edit(giveaway["message_id"])
+    save_giveaway_state()
+    return winners
+
+def giveaway_winner_embed(giveaway, winner_mentions):
+    winner_embed = discord.Embed(
+        title="🎉 GIVEAWAY ENDED!",
+        description=f"**Prize:** {giveaway.get('prize', 'Unknown')}\n\n**Winner(s):**\n" + "\n".join(winner_mentions),
+        color=0xffd700,
+        timestamp=datetime.datetime.now(datetime.timezone.utc)
+    )
+    winner_embed.add_field(name="Total Entries", value=str(len(get_giveaway_entries(giveaway["id"]))), inline=True)
+    winner_embed.set_footer(text="✝ The Fallen Giveaways ✝")
+    return winner_embed
+
+async def mark_giveaway_post_ended(guild, giveaway, winner_mentions):
+    """Grey out the original giveaway message and list the winners"""
+    try:
+        if giveaway.get("channel_id") and giveaway.get("message_id"):
+            channel = guild.get_channel(int(giveaway["channel_id"]))
+            if channel:
+                msg = await channel.fetch_message(int(giveaway["message_id"]))
+                embed = msg.embeds[0] if msg.embeds else None
+                if embed:
+                    embed.color = 0x95a5a6
+                    embed.title = "🎉 GIVEAWAY ENDED"
+                    embed.set_footer(text=f"✝ {len(get_giveaway_entries(giveaway['id']))} entries • ID: {giveaway['id']} ✝")
+                    embed.add_field(name="🏆 Winner(s)", value="\n".join(winner_mentions) or "No entries", inline=False)
+                    await msg.edit(embed=embed, view=None)
+    except:
+        pass
+
+async def announce_giveaway(channel, giveaway):
+    """Post the winners of an ended giveaway and record that it was announced"""
+    winner_mentions = [f"<@{w_id}>" for w_id in giveaway.get("winner_ids", [])]
+    if winner_mentions:
+        await channel.send(
+            f"🎉 Congratulations {', '.join(winner_mentions)}!",
+            embed=giveaway_winner_embed(giveaway, winner_mentions)
+        )
+    else:
+        await channel.send(f"🎉 The giveaway for **{giveaway.get('prize', 'Unknown')}** ended with no entries.")
+    giveaway["announced"] = True
+    save_giveaway_state()
+    await mark_giveaway_post_ended(channel.guild, giveaway, winner_mentions)
+
+async def giveaway_draw_loop():
+    """Draw giveaways once their ends_at passes and retry any unannounced results"""
+    await bot.wait_until_ready()
+    
+    while not bot.is_closed():
+        now = datetime.datetime.now(datetime.timezone.utc)
+        for giveaway in list(get_giveaway_state()["by_id"].values()):
+            if giveaway.get("ended"):
+                if giveaway.get("announced") is not False:
+                    continue  # Already posted, cancelled, or ended before announcements were tracked
+            elif not giveaway.get("ends_at") or datetime.datetime.fromisoformat(giveaway["ends_at"]) > now:
+                continue
+            
+            try:
+                channel = bot.get_channel(int(giveaway["channel_id"])) if giveaway.get("channel_id") else None
+                if channel is None and giveaway.get("channel_id"):
+                    try:
+                        channel = await bot.fetch_channel(int(giveaway["channel_id"]))
+                    except (discord.NotFound, discord.Forbidden):
+                        channel = None
+                
+                if not giveaway.get("ended"):
+                    await close_giveaway(giveaway)
+                if channel is None:
+                    print(f"Giveaway {giveaway['id']} ended but its channel is gone; winners: {giveaway.get('winner_ids', [])}")
+                    giveaway["announced"] = True
+                    save_giveaway_state()
+                    continue
+                
+                await announce_giveaway(channel, giveaway)
+            except Exception as e:
+                print(f"Giveaway draw error ({giveaway.get('id')}): {e}")
+        
+        await asyncio.sleep(GIVEAWAY_CHECK_INTERVAL)
 
 
 class GiveawayView(discord.ui.View):
@@ -19281,14 +21375,7 @@ class GiveawayView(discord.ui.View):
     
     @discord.ui.button(label="🎉 Enter Giveaway", style=discord.ButtonStyle.success, custom_id="giveaway_enter")
     async def enter_giveaway(self, interaction: discord.Interaction, button: discord.ui.Button):
-        data = load_giveaways()
-        
-        # Find giveaway
-        giveaway = None
-        for g in data["giveaways"]:
-            if g.get("message_id") == str(interaction.message.id) or g.get("id") == self.giveaway_id:
-                giveaway = g
-                break
+        giveaway = find_giveaway(message_id=interaction.message.id) or find_giveaway(self.giveaway_id)
         
         if not giveaway:
             return await interaction.response.send_message("❌ This giveaway has ended!", ephemeral=True)
@@ -19296,8 +21383,6 @@ class GiveawayView(discord.ui.View):
         if giveaway.get("ended"):
             return await interaction.response.send_message("❌ This giveaway has ended!", ephemeral=True)
         
-        user_id = str(interaction.user.id)
-        
         # Check requirements
         min_level = giveaway.get("min_level", 0)
         if min_level > 0:
@@ -19308,17 +21393,10 @@ class GiveawayView(discord.ui.View):
                     ephemeral=True
                 )
         
-        # Check if already entered
-        if user_id in giveaway.get("entries", []):
+        if not add_giveaway_entry(giveaway["id"], interaction.user.id):
             return await interaction.response.send_message("✅ You're already entered!", ephemeral=True)
         
-        # Add entry
-        if "entries" not in giveaway:
-            giveaway["entries"] = []
-        giveaway["entries"].append(user_id)
-        save_giveaways(data)
-        
-        entry_count = len(giveaway["entries"])
+        entry_count = len(get_giveaway_entries(giveaway["id"]))
         
         await interaction.response.send_message(
             f"🎉 **You're in!**\n"
@@ -19327,14 +21405,8 @@ class GiveawayView(discord.ui.View):
             ephemeral=True
         )
         
-        # Update embed with entry count
-        try:
-            embed = interaction.message.embeds[0]
-            # Update footer with entry count
-            embed.set_footer(text=f"✝ {entry_count} entries • ID: {giveaway['id']} ✝")
-            await interaction.message.edit(embed=embed)
-        except:
-            pass
+        # Update embed with entry count (debounced)
+        queue_giveaway_counter_update(giveaway["id"], interaction.message)
 
 
 class GiveawayControlView(discord.ui.View):
@@ -19343,34 +21415,28 @@ class GiveawayControlView(discord.ui.View):
         super().__init__(timeout=None)
         self.giveaway_id = giveaway_id
     
+    def get_giveaway(self, interaction):
+        # After a restart the view has no id - fall back to the control message
+        return find_giveaway(self.giveaway_id) or find_giveaway(message_id=interaction.message.id if interaction.message else None)
+    
     @discord.ui.button(label="🏆 Draw Winner", style=discord.ButtonStyle.success, custom_id="giveaway_draw")
     async def draw_winner(self, interaction: discord.Interaction, button: discord.ui.Button):
         if not is_staff(interaction.user):
             return await interaction.response.send_message("❌ Staff only!", ephemeral=True)
         
-        data = load_giveaways()
-        
-        giveaway = None
-        for g in data["giveaways"]:
-            if g.get("id") == self.giveaway_id:
-                giveaway = g
-                break
+        giveaway = self.get_giveaway(interaction)
         
         if not giveaway:
             return await interaction.response.send_message("❌ Giveaway not found!", ephemeral=True)
         
-        entries = giveaway.get("entries", [])
-        if not entries:
-            return await interaction.response.send_message("❌ No entries yet!", ephemeral=True)
+        if giveaway.get("ended"):
+            return await interaction.response.send_message("❌ This giveaway has already ended!", ephemeral=True)
         
-        # Draw winners
-        num_winners = giveaway.get("winners", 1)
-        winners = random.sample(entries, min(num_winners, len(entries)))
+        if not get_giveaway_entries(giveaway["id"]):
+            return await interaction.response.send_message("❌ No entries yet!", ephemeral=True)
         
-        giveaway["ended"] = True
-        giveaway["ended_at"] = datetime.datetime.now(datetime.timezone.utc).isoformat()
-        giveaway["winner_ids"] = winners
-        save_giveaways(data)
+        # Draw winners
+        winners = await close_giveaway(giveaway)
         
         # Build winner mentions
         winner_mentions = []
@@ -19381,58 +21447,30 @@ class GiveawayControlView(discord.ui.View):
             else:
                 winner_mentions.append(f"<@{w_id}>")
         
-        # Create winner embed
-        winner_embed = discord.Embed(
-            title="🎉 GIVEAWAY ENDED!",
-            description=f"**Prize:** {giveaway.get('prize', 'Unknown')}\n\n**Winner(s):**\n" + "\n".join(winner_mentions),
-            color=0xffd700,
-            timestamp=datetime.datetime.now(datetime.timezone.utc)
-        )
-        winner_embed.add_field(name="Total Entries", value=str(len(entries)), inline=True)
-        winner_embed.set_footer(text="✝ The Fallen Giveaways ✝")
-        
         await interaction.response.send_message(
             f"🎉 Congratulations {', '.join(winner_mentions)}!",
-            embed=winner_embed
+            embed=giveaway_winner_embed(giveaway, winner_mentions)
         )
+        giveaway["announced"] = True
+        save_giveaway_state()
         
         # Update original giveaway message
-        try:
-            # Find the giveaway message
-            if giveaway.get("channel_id") and giveaway.get("message_id"):
-                channel = interaction.guild.get_channel(int(giveaway["channel_id"]))
-                if channel:
-                    msg = await channel.fetch_message(int(giveaway["message_id"]))
-                    embed = msg.embeds[0] if msg.embeds else None
-                    if embed:
-                        embed.color = 0x95a5a6
-                        embed.title = "🎉 GIVEAWAY ENDED"
-                        embed.add_field(name="🏆 Winner(s)", value="\n".join(winner_mentions), inline=False)
-                        await msg.edit(embed=embed, view=None)
-        except:
-            pass
+        await mark_giveaway_post_ended(interaction.guild, giveaway, winner_mentions)
     
     @discord.ui.button(label="🔄 Reroll", style=discord.ButtonStyle.primary, custom_id="giveaway_reroll")
     async def reroll(self, interaction: discord.Interaction, button: discord.ui.Button):
         if not is_staff(interaction.user):
             return await interaction.response.send_message("❌ Staff only!", ephemeral=True)
         
-        data = load_giveaways()
-        
-        giveaway = None
-        for g in data["giveaways"]:
-            if g.get("id") == self.giveaway_id:
-                giveaway = g
-                break
+        giveaway = self.get_giveaway(interaction)
         
         if not giveaway:
             return await interaction.response.send_message("❌ Giveaway not found!", ephemeral=True)
         
-        entries = giveaway.get("entries", [])
-        previous_winners = giveaway.get("winner_ids", [])
+        previous_winners = set(giveaway.get("winner_ids", []))
         
         # Remove previous winners from pool
-        available = [e for e in entries if e not in previous_winners]
+        available = [e for e in get_giveaway_entries(giveaway["id"]) if e not in previous_winners]
         
         if not available:
             return await interaction.response.send_message("❌ No more entries to reroll from!", ephemeral=True)
@@ -19441,8 +21479,8 @@ class GiveawayControlView(discord.ui.View):
         new_winner = random.choice(available)
         member = interaction.guild.get_member(int(new_winner))
         
-        giveaway["winner_ids"].append(new_winner)
-        save_giveaways(data)
+        giveaway.setdefault("winner_ids", []).append(new_winner)
+        save_giveaway_state()
         
         await interaction.response.send_message(
             f"🔄 **Reroll Winner:** {member.mention if member else f'<@{new_winner}>'}\n"
@@ -19454,18 +21492,12 @@ class GiveawayControlView(discord.ui.View):
         if not is_staff(interaction.user):
             return await interaction.response.send_message("❌ Staff only!", ephemeral=True)
         
-        data = load_giveaways()
-        
-        giveaway = None
-        for g in data["giveaways"]:
-            if g.get("id") == self.giveaway_id:
-                giveaway = g
-                break
+        giveaway = self.get_giveaway(interaction)
         
         if not giveaway:
             return await interaction.response.send_message("❌ Giveaway not found!", ephemeral=True)
         
-        entries = giveaway.get("entries", [])
+        entries = list(get_giveaway_entries(giveaway["id"]))
         
         embed = discord.Embed(
             title=f"📊 Giveaway Entries",
@@ -19489,15 +21521,9 @@ class GiveawayControlView(discord.ui.View):
         if not is_staff(interaction.user):
             return await interaction.response.send_message("❌ Staff only!", ephemeral=True)
         
-        data = load_giveaways()
-        
-        for g in data["giveaways"]:
-            if g.get("id") == self.giveaway_id:
-                g["ended"] = True
-                g["cancelled"] = True
-                break
-        
-        save_giveaways(data)
+        giveaway = self.get_giveaway(interaction)
+        if giveaway and not giveaway.get("ended"):
+            await close_giveaway(giveaway, cancelled=True)
         
         await interaction.response.send_message("🗑️ Giveaway cancelled!", ephemeral=True)
         
@@ -19509,6 +21535,25 @@ class GiveawayControlView(discord.ui.View):
             pass
 
 
+async def post_giveaway(ctx, giveaway_data, embed, current=False):
+    """Send the public giveaway post and its staff controls, then index both"""
+    msg = await ctx.send(embed=embed, view=GiveawayView(giveaway_data["id"]))
+    giveaway_data["message_id"] = str(msg.id)
+    
+    controls = await ctx.send(
+        embed=discord.Embed(
+            title="🔧 Giveaway Controls",
+            description=f"Controls for giveaway `{giveaway_data['id']}`",
+            color=0x3498db
+        ),
+        view=GiveawayControlView(giveaway_data["id"])
+    )
+    giveaway_data["control_message_id"] = str(controls.id)
+    
+    register_giveaway(giveaway_data, current=current)
+    await ctx.message.delete()
+
+
 @bot.command(name="giveaway")
 @commands.has_any_role(*HIGH_STAFF_ROLES, STAFF_ROLE_NAME)
 async def start_giveaway(ctx, duration: str, winners: int, *, prize: str):
@@ -19518,21 +21563,13 @@ async def start_giveaway(ctx, duration: str, winners: int, *, prize: str):
     Example: !giveaway 1h 1 500 Coins
     Example: !giveaway 24h 3 Nitro Classic
     """
-    # Parse duration
-    duration_map = {
-        "30m": 30, "1h": 60, "2h": 120, "3h": 180,
-        "6h": 360, "12h": 720, "24h": 1440, "48h": 2880, "7d": 10080
-    }
-    
-    minutes = duration_map.get(duration.lower())
+    minutes = GIVEAWAY_DURATIONS.get(duration.lower())
     if not minutes:
         return await ctx.send("❌ Invalid duration! Use: 30m, 1h, 2h, 3h, 6h, 12h, 24h, 48h, 7d")
     
     if winners < 1 or winners > 10:
         return await ctx.send("❌ Winners must be between 1 and 10!")
     
-    data = load_giveaways()
-    
     # Create giveaway
     giveaway_id = f"gw_{int(datetime.datetime.now().timestamp())}"
     end_time = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(minutes=minutes)
@@ -19565,24 +21602,7 @@ async def start_giveaway(ctx, duration: str, winners: int, *, prize: str):
     )
     embed.set_footer(text=f"✝ 0 entries • ID: {giveaway_id} ✝")
     
-    # Send giveaway message
-    msg = await ctx.send(embed=embed, view=GiveawayView(giveaway_id))
-    
-    # Update with message ID
-    giveaway_data["message_id"] = str(msg.id)
-    data["giveaways"].append(giveaway_data)
-    data["current"].append(giveaway_id)
-    save_giveaways(data)
-    
-    # Send staff controls (ephemeral-like, in same channel)
-    staff_embed = discord.Embed(
-        title="🔧 Giveaway Controls",
-        description=f"Controls for giveaway `{giveaway_id}`",
-        color=0x3498db
-    )
-    await ctx.send(embed=staff_embed, view=GiveawayControlView(giveaway_id))
-    
-    await ctx.message.delete()
+    await post_giveaway(ctx, giveaway_data, embed, current=True)
 
 
 @bot.command(name="giveaway_req")
@@ -19593,17 +21613,10 @@ async def giveaway_with_requirements(ctx, duration: str, winners: int, min_level
     Usage: !giveaway_req <duration> <winners> <min_level> <prize>
     Example: !giveaway_req 24h 1 10 VIP Role
     """
-    duration_map = {
-        "30m": 30, "1h": 60, "2h": 120, "3h": 180,
-        "6h": 360, "12h": 720, "24h": 1440, "48h": 2880, "7d": 10080
-    }
-    
-    minutes = duration_map.get(duration.lower())
+    minutes = GIVEAWAY_DURATIONS.get(duration.lower())
     if not minutes:
         return await ctx.send("❌ Invalid duration!")
     
-    data = load_giveaways()
-    
     giveaway_id = f"gw_{int(datetime.datetime.now().timestamp())}"
     end_time = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(minutes=minutes)
     
@@ -19634,17 +21647,7 @@ async def giveaway_with_requirements(ctx, duration: str, winners: int, min_level
     )
     embed.set_footer(text=f"✝ 0 entries • ID: {giveaway_id} ✝")
     
-    msg = await ctx.send(embed=embed, view=GiveawayView(giveaway_id))
-    
-    giveaway_data["message_id"] = str(msg.id)
-    data["giveaways"].append(giveaway_data)
-    save_giveaways(data)
-    
-    await ctx.send(
-        embed=discord.Embed(title="🔧 Controls", color=0x3498db),
-        view=GiveawayControlView(giveaway_id)
-    )
-    await ctx.message.delete()
+    await post_giveaway(ctx, giveaway_data, embed)
 
 
 # ==========================================
@@ -19687,6 +21690,8 @@ class AttendanceLoggingView(discord.ui.View):
         if not is_staff(interaction.user):
             return await interaction.response.send_message("❌ Staff only!", ephemeral=True)
         
+        await interaction.response.defer(ephemeral=True)
+        
         # Show today's logging stats
         embed = discord.Embed(
             title="📊 Attendance Quick Stats",
@@ -19694,7 +21699,7 @@ class AttendanceLoggingView(discord.ui.View):
         )
         
         # Get global stats
-        total_members = len([m for m in interaction.guild.members if not m.bot])
+        total_members = interaction.guild.member_count - (await get_presence_counts(interaction.guild))["bots"]
         
         embed.add_field(name="👥 Total Members", value=str(total_members), inline=True)
         embed.add_field(name="📚 Training Reward", value="100 coins + 50 XP", inline=True)
@@ -19709,7 +21714,7 @@ class AttendanceLoggingView(discord.ui.View):
         
         embed.set_footer(text="Use the buttons above to log attendance!")
         
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+        await interaction.followup.send(embed=embed, ephemeral=True)
 
 
 class AttendanceMemberSelectView(discord.ui.View):
@@ -19797,23 +21802,13 @@ async def process_attendance_batch(interaction, members: list, event_type: str,
             if m.bot:
                 continue
                 
-            # Add rewards
-            add_user_stat(m.id, "coins", rewards["coins"])
-            add_xp_to_user(m.id, rewards["xp"])
-            
-            if event_type == "training":
-                add_user_stat(m.id, "training_attendance", 1)
-            else:
-                add_user_stat(m.id, "tryout_attendance", 1)
-            
-            # Reset activity
-            reset_member_activity(m.id)
-            
-            # Update streak
-            streak = update_attendance_streak(m.id)
-            bonus = get_streak_bonus(streak)
+            # Rewards, attendance count and streak bonus in one ledger entry
+            stat = "training_attendance" if event_type == "training" else "tryout_attendance"
+            result = award_attendance(m.id, stat, rewards, f"{event_type}:{interaction.id}:{m.id}")
+            if result is None:
+                continue
+            streak, bonus = result
             if bonus > 0:
-                add_user_stat(m.id, "coins", bonus)
                 if len(streak_bonuses) < 5:
                     streak_bonuses.append(f"🔥 {m.display_name}: {streak} streak (+{bonus})")
             
@@ -19844,11 +21839,7 @@ async def process_attendance_batch(interaction, members: list, event_type: str,
             await asyncio.sleep(1)  # 1 second between batches
     
     # Host rewards
-    host_rewards = ATTENDANCE_REWARDS["host"]
-    add_user_stat(host.id, "coins", host_rewards["coins"])
-    add_xp_to_user(host.id, host_rewards["xp"])
-    add_user_stat(host.id, "events_hosted", 1)
-    reset_member_activity(host.id)
+    host_rewards = award_host(host.id, f"host:{interaction.id}")
     
     # Build result embed
     attendee_names = [m.display_name for m in members[:15] if not m.bot]
@@ -19953,7 +21944,7 @@ class StaffQuickActionsView(discord.ui.View):
         threshold_days = 3  # Default
         now = datetime.datetime.now(datetime.timezone.utc)
         
-        for member in interaction.guild.members:
+        for member in await guild_members(interaction.guild):
             if member.bot:
                 continue
             
@@ -20037,28 +22028,14 @@ class QuickWarnModal(discord.ui.Modal, title="⚠️ Quick Warn"):
     async def on_submit(self, interaction: discord.Interaction):
         # Parse user
         user_input = self.user_id.value.strip()
-        member = None
         
-        # Try as ID
-        if user_input.isdigit():
-            member = interaction.guild.get_member(int(user_input))
-        
-        # Try as mention
-        if not member and user_input.startswith("<@"):
-            try:
-                uid = int(user_input.replace("<@", "").replace(">", "").replace("!", ""))
-                member = interaction.guild.get_member(uid)
-            except:
-                pass
+        await interaction.response.defer(ephemeral=True)
         
-        # Try as username
-        if not member:
-            member = discord.utils.get(interaction.guild.members, name=user_input)
-            if not member:
-                member = discord.utils.get(interaction.guild.members, display_name=user_input)
+        # ID, mention, username or display name
+        member = await resolve_member(interaction.guild, user_input)
         
         if not member:
-            return await interaction.response.send_message("❌ User not found!", ephemeral=True)
+            return await interaction.followup.send("❌ User not found!", ephemeral=True)
         
         # Add warning
         user_data = get_user_data(member.id)
@@ -20090,7 +22067,7 @@ class QuickWarnModal(discord.ui.Modal, title="⚠️ Quick Warn"):
         # Check thresholds
         await check_warning_thresholds(interaction.guild, member, len(warnings))
         
-        await interaction.response.send_message(
+        await interaction.followup.send(
             f"✅ Warned **{member.display_name}** (Warning #{len(warnings)})",
             ephemeral=True
         )
@@ -20106,17 +22083,11 @@ class QuickPromoteModal(discord.ui.Modal, title="📈 Quick Promote"):
     
     async def on_submit(self, interaction: discord.Interaction):
         user_input = self.user_id.value.strip()
-        member = None
-        
-        if user_input.isdigit():
-            member = interaction.guild.get_member(int(user_input))
-        if not member:
-            member = discord.utils.get(interaction.guild.members, name=user_input)
-        if not member:
-            member = discord.utils.get(interaction.guild.members, display_name=user_input)
+        await interaction.response.defer(ephemeral=True)
+        member = await resolve_member(interaction.guild, user_input)
         
         if not member:
-            return await interaction.response.send_message("❌ User not found!", ephemeral=True)
+            return await interaction.followup.send("❌ User not found!", ephemeral=True)
         
         # Find current stage and promote
         current_stage = None
@@ -20127,10 +22098,10 @@ class QuickPromoteModal(discord.ui.Modal, title="📈 Quick Promote"):
                     break
         
         if current_stage is None:
-            return await interaction.response.send_message("❌ User has no stage role!", ephemeral=True)
+            return await interaction.followup.send("❌ User has no stage role!", ephemeral=True)
         
         if current_stage <= 0:
-            return await interaction.response.send_message("❌ User is already at max stage!", ephemeral=True)
+            return await interaction.followup.send("❌ User is already at max stage!", ephemeral=True)
         
         new_stage = current_stage - 1
         old_role_name = STAGE_ROLES.get(current_stage)
@@ -20147,7 +22118,7 @@ class QuickPromoteModal(discord.ui.Modal, title="📈 Quick Promote"):
         
         await log_mod_action(interaction.guild, "Promote", member, f"Stage {current_stage} → Stage {new_stage}", interaction.user)
         
-        await interaction.response.send_message(
+        await interaction.followup.send(
             f"✅ Promoted **{member.display_name}** to Stage {new_stage}!",
             ephemeral=True
         )
@@ -20163,17 +22134,11 @@ class QuickDemoteModal(discord.ui.Modal, title="📉 Quick Demote"):
     
     async def on_submit(self, interaction: discord.Interaction):
         user_input = self.user_id.value.strip()
-        member = None
-        
-        if user_input.isdigit():
-            member = interaction.guild.get_member(int(user_input))
-        if not member:
-            member = discord.utils.get(interaction.guild.members, name=user_input)
-        if not member:
-            member = discord.utils.get(interaction.guild.members, display_name=user_input)
+        await interaction.response.defer(ephemeral=True)
+        member = await resolve_member(interaction.guild, user_input)
         
         if not member:
-            return await interaction.response.send_message("❌ User not found!", ephemeral=True)
+            return await interaction.followup.send("❌ User not found!", ephemeral=True)
         
         # Find current stage and demote
         current_stage = None
@@ -20184,10 +22149,10 @@ class QuickDemoteModal(discord.ui.Modal, title="📉 Quick Demote"):
                     break
         
         if current_stage is None:
-            return await interaction.response.send_message("❌ User has no stage role!", ephemeral=True)
+            return await interaction.followup.send("❌ User has no stage role!", ephemeral=True)
         
         if current_stage >= 5:
-            return await interaction.response.send_message("❌ User is already at lowest stage!", ephemeral=True)
+            return await interaction.followup.send("❌ User is already at lowest stage!", ephemeral=True)
         
         new_stage = current_stage + 1
         old_role_name = STAGE_ROLES.get(current_stage)
@@ -20204,7 +22169,7 @@ class QuickDemoteModal(discord.ui.Modal, title="📉 Quick Demote"):
         
         await log_mod_action(interaction.guild, "Demote", member, f"Stage {current_stage} → Stage {new_stage}", interaction.user)
         
-        await interaction.response.send_message(
+        await interaction.followup.send(
             f"✅ Demoted **{member.display_name}** to Stage {new_stage}",
             ephemeral=True
         )
@@ -20220,17 +22185,11 @@ class CheckStatsModal(discord.ui.Modal, title="📊 Check Member Stats"):
     
     async def on_submit(self, interaction: discord.Interaction):
         user_input = self.user_id.value.strip()
-        member = None
-        
-        if user_input.isdigit():
-            member = interaction.guild.get_member(int(user_input))
-        if not member:
-            member = discord.utils.get(interaction.guild.members, name=user_input)
-        if not member:
-            member = discord.utils.get(interaction.guild.members, display_name=user_input)
+        await interaction.response.defer(ephemeral=True)
+        member = await resolve_member(interaction.guild, user_input)
         
         if not member:
-            return await interaction.response.send_message("❌ User not found!", ephemeral=True)
+            return await interaction.followup.send("❌ User not found!", ephemeral=True)
         
         user_data = get_user_data(member.id)
         
@@ -20268,7 +22227,7 @@ class CheckStatsModal(discord.ui.Modal, title="📊 Check Member Stats"):
         
         embed.set_thumbnail(url=member.display_avatar.url)
         
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+        await interaction.followup.send(embed=embed, ephemeral=True)
 
 
 @bot.command(name="setup_staffpanel")
@@ -20346,46 +22305,148 @@ APPLICATION_TEMPLATES = {
 }
 
 # Store applications
+# Three segments: active applications and cooldowns in APPLICATIONS_FILE,
+# archived applications appended as JSON lines to APPLICATIONS_ARCHIVE_FILE
+# (never loaded by the bot). The active segment stays in memory with an
+# id index, and a min-heap of cooldown ends lets the sweep drop expired
+# cooldowns without scanning. application_maintenance_loop archives old
+# applications and prunes cooldowns on a timer.
 APPLICATIONS_FILE = "applications_data.json"
+APPLICATIONS_ARCHIVE_FILE = "applications_archive.log"
+APPLICATION_ARCHIVE_DAYS = 30          # Applications older than this are archived automatically
+APPLICATION_MAINTENANCE_INTERVAL = 3600
+
+_applications = {
+    "data": None,           # {"applications": [...], "cooldowns": {key: iso}}
+    "by_id": {},
+    "cooldown_ends": {},    # "<user_id>_<app_type>" -> end timestamp
+    "cooldown_heap": [],    # (end timestamp, key)
+}
 
-def load_applications():
+def _application_time(value):
     try:
-        with open(APPLICATIONS_FILE, "r") as f:
-            return json.load(f)
+        return datetime.datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
     except:
-        return {"applications": [], "cooldowns": {}, "archived": []}
+        return 0
+
+def load_applications():
+    if _applications["data"] is None:
+        try:
+            with open(APPLICATIONS_FILE, "r") as f:
+                data = json.load(f)
+                perf_record_store(APPLICATIONS_FILE, "load", f.tell())
+        except:
+            data = {"applications": [], "cooldowns": {}}
+        data.setdefault("cooldowns", {})
+        
+        # Older files kept the archive inline - move it to its own segment once
+        legacy_archive = data.pop("archived", None)
+        _applications["data"] = data
+        if legacy_archive:
+            append_archived_applications(legacy_archive)
+            save_applications(data)
+        
+        _applications["by_id"] = {app["id"]: app for app in data["applications"]}
+        ends = {key: _application_time(value) for key, value in data["cooldowns"].items()}
+        _applications["cooldown_ends"] = ends
+        heap = [(end, key) for key, end in ends.items()]
+        heapq.heapify(heap)
+        _applications["cooldown_heap"] = heap
+    return _applications["data"]
 
 def save_applications(data):
     with open(APPLICATIONS_FILE, "w") as f:
         json.dump(data, f, indent=2)
+        perf_record_store(APPLICATIONS_FILE, "save", f.tell())
+
+def get_application(app_id):
+    load_applications()
+    return _applications["by_id"].get(app_id)
+
+def add_application(application):
+    data = load_applications()
+    data["applications"].append(application)
+    _applications["by_id"][application["id"]] = application
+    save_applications(data)
+
+def append_archived_applications(apps):
+    lines = "".join(json.dumps(app) + "\n" for app in apps)
+    with open(APPLICATIONS_ARCHIVE_FILE, "a") as f:
+        f.write(lines)
+    perf_record_store(APPLICATIONS_ARCHIVE_FILE, "save", len(lines))
+
+def archive_applications(should_archive, archived_by="auto"):
+    """Move every active application matching `should_archive` to the archive in one pass"""
+    data = load_applications()
+    now = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    keep, archived = [], []
+    for app in data["applications"]:
+        (archived if should_archive(app) else keep).append(app)
+    if not archived:
+        return 0
+    
+    for app in archived:
+        app["archived_at"] = now
+        app["archived_by"] = archived_by
+        _applications["by_id"].pop(app["id"], None)
+    append_archived_applications(archived)
+    data["applications"] = keep
+    save_applications(data)
+    return len(archived)
+
+def archive_old_applications_before(days):
+    """Archive applications submitted `days` or more days ago"""
+    cutoff = (datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=days)).timestamp()
+    return archive_applications(lambda app: 0 < _application_time(app.get("submitted_at", "")) <= cutoff)
+
+def prune_application_cooldowns(now=None):
+    """Drop cooldowns that have ended. Only pops what's due."""
+    data = load_applications()
+    now = now or time.time()
+    heap, ends = _applications["cooldown_heap"], _applications["cooldown_ends"]
+    removed = 0
+    while heap and heap[0][0] <= now:
+        end, key = heapq.heappop(heap)
+        if ends.get(key) == end:  # Skip entries superseded by a newer cooldown
+            del ends[key]
+            data["cooldowns"].pop(key, None)
+            removed += 1
+    if removed:
+        save_applications(data)
+    return removed
 
 def check_application_cooldown(user_id, app_type):
     """Check if user is on cooldown for an application type"""
-    data = load_applications()
-    cooldowns = data.get("cooldowns", {})
-    
-    key = f"{user_id}_{app_type}"
-    if key in cooldowns:
-        try:
-            cooldown_end = datetime.datetime.fromisoformat(cooldowns[key].replace('Z', '+00:00'))
-            if datetime.datetime.now(datetime.timezone.utc) < cooldown_end:
-                return True, cooldown_end
-        except:
-            pass
-    
+    load_applications()
+    end = _applications["cooldown_ends"].get(f"{user_id}_{app_type}")
+    if end and time.time() < end:
+        return True, datetime.datetime.fromtimestamp(end, datetime.timezone.utc)
     return False, None
 
 def set_application_cooldown(user_id, app_type, days):
     """Set cooldown for user's application type"""
     data = load_applications()
-    if "cooldowns" not in data:
-        data["cooldowns"] = {}
-    
     key = f"{user_id}_{app_type}"
     cooldown_end = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(days=days)
     data["cooldowns"][key] = cooldown_end.isoformat()
+    _applications["cooldown_ends"][key] = cooldown_end.timestamp()
+    heapq.heappush(_applications["cooldown_heap"], (cooldown_end.timestamp(), key))
     save_applications(data)
 
+async def application_maintenance_loop():
+    """Archive old applications and drop expired cooldowns"""
+    await bot.wait_until_ready()
+    
+    while not bot.is_closed():
+        try:
+            archived = archive_old_applications_before(APPLICATION_ARCHIVE_DAYS)
+            if archived:
+                print(f"📦 Archived {archived} applications older than {APPLICATION_ARCHIVE_DAYS} days")
+            prune_application_cooldowns()
+        except Exception as e:
+            print(f"Application maintenance error: {e}")
+        
+        await asyncio.sleep(APPLICATION_MAINTENANCE_INTERVAL)
 
 class ApplicationPanelView(discord.ui.View):
     """Panel for submitting applications"""
@@ -20455,7 +22516,6 @@ class ApplicationModal(discord.ui.Modal):
                 answers[self.template["questions"][i]] = child.value
         
         # Save application
-        data = load_applications()
         app_id = f"app_{int(datetime.datetime.now().timestamp())}"
         
         application = {
@@ -20470,8 +22530,7 @@ class ApplicationModal(discord.ui.Modal):
             "review_notes": None
         }
         
-        data["applications"].append(application)
-        save_applications(data)
+        add_application(application)
         
         # Set cooldown
         set_application_cooldown(interaction.user.id, self.app_type, self.template.get("cooldown_days", 7))
@@ -20524,12 +22583,10 @@ class ApplicationModal(discord.ui.Modal):
             )
             
             # Update application with channel ID
-            data = load_applications()
-            for app in data["applications"]:
-                if app["id"] == application["id"]:
-                    app["channel_id"] = channel.id
-                    break
-            save_applications(data)
+            app = get_application(application["id"])
+            if app:
+                app["channel_id"] = channel.id
+                save_applications(load_applications())
             
             # Create embed
             embed = discord.Embed(
@@ -20609,24 +22666,16 @@ class ApplicationReviewView(discord.ui.View):
         await self.archive_application(interaction)
     
     async def review_application(self, interaction: discord.Interaction, status: str, notes: str = None):
-        data = load_applications()
-        
-        # Find and update application
-        app = None
-        for a in data["applications"]:
-            if a["id"] == self.app_id:
-                app = a
-                a["status"] = status
-                a["reviewed_by"] = str(interaction.user.id)
-                a["reviewed_at"] = datetime.datetime.now(datetime.timezone.utc).isoformat()
-                if notes:
-                    a["review_notes"] = notes
-                break
-        
+        app = get_application(self.app_id)
         if not app:
             return await interaction.response.send_message("❌ Application not found!", ephemeral=True)
         
-        save_applications(data)
+        app["status"] = status
+        app["reviewed_by"] = str(interaction.user.id)
+        app["reviewed_at"] = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        if notes:
+            app["review_notes"] = notes
+        save_applications(load_applications())
         
         # Notify applicant
         applicant = interaction.guild.get_member(int(app["user_id"]))
@@ -20669,18 +22718,7 @@ class ApplicationReviewView(discord.ui.View):
         await interaction.response.send_message(f"✅ Application {status}!", ephemeral=True)
     
     async def archive_application(self, interaction: discord.Interaction):
-        data = load_applications()
-        
-        # Find and move to archive
-        for i, app in enumerate(data["applications"]):
-            if app["id"] == self.app_id:
-                app["archived_at"] = datetime.datetime.now(datetime.timezone.utc).isoformat()
-                app["archived_by"] = str(interaction.user.id)
-                data["archived"].append(app)
-                data["applications"].pop(i)
-                break
-        
-        save_applications(data)
+        archive_applications(lambda app: app["id"] == self.app_id, archived_by=str(interaction.user.id))
         
         # Update message
         embed = interaction.message.embeds[0] if interaction.message.embeds else None
@@ -20706,22 +22744,15 @@ class ApplicationDenyModal(discord.ui.Modal, title="Deny Application"):
         self.app_id = app_id
     
     async def on_submit(self, interaction: discord.Interaction):
-        data = load_applications()
-        
-        app = None
-        for a in data["applications"]:
-            if a["id"] == self.app_id:
-                app = a
-                a["status"] = "denied"
-                a["reviewed_by"] = str(interaction.user.id)
-                a["reviewed_at"] = datetime.datetime.now(datetime.timezone.utc).isoformat()
-                a["review_notes"] = self.reason.value
-                break
-        
+        app = get_application(self.app_id)
         if not app:
             return await interaction.response.send_message("❌ Application not found!", ephemeral=True)
         
-        save_applications(data)
+        app["status"] = "denied"
+        app["reviewed_by"] = str(interaction.user.id)
+        app["reviewed_at"] = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        app["review_notes"] = self.reason.value
+        save_applications(load_applications())
         
         # Notify applicant
         applicant = interaction.guild.get_member(int(app["user_id"]))
@@ -20783,28 +22814,8 @@ async def setup_applications_panel(ctx):
 @bot.command(name="archive_old_apps")
 @commands.has_any_role(*HIGH_STAFF_ROLES)
 async def archive_old_applications(ctx, days: int = 30):
-    """Archive applications older than X days"""
-    data = load_applications()
-    now = datetime.datetime.now(datetime.timezone.utc)
-    archived_count = 0
-    
-    apps_to_archive = []
-    for app in data["applications"]:
-        try:
-            submitted = datetime.datetime.fromisoformat(app["submitted_at"].replace('Z', '+00:00'))
-            if (now - submitted).days >= days:
-                apps_to_archive.append(app)
-        except:
-            pass
-    
-    for app in apps_to_archive:
-        app["archived_at"] = now.isoformat()
-        app["archived_by"] = "auto"
-        data["archived"].append(app)
-        data["applications"].remove(app)
-        archived_count += 1
-    
-    save_applications(data)
+    """Archive applications older than X days (also runs automatically every hour)"""
+    archived_count = archive_old_applications_before(days)
     
     await ctx.send(f"📦 Archived {archived_count} applications older than {days} days.")
 
@@ -20874,18 +22885,66 @@ async def setup_mod_log(ctx):
 
 COMMAND_PERMS_FILE = "command_permissions.json"
 
+# command_permissions.json is loaded once. Per guild, each command compiles
+# to one frozenset of role ids (its custom roles plus the staff and high staff
+# roles, resolved by name), so a permission check is a single isdisjoint()
+# against the member's roles. Tables are rebuilt after !cmdperms changes and
+# when a guild's roles are created, renamed or deleted. Each guild partition
+# keeps its own command_permissions.json.
+def _command_perms():
+    return guild_state("command_perms", lambda: {
+        "data": None,
+        "tables": {},   # guild_id -> {"staff": ids, "custom": {cmd: ids}, "allowed": {cmd: staff | custom}}
+    })
+
 def load_command_perms():
     """Load custom command permissions"""
-    try:
-        with open(COMMAND_PERMS_FILE, "r") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return {"commands": {}}
+    perms = _command_perms()
+    if perms["data"] is None:
+        try:
+            with open(guild_path(COMMAND_PERMS_FILE), "r") as f:
+                perms["data"] = json.load(f)
+                perf_record_store(COMMAND_PERMS_FILE, "load", f.tell())
+        except FileNotFoundError:
+            perms["data"] = {"commands": {}}
+    return perms["data"]
 
 def save_command_perms(data):
     """Save custom command permissions"""
-    with open(COMMAND_PERMS_FILE, "w") as f:
+    perms = _command_perms()
+    perms["data"] = data
+    perms["tables"].clear()
+    with open(guild_path(COMMAND_PERMS_FILE), "w") as f:
         json.dump(data, f, indent=2)
+        perf_record_store(COMMAND_PERMS_FILE, "save", f.tell())
+
+def get_command_perm_table(guild):
+    """Role-id frozensets for a guild's staff roles and customised commands, compiled on first use"""
+    tables = _command_perms()["tables"]
+    table = tables.get(guild.id)
+    if table is None:
+        staff_names = {STAFF_ROLE_NAME, *HIGH_STAFF_ROLES}
+        staff = frozenset(role.id for role in guild.roles if role.name in staff_names)
+        custom = {cmd: frozenset(role_ids) for cmd, role_ids in load_command_perms().get("commands", {}).items()}
+        table = tables[guild.id] = {
+            "staff": staff,
+            "custom": custom,
+            "allowed": {cmd: staff | role_ids for cmd, role_ids in custom.items()},
+        }
+    return table
+
+@bot.event
+async def on_guild_role_create(role):
+    _command_perms()["tables"].pop(role.guild.id, None)
+
+@bot.event
+async def on_guild_role_delete(role):
+    _command_perms()["tables"].pop(role.guild.id, None)
+
+@bot.event
+async def on_guild_role_update(before, after):
+    if before.name != after.name:
+        _command_perms()["tables"].pop(after.guild.id, None)
 
 def get_command_roles(command_name):
     """Get list of role IDs that can use a command"""
@@ -20934,35 +22993,23 @@ def reset_command_perms(command_name):
 
 def has_command_permission(ctx, command_name):
     """Check if user has permission to use a command (custom roles)"""
-    # Get custom roles for this command
-    allowed_roles = get_command_roles(command_name)
-    
-    if not allowed_roles:
+    if not ctx.guild:
+        return False
+    allowed = get_command_perm_table(ctx.guild)["custom"].get(command_name.lower())
+    if not allowed:
         return False  # No custom permissions set
-    
-    # Check if user has any of the allowed roles
-    user_role_ids = [role.id for role in ctx.author.roles]
-    return any(role_id in user_role_ids for role_id in allowed_roles)
+    return not allowed.isdisjoint(role.id for role in ctx.author.roles)
 
 async def check_custom_perms(ctx, command_name):
-    """Combined permission check - staff OR custom role"""
-    # Check if admin
+    """Combined permission check - admin, staff, high staff OR custom role"""
+    if not ctx.guild:
+        return False
     if ctx.author.guild_permissions.administrator:
         return True
     
-    # Check if has staff role
-    if is_staff(ctx.author):
-        return True
-    
-    # Check if has high staff role
-    if is_high_staff(ctx.author):
-        return True
-    
-    # Check custom permissions
-    if has_command_permission(ctx, command_name):
-        return True
-    
-    return False
+    table = get_command_perm_table(ctx.guild)
+    allowed = table["allowed"].get(command_name.lower(), table["staff"])
+    return not allowed.isdisjoint(role.id for role in ctx.author.roles)
 
 
 # List of commands that support custom permissions
@@ -21259,7 +23306,9 @@ def load_custom_embeds():
     """Load saved custom embeds"""
     try:
         with open(EMBEDS_FILE, "r") as f:
-            return json.load(f)
+            data = json.load(f)
+            perf_record_store(EMBEDS_FILE, "load", f.tell())
+            return data
     except:
         return {"embeds": {}}
 
@@ -21267,6 +23316,7 @@ def save_custom_embeds(data):
     """Save custom embeds"""
     with open(EMBEDS_FILE, "w") as f:
         json.dump(data, f, indent=2)
+        perf_record_store(EMBEDS_FILE, "save", f.tell())
 
 class EmbedBuilderView(discord.ui.View):
     def __init__(self, author_id, embed_data=None):
@@ -21616,12 +23666,19 @@ except ImportError:
 # ==========================================
 
 TOURNAMENT_FILE = "tournament_data.json"
+TOURNAMENT_MAX_PARTICIPANTS = 256
+BRACKET_TYPES = ("single_elimination", "double_elimination")
 
 # Rate limit protection delays (in seconds)
 CHANNEL_CREATE_DELAY = 1.0
-THREAD_CREATE_DELAY = 0.5
 MESSAGE_SEND_DELAY = 0.3
 
+# Match threads open in parallel; discord.py paces each route bucket and
+# any 429 that still slips through is retried after its retry_after
+MATCH_THREAD_CONCURRENCY = 5
+MATCH_THREAD_RETRIES = 3
+_match_thread_lock = asyncio.Lock()
+
 # ==========================================
 # DATA MANAGEMENT
 # ==========================================
@@ -21630,7 +23687,9 @@ def load_tournament_data():
     """Load tournament data from file"""
     try:
         with open(TOURNAMENT_FILE, "r") as f:
-            return json.load(f)
+            data = json.load(f)
+            perf_record_store(TOURNAMENT_FILE, "load", f.tell())
+            return data
     except:
         return {
             "active_tournament": None,
@@ -21640,8 +23699,29 @@ def load_tournament_data():
 
 def save_tournament_data(data):
     """Save tournament data to file"""
+    # Compact - 256-player double elimination brackets run to ~500 matches
     with open(TOURNAMENT_FILE, "w") as f:
-        json.dump(data, f, indent=2)
+        json.dump(data, f, separators=(",", ":"))
+        perf_record_store(TOURNAMENT_FILE, "save", f.tell())
+    invalidate_view_index("tournament")
+
+def build_tournament_index():
+    """Panel/portal/results message ids -> tournament id, match thread ids -> (tournament id, match id)"""
+    index = {}
+    for tournament_id, tournament in load_tournament_data()["tournaments"].items():
+        for message_id in tournament.get("messages", {}).values():
+            if message_id:
+                index[str(message_id)] = tournament_id
+        for match in tournament.get("matches", []):
+            if match.get("thread_id"):
+                index[str(match["thread_id"])] = (tournament_id, match["id"])
+    return index
+
+VIEW_INDEX_BUILDERS["tournament"] = build_tournament_index
+
+def view_tournament_id(view, interaction):
+    """A tournament view's id - after a restart the registered view has none, so use the clicked message"""
+    return view.tournament_id or resolve_view_state("tournament", interaction.message and interaction.message.id)
 
 def get_active_tournament():
     """Get the currently active tournament"""
@@ -21656,14 +23736,181 @@ def update_tournament(tournament):
     data["tournaments"][tournament["id"]] = tournament
     save_tournament_data(data)
 
+def update_match(tournament_id, match_id, **fields):
+    """Persist fields on one match without overwriting the rest of the tournament"""
+    data = load_tournament_data()
+    tournament = data["tournaments"].get(tournament_id)
+    if not tournament:
+        return
+    match = next((m for m in tournament.get("matches", []) if m["id"] == match_id), None)
+    if match is None:
+        return
+    match.update(fields)
+    save_tournament_data(data)
+
 # ==========================================
 # BRACKET GENERATION
 # ==========================================
 
-def generate_bracket(participants, seeded=False):
+def bye_player():
+    """Placeholder opponent for empty bracket slots"""
+    return {"id": "BYE", "name": "BYE", "seed": 999}
+
+
+def bracket_seed_order(size):
+    """
+    Standard seed placement for a power-of-two bracket.
+    Seed 1 meets seed `size`, and the top seeds land in opposite halves,
+    so any BYEs go to the top seeds and never meet each other.
+    """
+    order = [1]
+    while len(order) < size:
+        n = len(order) * 2
+        order = [s for seed in order for s in (seed, n + 1 - seed)]
+    return order
+
+
+class Bracket:
+    """
+    Index over a tournament's match list.
+    Matches stay plain dicts in tournament["matches"] so they serialize as-is;
+    each one points at the match its winner moves to ("next"/"slot") and, in
+    double elimination, where its loser drops to ("loser_next"/"loser_slot").
+    Reporting a result only walks those links, O(depth) instead of rescanning.
+    """
+    
+    def __init__(self, matches):
+        self.matches = matches
+        self.by_id = {m["id"]: m for m in matches}
+        if matches and "next" not in matches[0]:
+            self._link_legacy()
+    
+    def _link_legacy(self):
+        """
+        Derive parent links for brackets saved before the engine existed.
+        The old generator's feeds_from often pointed at the wrong matches, so
+        each round is re-paired in bracket order (consecutive matches of the
+        round before, by id) wherever the saved list disagrees. Winners of
+        completed feeders are then seated in their parents, which also
+        resolves any BYE matches that fill up along the way.
+        """
+        def number(match):
+            digits = str(match["id"])[1:]
+            return int(digits) if digits.isdigit() else 0
+        
+        ordered = sorted(self.matches, key=number)
+        rounds = {}
+        for match in ordered:
+            match.setdefault("next", None)
+            match.setdefault("slot", None)
+            rounds.setdefault(match.get("round", 1), []).append(match)
+        
+        for round_num in sorted(rounds):
+            feeders = rounds.get(round_num - 1)
+            if not feeders:
+                continue
+            for i, match in enumerate(rounds[round_num]):
+                expected = [m["id"] for m in feeders[2 * i:2 * i + 2]]
+                if match.get("feeds_from") != expected:
+                    match["feeds_from"] = expected
+                for slot, feeder_id in enumerate(expected, 1):
+                    feeder = self.by_id[feeder_id]
+                    feeder["next"], feeder["slot"] = match["id"], slot
+        
+        for match in ordered:
+            if match["status"] != "completed" or not match.get("winner") or not match["next"]:
+                continue
+            parent = self.by_id[match["next"]]
+            winner = self.player(match, match["winner"])
+            if winner and parent.get(f"player{match['slot']}") is None:
+                self.place(parent["id"], match["slot"], winner)
+    
+    def get(self, match_id):
+        return self.by_id.get(match_id)
+    
+    def parent(self, match_id):
+        match = self.by_id.get(match_id)
+        return self.by_id.get(match.get("next")) if match else None
+    
+    @staticmethod
+    def player(match, player_id):
+        for key in ("player1", "player2"):
+            p = match.get(key)
+            if p and p["id"] == player_id:
+                return p
+        return None
+    
+    def place(self, match_id, slot, player):
+        """Seat a player in a match slot. Returns matches that became playable."""
+        match = self.by_id.get(match_id)
+        if not match:
+            return []
+        match[f"player{slot}"] = player
+        p1, p2 = match.get("player1"), match.get("player2")
+        if not p1 or not p2 or match["status"] != "waiting":
+            return []
+        if p1["id"] == "BYE" or p2["id"] == "BYE":
+            # BYE matches resolve on the spot (BYE vs BYE sends a BYE onward)
+            winner = p2 if p1["id"] == "BYE" else p1
+            return self._complete(match, winner["id"])
+        match["status"] = "pending"
+        return [match]
+    
+    def _complete(self, match, winner_id):
+        match["winner"] = winner_id
+        match["status"] = "completed"
+        winner = self.player(match, winner_id)
+        loser = match["player2"] if winner is match["player1"] else match["player1"]
+        
+        ready = []
+        if match.get("next"):
+            ready += self.place(match["next"], match["slot"], winner)
+        if match.get("loser_next"):
+            ready += self.place(match["loser_next"], match["loser_slot"], loser)
+        return ready
+    
+    def report_result(self, match_id, winner_id):
+        """Complete a match and move both players on. Returns newly playable matches."""
+        match = self.by_id.get(match_id)
+        if not match or match["status"] == "completed":
+            return []
+        return self._complete(match, winner_id)
+    
+    def final_match(self):
+        """The match nothing feeds out of (grand final in double elimination)"""
+        return next((m for m in reversed(self.matches) if not m.get("next")), None)
+    
+    def is_complete(self):
+        final = self.final_match()
+        return bool(final and final["status"] == "completed")
+    
+    def standings(self, participants):
+        """Champion first, then players still alive, then by how late they went out"""
+        final = self.final_match()
+        champion = final["winner"] if final and final["status"] == "completed" else None
+        
+        eliminated = {}
+        for match in self.matches:
+            if match["status"] != "completed" or not match.get("winner") or match.get("loser_next"):
+                continue
+            winner = self.player(match, match["winner"])
+            loser = match["player2"] if winner is match["player1"] else match["player1"]
+            if loser and loser["id"] != "BYE":
+                eliminated[loser["id"]] = (1 if match.get("bracket") == "grand_final" else 0, match["round"])
+        
+        def rank(p):
+            if p["id"] == champion:
+                return (3, 0)
+            return eliminated.get(p["id"], (2, 0))
+        
+        return sorted(participants, key=rank, reverse=True)
+
+
+def generate_bracket(participants, seeded=False, double_elimination=False):
     """
-    Generate single elimination bracket with proper BYE distribution
-    Handles any number of participants (not just powers of 2)
+    Generate a single or double elimination bracket.
+    Handles any number of participants (not just powers of 2) - the field is
+    padded with BYEs up to the next power of two, which the top seeds receive.
     """
     if not participants:
         return []
@@ -21671,417 +23918,534 @@ def generate_bracket(participants, seeded=False):
     # Make a copy to avoid modifying original
     players = [p.copy() for p in participants]
     
-    # Always shuffle for random matchups
-    random.shuffle(players)
+    if seeded:
+        players.sort(key=lambda p: p.get("seed") or 999)
+    else:
+        random.shuffle(players)
     
-    # Assign seeds after shuffle
     for i, p in enumerate(players):
         p["seed"] = i + 1
     
-    num_participants = len(players)
-    
-    # Find nearest power of 2 that's >= num_participants
-    bracket_size = 1
-    while bracket_size < num_participants:
+    bracket_size = 2
+    while bracket_size < len(players):
         bracket_size *= 2
+    total_rounds = bracket_size.bit_length() - 1
     
-    # Calculate number of BYEs needed
-    num_byes = bracket_size - num_participants
-    
-    # Create BYE entries
-    byes = [{"id": "BYE", "name": "BYE", "seed": 999} for _ in range(num_byes)]
-    
-    # Distribute BYEs evenly - top seeds get BYEs
-    # This means players at the end of shuffled list get BYEs (random advantage)
-    bracket_players = []
-    bye_index = 0
-    
-    for i in range(bracket_size):
-        if i < num_participants:
-            bracket_players.append(players[i])
-        else:
-            bracket_players.append(byes[bye_index])
-            bye_index += 1
-    
-    # Interleave BYEs with real players for fair distribution
-    # Put BYEs in second position of each pair where possible
-    final_order = []
-    real_players = [p for p in bracket_players if p["id"] != "BYE"]
-    bye_players = [p for p in bracket_players if p["id"] == "BYE"]
-    
-    # Pair real players first, then add BYEs to remaining slots
-    random.shuffle(real_players)  # Shuffle again for extra randomness
-    
-    # Create pairs - give BYEs to random players
-    pairs_needed = bracket_size // 2
-    bye_recipients = random.sample(range(len(real_players)), min(len(bye_players), len(real_players)))
-    
-    used_players = set()
     matches = []
-    match_id = 1
-    
-    # First, create matches for players who get BYEs (auto-advance)
-    for idx in bye_recipients:
-        if idx < len(real_players) and bye_players:
-            player = real_players[idx]
-            bye = bye_players.pop(0)
-            used_players.add(idx)
-            
-            match = {
-                "id": f"M{match_id}",
-                "round": 1,
-                "player1": player,
-                "player2": bye,
-                "player1_score": 0,
-                "player2_score": 0,
-                "winner": player["id"],  # Auto-advance
-                "status": "completed",
-                "thread_id": None
-            }
-            matches.append(match)
-            match_id += 1
-    
-    # Then create matches for remaining players
-    remaining = [p for i, p in enumerate(real_players) if i not in used_players]
-    random.shuffle(remaining)
-    
-    for i in range(0, len(remaining), 2):
-        if i + 1 < len(remaining):
-            match = {
-                "id": f"M{match_id}",
-                "round": 1,
-                "player1": remaining[i],
-                "player2": remaining[i + 1],
-                "player1_score": 0,
-                "player2_score": 0,
-                "winner": None,
-                "status": "pending",
-                "thread_id": None
-            }
-            matches.append(match)
-            match_id += 1
-        elif remaining:
-            # Odd player left - give them a BYE
-            match = {
-                "id": f"M{match_id}",
-                "round": 1,
-                "player1": remaining[i],
-                "player2": {"id": "BYE", "name": "BYE", "seed": 999},
-                "player1_score": 0,
-                "player2_score": 0,
-                "winner": remaining[i]["id"],
-                "status": "completed",
-                "thread_id": None
-            }
-            matches.append(match)
-            match_id += 1
     
-    # Sort matches by ID to maintain order
-    matches.sort(key=lambda m: int(m["id"][1:]))
-    
-    # Recalculate match IDs
-    for i, m in enumerate(matches):
-        m["id"] = f"M{i + 1}"
-    match_id = len(matches) + 1
-    
-    # Calculate total rounds needed
-    total_rounds = max(1, math.ceil(math.log2(bracket_size)))
+    def new_match(bracket, round_num):
+        match = {
+            "id": f"M{len(matches) + 1}",
+            "bracket": bracket,
+            "round": round_num,
+            "player1": None,
+            "player2": None,
+            "player1_score": 0,
+            "player2_score": 0,
+            "winner": None,
+            "status": "waiting",
+            "thread_id": None,
+            "next": None,
+            "slot": None,
+            "feeds_from": []
+        }
+        matches.append(match)
+        return match
     
-    # Generate placeholder matches for future rounds
-    current_round_matches = len(matches)
+    def link(src, dst, slot, loser=False):
+        if loser:
+            src["loser_next"], src["loser_slot"] = dst["id"], slot
+        else:
+            src["next"], src["slot"] = dst["id"], slot
+        dst["feeds_from"].append(src["id"])
     
+    # Winners bracket
+    winners = [[new_match("winners", 1) for _ in range(bracket_size // 2)]]
     for round_num in range(2, total_rounds + 1):
-        next_round_matches = max(1, current_round_matches // 2)
-        
-        for i in range(next_round_matches):
-            # Calculate which matches feed into this one
-            feed_start = match_id - current_round_matches - (i * 2) - 2 + (next_round_matches * 2)
-            
-            match = {
-                "id": f"M{match_id}",
-                "round": round_num,
-                "player1": None,
-                "player2": None,
-                "player1_score": 0,
-                "player2_score": 0,
-                "winner": None,
-                "status": "waiting",
-                "thread_id": None,
-                "feeds_from": [f"M{match_id - next_round_matches * 2 + i * 2 + 1}", 
-                               f"M{match_id - next_round_matches * 2 + i * 2 + 2}"]
-            }
-            matches.append(match)
-            match_id += 1
-        
-        current_round_matches = next_round_matches
-        
-        if next_round_matches <= 1:
-            break
-    
-    # Auto-advance BYE winners to next round
-    matches = auto_advance_byes(matches)
+        level = []
+        for a, b in zip(winners[-1][::2], winners[-1][1::2]):
+            match = new_match("winners", round_num)
+            link(a, match, 1)
+            link(b, match, 2)
+            level.append(match)
+        winners.append(level)
+    
+    # Losers bracket: round 1 pairs off first-round losers, then each winners
+    # round drops its losers in (reversed to avoid instant rematches) and the
+    # survivors are halved again, until the losers final feeds the grand final
+    if double_elimination and bracket_size >= 4:
+        lb_round = 1
+        survivors = []
+        for a, b in zip(winners[0][::2], winners[0][1::2]):
+            match = new_match("losers", lb_round)
+            link(a, match, 1, loser=True)
+            link(b, match, 2, loser=True)
+            survivors.append(match)
+        
+        for round_num in range(2, total_rounds + 1):
+            lb_round += 1
+            dropped = []
+            for prev, wb_match in zip(survivors, reversed(winners[round_num - 1])):
+                match = new_match("losers", lb_round)
+                link(prev, match, 1)
+                link(wb_match, match, 2, loser=True)
+                dropped.append(match)
+            survivors = dropped
+            
+            if len(survivors) > 1:
+                lb_round += 1
+                merged = []
+                for a, b in zip(survivors[::2], survivors[1::2]):
+                    match = new_match("losers", lb_round)
+                    link(a, match, 1)
+                    link(b, match, 2)
+                    merged.append(match)
+                survivors = merged
+        
+        grand_final = new_match("grand_final", total_rounds + 1)
+        link(winners[-1][0], grand_final, 1)
+        link(survivors[0], grand_final, 2)
+    
+    # Seat players; BYE matches resolve and propagate as they fill
+    by_seed = {p["seed"]: p for p in players}
+    order = bracket_seed_order(bracket_size)
+    bracket = Bracket(matches)
+    for i, match in enumerate(winners[0]):
+        bracket.place(match["id"], 1, by_seed.get(order[2 * i]) or bye_player())
+        bracket.place(match["id"], 2, by_seed.get(order[2 * i + 1]) or bye_player())
     
     return matches
 
 
-def auto_advance_byes(matches):
-    """Auto-advance winners from BYE matches to next rounds"""
-    changed = True
-    while changed:
-        changed = False
-        for match in matches:
-            if match["status"] == "waiting" and "feeds_from" in match:
-                feed1_id, feed2_id = match["feeds_from"]
-                
-                feeder1 = next((m for m in matches if m["id"] == feed1_id), None)
-                feeder2 = next((m for m in matches if m["id"] == feed2_id), None)
-                
-                if feeder1 and feeder2:
-                    if feeder1["status"] == "completed" and feeder2["status"] == "completed":
-                        # Both feeders complete, advance winners
-                        winner1 = None
-                        winner2 = None
-                        
-                        if feeder1["winner"]:
-                            if feeder1["player1"] and feeder1["player1"]["id"] == feeder1["winner"]:
-                                winner1 = feeder1["player1"]
-                            elif feeder1["player2"] and feeder1["player2"]["id"] == feeder1["winner"]:
-                                winner1 = feeder1["player2"]
-                        
-                        if feeder2["winner"]:
-                            if feeder2["player1"] and feeder2["player1"]["id"] == feeder2["winner"]:
-                                winner2 = feeder2["player1"]
-                            elif feeder2["player2"] and feeder2["player2"]["id"] == feeder2["winner"]:
-                                winner2 = feeder2["player2"]
-                        
-                        if winner1 and winner2:
-                            match["player1"] = winner1
-                            match["player2"] = winner2
-                            match["status"] = "pending"
-                            changed = True
-    
-    return matches
-
-def advance_bracket(tournament):
+def advance_bracket(tournament, match_id, winner_id):
     """
-    Check if winners can advance to next round matches
+    Record a match winner and advance the bracket.
+    Returns the matches that just became playable.
     """
-    matches = tournament.get("matches", [])
-    
-    for match in matches:
-        if match["status"] == "waiting" and "feeds_from" in match:
-            feed1, feed2 = match["feeds_from"]
-            
-            # Find feeder matches
-            feeder1 = next((m for m in matches if m["id"] == feed1), None)
-            feeder2 = next((m for m in matches if m["id"] == feed2), None)
-            
-            if feeder1 and feeder2:
-                if feeder1["status"] == "completed" and feeder2["status"] == "completed":
-                    # Get winners
-                    winner1 = next((p for p in [feeder1["player1"], feeder1["player2"]] 
-                                   if p and p["id"] == feeder1["winner"]), None)
-                    winner2 = next((p for p in [feeder2["player1"], feeder2["player2"]] 
-                                   if p and p["id"] == feeder2["winner"]), None)
-                    
-                    if winner1 and winner2:
-                        match["player1"] = winner1
-                        match["player2"] = winner2
-                        match["status"] = "pending"
-    
-    return matches
+    return Bracket(tournament.get("matches", [])).report_result(match_id, winner_id)
 
 # ==========================================
 # BRACKET IMAGE GENERATION
 # ==========================================
-
-async def create_bracket_image(tournament):
-    """Create enhanced visual tournament bracket image"""
-    if not PIL_AVAILABLE:
-        return None
-    
-    matches = tournament.get("matches", [])
-    if not matches:
-        return None
-    
-    total_rounds = max(m["round"] for m in matches)
-    matches_per_round = {}
+# The bracket is rendered once into cached page canvases (background, header,
+# round labels, connectors). Later renders compare each match against what was
+# last drawn and only repaint the boxes and paths that changed. Brackets with
+# more than BRACKET_PAGE_MATCHES first-round matches are split into section
+# pages plus a finals page, so 128/256-player images stay a sane size.
+
+BRACKET_PAGE_MATCHES = 16     # First-column matches per page before splitting
+BRACKET_CANVAS_CACHE = 4      # Page canvases kept decoded; the rest stay as PNG bytes
+BRACKET_AVATAR_SIZE = 24
+BRACKET_AVATAR_CACHE = 512
+
+BRACKET_MATCH_WIDTH = 220
+BRACKET_MATCH_HEIGHT = 55
+BRACKET_H_SPACING = 100
+BRACKET_V_SPACING = 25
+BRACKET_MARGIN = 60
+BRACKET_HEADER_HEIGHT = 80
+
+_bracket_render_cache = {}    # tournament_id -> {"layout": key, "pages": [page, ...]}
+_bracket_canvas_cache = {}    # (tournament_id, page_index) -> Image, oldest first
+_bracket_avatar_cache = {}    # user_id -> (avatar key, round Image), oldest first
+_bracket_fonts = {}
+_bracket_render_lock = asyncio.Lock()
+
+
+def get_bracket_fonts():
+    """Load bracket fonts once"""
+    if not _bracket_fonts:
+        try:
+            _bracket_fonts["font"] = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 14)
+            _bracket_fonts["small"] = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 11)
+            _bracket_fonts["title"] = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 28)
+            _bracket_fonts["round"] = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 16)
+        except:
+            default = ImageFont.load_default()
+            _bracket_fonts.update(font=default, small=default, title=default, round=default)
+    return _bracket_fonts
+
+
+def bracket_gradient(y, height):
+    return (int(20 + (y / height) * 15), int(20 + (y / height) * 15), int(30 + (y / height) * 20))
+
+
+def split_bracket_pages(matches):
+    """
+    Group displayed matches into columns and split them into pages.
+    A bracket with S sections gets S pages holding every column with at least
+    S matches, then a finals page with the columns of S matches or fewer.
+    """
+    main_rounds, losers_rounds = {}, {}
     for m in matches:
-        r = m["round"]
-        matches_per_round[r] = matches_per_round.get(r, 0) + 1
-    
-    first_round_matches = matches_per_round.get(1, 1)
+        target = losers_rounds if m.get("bracket") == "losers" else main_rounds
+        target.setdefault(m["round"], []).append(m["id"])
     
-    # Enhanced dimensions
-    match_width = 220
-    match_height = 55
-    h_spacing = 100
-    v_spacing = 25
-    margin = 60
-    header_height = 80
-    
-    width = margin * 2 + total_rounds * (match_width + h_spacing)
-    height = header_height + margin * 2 + first_round_matches * (match_height * 2 + v_spacing * 2)
+    pages = []
+    for side, rounds in (("", main_rounds), ("LOSERS BRACKET", losers_rounds)):
+        columns = [rounds[r] for r in sorted(rounds)]
+        if not columns:
+            continue
+        
+        sections = 1
+        while len(columns[0]) / sections > BRACKET_PAGE_MATCHES:
+            sections *= 2
+        
+        if sections == 1:
+            pages.append({"subtitle": side, "columns": columns})
+            continue
+        
+        for k in range(sections):
+            pages.append({
+                "subtitle": f"{side or 'BRACKET'} — SECTION {k + 1}/{sections}",
+                "columns": [c[k * len(c) // sections:(k + 1) * len(c) // sections] for c in columns if len(c) >= sections]
+            })
+        pages.append({
+            "subtitle": f"{side or 'BRACKET'} — FINALS",
+            "columns": [c for c in columns if len(c) <= sections]
+        })
+    return pages
+
+
+def layout_bracket_page(page, by_id):
+    """Work out page size, box positions and on-page feeder links"""
+    columns = page["columns"]
+    width = BRACKET_MARGIN * 2 + len(columns) * (BRACKET_MATCH_WIDTH + BRACKET_H_SPACING)
+    height = BRACKET_HEADER_HEIGHT + BRACKET_MARGIN * 2 + len(columns[0]) * (BRACKET_MATCH_HEIGHT * 2 + BRACKET_V_SPACING * 2)
     height = max(height, 500)
     
-    # Create image with gradient background
+    positions = {}
+    for j, column in enumerate(columns):
+        spacing = (height - BRACKET_HEADER_HEIGHT - BRACKET_MARGIN * 2 - 40) / max(len(column), 1)
+        x = BRACKET_MARGIN + j * (BRACKET_MATCH_WIDTH + BRACKET_H_SPACING)
+        for i, match_id in enumerate(column):
+            y = BRACKET_HEADER_HEIGHT + 45 + i * spacing + spacing / 2 - BRACKET_MATCH_HEIGHT / 2
+            positions[match_id] = (x, y)
+    
+    # feeder -> parent, only where both boxes are on this page
+    links = {}
+    for match_id in positions:
+        for feeder_id in by_id[match_id].get("feeds_from", []):
+            if feeder_id in positions and feeder_id != match_id:
+                links[feeder_id] = match_id
+    
+    page.update(width=width, height=height, positions=positions, links=links, drawn={}, png=None)
+
+
+def bracket_round_label(match, winners_final, losers_final, has_grand_final):
+    r = match["round"]
+    if match.get("bracket") == "grand_final":
+        return "🏆 GRAND FINAL"
+    if match.get("bracket") == "losers":
+        return "LOSERS FINAL" if r == losers_final else f"LOSERS R{r}"
+    if r == winners_final:
+        return "WINNERS FINAL" if has_grand_final else "🏆 FINALS"
+    if r == winners_final - 1 and winners_final > 2:
+        return "SEMI-FINALS"
+    if r == winners_final - 2 and winners_final > 3:
+        return "QUARTER-FINALS"
+    return f"ROUND {r}"
+
+
+def paint_bracket_base(page, by_id, title, info_line, labels):
+    """Everything on a page that doesn't change between results"""
+    fonts = get_bracket_fonts()
+    width, height = page["width"], page["height"]
+    
     img = Image.new("RGBA", (width, height), (20, 20, 30, 255))
     draw = ImageDraw.Draw(img)
     
-    # Draw gradient background
     for y in range(height):
-        r = int(20 + (y / height) * 15)
-        g = int(20 + (y / height) * 15)
-        b = int(30 + (y / height) * 20)
-        draw.line([(0, y), (width, y)], fill=(r, g, b))
+        draw.line([(0, y), (width, y)], fill=bracket_gradient(y, height))
     
-    # Load fonts
-    try:
-        font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 14)
-        small_font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 11)
-        title_font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 28)
-        round_font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 16)
-    except:
-        font = small_font = title_font = round_font = ImageFont.load_default()
+    # Header
+    draw.rectangle([(0, 0), (width, BRACKET_HEADER_HEIGHT)], fill=(30, 30, 45))
+    draw.line([(0, BRACKET_HEADER_HEIGHT), (width, BRACKET_HEADER_HEIGHT)], fill=(139, 0, 0), width=3)
+    draw.text((width // 2 + 2, 27), f"✝ {title} ✝", font=fonts["title"], fill=(0, 0, 0), anchor="mm")
+    draw.text((width // 2, 25), f"✝ {title} ✝", font=fonts["title"], fill=(255, 255, 255), anchor="mm")
+    if page["subtitle"]:
+        info_line = f"{info_line}  •  {page['subtitle']}"
+    draw.text((width // 2, 55), info_line, font=fonts["small"], fill=(150, 150, 150), anchor="mm")
+    
+    for column in page["columns"]:
+        x, _ = page["positions"][column[0]]
+        draw.text((x + BRACKET_MATCH_WIDTH // 2, BRACKET_HEADER_HEIGHT + 20), labels(by_id[column[0]]),
+                  font=fonts["round"], fill=(139, 0, 0), anchor="mm")
     
-    # Draw header background
-    draw.rectangle([(0, 0), (width, header_height)], fill=(30, 30, 45))
-    draw.line([(0, header_height), (width, header_height)], fill=(139, 0, 0), width=3)
+    # Footer
+    draw.rectangle([(0, height - 35), (width, height)], fill=(25, 25, 35))
+    draw.text((width // 2, height - 18), "✝ THE FALLEN ✝", font=fonts["round"], fill=(139, 0, 0), anchor="mm")
+    return img
+
+
+def paint_bracket_connector(draw, page, feeder, parent_id):
+    start_x, start_y = page["positions"][feeder["id"]]
+    start_x += BRACKET_MATCH_WIDTH
+    start_y += BRACKET_MATCH_HEIGHT
+    end_x, end_y = page["positions"][parent_id]
+    end_y += BRACKET_MATCH_HEIGHT
+    mid_x = (start_x + end_x) / 2
     
-    # Title with shadow
-    title = tournament.get("name", "Tournament").upper()
-    draw.text((width // 2 + 2, 27), f"✝ {title} ✝", font=title_font, fill=(0, 0, 0), anchor="mm")
-    draw.text((width // 2, 25), f"✝ {title} ✝", font=title_font, fill=(255, 255, 255), anchor="mm")
+    # Paths a winner has already travelled are lit up
+    line_color = (67, 181, 129) if feeder["status"] == "completed" else (80, 80, 100)
+    draw.line([(start_x, start_y), (mid_x, start_y)], fill=line_color, width=2)
+    draw.line([(mid_x, start_y), (mid_x, end_y)], fill=line_color, width=2)
+    draw.line([(mid_x, end_y), (end_x, end_y)], fill=line_color, width=2)
+
+
+def paint_bracket_match(img, page, match, avatars):
+    """Repaint one match box over a clean patch of background"""
+    fonts = get_bracket_fonts()
+    font, small_font = fonts["font"], fonts["small"]
+    draw = ImageDraw.Draw(img)
+    x, y = page["positions"][match["id"]]
+    match_width, match_height = BRACKET_MATCH_WIDTH, BRACKET_MATCH_HEIGHT
+    
+    for row in range(max(int(y) - 4, 0), min(int(y + match_height * 2) + 16, page["height"])):
+        draw.line([(x - 4, row), (x + match_width + 4, row)], fill=bracket_gradient(row, page["height"]))
+    
+    # Match box colors
+    if match["status"] == "completed":
+        box_fill = (35, 60, 35)
+        box_outline = (67, 181, 129)
+    elif match["status"] == "in_progress":
+        box_fill = (60, 55, 30)
+        box_outline = (255, 193, 7)
+    else:
+        box_fill = (40, 40, 55)
+        box_outline = (70, 70, 90)
     
-    # Participants count
-    participants = len([m for m in matches if m["round"] == 1]) * 2 - len([m for m in matches if m["round"] == 1 and m.get("player2", {}).get("id") == "BYE"])
-    draw.text((width // 2, 55), f"{participants} Participants", font=small_font, fill=(150, 150, 150), anchor="mm")
+    # Glow for active matches
+    if match["status"] == "in_progress":
+        for glow in range(3, 0, -1):
+            draw.rounded_rectangle(
+                [(x - glow, y - glow), (x + match_width + glow, y + match_height * 2 + glow)],
+                radius=8 + glow,
+                fill=None,
+                outline=(255, 193, 7, 50)
+            )
     
-    match_positions = {}
+    draw.rounded_rectangle(
+        [(x, y), (x + match_width, y + match_height * 2)],
+        radius=8,
+        fill=box_fill,
+        outline=box_outline,
+        width=2
+    )
     
-    for round_num in range(1, total_rounds + 1):
-        round_matches = [m for m in matches if m["round"] == round_num]
-        num_matches = len(round_matches)
-        
-        available_height = height - header_height - margin * 2 - 40
-        spacing = available_height / max(num_matches, 1)
-        
-        x = margin + (round_num - 1) * (match_width + h_spacing)
-        
-        # Draw round header
-        round_label = f"ROUND {round_num}"
-        if round_num == total_rounds:
-            round_label = "🏆 FINALS"
-        elif round_num == total_rounds - 1 and total_rounds > 2:
-            round_label = "SEMI-FINALS"
-        elif round_num == total_rounds - 2 and total_rounds > 3:
-            round_label = "QUARTER-FINALS"
-        
-        draw.text((x + match_width // 2, header_height + 20), round_label, font=round_font, fill=(139, 0, 0), anchor="mm")
-        
-        for i, match in enumerate(round_matches):
-            y = header_height + 45 + i * spacing + spacing / 2 - match_height / 2
-            
-            match_positions[match["id"]] = (x + match_width, y + match_height)
+    for slot in (1, 2):
+        top = y + match_height * (slot - 1)
+        center = top + match_height // 2
+        player = match.get(f"player{slot}")
+        is_bye = bool(player and player.get("id") == "BYE")
+        is_winner = bool(match.get("winner") and player and match["winner"] == player["id"])
+        avatar = avatars.get(player["id"]) if player else None
+        
+        name = player["name"][:13 if avatar else 16] if player else "TBD"
+        if is_bye and slot == 2:
+            name = "— BYE —"
+        score = str(match.get(f"player{slot}_score", "-")) if player and not is_bye else "-"
+        if is_winner:
+            color = (100, 255, 100)
+        elif player and not (is_bye and slot == 2):
+            color = (255, 255, 255)
+        else:
+            color = (100, 100, 100) if slot == 1 else (80, 80, 80)
+        
+        # Seed badge
+        if player and player.get("seed") and player["seed"] != 999:
+            seed_x = x + 8
+            draw.rounded_rectangle([(seed_x, top + 10), (seed_x + 20, top + match_height - 10)], radius=3, fill=(255, 215, 0))
+            draw.text((seed_x + 10, center), str(player["seed"]), font=small_font, fill=(0, 0, 0), anchor="mm")
+        
+        name_x = x + 35
+        if avatar:
+            img.paste(avatar, (int(x + 32), int(center - BRACKET_AVATAR_SIZE // 2)), avatar)
+            name_x = x + 32 + BRACKET_AVATAR_SIZE + 4
+        draw.text((name_x, center), name, font=font, fill=color, anchor="lm")
+        
+        # Score box
+        score_box_x = x + match_width - 35
+        draw.rounded_rectangle([(score_box_x, top + 8), (x + match_width - 8, top + match_height - 8)], radius=3, fill=(30, 30, 40))
+        draw.text((score_box_x + 13, center), score, font=font, fill=color, anchor="mm")
+    
+    # Divider
+    draw.line([(x + 8, y + match_height), (x + match_width - 8, y + match_height)], fill=(60, 60, 80), width=1)
+    
+    # Match ID badge
+    draw.text((x + match_width // 2, y + match_height * 2 + 8), match["id"], font=small_font, fill=(80, 80, 100), anchor="mm")
+
+
+def bracket_match_signature(match, avatars):
+    """Everything a match box depends on - unchanged signature means no repaint"""
+    p1 = match.get("player1") or {}
+    p2 = match.get("player2") or {}
+    return (
+        match["status"], match.get("winner"), match.get("player1_score"), match.get("player2_score"),
+        p1.get("id"), p1.get("name"), p1.get("seed"), p1.get("id") in avatars,
+        p2.get("id"), p2.get("name"), p2.get("seed"), p2.get("id") in avatars,
+    )
+
+
+def get_bracket_canvas(key, page, paint_base):
+    """Cached canvas for a page: decoded, re-opened from its PNG, or painted fresh"""
+    img = _bracket_canvas_cache.pop(key, None)
+    if img is None and page["png"] is not None:
+        img = Image.open(BytesIO(page["png"])).convert("RGBA")
+    if img is None:
+        img = paint_base(page)
+        page["drawn"] = {}
+    
+    _bracket_canvas_cache[key] = img
+    while len(_bracket_canvas_cache) > BRACKET_CANVAS_CACHE:
+        _bracket_canvas_cache.pop(next(iter(_bracket_canvas_cache)))
+    return img
+
+
+def render_bracket_pages_sync(tournament, avatars):
+    tournament_id = tournament.get("id", "")
+    # Losers bracket is drawn on its own pages; legacy brackets have no "bracket" key
+    matches = tournament.get("matches", [])
+    by_id = {m["id"]: m for m in matches}
+    
+    r1 = [m for m in matches if m["round"] == 1 and m.get("bracket") != "losers"]
+    participants = len(r1) * 2 - len([m for m in r1 if (m.get("player2") or {}).get("id") == "BYE"])
+    title = tournament.get("name", "Tournament").upper()
+    info_line = f"{participants} Participants"
+    
+    layout_key = (tuple((m["id"], m["round"], m.get("bracket")) for m in matches), title, info_line)
+    cached = _bracket_render_cache.get(tournament_id)
+    if not cached or cached["layout"] != layout_key:
+        for key in [k for k in _bracket_canvas_cache if k[0] == tournament_id]:
+            del _bracket_canvas_cache[key]
+        cached = {"layout": layout_key, "pages": split_bracket_pages(matches)}
+        for page in cached["pages"]:
+            layout_bracket_page(page, by_id)
+        _bracket_render_cache[tournament_id] = cached
+    
+    winners_final = max((m["round"] for m in matches if m.get("bracket") in (None, "winners")), default=0)
+    losers_final = max((m["round"] for m in matches if m.get("bracket") == "losers"), default=0)
+    has_grand_final = any(m.get("bracket") == "grand_final" for m in matches)
+    labels = lambda m: bracket_round_label(m, winners_final, losers_final, has_grand_final)
+    paint_base = lambda page: paint_bracket_base(page, by_id, title, info_line, labels)
+    
+    output = []
+    for index, page in enumerate(cached["pages"]):
+        if page["png"] is None:
+            page["drawn"] = {}
+        signatures = {mid: bracket_match_signature(by_id[mid], avatars) for mid in page["positions"]}
+        dirty = [mid for mid, sig in signatures.items() if page["drawn"].get(mid) != sig]
+        
+        if dirty:
+            img = get_bracket_canvas((tournament_id, index), page, paint_base)
+            if not page["drawn"]:
+                dirty = list(signatures)
+            
+            for mid in dirty:
+                paint_bracket_match(img, page, by_id[mid], avatars)
+                page["drawn"][mid] = signatures[mid]
+            
+            # Repainting a box clips the ends of its paths, so redraw both sides
+            draw = ImageDraw.Draw(img)
+            touched = set(dirty)
+            for feeder_id, parent_id in page["links"].items():
+                if feeder_id in touched or parent_id in touched:
+                    paint_bracket_connector(draw, page, by_id[feeder_id], parent_id)
+            
+            buffer = BytesIO()
+            img.save(buffer, format="PNG", compress_level=3)
+            page["png"] = buffer.getvalue()
+        
+        output.append(BytesIO(page["png"]))
+    return output
+
+
+async def fetch_bracket_avatars(guild, matches):
+    """Small round avatars for seated players - each one is downloaded once and reused"""
+    avatars = {}
+    missing = {}
+    for match in matches:
+        for player in (match.get("player1"), match.get("player2")):
+            if not player or player["id"] == "BYE" or player["id"] in avatars or player["id"] in missing:
+                continue
+            try:
+                member = guild.get_member(int(player["id"]))
+            except (TypeError, ValueError):
+                member = None
+            if not member:
+                continue
             
-            # Match box colors
-            if match["status"] == "completed":
-                box_fill = (35, 60, 35)
-                box_outline = (67, 181, 129)
-            elif match["status"] == "in_progress":
-                box_fill = (60, 55, 30)
-                box_outline = (255, 193, 7)
+            cached = _bracket_avatar_cache.get(player["id"])
+            if cached and cached[0] == member.display_avatar.key:
+                avatars[player["id"]] = cached[1]
             else:
-                box_fill = (40, 40, 55)
-                box_outline = (70, 70, 90)
-            
-            # Draw match box with glow for active matches
-            if match["status"] == "in_progress":
-                for glow in range(3, 0, -1):
-                    draw.rounded_rectangle(
-                        [(x - glow, y - glow), (x + match_width + glow, y + match_height * 2 + glow)],
-                        radius=8 + glow,
-                        fill=None,
-                        outline=(255, 193, 7, 50)
-                    )
-            
-            draw.rounded_rectangle(
-                [(x, y), (x + match_width, y + match_height * 2)],
-                radius=8,
-                fill=box_fill,
-                outline=box_outline,
-                width=2
-            )
-            
-            # Player 1
-            p1 = match.get("player1")
-            p1_name = p1["name"][:16] if p1 else "TBD"
-            p1_score = str(match.get("player1_score", "-")) if p1 else "-"
-            is_p1_winner = match.get("winner") and p1 and match["winner"] == p1["id"]
-            p1_color = (100, 255, 100) if is_p1_winner else (255, 255, 255) if p1 else (100, 100, 100)
-            
-            # Seed badge
-            if p1 and p1.get("seed") and p1["seed"] != 999:
-                seed_x = x + 8
-                draw.rounded_rectangle([(seed_x, y + 10), (seed_x + 20, y + match_height - 10)], radius=3, fill=(255, 215, 0))
-                draw.text((seed_x + 10, y + match_height // 2), str(p1["seed"]), font=small_font, fill=(0, 0, 0), anchor="mm")
-            
-            draw.text((x + 35, y + match_height // 2), p1_name, font=font, fill=p1_color, anchor="lm")
-            
-            # Score box
-            score_box_x = x + match_width - 35
-            draw.rounded_rectangle([(score_box_x, y + 8), (x + match_width - 8, y + match_height - 8)], radius=3, fill=(30, 30, 40))
-            draw.text((score_box_x + 13, y + match_height // 2), p1_score, font=font, fill=p1_color, anchor="mm")
-            
-            # Divider
-            draw.line([(x + 8, y + match_height), (x + match_width - 8, y + match_height)], fill=(60, 60, 80), width=1)
-            
-            # Player 2
-            p2 = match.get("player2")
-            p2_name = p2["name"][:16] if p2 else "TBD"
-            if p2 and p2.get("id") == "BYE":
-                p2_name = "— BYE —"
-            p2_score = str(match.get("player2_score", "-")) if p2 and p2.get("id") != "BYE" else "-"
-            is_p2_winner = match.get("winner") and p2 and match["winner"] == p2["id"]
-            p2_color = (100, 255, 100) if is_p2_winner else (255, 255, 255) if p2 and p2.get("id") != "BYE" else (80, 80, 80)
-            
-            if p2 and p2.get("seed") and p2["seed"] != 999:
-                seed_x = x + 8
-                draw.rounded_rectangle([(seed_x, y + match_height + 10), (seed_x + 20, y + match_height * 2 - 10)], radius=3, fill=(255, 215, 0))
-                draw.text((seed_x + 10, y + match_height + match_height // 2), str(p2["seed"]), font=small_font, fill=(0, 0, 0), anchor="mm")
-            
-            draw.text((x + 35, y + match_height + match_height // 2), p2_name, font=font, fill=p2_color, anchor="lm")
+                missing[player["id"]] = member.display_avatar
+    
+    if missing:
+        async def download(session, user_id, asset):
+            try:
+                async with session.get(asset.with_format('png').with_size(64).url) as resp:
+                    if resp.status != 200:
+                        return
+                    avatar_data = await resp.read()
+            except Exception:
+                return
             
-            draw.rounded_rectangle([(score_box_x, y + match_height + 8), (x + match_width - 8, y + match_height * 2 - 8)], radius=3, fill=(30, 30, 40))
-            draw.text((score_box_x + 13, y + match_height + match_height // 2), p2_score, font=font, fill=p2_color, anchor="mm")
+            size = BRACKET_AVATAR_SIZE
+            avatar = Image.open(BytesIO(avatar_data)).convert("RGBA").resize((size, size), Image.LANCZOS)
+            mask = Image.new("L", (size, size), 0)
+            ImageDraw.Draw(mask).ellipse((0, 0, size - 1, size - 1), fill=255)
+            avatar.putalpha(mask)
             
-            # Match ID badge
-            draw.text((x + match_width // 2, y + match_height * 2 + 8), match["id"], font=small_font, fill=(80, 80, 100), anchor="mm")
+            _bracket_avatar_cache[user_id] = (asset.key, avatar)
+            avatars[user_id] = avatar
+        
+        async with aiohttp.ClientSession() as session:
+            await asyncio.gather(*(download(session, uid, asset) for uid, asset in missing.items()))
+        
+        while len(_bracket_avatar_cache) > BRACKET_AVATAR_CACHE:
+            _bracket_avatar_cache.pop(next(iter(_bracket_avatar_cache)))
     
-    # Draw connecting lines
-    for match in matches:
-        if "feeds_from" in match and match["id"] in match_positions:
-            end_x, end_y = match_positions[match["id"]]
-            end_x -= match_width
-            
-            for feeder_id in match.get("feeds_from", []):
-                if feeder_id in match_positions:
-                    start_x, start_y = match_positions[feeder_id]
-                    mid_x = (start_x + end_x) / 2
-                    
-                    line_color = (80, 80, 100)
-                    draw.line([(start_x, start_y), (mid_x, start_y)], fill=line_color, width=2)
-                    draw.line([(mid_x, start_y), (mid_x, end_y)], fill=line_color, width=2)
-                    draw.line([(mid_x, end_y), (end_x, end_y)], fill=line_color, width=2)
+    return avatars
+
+
+@perf_render
+async def render_bracket_pages(tournament, guild=None):
+    """Render the bracket as a list of PNG pages, repainting only what changed"""
+    if not PIL_AVAILABLE or not tournament.get("matches"):
+        return []
     
-    # Footer
-    draw.rectangle([(0, height - 35), (width, height)], fill=(25, 25, 35))
-    draw.text((width // 2, height - 18), "✝ THE FALLEN ✝", font=round_font, fill=(139, 0, 0), anchor="mm")
+    avatars = await fetch_bracket_avatars(guild, tournament["matches"]) if guild else {}
+    async with _bracket_render_lock:
+        return await asyncio.to_thread(render_bracket_pages_sync, tournament, avatars)
+
+
+async def create_bracket_image(tournament, guild=None):
+    """Create the bracket image (first page when the bracket is split)"""
+    pages = await render_bracket_pages(tournament, guild)
+    return pages[0] if pages else None
+
+
+def bracket_page_embeds(tournament, pages, title_suffix="Bracket"):
+    """Files and embeds for up to 10 bracket pages in one message"""
+    files = []
+    embeds = []
+    for i, page in enumerate(pages[:10]):
+        filename = "bracket.png" if i == 0 else f"bracket_{i + 1}.png"
+        files.append(discord.File(page, filename=filename))
+        embed = discord.Embed(
+            title=f"🏆 {tournament['name']} — {title_suffix}" if i == 0 else None,
+            color=0x8B0000
+        )
+        embed.set_image(url=f"attachment://{filename}")
+        embeds.append(embed)
     
-    buffer = BytesIO()
-    img.save(buffer, format="PNG")
-    buffer.seek(0)
-    return buffer
+    if embeds:
+        footer = "✝ THE FALLEN ✝"
+        if len(pages) > 10:
+            footer += f" • Showing 10 of {len(pages)} pages - use !bracket for the rest"
+        embeds[-1].set_footer(text=footer)
+    return files, embeds
 
 
 # ==========================================
@@ -22108,7 +24472,7 @@ class TournamentCreateModal(discord.ui.Modal, title="Create Tournament"):
     
     max_participants = discord.ui.TextInput(
         label="Max Participants",
-        placeholder="8, 16, 32, 64...",
+        placeholder="8, 16, 32, 64... (max 256)",
         default="16",
         max_length=3,
         required=True
@@ -22146,8 +24510,8 @@ class TournamentCreateModal(discord.ui.Modal, title="Create Tournament"):
             max_p = int(self.max_participants.value)
             if max_p < 2:
                 max_p = 8
-            elif max_p > 128:
-                max_p = 128
+            elif max_p > TOURNAMENT_MAX_PARTICIPANTS:
+                max_p = TOURNAMENT_MAX_PARTICIPANTS
         except:
             max_p = 16
         
@@ -22267,6 +24631,8 @@ class TournamentConfigModal(discord.ui.Modal, title="Edit Configuration"):
             max_p = int(self.max_participants.value)
             if max_p < 2:
                 max_p = 8
+            elif max_p > TOURNAMENT_MAX_PARTICIPANTS:
+                max_p = TOURNAMENT_MAX_PARTICIPANTS
         except:
             max_p = 16
         
@@ -22396,10 +24762,8 @@ class ScoreSubmitModal(discord.ui.Modal, title="Submit Match Score"):
                 ephemeral=True
             )
         
-        self.match["status"] = "completed"
-        
         # Advance bracket
-        self.tournament["matches"] = advance_bracket(self.tournament)
+        ready = advance_bracket(self.tournament, self.match["id"], self.match["winner"])
         update_tournament(self.tournament)
         
         winner_name = self.match["player1"]["name"] if self.match["winner"] == self.match["player1"]["id"] else self.match["player2"]["name"]
@@ -22415,6 +24779,10 @@ class ScoreSubmitModal(discord.ui.Modal, title="Submit Match Score"):
         
         # Update bracket image
         await update_bracket_display(interaction.guild, self.tournament)
+        
+        # Open threads for matches this result unlocked
+        if ready:
+            await create_match_threads(interaction.guild, self.tournament, ready)
 
 
 # ==========================================
@@ -22435,7 +24803,7 @@ def create_admin_embed(tournament):
         f"👥 **Player Cap:** {tournament['max_participants']}\n"
         f"📋 **Rules:** {'Custom rules entered.' if tournament['rules'] != 'No rules specified.' else 'None specified'}\n"
         f"ℹ️ **Info:** {'Custom info entered.' if tournament['info'] != 'No additional info.' else 'None specified'}\n"
-        f"⚔️ **Bracket:** Single Elimination\n"
+        f"⚔️ **Bracket:** {tournament.get('bracket_type', 'single_elimination').replace('_', ' ').title()}\n"
         f"👤 **Team Size:** 1\n"
         f"📊 **Status:** {tournament['status'].title()}\n"
         f"👥 **Participants:** {len(tournament['participants'])}/{tournament['max_participants']}"
@@ -22529,30 +24897,18 @@ def get_standings(tournament):
     if not matches:
         return []
     
-    # Track eliminations by round
-    player_rounds = {}  # player_id -> highest round reached
-    
-    for match in matches:
-        if match["status"] == "completed" and match["winner"]:
-            # Winner advances
-            winner_id = match["winner"]
-            if match["player1"] and match["player1"]["id"] == winner_id:
-                winner = match["player1"]
-                loser = match["player2"]
-            else:
-                winner = match["player2"]
-                loser = match["player1"]
-            
-            if winner:
-                player_rounds[winner["id"]] = max(player_rounds.get(winner["id"], 0), match["round"] + 1)
-            if loser and loser["id"] != "BYE":
-                player_rounds[loser["id"]] = max(player_rounds.get(loser["id"], 0), match["round"])
-    
-    # Sort by highest round reached
-    participants = tournament.get("participants", [])
-    sorted_players = sorted(participants, key=lambda p: player_rounds.get(p["id"], 0), reverse=True)
-    
-    return sorted_players
+    return Bracket(matches).standings(tournament.get("participants", []))
+
+
+def award_tournament_prize(tournament, user_id, place, coins, xp):
+    """Pay a placing's prize through the coin ledger. Keyed by tournament and
+    place, so the champion buttons, Give Rewards and the end paths pay it once.
+    Returns True if this call paid it."""
+    status, _ = ledger_apply(
+        user_id, f"tournament:place{place}", coins=coins, xp=xp,
+        key=f"tournament:{tournament['id']}:place{place}"
+    )
+    return status == "ok"
 
 
 # ==========================================
@@ -22566,13 +24922,13 @@ class TournamentAdminView(discord.ui.View):
         super().__init__(timeout=None)
         self.tournament_id = tournament_id
     
-    def get_tournament(self):
+    def get_tournament(self, interaction):
         data = load_tournament_data()
-        return data["tournaments"].get(self.tournament_id)
+        return data["tournaments"].get(view_tournament_id(self, interaction))
     
     @discord.ui.button(label="▶️", style=discord.ButtonStyle.success, custom_id="tourney_start", row=0)
     async def start_tournament(self, interaction: discord.Interaction, button: discord.ui.Button):
-        tournament = self.get_tournament()
+        tournament = self.get_tournament(interaction)
         if not tournament:
             return await interaction.response.send_message("❌ Tournament not found!", ephemeral=True)
         
@@ -22585,26 +24941,26 @@ class TournamentAdminView(discord.ui.View):
         # Confirmation
         await interaction.response.send_message(
             f"Are you sure you want to start the tournament with **{len(tournament['participants'])}** participants?",
-            view=StartConfirmView(self.tournament_id),
+            view=StartConfirmView(tournament["id"]),
             ephemeral=True
         )
     
     @discord.ui.button(label="📤", style=discord.ButtonStyle.primary, custom_id="tourney_publish", row=0)
     async def publish_tournament(self, interaction: discord.Interaction, button: discord.ui.Button):
-        tournament = self.get_tournament()
+        tournament = self.get_tournament(interaction)
         if not tournament:
             return await interaction.response.send_message("❌ Tournament not found!", ephemeral=True)
         
         # Ask for channel
         await interaction.response.send_message(
             "Select the channel to publish the registration portal:",
-            view=ChannelSelectView(self.tournament_id),
+            view=ChannelSelectView(tournament["id"]),
             ephemeral=True
         )
     
     @discord.ui.button(label="➖", style=discord.ButtonStyle.danger, custom_id="tourney_unpublish", row=0)
     async def unpublish_tournament(self, interaction: discord.Interaction, button: discord.ui.Button):
-        tournament = self.get_tournament()
+        tournament = self.get_tournament(interaction)
         if not tournament:
             return await interaction.response.send_message("❌ Tournament not found!", ephemeral=True)
         
@@ -22615,7 +24971,7 @@ class TournamentAdminView(discord.ui.View):
     
     @discord.ui.button(label="✅", style=discord.ButtonStyle.success, custom_id="tourney_checkin", row=0)
     async def start_checkin(self, interaction: discord.Interaction, button: discord.ui.Button):
-        tournament = self.get_tournament()
+        tournament = self.get_tournament(interaction)
         if not tournament:
             return await interaction.response.send_message("❌ Tournament not found!", ephemeral=True)
         
@@ -22628,13 +24984,13 @@ class TournamentAdminView(discord.ui.View):
     async def delete_tournament(self, interaction: discord.Interaction, button: discord.ui.Button):
         await interaction.response.send_message(
             "⚠️ Are you sure you want to delete this tournament?",
-            view=DeleteConfirmView(self.tournament_id),
+            view=DeleteConfirmView(view_tournament_id(self, interaction)),
             ephemeral=True
         )
     
     @discord.ui.button(label="📝", style=discord.ButtonStyle.secondary, custom_id="tourney_config", row=1)
     async def edit_config(self, interaction: discord.Interaction, button: discord.ui.Button):
-        tournament = self.get_tournament()
+        tournament = self.get_tournament(interaction)
         if not tournament:
             return await interaction.response.send_message("❌ Tournament not found!", ephemeral=True)
         
@@ -22642,19 +24998,19 @@ class TournamentAdminView(discord.ui.View):
     
     @discord.ui.button(label="🔒", style=discord.ButtonStyle.secondary, custom_id="tourney_role", row=1)
     async def set_role(self, interaction: discord.Interaction, button: discord.ui.Button):
-        tournament = self.get_tournament()
+        tournament = self.get_tournament(interaction)
         if not tournament:
             return await interaction.response.send_message("❌ Tournament not found!", ephemeral=True)
         
         await interaction.response.send_message(
             "Select a required role (only members with this role can join):",
-            view=RoleSelectView(self.tournament_id),
+            view=RoleSelectView(tournament["id"]),
             ephemeral=True
         )
     
     @discord.ui.button(label="👥", style=discord.ButtonStyle.secondary, custom_id="tourney_players", row=1)
     async def view_players(self, interaction: discord.Interaction, button: discord.ui.Button):
-        tournament = self.get_tournament()
+        tournament = self.get_tournament(interaction)
         if not tournament:
             return await interaction.response.send_message("❌ Tournament not found!", ephemeral=True)
         
@@ -22684,13 +25040,13 @@ class TournamentRegistrationView(discord.ui.View):
         super().__init__(timeout=None)
         self.tournament_id = tournament_id
     
-    def get_tournament(self):
+    def get_tournament(self, interaction):
         data = load_tournament_data()
-        return data["tournaments"].get(self.tournament_id)
+        return data["tournaments"].get(view_tournament_id(self, interaction))
     
     @discord.ui.button(label="Register", style=discord.ButtonStyle.success, custom_id="tourney_register")
     async def register(self, interaction: discord.Interaction, button: discord.ui.Button):
-        tournament = self.get_tournament()
+        tournament = self.get_tournament(interaction)
         if not tournament:
             return await interaction.response.send_message("❌ Tournament not found!", ephemeral=True)
         
@@ -22733,7 +25089,7 @@ class TournamentRegistrationView(discord.ui.View):
     
     @discord.ui.button(label="Leave", style=discord.ButtonStyle.secondary, custom_id="tourney_leave")
     async def leave(self, interaction: discord.Interaction, button: discord.ui.Button):
-        tournament = self.get_tournament()
+        tournament = self.get_tournament(interaction)
         if not tournament:
             return await interaction.response.send_message("❌ Tournament not found!", ephemeral=True)
         
@@ -22749,7 +25105,7 @@ class TournamentRegistrationView(discord.ui.View):
     
     @discord.ui.button(label="Spectate", style=discord.ButtonStyle.primary, custom_id="tourney_spectate")
     async def spectate(self, interaction: discord.Interaction, button: discord.ui.Button):
-        tournament = self.get_tournament()
+        tournament = self.get_tournament(interaction)
         if not tournament:
             return await interaction.response.send_message("❌ Tournament not found!", ephemeral=True)
         
@@ -22780,12 +25136,17 @@ class MatchScoreView(discord.ui.View):
         if not is_staff(interaction.user):
             return await interaction.response.send_message("❌ Only staff can report match scores!", ephemeral=True)
         
+        tournament_id, match_id = self.tournament_id, self.match_id
+        if not tournament_id:
+            # Registered after a restart without ids - the match is found by its thread
+            tournament_id, match_id = resolve_view_state("tournament", interaction.channel_id) or (None, None)
+        
         data = load_tournament_data()
-        tournament = data["tournaments"].get(self.tournament_id)
+        tournament = data["tournaments"].get(tournament_id)
         if not tournament:
             return await interaction.response.send_message("❌ Tournament not found!", ephemeral=True)
         
-        match = next((m for m in tournament["matches"] if m["id"] == self.match_id), None)
+        match = next((m for m in tournament["matches"] if m["id"] == match_id), None)
         if not match:
             return await interaction.response.send_message("❌ Match not found!", ephemeral=True)
         
@@ -22817,7 +25178,10 @@ class StartConfirmView(discord.ui.View):
             return await interaction.followup.send("❌ Tournament not found!", ephemeral=True)
         
         # Generate bracket
-        tournament["matches"] = generate_bracket(tournament["participants"])
+        tournament["matches"] = generate_bracket(
+            tournament["participants"],
+            double_elimination=tournament.get("bracket_type") == "double_elimination"
+        )
         tournament["status"] = "active"
         tournament["started_at"] = datetime.datetime.now(datetime.timezone.utc).isoformat()
         
@@ -22992,7 +25356,7 @@ class TournamentEndView(discord.ui.View):
             return await interaction.response.send_message("❌ Staff only!", ephemeral=True)
         await interaction.response.send_message(
             "⚠️ Are you sure you want to delete this tournament?",
-            view=DeleteConfirmView(self.tournament_id),
+            view=DeleteConfirmView(view_tournament_id(self, interaction)),
             ephemeral=True
         )
     
@@ -23001,7 +25365,7 @@ class TournamentEndView(discord.ui.View):
         if not is_staff(interaction.user):
             return await interaction.response.send_message("❌ Staff only!", ephemeral=True)
         data = load_tournament_data()
-        tournament = data["tournaments"].get(self.tournament_id)
+        tournament = data["tournaments"].get(view_tournament_id(self, interaction))
         if tournament:
             tournament["status"] = "active"
             update_tournament(tournament)
@@ -23010,7 +25374,7 @@ class TournamentEndView(discord.ui.View):
     @discord.ui.button(label="📢 Publish Results", style=discord.ButtonStyle.primary, custom_id="tourney_end_publish")
     async def publish(self, interaction: discord.Interaction, button: discord.ui.Button):
         data = load_tournament_data()
-        tournament = data["tournaments"].get(self.tournament_id)
+        tournament = data["tournaments"].get(view_tournament_id(self, interaction))
         if not tournament:
             return await interaction.response.send_message("❌ Tournament not found!", ephemeral=True)
         
@@ -23020,7 +25384,7 @@ class TournamentEndView(discord.ui.View):
         embed = create_results_embed(tournament)
         
         # Add bracket image
-        bracket_img = await create_bracket_image(tournament)
+        bracket_img = await create_bracket_image(tournament, interaction.guild)
         
         if bracket_img:
             file = discord.File(bracket_img, filename="bracket.png")
@@ -23036,7 +25400,7 @@ class TournamentEndView(discord.ui.View):
             return await interaction.response.send_message("❌ Staff only!", ephemeral=True)
         
         data = load_tournament_data()
-        tournament = data["tournaments"].get(self.tournament_id)
+        tournament = data["tournaments"].get(view_tournament_id(self, interaction))
         if not tournament:
             return await interaction.response.send_message("❌ Tournament not found!", ephemeral=True)
         
@@ -23046,7 +25410,7 @@ class TournamentEndView(discord.ui.View):
         # Show rank selection
         await interaction.response.send_message(
             "Select which rank to place the winner at:",
-            view=Top10RankSelectView(self.tournament_id, tournament["winner"]),
+            view=Top10RankSelectView(tournament["id"], tournament["winner"]),
             ephemeral=True
         )
     
@@ -23057,7 +25421,7 @@ class TournamentEndView(discord.ui.View):
             return await interaction.response.send_message("❌ Staff only!", ephemeral=True)
         
         data = load_tournament_data()
-        tournament = data["tournaments"].get(self.tournament_id)
+        tournament = data["tournaments"].get(view_tournament_id(self, interaction))
         if not tournament:
             return await interaction.response.send_message("❌ Tournament not found!", ephemeral=True)
         
@@ -23086,12 +25450,11 @@ class TournamentEndView(discord.ui.View):
             if user_id == "BYE":
                 continue
             
-            # Add coins and XP
-            add_coins(user_id, coins)
-            add_xp(user_id, xp)
-            
             medal = ["🥇", "🥈", "🥉"][i]
-            reward_text += f"{medal} **{player['name']}**: +{coins:,} coins, +{xp} XP\n"
+            if award_tournament_prize(tournament, user_id, i + 1, coins, xp):
+                reward_text += f"{medal} **{player['name']}**: +{coins:,} coins, +{xp} XP\n"
+            else:
+                reward_text += f"{medal} **{player['name']}**: already paid\n"
         
         await interaction.followup.send(reward_text, ephemeral=True)
 
@@ -23183,18 +25546,24 @@ async def update_registration_embed(interaction, tournament):
         if not channel:
             return
         
-        msg = await channel.fetch_message(int(tournament["messages"]["registration_portal"]))
-        embed = create_registration_embed(tournament)
-        await msg.edit(embed=embed)
+        msg = channel.get_partial_message(int(tournament["messages"]["registration_portal"]))
+        tournament_id = tournament["id"]
+        
+        def registration_state():
+            # Built at send time so a burst of sign-ups shows the final count
+            latest = load_tournament_data()["tournaments"].get(tournament_id)
+            return {"embed": create_registration_embed(latest)} if latest else None
+        
+        queue_live_edit(msg, registration_state)
     except Exception as e:
         print(f"Failed to update registration embed: {e}")
 
 
 async def create_bracket_display(guild, tournament):
     """Create bracket display in bracket channel or current channel"""
-    bracket_img = await create_bracket_image(tournament)
+    pages = await render_bracket_pages(tournament, guild)
     
-    if not bracket_img:
+    if not pages:
         return
     
     # Find or create bracket channel
@@ -23202,15 +25571,9 @@ async def create_bracket_display(guild, tournament):
     if channel_id:
         channel = guild.get_channel(int(channel_id))
         if channel:
-            file = discord.File(bracket_img, filename="bracket.png")
-            embed = discord.Embed(
-                title=f"🏆 {tournament['name']} — Bracket",
-                color=0x8B0000
-            )
-            embed.set_image(url="attachment://bracket.png")
-            embed.set_footer(text="✝ THE FALLEN ✝")
+            files, embeds = bracket_page_embeds(tournament, pages)
             
-            msg = await channel.send(embed=embed, file=file)
+            msg = await channel.send(embeds=embeds, files=files)
             tournament["messages"]["bracket_display"] = str(msg.id)
             update_tournament(tournament)
 
@@ -23231,24 +25594,79 @@ async def update_bracket_display(guild, tournament):
         
         msg = await channel.fetch_message(int(tournament["messages"]["bracket_display"]))
         
-        bracket_img = await create_bracket_image(tournament)
-        if bracket_img:
-            file = discord.File(bracket_img, filename="bracket.png")
+        pages = await render_bracket_pages(tournament, guild)
+        if pages:
+            files, embeds = bracket_page_embeds(tournament, pages)
+            await msg.edit(embeds=embeds, attachments=files)
+    except Exception as e:
+        print(f"Failed to update bracket display: {e}")
+
+
+async def retry_rate_limited(make_coro):
+    """Await a fresh coroutine from make_coro, retrying when Discord answers 429"""
+    for attempt in range(MATCH_THREAD_RETRIES):
+        try:
+            return await make_coro()
+        except discord.HTTPException as e:
+            if e.status != 429 or attempt == MATCH_THREAD_RETRIES - 1:
+                raise
+            perf_record_rate_limit()
+            retry_after = getattr(e, "retry_after", None) or 2 ** attempt
+            print(f"Rate limited opening match thread! Waiting {retry_after}s...")
+            await asyncio.sleep(retry_after)
+
+
+async def launch_match_thread(channel, tournament, match, details, semaphore):
+    """Open (or reopen) one match thread and post the match intro"""
+    async with semaphore:
+        thread = None
+        if match.get("thread_id"):
+            # Created before an interruption - reuse it instead of opening a duplicate
+            thread = channel.guild.get_thread(int(match["thread_id"]))
+            if thread is None:
+                try:
+                    thread = await channel.guild.fetch_channel(int(match["thread_id"]))
+                except discord.HTTPException:
+                    thread = None
+        
+        if thread is None:
+            thread_name = f"{match['player1']['name']} vs {match['player2']['name']}"
+            thread = await retry_rate_limited(lambda: channel.create_thread(
+                name=thread_name[:100],
+                type=discord.ChannelType.public_thread,
+                auto_archive_duration=1440  # 24 hours
+            ))
+            match["thread_id"] = str(thread.id)
+            update_match(tournament["id"], match["id"], thread_id=match["thread_id"])
+        
+        if not match.get("intro_message_id"):
             embed = discord.Embed(
-                title=f"🏆 {tournament['name']} — Bracket",
+                title=f"⚔️ {match['player1']['name']} vs {match['player2']['name']}",
+                description=f"**Match ID:** {match['id']}\n{details}",
                 color=0x8B0000
             )
-            embed.set_image(url="attachment://bracket.png")
-            embed.set_footer(text="✝ THE FALLEN ✝")
+            embed.set_footer(text="Click Score when match is complete")
             
-            await msg.edit(embed=embed, attachments=[file])
-    except Exception as e:
-        print(f"Failed to update bracket display: {e}")
+            mentions = f"<@{match['player1']['id']}> <@{match['player2']['id']}>"
+            intro = await retry_rate_limited(lambda: thread.send(
+                content=f"{mentions}\n\nBegin your match! Click **Score** when complete.",
+                embed=embed,
+                view=MatchScoreView(tournament["id"], match["id"])
+            ))
+            # Saved with the status so a resume never posts (and pings) the intro twice
+            match["intro_message_id"] = str(intro.id)
+        
+        match["status"] = "in_progress"
+        update_match(tournament["id"], match["id"], intro_message_id=match["intro_message_id"], status="in_progress")
 
 
-async def create_match_threads(guild, tournament):
-    """Create threads for each active match"""
-    channel_id = tournament["channels"].get("registration")
+async def create_match_threads(guild, tournament, matches=None):
+    """
+    Create threads for every playable match (or just `matches`).
+    Each thread id is saved as soon as it exists, so running this again after
+    a crash picks up where it stopped instead of opening duplicates.
+    """
+    channel_id = tournament.get("channels", {}).get("registration")
     if not channel_id:
         return
     
@@ -23256,57 +25674,45 @@ async def create_match_threads(guild, tournament):
     if not channel:
         return
     
-    for match in tournament["matches"]:
-        if match["status"] == "pending" and match["player1"] and match["player2"]:
-            if match["player1"]["id"] == "BYE" or match["player2"]["id"] == "BYE":
-                continue
-            
-            # Rate limit protection
-            await asyncio.sleep(THREAD_CREATE_DELAY)
-            
-            try:
-                thread_name = f"{match['player1']['name']} vs {match['player2']['name']}"
-                thread = await channel.create_thread(
-                    name=thread_name[:100],
-                    type=discord.ChannelType.public_thread,
-                    auto_archive_duration=1440  # 24 hours
-                )
-                
-                match["thread_id"] = str(thread.id)
-                match["status"] = "in_progress"
-                
-                # Send match info
-                p1 = guild.get_member(int(match["player1"]["id"]))
-                p2 = guild.get_member(int(match["player2"]["id"]))
-                
-                mentions = ""
-                if p1:
-                    mentions += p1.mention + " "
-                if p2:
-                    mentions += p2.mention
-                
-                embed = discord.Embed(
-                    title=f"⚔️ {match['player1']['name']} vs {match['player2']['name']}",
-                    description=(
-                        f"**Match ID:** {match['id']}\n"
-                        f"**Best of:** {tournament['best_of']}\n\n"
-                        f"**Rules:**\n{tournament['rules']}\n\n"
-                        f"**Info:**\n{tournament['info']}"
-                    ),
-                    color=0x8B0000
-                )
-                embed.set_footer(text="Click Score when match is complete")
-                
-                await thread.send(
-                    content=f"{mentions}\n\nBegin your match! Click **Score** when complete.",
-                    embed=embed,
-                    view=MatchScoreView(tournament["id"], match["id"])
-                )
-                
-            except Exception as e:
-                print(f"Failed to create match thread: {e}")
+    async with _match_thread_lock:
+        todo = [
+            m for m in (tournament["matches"] if matches is None else matches)
+            if m["status"] == "pending" and m["player1"] and m["player2"]
+            and m["player1"]["id"] != "BYE" and m["player2"]["id"] != "BYE"
+        ]
+        if not todo:
+            return
+        
+        # Shared by every intro this round
+        details = (
+            f"**Best of:** {tournament['best_of']}\n\n"
+            f"**Rules:**\n{tournament['rules']}\n\n"
+            f"**Info:**\n{tournament['info']}"
+        )
+        semaphore = asyncio.Semaphore(MATCH_THREAD_CONCURRENCY)
+        
+        with perf_timer("loop", "match_threads"):
+            results = await asyncio.gather(
+                *(launch_match_thread(channel, tournament, m, details, semaphore) for m in todo),
+                return_exceptions=True
+            )
+        
+        for match, result in zip(todo, results):
+            if isinstance(result, Exception):
+                print(f"Failed to create match thread for {match['id']}: {result}")
+
+
+async def resume_match_threads():
+    """Finish opening match threads that a restart interrupted"""
+    await bot.wait_until_ready()
+    tournament = get_active_tournament()
+    if not tournament or tournament.get("status") != "active":
+        return
     
-    update_tournament(tournament)
+    channel_id = tournament.get("channels", {}).get("registration")
+    channel = bot.get_channel(int(channel_id)) if channel_id else None
+    if channel:
+        await create_match_threads(channel.guild, tournament)
 
 
 async def check_tournament_complete(interaction, tournament):
@@ -23315,11 +25721,10 @@ async def check_tournament_complete(interaction, tournament):
     if not matches:
         return
     
-    # Find final match (highest round)
-    max_round = max(m["round"] for m in matches)
-    final_match = next((m for m in matches if m["round"] == max_round), None)
+    bracket = Bracket(matches)
+    final_match = bracket.final_match()
     
-    if final_match and final_match["status"] == "completed":
+    if bracket.is_complete():
         # Tournament complete!
         tournament["status"] = "completed"
         tournament["ended_at"] = datetime.datetime.now(datetime.timezone.utc).isoformat()
@@ -23372,8 +25777,7 @@ async def check_tournament_complete(interaction, tournament):
             if i < len(reward_amounts):
                 coins, xp = reward_amounts[i]
                 try:
-                    add_coins(player["id"], coins)
-                    add_xp(player["id"], xp)
+                    award_tournament_prize(tournament, player["id"], i + 1, coins, xp)
                     rewards_given.append(f"{['🥇', '🥈', '🥉'][i]} **{player['name']}**: +{coins:,} coins, +{xp} XP")
                 except:
                     pass
@@ -23411,7 +25815,9 @@ async def check_tournament_complete(interaction, tournament):
         if channel_id:
             channel = interaction.guild.get_channel(int(channel_id))
             if channel:
-                await channel.send(embed=embed, view=TournamentEndView(tournament["id"]))
+                msg = await channel.send(embed=embed, view=TournamentEndView(tournament["id"]))
+                tournament.setdefault("messages", {})["results"] = str(msg.id)
+                update_tournament(tournament)
         
         # UPDATE VISUAL LEADERBOARD IMAGE
         if top10_updated:
@@ -23449,18 +25855,14 @@ async def bracket_prefix_cmd(ctx):
         return await ctx.send("❌ No active tournament!")
     
     async with ctx.typing():
-        bracket_img = await create_bracket_image(tournament)
-        if bracket_img:
-            file = discord.File(bracket_img, filename="bracket.png")
-            embed = discord.Embed(
-                title=f"🏆 {tournament['name']} — Bracket",
-                color=0x8B0000
-            )
-            embed.set_image(url="attachment://bracket.png")
-            embed.set_footer(text="✝ THE FALLEN ✝")
-            await ctx.send(embed=embed, file=file)
-        else:
-            await ctx.send("❌ Could not generate bracket image.")
+        pages = await render_bracket_pages(tournament, ctx.guild)
+        if not pages:
+            return await ctx.send("❌ Could not generate bracket image.")
+        
+        # Large brackets come in sections - 10 images per message
+        for i in range(0, len(pages), 10):
+            files, embeds = bracket_page_embeds(tournament, pages[i:i + 10])
+            await ctx.send(embeds=embeds, files=files)
 
 
 @bot.command(name="tparticipants", aliases=["tplayers"])
@@ -23519,6 +25921,36 @@ async def tournament_set_winner_cmd(ctx, member: discord.Member):
     await ctx.send(f"✅ **{member.display_name}** set as tournament winner!")
 
 
+@bot.command(name="tformat")
+async def tournament_format_cmd(ctx, bracket_type: str = None):
+    """
+    Set the bracket format before the tournament starts (staff only)
+    Usage: !tformat single | double
+    """
+    if not is_staff(ctx.author):
+        return await ctx.send("❌ Staff only!", delete_after=5)
+    
+    tournament = get_active_tournament()
+    if not tournament:
+        return await ctx.send("❌ No active tournament!")
+    
+    if not bracket_type:
+        current = tournament.get("bracket_type", "single_elimination").replace("_", " ").title()
+        return await ctx.send(f"⚔️ Current format: **{current}**\nUsage: `!tformat single` or `!tformat double`")
+    
+    bracket_type = f"{bracket_type.lower().split('_')[0]}_elimination"
+    if bracket_type not in BRACKET_TYPES:
+        return await ctx.send("❌ Format must be `single` or `double`.")
+    
+    if tournament.get("matches"):
+        return await ctx.send("❌ The bracket has already been generated!")
+    
+    tournament["bracket_type"] = bracket_type
+    update_tournament(tournament)
+    
+    await ctx.send(f"✅ Bracket format set to **{bracket_type.replace('_', ' ').title()}**")
+
+
 @bot.command(name="tendtournament", aliases=["endt"])
 async def tournament_end_cmd(ctx):
     """
@@ -23567,8 +25999,7 @@ async def tournament_end_cmd(ctx):
         if i < len(reward_amounts):
             coins, xp = reward_amounts[i]
             try:
-                add_coins(player["id"], coins)
-                add_xp(player["id"], xp)
+                award_tournament_prize(tournament, player["id"], i + 1, coins, xp)
                 rewards_given.append(f"{['🥇', '🥈', '🥉'][i]} **{player['name']}**: +{coins:,} coins, +{xp} XP")
             except:
                 pass
@@ -23598,7 +26029,9 @@ async def tournament_end_cmd(ctx):
     
     embed.set_footer(text="✝ THE FALLEN ✝")
     
-    await ctx.send(embed=embed, view=TournamentEndView(tournament["id"]))
+    msg = await ctx.send(embed=embed, view=TournamentEndView(tournament["id"]))
+    tournament.setdefault("messages", {})["results"] = str(msg.id)
+    update_tournament(tournament)
     
     # UPDATE VISUAL LEADERBOARD IMAGE
     if top10_updated:
@@ -23736,21 +26169,90 @@ class TournamentCreateButtonView(discord.ui.View):
 # ============================================================
 
 # --- POLL DATA FUNCTIONS ---
+# polls_data.json is loaded once and kept in memory. Each availability
+# submission is one line appended to POLL_RESPONSE_LOG instead of a rewrite
+# of the whole file; the log is folded back in whenever the file is saved
+# anyway (poll created or closed). Per-poll tallies of (day, time) votes and
+# per-day responders are kept up to date on each submission, so results
+# never re-count every response.
+
+POLL_RESPONSE_LOG = "poll_responses.log"  # Append-only {"poll", "user", "day", "times"} lines
+
+_poll_state = {
+    "data": None,     # polls_data.json contents with logged responses applied
+    "tallies": {},    # poll_id -> {"slots": Counter((day, time)), "days": {day: set(user_id)}}
+}
 
 def load_polls_data():
-    """Load poll data from JSON"""
-    if os.path.exists(POLLS_FILE):
+    """Load poll data (cached, with logged responses applied)"""
+    if _poll_state["data"] is None:
+        data = {"active_polls": {}, "poll_history": []}
+        if os.path.exists(POLLS_FILE):
+            try:
+                with open(POLLS_FILE, "r") as f:
+                    data = json.load(f)
+                    perf_record_store(POLLS_FILE, "load", f.tell())
+            except:
+                pass
         try:
-            with open(POLLS_FILE, "r") as f:
-                return json.load(f)
-        except:
+            with open(POLL_RESPONSE_LOG, "r") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    poll = data["active_polls"].get(entry["poll"])
+                    if poll:
+                        _apply_poll_response(poll, entry["user"], entry["day"], entry["times"])
+                perf_record_store(POLL_RESPONSE_LOG, "load", f.tell())
+        except FileNotFoundError:
             pass
-    return {"active_polls": {}, "poll_history": []}
+        _poll_state["data"] = data
+        _poll_state["tallies"] = {}
+    return _poll_state["data"]
 
 def save_polls_data(data):
-    """Save poll data to JSON"""
+    """Save poll data to JSON and start a fresh response log"""
+    _poll_state["data"] = data
     with open(POLLS_FILE, "w") as f:
         json.dump(data, f, indent=2)
+        perf_record_store(POLLS_FILE, "save", f.tell())
+    open(POLL_RESPONSE_LOG, "w").close()
+
+def _apply_poll_response(poll, user_id, day, times):
+    """Set one user's times for a day; returns the times they replaced"""
+    previous = poll.setdefault("responses", {}).setdefault(user_id, {}).get(day, [])
+    poll["responses"][user_id][day] = times
+    responders = poll.setdefault("responders", [])
+    if user_id not in responders:
+        responders.append(user_id)
+    return previous
+
+def get_poll_tally(poll):
+    """Vote counts per (day, time) and responders per day, built once per poll"""
+    tally = _poll_state["tallies"].get(poll["id"])
+    if tally is None:
+        tally = {"slots": Counter(), "days": {}}
+        for user_id, user_days in poll.get("responses", {}).items():
+            for day, times in user_days.items():
+                tally["days"].setdefault(day, set()).add(user_id)
+                tally["slots"].update((day, t) for t in times)
+        _poll_state["tallies"][poll["id"]] = tally
+    return tally
+
+def record_poll_response(poll, user_id, day, times):
+    """Apply a submission, update the poll's tally and append it to the log"""
+    tally = get_poll_tally(poll)
+    previous = _apply_poll_response(poll, user_id, day, times)
+    tally["slots"].subtract((day, t) for t in previous)
+    tally["slots"].update((day, t) for t in times)
+    tally["slots"] += Counter()  # Drop slots that fell to zero
+    tally["days"].setdefault(day, set()).add(user_id)
+    
+    line = json.dumps({"poll": poll["id"], "user": user_id, "day": day, "times": times}) + "\n"
+    with open(POLL_RESPONSE_LOG, "a") as f:
+        f.write(line)
+    perf_record_store(POLL_RESPONSE_LOG, "save", len(line))
 
 # --- POLL CONFIGURATION ---
 
@@ -23842,26 +26344,15 @@ class PollTimeSelectionModal(discord.ui.Modal):
                 ephemeral=True
             )
         
+        valid_times = list(dict.fromkeys(valid_times))  # "3pm, 3:00 PM" is one vote
+        
         data = load_polls_data()
         poll = data["active_polls"].get(self.poll_id)
         
         if not poll:
             return await interaction.response.send_message("❌ This poll is no longer active.", ephemeral=True)
         
-        user_id = str(interaction.user.id)
-        if "responses" not in poll:
-            poll["responses"] = {}
-        if user_id not in poll["responses"]:
-            poll["responses"][user_id] = {}
-        
-        poll["responses"][user_id][self.day] = valid_times
-        
-        if "responders" not in poll:
-            poll["responders"] = []
-        if user_id not in poll["responders"]:
-            poll["responders"].append(user_id)
-        
-        save_polls_data(data)
+        record_poll_response(poll, str(interaction.user.id), self.day, valid_times)
         
         await interaction.response.send_message(
             f"✅ **{self.day}** saved!\n\nSelected times: **{', '.join(valid_times)}**\n\n*Click other days to add more, or click ✅ Submit when done!*",
@@ -23870,21 +26361,27 @@ class PollTimeSelectionModal(discord.ui.Modal):
 
 
 # --- POLL BUTTONS ---
+# DynamicItems: the poll id travels in the custom_id, so one registration per
+# button class (bot.add_dynamic_items in setup_hook) covers every poll.
 
-class PollDayButton(discord.ui.Button):
+class PollDayButton(discord.ui.DynamicItem[discord.ui.Button], template=r"poll_day_(?P<poll_id>.+)_(?P<day>[A-Za-z]+)"):
     """Button for each day of the week"""
     
     def __init__(self, day: str, poll_id: str, row: int = 0):
         self.day = day
         self.poll_id = poll_id
         emoji = POLL_DAY_EMOJIS.get(day, "📅")
-        super().__init__(
+        super().__init__(discord.ui.Button(
             label=day[:3],
             style=discord.ButtonStyle.secondary,
             custom_id=f"poll_day_{poll_id}_{day}",
             emoji=emoji,
             row=row
-        )
+        ))
+    
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(day=match["day"], poll_id=match["poll_id"])
     
     async def callback(self, interaction: discord.Interaction):
         await interaction.response.send_modal(PollTimeSelectionModal(
@@ -23893,18 +26390,22 @@ class PollDayButton(discord.ui.Button):
         ))
 
 
-class PollSubmitButton(discord.ui.Button):
+class PollSubmitButton(discord.ui.DynamicItem[discord.ui.Button], template=r"poll_submit_(?P<poll_id>.+)"):
     """Button to finalize submission"""
     
     def __init__(self, poll_id: str):
         self.poll_id = poll_id
-        super().__init__(
+        super().__init__(discord.ui.Button(
             label="Submit",
             style=discord.ButtonStyle.success,
             custom_id=f"poll_submit_{poll_id}",
             emoji="✅",
             row=2
-        )
+        ))
+    
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(poll_id=match["poll_id"])
     
     async def callback(self, interaction: discord.Interaction):
         data = load_polls_data()
@@ -23943,18 +26444,22 @@ class PollSubmitButton(discord.ui.Button):
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
 
-class PollViewSelectionsButton(discord.ui.Button):
+class PollViewSelectionsButton(discord.ui.DynamicItem[discord.ui.Button], template=r"poll_view_(?P<poll_id>.+)"):
     """Button to view current selections"""
     
     def __init__(self, poll_id: str):
         self.poll_id = poll_id
-        super().__init__(
+        super().__init__(discord.ui.Button(
             label="My Times",
             style=discord.ButtonStyle.primary,
             custom_id=f"poll_view_{poll_id}",
             emoji="👁️",
             row=2
-        )
+        ))
+    
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(poll_id=match["poll_id"])
     
     async def callback(self, interaction: discord.Interaction):
         data = load_polls_data()
@@ -23990,18 +26495,22 @@ class PollViewSelectionsButton(discord.ui.Button):
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
 
-class PollStaffResultsButton(discord.ui.Button):
+class PollStaffResultsButton(discord.ui.DynamicItem[discord.ui.Button], template=r"poll_staffresults_(?P<poll_id>.+)"):
     """Staff button to view results"""
     
     def __init__(self, poll_id: str):
         self.poll_id = poll_id
-        super().__init__(
+        super().__init__(discord.ui.Button(
             label="Results",
             style=discord.ButtonStyle.secondary,
             custom_id=f"poll_staffresults_{poll_id}",
             emoji="📊",
             row=3
-        )
+        ))
+    
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(poll_id=match["poll_id"])
     
     async def callback(self, interaction: discord.Interaction):
         if not is_staff(interaction.user):
@@ -24019,18 +26528,22 @@ class PollStaffResultsButton(discord.ui.Button):
         await interaction.followup.send(embed=embed, ephemeral=True)
 
 
-class PollStaffCloseButton(discord.ui.Button):
+class PollStaffCloseButton(discord.ui.DynamicItem[discord.ui.Button], template=r"poll_staffclose_(?P<poll_id>.+)"):
     """Staff button to close poll"""
     
     def __init__(self, poll_id: str):
         self.poll_id = poll_id
-        super().__init__(
+        super().__init__(discord.ui.Button(
             label="Close",
             style=discord.ButtonStyle.danger,
             custom_id=f"poll_staffclose_{poll_id}",
             emoji="🔒",
             row=3
-        )
+        ))
+    
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(poll_id=match["poll_id"])
     
     async def callback(self, interaction: discord.Interaction):
         if not is_staff(interaction.user):
@@ -24096,7 +26609,6 @@ class PollDaySelectView(discord.ui.View):
 async def generate_poll_results_embed(poll: dict, guild: discord.Guild, final: bool = False) -> discord.Embed:
     """Generate results embed with best times analysis"""
     
-    responses = poll.get("responses", {})
     responders = poll.get("responders", [])
     
     title_prefix = "📊 FINAL RESULTS:" if final else "📊 Current Results:"
@@ -24105,39 +26617,17 @@ async def generate_poll_results_embed(poll: dict, guild: discord.Guild, final: b
         color=0x8B0000 if final else 0xFFD700
     )
     
-    if not responses:
+    if not poll.get("responses"):
         embed.description = "No responses yet."
         return embed
     
-    # Count votes for each day/time combination
-    time_counts = {}
-    day_counts = {}
-    
-    for user_id, user_days in responses.items():
-        for day, times in user_days.items():
-            if day not in day_counts:
-                day_counts[day] = set()
-            day_counts[day].add(user_id)
-            
-            if day not in time_counts:
-                time_counts[day] = {}
-            
-            for time in times:
-                if time not in time_counts[day]:
-                    time_counts[day][time] = 0
-                time_counts[day][time] += 1
-    
-    # Find best times
-    best_slots = []
-    for day, times in time_counts.items():
-        for time, count in times.items():
-            best_slots.append((day, time, count))
-    
-    best_slots.sort(key=lambda x: x[2], reverse=True)
+    # Vote counts are kept up to date on every submission
+    tally = get_poll_tally(poll)
+    day_counts = tally["days"]
     
     # Top 5 best times
-    if best_slots:
-        top_times = best_slots[:5]
+    if tally["slots"]:
+        top_times = [(day, time, count) for (day, time), count in tally["slots"].most_common(5)]
         top_text = "\n".join([
             f"🥇 **{day}** @ **{time}** — {count} {'person' if count == 1 else 'people'}" if i == 0 else
             f"🥈 **{day}** @ **{time}** — {count} {'person' if count == 1 else 'people'}" if i == 1 else
@@ -24459,18 +26949,6 @@ async def poll_results_cmd(ctx, poll_id: str):
 
 # --- SETUP POLL VIEWS ON READY ---
 
-async def setup_poll_views():
-    """Register persistent poll views - call this in on_ready"""
-    data = load_polls_data()
-    count = 0
-    for poll_id, poll in data.get("active_polls", {}).items():
-        view = PollDaySelectView(poll_id=poll_id, poll_type=poll.get("type", "training"))
-        bot.add_view(view)
-        count += 1
-    if count > 0:
-        print(f"✅ Registered {count} poll views")
-
-
 # ============================================================
 # END POLL SYSTEM
 # ============================================================
@@ -24486,6 +26964,10 @@ if __name__ == "__main__":
     print("Starting The Fallen Bot...")
     print("=" * 50)
     
+    if os.getenv("SHARD_IDS"):
+        print("❌ SHARD_IDS is not supported - run every shard in one process (SHARD_COUNT)")
+        sys.exit(1)
+    
     # Check if we should wait (rate limit cooldown file)
     cooldown_file = "/tmp/bot_cooldown"
     if os.path.exists(cooldown_file):
@@ -24504,6 +26986,7 @@ if __name__ == "__main__":
         bot.run(TOKEN)
     except discord.errors.HTTPException as e:
         if e.status == 429:
+            perf_record_rate_limit()
             retry_after = getattr(e, 'retry_after', 60)
             print(f"⚠️ Rate limited by Discord! Waiting {retry_after}s before Render restarts...")
             # Write cooldown file so next restart knows to wait